@@ -0,0 +1,45 @@
+"""Add unique (device_id, device_timestamp) index to sensor_data
+
+Revision ID: f6g7h8i9j0k1
+Revises: 44f540b6d786
+Create Date: 2026-03-15
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "f6g7h8i9j0k1"
+down_revision = "44f540b6d786"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Remove readings already stored twice (keep the first row of each)
+    op.execute(
+        """
+        DELETE FROM sensor_data
+        WHERE device_timestamp IS NOT NULL
+          AND id NOT IN (
+              SELECT MIN(id) FROM sensor_data
+              WHERE device_timestamp IS NOT NULL
+              GROUP BY device_id, device_timestamp
+          )
+        """
+    )
+
+    # Partial unique index — readings without a device clock are not deduplicated
+    op.create_index(
+        "uq_sensor_data_device_timestamp",
+        "sensor_data",
+        ["device_id", "device_timestamp"],
+        unique=True,
+        postgresql_where=sa.text("device_timestamp IS NOT NULL"),
+        sqlite_where=sa.text("device_timestamp IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_sensor_data_device_timestamp", table_name="sensor_data")
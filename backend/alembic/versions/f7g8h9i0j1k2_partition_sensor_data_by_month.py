@@ -0,0 +1,141 @@
+"""Partition sensor_data by month on created_at (PostgreSQL)
+
+Rebuilds sensor_data as a RANGE (created_at) partitioned table with one
+partition per calendar month, from the month of the oldest reading to two
+months ahead, plus a DEFAULT partition as a safety net. Existing rows are
+copied in one pass, so run it in a maintenance window on large tables.
+
+- Primary key becomes (id, created_at); ids keep their sequence.
+- The (pit|workshop|device, created_at) indexes are recreated on the
+  parent; the plain created_at index is dropped (partition bounds do
+  its job).
+- The duplicate-reading unique index moves to each partition, since a
+  unique index on the parent would have to include created_at.
+
+Later partitions are created by the app (src/services/sensor_partitions.py).
+No-op on other databases.
+
+Revision ID: f7g8h9i0j1k2
+Revises: f6g7h8i9j0k1
+Create Date: 2026-03-18
+"""
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "f7g8h9i0j1k2"
+down_revision = "f6g7h8i9j0k1"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 2
+
+_FOREIGN_KEYS = (
+    ("sensor_data_device_id_fkey", "device_id", "devices(device_id)"),
+    ("sensor_data_pit_id_fkey", "pit_id", "pits(id)"),
+    ("sensor_data_workshop_id_fkey", "workshop_id", "workshops(id)"),
+)
+_INDEXES = (
+    ("ix_sensor_data_pit_created", "pit_id, created_at"),
+    ("ix_sensor_data_workshop_created", "workshop_id, created_at"),
+    ("ix_sensor_data_device_created", "device_id, created_at"),
+)
+
+
+def _month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_month(start: datetime) -> datetime:
+    return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+
+
+def _dedup_index(table: str) -> str:
+    return (
+        f"CREATE UNIQUE INDEX uq_{table}_device_timestamp ON {table} "
+        f"(device_id, device_timestamp) WHERE device_timestamp IS NOT NULL"
+    )
+
+
+def _swap_in(new_table: str, pkey: str) -> None:
+    """Replace sensor_data with new_table, keeping the id sequence."""
+    op.execute("ALTER SEQUENCE sensor_data_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE sensor_data")
+    op.execute(f"ALTER TABLE {new_table} RENAME TO sensor_data")
+    op.execute(f"ALTER TABLE sensor_data RENAME CONSTRAINT {new_table}_pkey TO {pkey}")
+    op.execute("ALTER SEQUENCE sensor_data_id_seq OWNED BY sensor_data.id")
+    for name, column, target in _FOREIGN_KEYS:
+        op.execute(
+            f"ALTER TABLE sensor_data ADD CONSTRAINT {name} "
+            f"FOREIGN KEY ({column}) REFERENCES {target}"
+        )
+    for name, columns in _INDEXES:
+        op.execute(f"CREATE INDEX {name} ON sensor_data ({columns})")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute(
+        "CREATE TABLE sensor_data_partitioned "
+        "(LIKE sensor_data INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute(
+        "ALTER TABLE sensor_data_partitioned "
+        "ADD CONSTRAINT sensor_data_partitioned_pkey PRIMARY KEY (id, created_at)"
+    )
+
+    now = datetime.now(timezone.utc)
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM sensor_data")).scalar()
+    month = _month_start(oldest or now)
+    last = _month_start(now)
+    for _ in range(MONTHS_AHEAD):
+        last = _add_month(last)
+
+    partitions = []
+    while month <= last:
+        name = f"sensor_data_y{month.year:04d}m{month.month:02d}"
+        op.execute(
+            f"CREATE TABLE {name} PARTITION OF sensor_data_partitioned "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_month(month).isoformat()}')"
+        )
+        partitions.append(name)
+        month = _add_month(month)
+    op.execute("CREATE TABLE sensor_data_default PARTITION OF sensor_data_partitioned DEFAULT")
+    partitions.append("sensor_data_default")
+
+    op.execute("INSERT INTO sensor_data_partitioned SELECT * FROM sensor_data")
+    _swap_in("sensor_data_partitioned", "sensor_data_pkey")
+
+    for name in partitions:
+        op.execute(_dedup_index(name))
+    op.execute("ANALYZE sensor_data")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute(
+        "CREATE TABLE sensor_data_plain "
+        "(LIKE sensor_data INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    op.execute("ALTER TABLE sensor_data_plain ADD CONSTRAINT sensor_data_plain_pkey PRIMARY KEY (id)")
+    op.execute("INSERT INTO sensor_data_plain SELECT * FROM sensor_data")
+    # Dropping the parent drops every partition with it
+    _swap_in("sensor_data_plain", "sensor_data_pkey")
+
+    op.execute("CREATE INDEX ix_sensor_data_created_at ON sensor_data (created_at)")
+    op.execute(
+        "CREATE UNIQUE INDEX uq_sensor_data_device_timestamp ON sensor_data "
+        "(device_id, device_timestamp) WHERE device_timestamp IS NOT NULL"
+    )
@@ -0,0 +1,64 @@
+"""Add sensor_rollups table
+
+Per-pit 1-minute / 15-minute / 1-hour aggregates of sensor_data, filled
+(and backfilled from existing readings) by the rollup compactor in the
+ingest process — see src/services/sensor_rollups.py.
+
+Revision ID: g8h9i0j1k2l3
+Revises: f7g8h9i0j1k2
+Create Date: 2026-03-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "g8h9i0j1k2l3"
+down_revision = "f7g8h9i0j1k2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sensor_rollups",
+        sa.Column("pit_id", sa.Integer(), sa.ForeignKey("pits.id"), nullable=False),
+        sa.Column("resolution_seconds", sa.Integer(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("reading_count", sa.Integer(), nullable=False, server_default="0"),
+        # Per metric: readings with a value, their sum, min and max
+        sa.Column("temperature_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("temperature_sum", sa.Float(), nullable=True),
+        sa.Column("temperature_min", sa.Float(), nullable=True),
+        sa.Column("temperature_max", sa.Float(), nullable=True),
+        sa.Column("humidity_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("humidity_sum", sa.Float(), nullable=True),
+        sa.Column("humidity_min", sa.Float(), nullable=True),
+        sa.Column("humidity_max", sa.Float(), nullable=True),
+        sa.Column("pressure_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pressure_sum", sa.Float(), nullable=True),
+        sa.Column("pressure_min", sa.Float(), nullable=True),
+        sa.Column("pressure_max", sa.Float(), nullable=True),
+        sa.Column("iaq_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("iaq_sum", sa.Float(), nullable=True),
+        sa.Column("iaq_min", sa.Float(), nullable=True),
+        sa.Column("iaq_max", sa.Float(), nullable=True),
+        sa.Column("pm1_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pm1_sum", sa.Float(), nullable=True),
+        sa.Column("pm1_min", sa.Float(), nullable=True),
+        sa.Column("pm1_max", sa.Float(), nullable=True),
+        sa.Column("pm25_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pm25_sum", sa.Float(), nullable=True),
+        sa.Column("pm25_min", sa.Float(), nullable=True),
+        sa.Column("pm25_max", sa.Float(), nullable=True),
+        sa.Column("pm10_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pm10_sum", sa.Float(), nullable=True),
+        sa.Column("pm10_min", sa.Float(), nullable=True),
+        sa.Column("pm10_max", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("pit_id", "resolution_seconds", "bucket_start"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sensor_rollups")
@@ -0,0 +1,58 @@
+"""Add pit_latest_readings table
+
+One row per pit with its newest valid reading, upserted by ingest in the
+same transaction as the readings — see src/services/latest_readings.py.
+On PostgreSQL the table is seeded from sensor_data here; elsewhere (and
+for any pit missed) rows are filled on first read.
+
+Revision ID: h9i0j1k2l3m4
+Revises: g8h9i0j1k2l3
+Create Date: 2026-03-21
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "h9i0j1k2l3m4"
+down_revision = "g8h9i0j1k2l3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pit_latest_readings",
+        sa.Column("pit_id", sa.Integer(), sa.ForeignKey("pits.id"), primary_key=True),
+        sa.Column("device_id", sa.String(50), nullable=True),
+        sa.Column("temperature", sa.Float(), nullable=True),
+        sa.Column("humidity", sa.Float(), nullable=True),
+        sa.Column("pressure", sa.Float(), nullable=True),
+        sa.Column("gas_resistance", sa.Float(), nullable=True),
+        sa.Column("iaq", sa.Float(), nullable=True),
+        sa.Column("pm1", sa.Float(), nullable=True),
+        sa.Column("pm25", sa.Float(), nullable=True),
+        sa.Column("pm10", sa.Float(), nullable=True),
+        # created_at of the reading; NULL = the pit has no valid reading
+        sa.Column("reading_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            """
+            INSERT INTO pit_latest_readings
+                (pit_id, device_id, temperature, humidity, pressure, gas_resistance,
+                 iaq, pm1, pm25, pm10, reading_at)
+            SELECT DISTINCT ON (pit_id)
+                pit_id, device_id, temperature, humidity, pressure, gas_resistance,
+                iaq, pm1, pm25, pm10, created_at
+            FROM sensor_data
+            WHERE is_valid
+            ORDER BY pit_id, created_at DESC
+            """
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("pit_latest_readings")
@@ -0,0 +1,31 @@
+"""Add indexes for keyset pagination
+
+Alerts, jobs and audit logs are listed newest first per workshop; keyset
+pages (src/utils/pagination.py) seek on created_at within the workshop.
+sensor_data already has ix_sensor_data_pit_created.
+
+Revision ID: i0j1k2l3m4n5
+Revises: h9i0j1k2l3m4
+Create Date: 2026-03-22
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = "i0j1k2l3m4n5"
+down_revision = "h9i0j1k2l3m4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_alerts_workshop_created", "alerts", ["workshop_id", "created_at"])
+    op.create_index("ix_jobs_workshop_created", "jobs", ["workshop_id", "created_at"])
+    op.create_index("ix_audit_logs_created_at", "audit_logs", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_logs_created_at", table_name="audit_logs")
+    op.drop_index("ix_jobs_workshop_created", table_name="jobs")
+    op.drop_index("ix_alerts_workshop_created", table_name="alerts")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Script: bench_payload_decoder.py
+Purpose:
+    Microbenchmark of MQTT sensor payload decoding.
+    Compares the tolerant path (stdlib json.loads + per-field _safe_float /
+    _safe_int + _validate_reading, as the ingest path did before) with
+    decode_sensor_readings(), which uses orjson when installed and the
+    one-pass decoder for known shapes. Also times the compact binary
+    format and prints the payload sizes.
+
+Usage:
+    python scripts/benchmarks/bench_payload_decoder.py
+    python scripts/benchmarks/bench_payload_decoder.py --iterations 200000
+
+Author: PPF Monitoring Team
+Created: 2026-03-13
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# ── Add project root ──────────────────────────────────────────────────────────
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Settings are loaded on import; the benchmark never connects to anything
+for _key, _value in {
+    "DATABASE_USER": "bench",
+    "DATABASE_PASSWORD": "bench_password_32chars_minimum_ok",
+    "DATABASE_HOST": "localhost",
+    "DATABASE_NAME": "bench",
+    "JWT_SECRET_KEY": "bench_secret_key_that_is_at_least_32_characters_long",
+    "MQTT_BROKER_HOST": "localhost",
+    "MQTT_USERNAME": "bench",
+    "MQTT_PASSWORD": "bench",
+    "STREAM_TOKEN_SECRET": "bench_stream_token_secret_32chars_ok",
+    "SUPER_ADMIN_PASSWORD": "Bench@Password123",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+from src.services import payload_decoder  # noqa: E402
+from src.services.sensor_service import (  # noqa: E402
+    coerce_sensor_payload,
+    decode_sensor_readings,
+)
+
+PAYLOADS = {
+    "DHT22+PMS5003": json.dumps({
+        "device_id": "ESP32-AABBCCDDEEFF",
+        "license_key": "LIC-TEST-TEST-TEST",
+        "sensor_type": "DHT22+PMS5003",
+        "temperature": 24.5,
+        "humidity": 58.2,
+        "pm1": 8.2,
+        "pm25": 14.6,
+        "pm10": 22.1,
+        "particles_03um": 1200,
+        "particles_05um": 800,
+        "particles_10um": 400,
+        "particles_25um": 150,
+        "particles_50um": 50,
+        "particles_100um": 10,
+        "timestamp": "2026-02-22T10:30:00Z",
+    }),
+    "BME688+PMS5003": json.dumps({
+        "device_id": "PIWIFI-01",
+        "license_key": "LIC-TEST-TEST-TEST",
+        "sensor_type": "BME688+PMS5003",
+        "temperature": 24.5,
+        "humidity": 58.2,
+        "pressure": 1013.2,
+        "gas_resistance": 95000.0,
+        "iaq": 82.4,
+        "iaq_accuracy": 3,
+        "pm1": 8,
+        "pm25": 14,
+        "pm10": 22,
+        "timestamp": "2026-02-22T10:30:00Z",
+    }),
+}
+
+
+def tolerant(raw: str):
+    """The pre-fast-path pipeline: stdlib JSON, then per-field coercion."""
+    return coerce_sensor_payload(json.loads(raw))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2].strip())
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    backend = getattr(payload_decoder._loads or payload_decoder._resolve_loads(), "__module__", "?")
+    print(f"JSON backend: {backend}  iterations: {args.iterations:,}\n")
+    print(f"{'shape':<16} {'bytes':>6} {'tolerant µs':>12} {'fast µs':>10} {'speed-up':>9}")
+
+    for shape, raw in PAYLOADS.items():
+        assert tolerant(raw).values == decode_sensor_readings(raw)[0].values
+        slow = min(timeit.repeat(lambda: tolerant(raw), number=args.iterations, repeat=3))
+        fast = min(timeit.repeat(lambda: decode_sensor_readings(raw), number=args.iterations, repeat=3))
+        per_slow = slow / args.iterations * 1e6
+        per_fast = fast / args.iterations * 1e6
+        print(f"{shape:<16} {len(raw):>6} {per_slow:>12.2f} {per_fast:>10.2f} {slow / fast:>8.2f}x")
+
+    # Same BME688 reading in the compact binary format
+    data = json.loads(PAYLOADS["BME688+PMS5003"])
+    token = hashlib.sha256(data["license_key"].encode("utf-8")).digest()[:8]
+    values = {k: v for k, v in data.items() if k in payload_decoder._BINARY_IDS}
+    binary = payload_decoder.encode_binary(data["device_id"], token, values, 1771756200000)
+    binary_str = binary.decode("latin-1")
+    assert decode_sensor_readings(binary_str)[0].values["pressure"] == 1013.2
+    elapsed = min(timeit.repeat(lambda: decode_sensor_readings(binary_str), number=args.iterations, repeat=3))
+    print(f"{'binary v1':<16} {len(binary):>6} {'':>12} {elapsed / args.iterations * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,9 +17,10 @@ from src.config.database import get_db
 from src.config.settings import get_settings
 from src.models.audit_log import AuditLog
 from src.models.user import User
-from src.schemas.common import SuccessResponse, build_paginated
+from src.schemas.common import SuccessResponse, build_cursor_paginated, build_paginated
 from src.utils.constants import UserRole
 from src.utils.logger import get_logger
+from src.utils.pagination import estimate_count, keyset_page
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 logger = get_logger(__name__)
@@ -110,10 +111,16 @@ async def list_audit_logs(
     page_size: int = Query(default=50, ge=1, le=200),
     workshop_id: int = Query(default=None),
     action_prefix: str = Query(default=None, description="e.g. 'user.' or 'job.'"),
+    pagination: str = Query(default="offset", pattern="^(offset|cursor)$"),
+    cursor: str = Query(default=None, description="next_cursor of the previous page"),
+    estimate_total: bool = Query(default=False, description="Cursor mode: include estimated_total"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_super_admin),
 ):
-    """Paginated audit log. super_admin only."""
+    """
+    Paginated audit log. super_admin only.
+    pagination=cursor (implied by cursor) pages by (created_at, id) without a count.
+    """
     from sqlalchemy import func
 
     base_q = select(AuditLog)
@@ -122,6 +129,17 @@ async def list_audit_logs(
     if action_prefix:
         base_q = base_q.where(AuditLog.action.like(f"{action_prefix}%"))
 
+    if pagination == "cursor" or cursor is not None:
+        try:
+            logs, next_cursor = await keyset_page(
+                db, base_q, AuditLog.created_at, AuditLog.id, cursor, page_size
+            )
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        items = [_audit_log_item(log) for log in logs]
+        estimated = await estimate_count(db, base_q) if estimate_total else None
+        return build_cursor_paginated(items, page_size, next_cursor, estimated)
+
     count_result = await db.execute(select(func.count()).select_from(base_q.subquery()))
     total = count_result.scalar_one()
 
@@ -130,17 +148,18 @@ async def list_audit_logs(
         base_q.order_by(AuditLog.created_at.desc()).offset(offset).limit(page_size)
     )
     logs = result.scalars().all()
-    items = [
-        {
-            "id": log.id,
-            "workshop_id": log.workshop_id,
-            "user_id": log.user_id,
-            "action": log.action,
-            "resource_type": log.resource_type,
-            "resource_id": log.resource_id,
-            "ip_address": log.ip_address,
-            "created_at": log.created_at,
-        }
-        for log in logs
-    ]
+    items = [_audit_log_item(log) for log in logs]
     return build_paginated(items=items, total=total, page=page, page_size=page_size)
+
+
+def _audit_log_item(log: AuditLog) -> dict:
+    return {
+        "id": log.id,
+        "workshop_id": log.workshop_id,
+        "user_id": log.user_id,
+        "action": log.action,
+        "resource_type": log.resource_type,
+        "resource_id": log.resource_id,
+        "ip_address": log.ip_address,
+        "created_at": log.created_at,
+    }
@@ -23,6 +23,8 @@ from src.models.user import User
 from src.models.workshop import Workshop
 from src.schemas.common import SuccessResponse, build_paginated
 from src.schemas.device import DeviceResponse
+from src.services.license_service import license_cache
+from src.services.liveness import liveness
 from src.services.mqtt_service import publish_device_command
 from src.utils.constants import DeviceStatus
 from src.utils.helpers import generate_license_key, utc_now
@@ -62,6 +64,7 @@ async def list_pending_devices(
     
     items = []
     for d in devices:
+        last_seen = liveness.device_last_seen(d)
         items.append({
             "device_id": d.device_id,
             "mac_address": d.mac_address,
@@ -69,8 +72,8 @@ async def list_pending_devices(
             "status": d.status,
             "primary_sensor_code": d.primary_sensor_code,
             "air_quality_sensor_code": d.air_quality_sensor_code,
-            "is_online": d.is_online,
-            "last_seen": d.last_seen.isoformat() if d.last_seen else None,
+            "is_online": liveness.device_is_online(d),
+            "last_seen": last_seen.isoformat() if last_seen else None,
             "created_at": d.created_at.isoformat() if d.created_at else None,
             "ip_address": d.ip_address,
         })
@@ -130,6 +133,7 @@ async def approve_device(
     
     await db.commit()
     await db.refresh(device)
+    license_cache.invalidate(device_id)
 
     # Create a Subscription record so license validation passes.
     # Without this the MQTT handler rejects the device's sensor messages
@@ -154,6 +158,7 @@ async def approve_device(
         )
         db.add(sub)
         await db.commit()
+        license_cache.invalidate(device_id)
         logger.info(f"Created subscription for device {device_id}")
 
     # Send provisioning config to device via MQTT
@@ -226,6 +231,7 @@ async def reject_device(
     device.updated_at = utc_now()
     
     await db.commit()
+    license_cache.invalidate(device_id)
     
     reason = request.get("reason", "") if request else ""
     logger.info(f"Device {device_id} rejected by {current_user.username}. Reason: {reason}")
@@ -402,6 +408,7 @@ async def unassign_device(
     device.updated_at = utc_now()
     
     await db.commit()
+    license_cache.invalidate(device_id)
     
     logger.info(
         f"Device {device_id} unassigned from workshop {old_workshop_id} by {current_user.username}"
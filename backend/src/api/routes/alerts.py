@@ -27,9 +27,12 @@ from src.schemas.alert import (
     AlertConfigUpdate,
     AlertResponse,
 )
-from src.schemas.common import SuccessResponse, build_paginated
+from src.schemas.common import SuccessResponse, build_cursor_paginated, build_paginated
+from src.services.alert_cooldown import alert_cooldowns
+from src.services.threshold_cache import threshold_cache
 from src.utils.constants import UserRole
 from src.utils.logger import get_logger
+from src.utils.pagination import estimate_count, keyset_page
 
 router = APIRouter(tags=["alerts"])
 logger = get_logger(__name__)
@@ -45,10 +48,16 @@ async def list_alerts(
     pit_id: Optional[int] = Query(default=None),
     from_dt: Optional[datetime] = Query(default=None),
     to_dt: Optional[datetime] = Query(default=None),
+    pagination: str = Query(default="offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    estimate_total: bool = Query(default=False, description="Cursor mode: include estimated_total"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_workshop_access()),
 ):
-    """List alerts for a workshop, newest first. Filterable by pit, time, ack status."""
+    """
+    List alerts for a workshop, newest first. Filterable by pit, time, ack status.
+    pagination=cursor (implied by cursor) pages by (created_at, id) without a count.
+    """
     from sqlalchemy import func
     base_q = select(Alert).where(Alert.workshop_id == workshop_id)
     if unacknowledged_only:
@@ -60,6 +69,17 @@ async def list_alerts(
     if to_dt:
         base_q = base_q.where(Alert.created_at <= to_dt)
 
+    if pagination == "cursor" or cursor is not None:
+        try:
+            alerts, next_cursor = await keyset_page(
+                db, base_q, Alert.created_at, Alert.id, cursor, page_size
+            )
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        items = [AlertResponse.model_validate(a).model_dump() for a in alerts]
+        estimated = await estimate_count(db, base_q) if estimate_total else None
+        return build_cursor_paginated(items, page_size, next_cursor, estimated)
+
     count_result = await db.execute(select(func.count()).select_from(base_q.subquery()))
     total = count_result.scalar_one()
 
@@ -118,6 +138,7 @@ async def acknowledge_alert(
     alert.acknowledged_at = datetime.now(tz=timezone.utc)
     await db.commit()
     await db.refresh(alert)
+    alert_cooldowns.acknowledge(alert)
     logger.info(f"Alert acknowledged: id={alert_id} by user_id={current_user.id}")
     return AlertResponse.model_validate(alert)
 
@@ -153,6 +174,7 @@ async def acknowledge_all_alerts(
         a.acknowledged_at = now
 
     await db.commit()
+    alert_cooldowns.forget(alerts)
     logger.info(
         f"Bulk acknowledge: workshop_id={workshop_id} count={len(alerts)} "
         f"by user_id={current_user.id}"
@@ -207,5 +229,6 @@ async def update_alert_config(
 
     await db.commit()
     await db.refresh(cfg)
+    threshold_cache.invalidate_workshop(workshop_id)
     logger.info(f"AlertConfig updated: workshop_id={workshop_id}")
     return AlertConfigResponse.model_validate(cfg)
@@ -26,10 +26,22 @@ from src.api.dependencies import get_current_user
 from src.models.user import User
 from src.services.camera_discovery import discover_mediamtx_cameras
 from src.services.hikvision_discovery import discover_hikvision_cameras
+from src.services.liveness import liveness
 
 router = APIRouter(prefix="/cameras", tags=["cameras"])
 
 
+def _camera_dict(camera: Camera) -> dict:
+    """Camera.to_dict() with heartbeat liveness not yet flushed to the row."""
+    data = camera.to_dict()
+    if not camera.is_online and liveness.camera_is_online(camera):
+        data["is_online"] = True
+        data["status"] = "online"
+    last_seen = liveness.camera_last_seen(camera)
+    data["last_seen"] = last_seen.isoformat() if last_seen else None
+    return data
+
+
 @router.get("/discovered", response_model=List[CameraResponse])
 async def get_discovered_cameras(
     workshop_id: int = Query(..., description="Workshop ID"),
@@ -62,7 +74,7 @@ async def get_discovered_cameras(
     result = await session.execute(query)
     cameras = result.scalars().all()
     
-    return [camera.to_dict() for camera in cameras]
+    return [_camera_dict(camera) for camera in cameras]
 
 
 @router.get("/workshop/{workshop_id}", response_model=List[CameraResponse])
@@ -91,7 +103,7 @@ async def get_workshop_cameras(
     result = await session.execute(query)
     cameras = result.scalars().all()
     
-    return [camera.to_dict() for camera in cameras]
+    return [_camera_dict(camera) for camera in cameras]
 
 
 @router.get("/{camera_id}", response_model=CameraResponse)
@@ -118,7 +130,7 @@ async def get_camera(
             detail="Not authorized to access this camera"
         )
     
-    return camera.to_dict()
+    return _camera_dict(camera)
 
 
 @router.post("/register", response_model=CameraResponse, status_code=status.HTTP_201_CREATED)
@@ -175,7 +187,7 @@ async def register_camera(
     await session.commit()
     await session.refresh(camera)
     
-    return camera.to_dict()
+    return _camera_dict(camera)
 
 
 @router.post("/discover", response_model=dict)
@@ -255,7 +267,7 @@ async def trigger_camera_discovery(
         "workshop_id": workshop_id,
         "new_cameras": len(new_cameras),
         "available_cameras": len(available_cameras),
-        "cameras": [c.to_dict() for c in available_cameras],
+        "cameras": [_camera_dict(c) for c in available_cameras],
     }
 
 
@@ -405,7 +417,7 @@ async def assign_camera_to_pit(
     await session.commit()
     await session.refresh(camera)
     
-    return camera.to_dict()
+    return _camera_dict(camera)
 
 
 @router.post("/{camera_id}/unassign", response_model=CameraResponse)
@@ -439,7 +451,7 @@ async def unassign_camera(
     await session.commit()
     await session.refresh(camera)
     
-    return camera.to_dict()
+    return _camera_dict(camera)
 
 
 @router.patch("/{camera_id}", response_model=CameraResponse)
@@ -476,7 +488,7 @@ async def update_camera(
     await session.commit()
     await session.refresh(camera)
     
-    return camera.to_dict()
+    return _camera_dict(camera)
 
 
 @router.delete("/{camera_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -561,4 +573,4 @@ async def get_camera_by_pit(
     if not pit.camera:
         return None
     
-    return pit.camera.to_dict()
+    return _camera_dict(pit.camera)
@@ -32,12 +32,22 @@ from src.schemas.device import (
     DeviceUpdate,
 )
 from src.services import device_service
+from src.services.license_service import license_cache
+from src.services.liveness import liveness
 from src.utils.logger import get_logger
 
 router = APIRouter(tags=["devices"])
 logger = get_logger(__name__)
 
 
+def _liveness_overlay(device) -> dict:
+    """is_online / last_seen including liveness not yet flushed to the row."""
+    return {
+        "is_online": liveness.device_is_online(device),
+        "last_seen": liveness.device_last_seen(device),
+    }
+
+
 # ─── List devices for a workshop ──────────────────────────────────────────────
 @router.get("/workshops/{workshop_id}/devices", response_model=dict)
 async def list_devices(
@@ -51,7 +61,10 @@ async def list_devices(
     devices, total = await device_service.list_devices_for_workshop(
         db, workshop_id=workshop_id, page=page, page_size=page_size
     )
-    items = [DeviceSummary.model_validate(d).model_dump() for d in devices]
+    items = [
+        DeviceSummary.model_validate(d).model_copy(update=_liveness_overlay(d)).model_dump()
+        for d in devices
+    ]
     return build_paginated(items=items, total=total, page=page, page_size=page_size)
 
 
@@ -122,7 +135,7 @@ async def get_device(
         and current_user.workshop_id != device.workshop_id
     ):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-    return DeviceResponse.model_validate(device)
+    return DeviceResponse.model_validate(device).model_copy(update=_liveness_overlay(device))
 
 
 # ─── Update device ────────────────────────────────────────────────────────────
@@ -244,6 +257,7 @@ async def approve_device(
     db.add(subscription)
     await db.commit()
     await db.refresh(device)
+    license_cache.invalidate(device.device_id)
 
     # Publish provisioning config to device via MQTT
     publish_provisioning_config(
@@ -293,6 +307,7 @@ async def assign_device(
     device.pit_id = payload.pit_id
     await db.commit()
     await db.refresh(device)
+    license_cache.invalidate(device.device_id)
 
     # Publish ASSIGN command to device via MQTT
     publish_device_command(
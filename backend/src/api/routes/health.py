@@ -3,12 +3,17 @@ Module: routes/health.py
 Purpose:
     Health check and metrics endpoints.
     GET /health — public, used by load balancers and uptime monitors.
+    GET /metrics — super_admin; JSON, or Prometheus text with ?format=prometheus.
 
 Author: PPF Monitoring Team
 Created: 2026-02-21
 """
 
-from fastapi import APIRouter, Depends
+import re
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -20,6 +25,9 @@ from src.services.websocket_service import manager
 from src.utils.helpers import utc_now
 from src.utils.logger import get_logger
 
+if TYPE_CHECKING:
+    from src.services.ingest_metrics import IngestMetrics
+
 logger = get_logger(__name__)
 settings = get_settings()
 
@@ -59,6 +67,20 @@ async def health_check(db: AsyncSession = Depends(get_db)):
         components["mqtt_broker"] = "not_initialized"
         # Not fatal for health check — MQTT may not be started in test mode
 
+    # Standalone ingest worker (ingest.mode "external") — not fatal for the
+    # API itself, but no live sensor updates reach dashboards without it
+    if settings.INGEST_MODE == "external":
+        from src.services.ingest_ipc import get_ingest_client
+        try:
+            connected = get_ingest_client().connected
+        except RuntimeError:
+            connected = False
+        components["ingest_worker"] = "connected" if connected else "disconnected"
+
+    # Readings waiting on disk for the DB (see ingest_spool.py)
+    from src.services.ingest_spool import ingest_spool
+    spool = {"depth": ingest_spool.depth, "oldest_age_seconds": ingest_spool.oldest_age_seconds}
+
     uptime_seconds = int((utc_now() - _startup_time).total_seconds())
 
     response = {
@@ -66,6 +88,7 @@ async def health_check(db: AsyncSession = Depends(get_db)):
         "version": settings.APP_VERSION,
         "environment": settings.ENVIRONMENT,
         "components": components,
+        "ingest_spool": spool,
         "uptime_seconds": uptime_seconds,
         "active_ws_connections": manager.total_connections,
         "timestamp": utc_now().isoformat(),
@@ -79,13 +102,81 @@ async def health_check(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/metrics")
-async def get_metrics(current_user: User = Depends(get_super_admin)):
+async def get_metrics(
+    format: str = Query(default="json", pattern="^(json|prometheus)$"),
+    current_user: User = Depends(get_super_admin),
+):
     """System metrics — super_admin only."""
-    return {
-        "success": True,
-        "data": {
-            "active_ws_connections": manager.total_connections,
-            "uptime_seconds": int((utc_now() - _startup_time).total_seconds()),
-            "version": settings.APP_VERSION,
-        },
+    ingest, histograms = _ingest_metrics()
+    data = {
+        "active_ws_connections": manager.total_connections,
+        "uptime_seconds": int((utc_now() - _startup_time).total_seconds()),
+        "version": settings.APP_VERSION,
+        "ingest": ingest,
+    }
+    if format == "prometheus":
+        return PlainTextResponse(
+            _prometheus_text(data, histograms),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+    return {"success": True, "data": data}
+
+
+def _ingest_metrics() -> tuple[dict, "IngestMetrics"]:
+    """
+    Ingest pipeline counters and stage histograms.
+
+    Embedded ingest: this process's own (None for stages not running).
+    External ingest: the latest report of every connected ingest process,
+    under "workers", with their stage histograms merged.
+    """
+    from src.ingest_worker import ingest_stats
+    from src.services.ingest_ipc import get_ingest_client
+    from src.services.ingest_metrics import IngestMetrics, ingest_metrics
+    from src.services.latest_readings import latest_readings
+
+    if settings.INGEST_MODE != "external":
+        return {"stages": ingest_metrics.stats, **ingest_stats(), "ipc": None}, ingest_metrics
+
+    histograms = IngestMetrics()
+    workers = {}
+    try:
+        client = get_ingest_client()
+    except RuntimeError:
+        client = None
+    if client is not None:
+        for report in client.worker_metrics.values():
+            histograms.merge(report["stages"])
+            workers[report["worker"]] = report["stats"]
+    metrics = {
+        "stages": histograms.stats,
+        "workers": workers,
+        "ipc": client.stats if client is not None else None,
+        # Read side of the snapshot cache, served by this process
+        "latest_readings": latest_readings.stats,
     }
+    return metrics, histograms
+
+
+def _prometheus_text(data: dict, histograms: "IngestMetrics") -> str:
+    """
+    Stage histograms as-is, plus every numeric value of the JSON view as a
+    gauge (ppf_<path>, e.g. ppf_ingest_writer_rows_written).
+    """
+    lines = histograms.prometheus_lines()
+
+    def flatten(prefix: str, value) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                # Worker ids (host-0, ...) become valid metric name parts
+                flatten(f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', str(key))}", item)
+        elif isinstance(value, (bool, int, float)):
+            # Counters stay exact integers; floats keep all their digits
+            # (repr round-trips, where :g cut them to six)
+            text = str(int(value)) if isinstance(value, int) else repr(float(value))
+            lines.append(f"# TYPE {prefix} gauge")
+            lines.append(f"{prefix} {text}")
+
+    ingest = {key: value for key, value in data["ingest"].items() if key != "stages"}
+    flatten("ppf", {**data, "ingest": ingest})
+    return "\n".join(lines) + "\n"
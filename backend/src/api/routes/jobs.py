@@ -21,7 +21,7 @@ from src.api.dependencies import (
 )
 from src.config.database import get_db
 from src.models.user import User
-from src.schemas.common import build_paginated
+from src.schemas.common import build_cursor_paginated, build_paginated
 from src.schemas.job import (
     JobAssignStaff,
     JobCreate,
@@ -111,10 +111,32 @@ async def list_jobs(
     page_size: int = Query(default=20, ge=1, le=100),
     status_filter: Optional[str] = Query(default=None, alias="status"),
     pit_id: Optional[int] = Query(default=None),
+    pagination: str = Query(default="offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    estimate_total: bool = Query(default=False, description="Cursor mode: include estimated_total"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_workshop_access()),
 ):
-    """List jobs for a workshop with optional status/pit filters."""
+    """
+    List jobs for a workshop with optional status/pit filters.
+    pagination=cursor (implied by cursor) pages by (created_at, id) without a count.
+    """
+    if pagination == "cursor" or cursor is not None:
+        try:
+            jobs, next_cursor, estimated = await job_service.list_jobs_for_workshop_after(
+                db,
+                workshop_id=workshop_id,
+                cursor=cursor,
+                page_size=page_size,
+                status_filter=status_filter,
+                pit_id_filter=pit_id,
+                estimate_total=estimate_total,
+            )
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        items = [_job_list_item(job) for job in jobs]
+        return build_cursor_paginated(items, page_size, next_cursor, estimated)
+
     jobs, total = await job_service.list_jobs_for_workshop(
         db,
         workshop_id=workshop_id,
@@ -123,36 +145,31 @@ async def list_jobs(
         status_filter=status_filter,
         pit_id_filter=pit_id,
     )
-    items = []
-    for job in jobs:
-        import json
-        staff_ids = []
-        try:
-            if job.assigned_staff_ids_str:
-                staff_ids = json.loads(job.assigned_staff_ids_str)
-        except (ValueError, TypeError):
-            pass
-        items.append({
-            "id": job.id,
-            "pit_id": job.pit_id,
-            "pit_name": job.pit.display_name if job.pit else None,
-            "workshop_id": job.workshop_id,
-            "work_type": job.work_type,
-            "status": job.status,
-            "car_model": job.car_model,
-            "car_plate": job.car_plate,
-            "scheduled_start_time": job.scheduled_start_time,
-            "actual_start_time": job.actual_start_time,
-            "estimated_end_time": job.estimated_end_time,
-            "quoted_price": float(job.quoted_price) if job.quoted_price else None,
-            "currency": job.currency,
-            "created_at": job.created_at,
-            "customer_name": job.customer.full_name if job.customer else None,
-            "tracking_code": job.tracking_code,
-        })
+    items = [_job_list_item(job) for job in jobs]
     return build_paginated(items=items, total=total, page=page, page_size=page_size)
 
 
+def _job_list_item(job) -> dict:
+    return {
+        "id": job.id,
+        "pit_id": job.pit_id,
+        "pit_name": job.pit.display_name if job.pit else None,
+        "workshop_id": job.workshop_id,
+        "work_type": job.work_type,
+        "status": job.status,
+        "car_model": job.car_model,
+        "car_plate": job.car_plate,
+        "scheduled_start_time": job.scheduled_start_time,
+        "actual_start_time": job.actual_start_time,
+        "estimated_end_time": job.estimated_end_time,
+        "quoted_price": float(job.quoted_price) if job.quoted_price else None,
+        "currency": job.currency,
+        "created_at": job.created_at,
+        "customer_name": job.customer.full_name if job.customer else None,
+        "tracking_code": job.tracking_code,
+    }
+
+
 # ─── Create job ───────────────────────────────────────────────────────────────
 @router.post(
     "/workshops/{workshop_id}/jobs",
@@ -393,10 +410,10 @@ async def public_sensors_by_code(
     Public endpoint — no auth required.
     Returns latest sensor readings for the bay associated with a tracking code.
     """
-    from sqlalchemy import desc, select
+    from sqlalchemy import select
     from sqlalchemy.orm import selectinload
 
-    from src.models.sensor_data import SensorData
+    from src.services.latest_readings import latest_readings
 
     if not tracking_code.isdigit() or len(tracking_code) != 6:
         raise HTTPException(
@@ -427,14 +444,8 @@ async def public_sensors_by_code(
     # Get device online status (device relationship uses lazy="selectin", auto-loaded with pit)
     is_device_online = bool(pit.device and pit.device.is_online)
 
-    # Get latest sensor reading for this pit
-    sensor_result = await db.execute(
-        select(SensorData)
-        .where(SensorData.pit_id == pit.id)
-        .order_by(desc(SensorData.created_at))
-        .limit(1)
-    )
-    latest = sensor_result.scalar_one_or_none()
+    # Latest valid sensor reading for this pit (snapshot kept by ingest)
+    latest = await latest_readings.get(db, pit.id)
 
     return {
         "temperature": latest.temperature if latest else None,
@@ -444,5 +455,5 @@ async def public_sensors_by_code(
         "iaq": latest.iaq if latest else None,
         "pressure": latest.pressure if latest else None,
         "is_device_online": is_device_online,
-        "last_reading_at": latest.created_at.isoformat() if latest else None,
+        "last_reading_at": latest.reading_at.isoformat() if latest else None,
     }
@@ -24,6 +24,8 @@ from src.models.user import User
 from src.schemas.common import SuccessResponse
 from src.schemas.pit import PitCreate, PitResponse, PitSummary, PitUpdate
 from src.schemas.pit_alert_config import PitAlertConfigUpdate
+from src.services.liveness import liveness
+from src.services.threshold_cache import threshold_cache
 from src.utils.logger import get_logger
 
 router = APIRouter(prefix="/workshops/{workshop_id}/pits", tags=["pits"])
@@ -39,8 +41,8 @@ def _pit_response(pit: Pit) -> dict:
         device_data = {
             "device_id": device.device_id,
             "status": device.status,
-            "is_online": device.is_online,
-            "last_seen": device.last_seen,
+            "is_online": liveness.device_is_online(device),
+            "last_seen": liveness.device_last_seen(device),
             "primary_sensor_code": device.primary_sensor_code,
             "air_quality_sensor_code": device.air_quality_sensor_code,
         }
@@ -262,8 +264,6 @@ async def get_pit_alert_config(
 ):
     """Get merged alert config for a pit (pit overrides + workshop defaults)."""
     from src.utils.constants import UserRole
-    from src.models.alert import AlertConfig
-    from src.models.pit_alert_config import PitAlertConfig
 
     pit = await db.get(Pit, pit_id)
     if pit is None:
@@ -275,47 +275,9 @@ async def get_pit_alert_config(
     ):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    # Fetch both configs
-    ws_result = await db.execute(
-        select(AlertConfig).where(AlertConfig.workshop_id == pit.workshop_id)
-    )
-    ws_config = ws_result.scalar_one_or_none()
-
-    pit_result = await db.execute(
-        select(PitAlertConfig).where(PitAlertConfig.pit_id == pit_id)
-    )
-    pit_config = pit_result.scalar_one_or_none()
-
-    # Build merged response with source tracking
-    THRESHOLD_FIELDS = [
-        ("temp_min", 15.0),
-        ("temp_max", 35.0),
-        ("humidity_max", 70.0),
-        ("pm25_warning", 12.0),
-        ("pm25_critical", 35.4),
-        ("pm10_warning", 54.0),
-        ("pm10_critical", 154.0),
-        ("iaq_warning", 100.0),
-        ("iaq_critical", 150.0),
-        ("device_offline_threshold_seconds", 60),
-    ]
-
-    result = {"pit_id": pit_id}
-    for field, default in THRESHOLD_FIELDS:
-        pit_val = getattr(pit_config, field, None) if pit_config else None
-        ws_val = getattr(ws_config, field, None) if ws_config else None
-
-        if pit_val is not None:
-            result[field] = pit_val
-            result[f"{field}_source"] = "pit"
-        elif ws_val is not None:
-            result[field] = ws_val
-            result[f"{field}_source"] = "workshop"
-        else:
-            result[field] = default
-            result[f"{field}_source"] = "default"
-
-    return result
+    # Merged values with source tracking, from the shared threshold cache
+    thresholds = await threshold_cache.get(db, pit.workshop_id, pit_id)
+    return {"pit_id": pit_id, **thresholds.as_sourced_dict()}
 
 
 # ─── Per-pit alert config: upsert ────────────────────────────────────────────
@@ -357,6 +319,7 @@ async def update_pit_alert_config(
 
     await db.commit()
     await db.refresh(pit_config)
+    threshold_cache.invalidate_pit(pit_id)
 
     logger.info(f"Pit alert config updated: pit_id={pit_id} by user_id={current_user.id}")
     return {"message": "Pit alert thresholds saved", "pit_id": pit_id}
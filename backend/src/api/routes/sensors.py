@@ -2,14 +2,17 @@
 Module: sensors.py
 Purpose:
     Sensor data read endpoints.
-    Latest reading per pit, historical data with pagination,
-    aggregate stats for dashboard charts.
+    Latest reading per pit, historical data with offset or keyset
+    pagination (or LTTB-downsampled with max_points), time-bucketed or
+    LTTB-downsampled chart series,
+    aggregate stats for dashboard charts (served from the rollups,
+    see services/sensor_rollups.py).
 
 Author: PPF Monitoring Team
 Created: 2026-02-21
 """
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -22,29 +25,32 @@ from src.models.device import Device
 from src.models.pit import Pit
 from src.models.sensor_data import SensorData
 from src.models.user import User
-from src.utils.helpers import utc_now
-from src.schemas.common import build_paginated
+from src.schemas.common import build_cursor_paginated, build_paginated
 from src.schemas.sensor_data import LatestSensorSummary, SensorReadingResponse, SensorStatsResponse
+from src.services.latest_readings import LatestSnapshot, latest_readings
+from src.services.liveness import liveness
+from src.services.sensor_downsample import downsampled_series
+from src.services.sensor_rollups import METRICS, bucketed_aggregate, window_aggregate
+from src.services.threshold_cache import threshold_cache
 from src.utils.constants import UserRole
 from src.utils.helpers import (
     evaluate_humidity_status,
     evaluate_iaq_status,
     evaluate_pm25_status,
     evaluate_temperature_status,
+    utc_now,
 )
 from src.utils.logger import get_logger
+from src.utils.pagination import estimate_count, keyset_page
 
 router = APIRouter(tags=["sensors"])
 logger = get_logger(__name__)
 
-# Default alert thresholds if no AlertConfig exists yet
-_DEFAULT_TEMP_MIN = 15.0
-_DEFAULT_TEMP_MAX = 35.0
-_DEFAULT_HUMIDITY_MAX = 70.0
-_DEFAULT_PM25_WARNING = 12.0
-_DEFAULT_PM25_CRITICAL = 35.4
-_DEFAULT_IAQ_WARNING = 100.0
-_DEFAULT_IAQ_CRITICAL = 150.0
+# Chart series: bucket widths, and the most buckets one response may hold
+SERIES_BUCKETS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+SERIES_MAX_BUCKETS = 2000
+# LTTB series read every raw reading in the range
+SERIES_MAX_RAW_DAYS = 90
 
 
 # ─── Latest reading for all pits in a workshop ────────────────────────────────
@@ -64,13 +70,15 @@ async def latest_readings_for_workshop(
     )
     pits = pits_result.scalars().all()
 
-    # Fetch alert config for thresholds
-    thresholds = await _get_thresholds(db, workshop_id)
-    summaries = []
-    for pit in pits:
-        summary = await _build_latest_summary(db, pit, thresholds)
-        summaries.append(summary)
-    return summaries
+    # Effective thresholds and newest readings per pit (in-memory snapshots,
+    # one query each for whatever is not cached)
+    pit_ids = [pit.id for pit in pits]
+    thresholds = await threshold_cache.get_many(db, workshop_id, pit_ids)
+    readings = await latest_readings.get_many(db, pit_ids)
+    return [
+        _build_latest_summary(pit, thresholds[pit.id].as_dict(), readings[pit.id])
+        for pit in pits
+    ]
 
 
 # ─── Latest reading for a single pit ─────────────────────────────────────────
@@ -90,8 +98,9 @@ async def latest_reading_for_pit(
     ):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    thresholds = await _get_thresholds(db, pit.workshop_id)
-    return await _build_latest_summary(db, pit, thresholds)
+    thresholds = await _get_thresholds(db, pit.workshop_id, pit.id)
+    reading = await latest_readings.get(db, pit.id)
+    return _build_latest_summary(pit, thresholds, reading)
 
 
 # ─── Historical readings for a pit ────────────────────────────────────────────
@@ -102,10 +111,28 @@ async def sensor_history(
     page_size: int = Query(default=50, ge=1, le=200),
     from_dt: Optional[datetime] = Query(default=None, description="ISO 8601 start (UTC)"),
     to_dt: Optional[datetime] = Query(default=None, description="ISO 8601 end (UTC)"),
+    pagination: str = Query(default="offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    estimate_total: bool = Query(default=False, description="Cursor mode: include estimated_total"),
+    max_points: Optional[int] = Query(
+        default=None,
+        ge=3,
+        le=5000,
+        description="Instead of pages: LTTB-downsample the raw readings to this many points per metric",
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_staff_or_above),
 ):
-    """Paginated historical sensor readings for a pit."""
+    """
+    Paginated historical sensor readings for a pit, newest first.
+
+    pagination=cursor (implied by cursor) pages by (created_at, id) instead
+    of OFFSET and skips the count, so deep pages of long histories stay cheap.
+
+    With max_points, the whole range (default the last 24h) is returned as
+    one Largest-Triangle-Three-Buckets series per metric instead — the same
+    response as /sensors/series?max_points=N.
+    """
     pit = await db.get(Pit, pit_id)
     if pit is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pit not found")
@@ -115,12 +142,33 @@ async def sensor_history(
     ):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
+    if max_points is not None:
+        if pagination == "cursor" or cursor is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="max_points returns the whole range; it cannot be paginated",
+            )
+        end = to_dt or utc_now()
+        start = from_dt or end - timedelta(hours=24)
+        return await _downsampled_response(db, pit_id, start, end, list(METRICS), max_points)
+
     query = select(SensorData).where(SensorData.pit_id == pit_id)
     if from_dt:
         query = query.where(SensorData.created_at >= from_dt)
     if to_dt:
         query = query.where(SensorData.created_at <= to_dt)
 
+    if pagination == "cursor" or cursor is not None:
+        try:
+            rows, next_cursor = await keyset_page(
+                db, query, SensorData.created_at, SensorData.id, cursor, page_size
+            )
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        items = [SensorReadingResponse.model_validate(r).model_dump() for r in rows]
+        estimated = await estimate_count(db, query) if estimate_total else None
+        return build_cursor_paginated(items, page_size, next_cursor, estimated)
+
     count_result = await db.execute(select(func.count()).select_from(query.subquery()))
     total = count_result.scalar_one()
 
@@ -133,6 +181,102 @@ async def sensor_history(
     return build_paginated(items=items, total=total, page=page, page_size=page_size)
 
 
+# ─── Time-bucketed series for charts ──────────────────────────────────────────
+@router.get("/pits/{pit_id}/sensors/series")
+async def sensor_series(
+    pit_id: int,
+    from_dt: Optional[datetime] = Query(default=None, description="ISO 8601 start (UTC), default 24h ago"),
+    to_dt: Optional[datetime] = Query(default=None, description="ISO 8601 end (UTC), default now"),
+    bucket: Optional[str] = Query(
+        default=None,
+        pattern="^(1m|5m|1h|1d)$",
+        description="Bucket width; default the finest that fits the range",
+    ),
+    metrics: str = Query(
+        default="temperature,humidity,pm25,pm10,iaq",
+        description=f"Comma-separated, any of: {', '.join(METRICS)}",
+    ),
+    max_points: Optional[int] = Query(
+        default=None,
+        ge=3,
+        le=5000,
+        description="Instead of buckets: LTTB-downsample the raw readings to this many points per metric",
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_staff_or_above),
+):
+    """
+    avg/min/max per time bucket for a pit, as columnar arrays
+    (timestamps[], reading_count[], <metric>_avg[], _min[], _max[]).
+
+    Served from the rollups plus raw rows at the edges, so any range is one
+    request. Buckets are UTC aligned; buckets without readings are omitted.
+
+    With max_points, each metric is instead the raw series reduced by
+    Largest-Triangle-Three-Buckets ({metric: {timestamps[], values[]}}):
+    actual readings, short spikes included, at most max_points of them.
+    """
+    pit = await db.get(Pit, pit_id)
+    if pit is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pit not found")
+    if (
+        current_user.role != UserRole.SUPER_ADMIN.value
+        and current_user.workshop_id != pit.workshop_id
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+    selected = [m.strip() for m in metrics.split(",") if m.strip()]
+    unknown = sorted(set(selected) - set(METRICS))
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metric(s): {', '.join(unknown) or '(none given)'}",
+        )
+
+    end = to_dt or utc_now()
+    start = from_dt or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="from_dt must be before to_dt")
+
+    if max_points is not None:
+        if bucket is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use either bucket or max_points, not both",
+            )
+        return await _downsampled_response(db, pit_id, start, end, selected, max_points)
+
+    span = (end - start).total_seconds()
+    if bucket is None:
+        bucket = next(
+            (name for name, seconds in SERIES_BUCKETS.items() if span / seconds <= SERIES_MAX_BUCKETS),
+            "1d",
+        )
+    elif span / SERIES_BUCKETS[bucket] > SERIES_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range too long for bucket={bucket} (max {SERIES_MAX_BUCKETS} buckets)",
+        )
+
+    buckets = await bucketed_aggregate(db, pit_id, start, end, SERIES_BUCKETS[bucket])
+
+    series = {
+        "pit_id": pit_id,
+        "bucket": bucket,
+        "bucket_seconds": SERIES_BUCKETS[bucket],
+        "period_start": start,
+        "period_end": end,
+        "timestamps": list(buckets),
+        "reading_count": [agg.reading_count for agg in buckets.values()],
+    }
+    for metric in selected:
+        values = [agg.metrics[metric] for agg in buckets.values()]
+        series[f"{metric}_avg"] = [_round(v.avg) for v in values]
+        series[f"{metric}_min"] = [_round(v.min) for v in values]
+        series[f"{metric}_max"] = [_round(v.max) for v in values]
+    return series
+
+
 # ─── Aggregate stats for a pit ────────────────────────────────────────────────
 @router.get("/pits/{pit_id}/sensors/stats")
 async def sensor_stats(
@@ -151,120 +295,96 @@ async def sensor_stats(
     ):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    from datetime import timedelta
-    since = datetime.now(tz=timezone.utc) - timedelta(hours=hours)
-
-    agg = await db.execute(
-        select(
-            func.count(SensorData.id).label("reading_count"),
-            func.avg(SensorData.temperature).label("temp_avg"),
-            func.min(SensorData.temperature).label("temp_min"),
-            func.max(SensorData.temperature).label("temp_max"),
-            func.avg(SensorData.humidity).label("humidity_avg"),
-            func.min(SensorData.humidity).label("humidity_min"),
-            func.max(SensorData.humidity).label("humidity_max"),
-            func.avg(SensorData.pm25).label("pm25_avg"),
-            func.max(SensorData.pm25).label("pm25_max"),
-            func.avg(SensorData.pm10).label("pm10_avg"),
-            func.max(SensorData.pm10).label("pm10_max"),
-            func.avg(SensorData.iaq).label("iaq_avg"),
-            func.max(SensorData.iaq).label("iaq_max"),
-        ).where(
-            SensorData.pit_id == pit_id,
-            SensorData.created_at >= since,
-            SensorData.is_valid.is_(True),
-        )
-    )
-    row = agg.one()
+    now = utc_now()
+    since = now - timedelta(hours=hours)
 
-    def _round(v, n=2):
-        return round(float(v), n) if v is not None else None
+    # Rollup buckets for the bulk of the window, raw rows at the edges
+    stats = await window_aggregate(db, pit_id, since, now)
+    temp, humidity, pm25, pm10, iaq = (
+        stats.metrics[m] for m in ("temperature", "humidity", "pm25", "pm10", "iaq")
+    )
 
     return {
         "pit_id": pit_id,
         "device_id": pit.device.device_id if pit.device else None,
         "period_start": since,
-        "period_end": datetime.now(tz=timezone.utc),
-        "reading_count": row.reading_count,
-        "temp_avg": _round(row.temp_avg),
-        "temp_min": _round(row.temp_min),
-        "temp_max": _round(row.temp_max),
-        "humidity_avg": _round(row.humidity_avg),
-        "humidity_min": _round(row.humidity_min),
-        "humidity_max": _round(row.humidity_max),
-        "pm25_avg": _round(row.pm25_avg),
-        "pm25_max": _round(row.pm25_max),
-        "pm10_avg": _round(row.pm10_avg),
-        "pm10_max": _round(row.pm10_max),
-        "iaq_avg": _round(row.iaq_avg),
-        "iaq_max": _round(row.iaq_max),
+        "period_end": now,
+        "reading_count": stats.reading_count,
+        "temp_avg": _round(temp.avg),
+        "temp_min": _round(temp.min),
+        "temp_max": _round(temp.max),
+        "humidity_avg": _round(humidity.avg),
+        "humidity_min": _round(humidity.min),
+        "humidity_max": _round(humidity.max),
+        "pm25_avg": _round(pm25.avg),
+        "pm25_max": _round(pm25.max),
+        "pm10_avg": _round(pm10.avg),
+        "pm10_max": _round(pm10.max),
+        "iaq_avg": _round(iaq.avg),
+        "iaq_max": _round(iaq.max),
     }
 
 
 # ─── Internal helpers ─────────────────────────────────────────────────────────
-async def _get_thresholds(db: AsyncSession, workshop_id: int) -> dict:
-    from src.models.alert import AlertConfig
-    result = await db.execute(
-        select(AlertConfig).where(AlertConfig.workshop_id == workshop_id)
-    )
-    cfg = result.scalar_one_or_none()
-    if cfg:
-        return {
-            "temp_min": cfg.temp_min,
-            "temp_max": cfg.temp_max,
-            "humidity_max": cfg.humidity_max,
-            "pm25_warning": cfg.pm25_warning,
-            "pm25_critical": cfg.pm25_critical,
-            "iaq_warning": cfg.iaq_warning,
-            "iaq_critical": cfg.iaq_critical,
-            "device_offline_threshold_seconds": cfg.device_offline_threshold_seconds,
-        }
+def _round(value, digits: int = 2) -> Optional[float]:
+    return round(float(value), digits) if value is not None else None
+
+
+async def _downsampled_response(
+    db: AsyncSession,
+    pit_id: int,
+    start: datetime,
+    end: datetime,
+    metrics: list[str],
+    max_points: int,
+) -> dict:
+    """LTTB series per metric for /sensors/history and /sensors/series."""
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="from_dt must be before to_dt")
+    if end - start > timedelta(days=SERIES_MAX_RAW_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"max_points ranges are limited to {SERIES_MAX_RAW_DAYS} days; use bucket",
+        )
     return {
-        "temp_min": _DEFAULT_TEMP_MIN,
-        "temp_max": _DEFAULT_TEMP_MAX,
-        "humidity_max": _DEFAULT_HUMIDITY_MAX,
-        "pm25_warning": _DEFAULT_PM25_WARNING,
-        "pm25_critical": _DEFAULT_PM25_CRITICAL,
-        "iaq_warning": _DEFAULT_IAQ_WARNING,
-        "iaq_critical": _DEFAULT_IAQ_CRITICAL,
-        "device_offline_threshold_seconds": 60,  # Default 60 seconds
+        "pit_id": pit_id,
+        "max_points": max_points,
+        "period_start": start,
+        "period_end": end,
+        "series": await downsampled_series(db, pit_id, start, end, metrics, max_points),
     }
 
 
+async def _get_thresholds(db: AsyncSession, workshop_id: int, pit_id: int) -> dict:
+    """Effective thresholds for a pit (pit override → workshop config → default)."""
+    thresholds = await threshold_cache.get(db, workshop_id, pit_id)
+    return thresholds.as_dict()
+
+
 def _is_device_online(device: Optional[Device], threshold_seconds: int) -> bool:
-    """Check if device is online based on last_seen vs threshold."""
+    """
+    Check if device is online based on last_seen vs threshold.
+    last_seen comes from the liveness registry when it is newer than the row.
+    """
     if device is None:
         return False
-    if device.last_seen is None:
+    last_seen = liveness.device_last_seen(device)
+    if last_seen is None:
         return False
-    from src.utils.helpers import utc_now
-    elapsed = (utc_now() - device.last_seen).total_seconds()
+    elapsed = (utc_now() - last_seen).total_seconds()
     return elapsed < threshold_seconds
 
 
-async def _build_latest_summary(db: AsyncSession, pit: Pit, thresholds: dict) -> dict:
-    from src.models.pit_alert_config import PitAlertConfig
-    
-    result = await db.execute(
-        select(SensorData)
-        .where(SensorData.pit_id == pit.id, SensorData.is_valid.is_(True))
-        .order_by(SensorData.created_at.desc())
-        .limit(1)
-    )
-    reading = result.scalar_one_or_none()
+def _build_latest_summary(
+    pit: Pit,
+    thresholds: dict,
+    reading: Optional[LatestSnapshot],
+) -> dict:
     device = pit.device
-    
-    # Get per-pit alert config to check for threshold override
-    pit_config_result = await db.execute(
-        select(PitAlertConfig).where(PitAlertConfig.pit_id == pit.id)
-    )
-    pit_config = pit_config_result.scalar_one_or_none()
-    
-    # Resolve offline threshold: pit config -> workshop config -> default
-    offline_threshold = thresholds.get("device_offline_threshold_seconds", 60)
-    if pit_config and pit_config.device_offline_threshold_seconds is not None:
-        offline_threshold = pit_config.device_offline_threshold_seconds
-    
+
+    # Already resolved per pit: pit config -> workshop config -> default
+    offline_threshold = thresholds["device_offline_threshold_seconds"]
+
     # Determine online status based on last_seen vs threshold
     is_device_online = _is_device_online(device, offline_threshold)
 
@@ -310,11 +430,11 @@ async def _build_latest_summary(db: AsyncSession, pit: Pit, thresholds: dict) ->
         ).value,
         "pm10_status": evaluate_pm25_status(   # same logic, different thresholds
             reading.pm10,
-            thresholds.get("pm10_warning", 54.0),
-            thresholds.get("pm10_critical", 154.0),
+            thresholds["pm10_warning"],
+            thresholds["pm10_critical"],
         ).value,
         "iaq_status": evaluate_iaq_status(
             reading.iaq, thresholds["iaq_warning"], thresholds["iaq_critical"]
         ).value,
-        "last_reading_at": reading.created_at,
+        "last_reading_at": reading.reading_at,
     }
@@ -21,9 +21,9 @@ from src.config.settings import get_settings
 from src.models.camera import Camera
 from src.models.job import Job
 from src.models.pit import Pit
-from src.models.sensor_data import SensorData
 from src.models.user import User
 from src.schemas.stream import PitStreamStatus, StreamTokenResponse
+from src.services.latest_readings import latest_readings
 from src.utils.constants import UserRole
 from src.utils.helpers import generate_stream_token
 from src.utils.logger import get_logger
@@ -366,14 +366,8 @@ async def get_pit_by_tracking_code(
     stream_path = _resolve_stream_path(pit)
     stream_urls = _build_stream_urls(stream_path, token, settings, pit.id, expires_at, pit, is_demo)
 
-    # Get latest sensor data
-    sensor_result = await db.execute(
-        select(SensorData)
-        .where(SensorData.pit_id == pit.id)
-        .order_by(SensorData.created_at.desc())
-        .limit(1)
-    )
-    latest_sensor = sensor_result.scalar_one_or_none()
+    # Latest valid sensor reading (snapshot kept by ingest)
+    latest_sensor = await latest_readings.get(db, pit.id)
 
     return {
         "pit_id": pit.id,
@@ -395,6 +389,6 @@ async def get_pit_by_tracking_code(
             "pm25": latest_sensor.pm25 if latest_sensor else None,
             "pm10": latest_sensor.pm10 if latest_sensor else None,
             "iaq": latest_sensor.iaq if latest_sensor else None,
-            "timestamp": latest_sensor.created_at.isoformat() if latest_sensor else None,
+            "timestamp": latest_sensor.reading_at.isoformat() if latest_sensor else None,
         } if latest_sensor else None,
     }
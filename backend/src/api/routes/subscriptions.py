@@ -27,6 +27,7 @@ from src.schemas.subscription import (
     SubscriptionSummary,
     SubscriptionUpdate,
 )
+from src.services.license_service import license_cache
 from src.utils.constants import SubscriptionPlan, SubscriptionStatus, UserRole
 from src.utils.helpers import generate_license_key
 from src.utils.logger import get_logger
@@ -107,6 +108,7 @@ async def create_subscription(
     db.add(sub)
     await db.commit()
     await db.refresh(sub)
+    license_cache.invalidate(sub.device_id)
     logger.info(
         f"Subscription created: id={sub.id} device_id='{payload.device_id}' "
         f"workshop_id={workshop_id} plan={payload.plan.value}"
@@ -154,6 +156,7 @@ async def update_subscription(
 
     await db.commit()
     await db.refresh(sub)
+    license_cache.invalidate(sub.device_id)
     logger.info(f"Subscription updated: id={subscription_id}")
     return SubscriptionResponse.model_validate(sub)
 
@@ -197,6 +200,7 @@ async def record_payment(
 
     await db.commit()
     await db.refresh(sub)
+    license_cache.invalidate(sub.device_id)
     logger.info(
         f"Payment recorded: subscription_id={subscription_id} "
         f"amount={payload.amount} {payload.currency} "
@@ -21,7 +21,7 @@ from pathlib import Path
 from typing import List, Optional
 
 import yaml
-from pydantic import Field, field_validator
+from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings
 
 
@@ -154,6 +154,12 @@ class Settings(BaseSettings):
     MQTT_KEEPALIVE: int = _yaml_config["mqtt"]["keepalive"]
     MQTT_QOS: int = _yaml_config["mqtt"]["qos"]
     MQTT_RECONNECT_DELAY: int = _yaml_config["mqtt"]["reconnect_delay_seconds"]
+    MQTT_TRANSPORT: str = _yaml_config["mqtt"]["transport"]
+    MQTT_SHARED_GROUP: str = _yaml_config["mqtt"]["shared_group"]
+    MQTT_CLIENT_ID_PREFIX: str = _yaml_config["mqtt"]["client_id_prefix"]
+    # Stable per-process ID (e.g. the replica / pod name). Unset: host name
+    # plus the lowest free worker slot on this host.
+    MQTT_WORKER_ID: Optional[str] = None
     MQTT_USE_TLS: bool = False
 
     # ── Backend public URL (used for OTA download links sent to devices) ───────
@@ -182,6 +188,43 @@ class Settings(BaseSettings):
     SENSOR_OFFLINE_THRESHOLD_SECONDS: int = _yaml_config["sensor"]["offline_threshold_seconds"]
     CAMERA_OFFLINE_THRESHOLD_SECONDS: int = _yaml_config["sensor"]["camera_offline_threshold_seconds"]
     SENSOR_DATA_RETENTION_DAYS: int = _yaml_config["sensor"]["data_retention_days"]
+    SENSOR_PARTITION_MONTHS_AHEAD: int = _yaml_config["sensor"]["partition_months_ahead"]
+    SENSOR_LATEST_LOOKBACK_DAYS: int = _yaml_config["sensor"]["latest_reading_lookback_days"]
+    SENSOR_LATEST_CACHE_TTL_SECONDS: float = _yaml_config["sensor"]["latest_cache_ttl_seconds"]
+    SENSOR_ROLLUP_INTERVAL_SECONDS: int = _yaml_config["sensor"]["rollup_interval_seconds"]
+    SENSOR_ROLLUP_BATCH_ROWS: int = _yaml_config["sensor"]["rollup_batch_rows"]
+
+    # ── Sensor ingest pipeline ────────────────────────────────────────────────
+    INGEST_QUEUE_SIZE: int = _yaml_config["ingest"]["queue_size"]
+    INGEST_WORKERS: int = _yaml_config["ingest"]["workers"]
+    INGEST_OVERFLOW_POLICY: str = _yaml_config["ingest"]["overflow_policy"]
+    INGEST_SPILL_PATH: str = _yaml_config["ingest"]["spill_path"]
+    INGEST_BATCH_MAX_ROWS: int = _yaml_config["ingest"]["batch_max_rows"]
+    INGEST_BATCH_MAX_DELAY_MS: int = _yaml_config["ingest"]["batch_max_delay_ms"]
+    INGEST_WRITER_QUEUE_SIZE: int = _yaml_config["ingest"]["writer_queue_size"]
+    INGEST_MAX_READINGS_PER_MESSAGE: int = _yaml_config["ingest"]["max_readings_per_message"]
+    INGEST_ALERT_EVAL_MODE: str = _yaml_config["ingest"]["alert_eval_mode"]
+    INGEST_MODE: str = _yaml_config["ingest"]["mode"]
+    INGEST_IPC_SOCKET: str = _yaml_config["ingest"]["ipc_socket"]
+    INGEST_IPC_CLIENT_QUEUE_SIZE: int = _yaml_config["ingest"]["ipc_client_queue_size"]
+    LICENSE_CACHE_TTL_SECONDS: int = _yaml_config["ingest"]["license_cache_ttl_seconds"]
+    LICENSE_CACHE_MAX_ENTRIES: int = _yaml_config["ingest"]["license_cache_max_entries"]
+    THRESHOLD_CACHE_TTL_SECONDS: int = _yaml_config["ingest"]["threshold_cache_ttl_seconds"]
+    LIVENESS_FLUSH_INTERVAL_SECONDS: float = _yaml_config["ingest"]["liveness_flush_interval_seconds"]
+    INGEST_SPOOL_DIR: str = _yaml_config["ingest"]["spool_dir"]
+    INGEST_SPOOL_SEGMENT_RECORDS: int = _yaml_config["ingest"]["spool_segment_records"]
+    INGEST_SPOOL_MAX_RECORDS: int = _yaml_config["ingest"]["spool_max_records"]
+    INGEST_SPOOL_REPLAY_INTERVAL_SECONDS: float = _yaml_config["ingest"]["spool_replay_interval_seconds"]
+    INGEST_DEDUP_WINDOW_PER_DEVICE: int = _yaml_config["ingest"]["dedup_window_per_device"]
+    INGEST_DEDUP_MAX_DEVICES: int = _yaml_config["ingest"]["dedup_max_devices"]
+
+    # ── Sensor history retention ──────────────────────────────────────────────
+    RETENTION_ENABLED: bool = _yaml_config["retention"]["enabled"]
+    RETENTION_INTERVAL_MINUTES: int = _yaml_config["retention"]["interval_minutes"]
+    RETENTION_BATCH_ROWS: int = _yaml_config["retention"]["batch_rows"]
+    RETENTION_BATCH_PAUSE_MS: int = _yaml_config["retention"]["batch_pause_ms"]
+    RETENTION_ARCHIVE_DIR: str = _yaml_config["retention"]["archive_dir"]
+    RETENTION_POLICIES: dict = _yaml_config["retention"]["policies"]
 
     # ── Subscription ──────────────────────────────────────────────────────────
     TRIAL_DAYS: int = _yaml_config["subscriptions"]["trial_days"]
@@ -208,6 +251,34 @@ class Settings(BaseSettings):
             raise ValueError(f"ENVIRONMENT must be one of {allowed}, got '{v}'")
         return v
 
+    @field_validator("INGEST_ALERT_EVAL_MODE")
+    @classmethod
+    def validate_alert_eval_mode(cls, v: str) -> str:
+        allowed = {"latest", "each"}
+        if v not in allowed:
+            raise ValueError(f"INGEST_ALERT_EVAL_MODE must be one of {allowed}, got '{v}'")
+        return v
+
+    @field_validator("INGEST_MODE")
+    @classmethod
+    def validate_ingest_mode(cls, v: str) -> str:
+        allowed = {"embedded", "external"}
+        if v not in allowed:
+            raise ValueError(f"INGEST_MODE must be one of {allowed}, got '{v}'")
+        return v
+
+    @model_validator(mode="after")
+    def validate_shared_group_mode(self) -> "Settings":
+        # Embedded ingest pushes WebSocket events only to its own process's
+        # clients; with the topics split between processes, dashboards on
+        # one process would miss every reading another process took
+        if self.MQTT_SHARED_GROUP and self.INGEST_MODE != "external":
+            raise ValueError(
+                "MQTT_SHARED_GROUP requires INGEST_MODE 'external' "
+                "(embedded processes have no cross-process event fan-out)"
+            )
+        return self
+
     @field_validator("JWT_SECRET_KEY")
     @classmethod
     def validate_jwt_secret(cls, v: str) -> str:
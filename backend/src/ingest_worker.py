@@ -0,0 +1,208 @@
+"""
+Module: ingest_worker.py
+Purpose:
+    The MQTT sensor ingest stack, and a standalone entry point for it.
+
+    start_ingest() / stop_ingest() bring up and tear down everything that
+    turns broker messages into stored readings: alert cooldowns, liveness
+    write-behind, the disk spool, the batched writer, the ingest queue, the
+    MQTT subscriber, the offline detector, sensor_data partition upkeep,
+    the rollup compactor and history retention.
+
+    ingest.mode "embedded" (default): main.lifespan calls them, and ingest
+    shares the API server's event loop.
+
+    ingest.mode "external": run ingest in its own process so history
+    queries or bcrypt logins cannot delay sensor processing (and ingest
+    gets a core of its own):
+
+        INGEST_MODE=external python -m src.ingest_worker
+
+    WebSocket events raised here are forwarded to the API processes over
+    the IPC socket (ingest_ipc.py), together with periodic ingest_stats()
+    for their GET /metrics; API routes' cache invalidations come back the
+    same way. Start the API with INGEST_MODE=external as well, so it does
+    not subscribe to MQTT itself. Several ingest processes (with
+    mqtt.shared_group) each listen on their own ipc_socket.<worker id>.
+
+Author: PPF Monitoring Team
+Created: 2026-03-17
+"""
+
+import asyncio
+import signal
+
+from src.config.settings import get_settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+async def start_ingest() -> None:
+    """Start the ingest pipeline on the running event loop."""
+    # Load active alert cooldowns so evaluation needs no per-reading queries
+    from src.services.alert_cooldown import alert_cooldowns
+    try:
+        await alert_cooldowns.seed()
+    except Exception as e:
+        logger.error(f"Failed to seed alert cooldowns (falling back to DB checks): {e}")
+    # ...and drop those acknowledged through another worker
+    alert_cooldowns.start()
+
+    # Keep monthly sensor_data partitions created ahead of the inserts
+    from src.services.sensor_partitions import partition_maintainer
+    partition_maintainer.start()
+
+    # Fold new readings into the per-pit stats rollups
+    from src.services.sensor_rollups import rollup_compactor
+    rollup_compactor.start()
+
+    # Downsample and purge sensor history past its retention
+    if settings.RETENTION_ENABLED:
+        from src.services.sensor_retention import sensor_retention
+        sensor_retention.start()
+
+    # Start the batched sensor writer and the ingest queue before MQTT
+    # so no message is dropped
+    from src.services.ingest_queue import start_ingest_queue
+    from src.services.ingest_spool import ingest_spool
+    from src.services.ingest_writer import start_sensor_writer
+    from src.services.liveness import liveness
+    liveness.start()
+    ingest_spool.start()
+    start_sensor_writer()
+    start_ingest_queue()
+
+    # Start MQTT subscriber
+    try:
+        from src.services.mqtt_service import setup_mqtt
+        setup_mqtt(asyncio.get_running_loop())
+        logger.info("MQTT subscriber started")
+    except Exception as e:
+        logger.error(f"Failed to start MQTT subscriber: {e}", exc_info=True)
+        # Non-fatal in development — allow app to start without MQTT
+
+    # Mark devices offline when their per-pit silence threshold passes
+    from src.services.offline_detector import offline_detector
+    offline_detector.start()
+
+
+async def stop_ingest() -> None:
+    """Stop the ingest pipeline, flushing everything already received."""
+    from src.services.alert_cooldown import alert_cooldowns
+    from src.services.ingest_queue import stop_ingest_queue
+    from src.services.ingest_spool import ingest_spool
+    from src.services.ingest_writer import stop_sensor_writer
+    from src.services.liveness import liveness
+    from src.services.offline_detector import offline_detector
+    from src.services.sensor_partitions import partition_maintainer
+    from src.services.sensor_retention import sensor_retention
+    from src.services.sensor_rollups import rollup_compactor
+
+    await offline_detector.stop()
+    await alert_cooldowns.stop()
+    await partition_maintainer.stop()
+    await rollup_compactor.stop()
+    await sensor_retention.stop()
+
+    try:
+        from src.services.mqtt_service import teardown_mqtt
+        teardown_mqtt()
+        logger.info("MQTT subscriber stopped")
+    except Exception as e:
+        logger.warning(f"MQTT teardown error: {e}")
+
+    # Drain queued messages, then flush readings still waiting in the writer
+    try:
+        await stop_ingest_queue()
+    except Exception as e:
+        logger.warning(f"Ingest queue shutdown error: {e}")
+    try:
+        await stop_sensor_writer()
+    except Exception as e:
+        logger.warning(f"Sensor writer shutdown error: {e}")
+    # Anything still spooled stays on disk and is replayed after restart
+    await ingest_spool.stop()
+    # Last write-behind flush of device/camera liveness
+    try:
+        await liveness.stop()
+    except Exception as e:
+        logger.warning(f"Liveness flush on shutdown failed: {e}")
+
+
+def ingest_stats() -> dict:
+    """Counters of the ingest stack in this process (None for parts not running)."""
+    from src.services.ingest_queue import get_ingest_queue
+    from src.services.ingest_spool import ingest_spool
+    from src.services.ingest_writer import get_sensor_writer
+    from src.services.latest_readings import latest_readings
+    from src.services.license_service import license_cache
+    from src.services.liveness import liveness
+    from src.services.offline_detector import offline_detector
+    from src.services.reading_dedup import reading_dedup
+    from src.services.sensor_retention import sensor_retention
+    from src.services.sensor_rollups import rollup_compactor
+
+    stats = {
+        "queue": None,
+        "writer": None,
+        "spool": ingest_spool.stats,
+        "license_cache": license_cache.stats,
+        "latest_readings": latest_readings.stats,
+        "liveness": liveness.stats,
+        "offline_detector": offline_detector.stats,
+        "dedup": reading_dedup.stats,
+        "rollups": rollup_compactor.stats,
+        "retention": sensor_retention.stats,
+    }
+    try:
+        stats["queue"] = get_ingest_queue().stats
+    except RuntimeError:
+        pass
+    try:
+        stats["writer"] = get_sensor_writer().stats
+    except RuntimeError:
+        pass
+    return stats
+
+
+async def run() -> None:
+    """Standalone ingest process: run until SIGINT/SIGTERM."""
+    from src.services.ingest_ipc import IngestEventServer
+    from src.services.websocket_service import manager
+
+    logger.info(f"Starting {settings.APP_NAME} ingest worker v{settings.APP_VERSION}")
+    if settings.INGEST_MODE != "external":
+        logger.warning(
+            "ingest.mode is not 'external' — an API process started with the "
+            "same settings will subscribe to MQTT too"
+        )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Events go to the API processes, which hold the WebSocket connections;
+    # they also receive this process's ingest_stats() for GET /metrics
+    server = IngestEventServer()
+    try:
+        await server.start()
+    except RuntimeError as e:
+        logger.error(str(e))
+        raise SystemExit(1)
+    manager.forward = server.publish
+
+    await start_ingest()
+    await stop.wait()
+
+    logger.info("Ingest worker shutting down...")
+    await stop_ingest()
+    manager.forward = None
+    await server.stop()
+    logger.info("Ingest worker shut down cleanly")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
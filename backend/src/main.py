@@ -81,74 +81,33 @@ async def _render_keep_alive() -> None:
         await asyncio.sleep(10 * 60)
 
 
-async def _stale_device_sweeper() -> None:
-    """
-    Background task: marks devices offline when no sensor message has been
-    received within SENSOR_OFFLINE_THRESHOLD_SECONDS.
-
-    Runs every 30 seconds so the UI reflects disconnections quickly.
-    """
-    from datetime import timedelta
-    from sqlalchemy import select
-    from src.config.database import get_db_context
-    from src.models.device import Device
-    from src.utils.helpers import utc_now
-
-    threshold = settings.SENSOR_OFFLINE_THRESHOLD_SECONDS
-    logger.info(f"Stale-device sweeper started (threshold={threshold}s, interval=30s)")
-
-    while True:
-        try:
-            await asyncio.sleep(30)
-            cutoff = utc_now() - timedelta(seconds=threshold)
-            async with get_db_context() as db:
-                result = await db.execute(
-                    select(Device).where(
-                        Device.is_online == True,  # noqa: E712
-                        Device.last_seen < cutoff,
-                        Device.workshop_id.isnot(None),  # only assigned devices
-                    )
-                )
-                stale = result.scalars().all()
-                for dev in stale:
-                    dev.is_online = False
-                    logger.info(
-                        f"Stale sweeper: marked '{dev.device_id}' offline "
-                        f"(last_seen={dev.last_seen})"
-                    )
-                if stale:
-                    await db.commit()
-        except asyncio.CancelledError:
-            logger.info("Stale-device sweeper cancelled")
-            break
-        except Exception as exc:
-            logger.error(f"Stale-device sweeper error: {exc}", exc_info=True)
-
-
 # ─── Application Lifecycle ────────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Startup and shutdown lifecycle manager.
-    - Startup:  Connect to MQTT broker, start background sweeper
-    - Shutdown: Cancel tasks, disconnect MQTT cleanly
+    - Startup:  Start the ingest pipeline (see ingest_worker.py), or connect
+                to a standalone ingest worker when ingest.mode is "external"
+    - Shutdown: Cancel tasks, disconnect MQTT cleanly, flush sensor writer
     """
     # ── STARTUP ──────────────────────────────────────────────────────────────
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
 
-    # Start MQTT subscriber
-    try:
-        from src.services.mqtt_service import setup_mqtt
-        loop = asyncio.get_event_loop()
-        setup_mqtt(loop)
-        logger.info("MQTT subscriber started")
-    except Exception as e:
-        logger.error(f"Failed to start MQTT subscriber: {e}", exc_info=True)
-        # Non-fatal in development — allow app to start without MQTT
-
-    # Start background stale-device sweeper
-    sweeper_task = asyncio.create_task(_stale_device_sweeper())
+    # Sensor ingest: in this process, or in a standalone ingest worker
+    # whose WebSocket events arrive over the IPC socket
+    if settings.INGEST_MODE == "external":
+        from src.services.ingest_ipc import start_ingest_client
+        start_ingest_client()
+        # Publish-only MQTT client for device commands sent by API routes
+        try:
+            from src.services.mqtt_service import setup_mqtt
+            setup_mqtt(asyncio.get_running_loop(), subscribe=False)
+        except Exception as e:
+            logger.error(f"Failed to start MQTT publisher: {e}", exc_info=True)
+    else:
+        from src.ingest_worker import start_ingest
+        await start_ingest()
 
     # Keep Render free-tier awake (no-op if BACKEND_BASE_URL is not set)
     keepalive_task = asyncio.create_task(_render_keep_alive())
@@ -160,20 +119,20 @@ async def lifespan(app: FastAPI):
     # ── SHUTDOWN ─────────────────────────────────────────────────────────────
     logger.info("Shutting down...")
 
-    sweeper_task.cancel()
     keepalive_task.cancel()
-    for task in (sweeper_task, keepalive_task):
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
-
     try:
+        await keepalive_task
+    except asyncio.CancelledError:
+        pass
+
+    if settings.INGEST_MODE == "external":
+        from src.services.ingest_ipc import stop_ingest_client
         from src.services.mqtt_service import teardown_mqtt
         teardown_mqtt()
-        logger.info("MQTT subscriber stopped")
-    except Exception as e:
-        logger.warning(f"MQTT teardown error: {e}")
+        await stop_ingest_client()
+    else:
+        from src.ingest_worker import stop_ingest
+        await stop_ingest()
 
     logger.info(f"{settings.APP_NAME} shut down cleanly")
 
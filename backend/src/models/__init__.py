@@ -5,12 +5,14 @@ from src.models.workshop import Workshop
 from src.models.pit import Pit
 from src.models.device import Device, SensorType
 from src.models.sensor_data import SensorData
+from src.models.sensor_rollup import SensorRollup
 from src.models.alert import Alert, AlertConfig
 from src.models.job import Job
 from src.models.subscription import Subscription
 from src.models.audit_log import AuditLog
 from src.models.device_command import DeviceCommand
 from src.models.pit_alert_config import PitAlertConfig
+from src.models.pit_latest_reading import PitLatestReading
 from src.models.firmware_release import FirmwareRelease
 from src.models.camera import Camera
 
@@ -21,6 +23,7 @@ __all__ = [
     "Device",
     "SensorType",
     "SensorData",
+    "SensorRollup",
     "Alert",
     "AlertConfig",
     "Job",
@@ -28,6 +31,7 @@ __all__ = [
     "AuditLog",
     "DeviceCommand",
     "PitAlertConfig",
+    "PitLatestReading",
     "FirmwareRelease",
     "Camera",
 ]
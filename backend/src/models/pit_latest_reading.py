@@ -0,0 +1,47 @@
+"""
+Module: pit_latest_reading.py
+Purpose:
+    PitLatestReading ORM model — one row per pit holding its newest valid
+    sensor reading, upserted by ingest in the same transaction as the
+    reading itself (see services/latest_readings.py). Dashboards, the
+    public tracking page and the stream status read this instead of
+    searching sensor_data.
+
+    A row with reading_at NULL records that the pit has no valid reading.
+
+Author: PPF Monitoring Team
+Created: 2026-03-21
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.config.database import Base
+
+
+class PitLatestReading(Base):
+    __tablename__ = "pit_latest_readings"
+
+    pit_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("pits.id"), primary_key=True
+    )
+    device_id: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+
+    temperature: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    humidity: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pressure: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    gas_resistance: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    iaq: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm1: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm25: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm10: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    reading_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )  # created_at of the reading
+
+    def __repr__(self) -> str:
+        return f"<PitLatestReading pit_id={self.pit_id} at={self.reading_at}>"
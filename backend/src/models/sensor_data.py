@@ -9,6 +9,12 @@ Purpose:
     PMS5003 fields: pm1, pm25, pm10, particles_*
     BME680 fields:  temperature, humidity, pressure, gas_resistance, iaq, iaq_accuracy
 
+    On PostgreSQL the table is range-partitioned by month on created_at
+    (migration f7g8h9i0j1k2, upkeep in sensor_partitions.py): the primary
+    key there is (id, created_at) and the dedup unique index exists per
+    partition. The model keeps the plain layout so SQLite and create_all
+    work unchanged.
+
 Author: PPF Monitoring Team
 Created: 2026-02-21
 """
@@ -16,7 +22,9 @@ Created: 2026-02-21
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    BigInteger, Boolean, DateTime, Float, ForeignKey, Index, Integer, String, Text, text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.config.database import Base
@@ -29,6 +37,17 @@ if TYPE_CHECKING:
 
 class SensorData(Base):
     __tablename__ = "sensor_data"
+    __table_args__ = (
+        # Backstop for reading_dedup.py: one row per device reading
+        Index(
+            "uq_sensor_data_device_timestamp",
+            "device_id",
+            "device_timestamp",
+            unique=True,
+            postgresql_where=text("device_timestamp IS NOT NULL"),
+            sqlite_where=text("device_timestamp IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(
         BigInteger().with_variant(Integer(), "sqlite"),
@@ -0,0 +1,79 @@
+"""
+Module: sensor_rollup.py
+Purpose:
+    SensorRollup ORM model — per-pit aggregates of sensor_data over fixed
+    time buckets (1 minute, 15 minutes, 1 hour).
+
+    Each row keeps count, sum, min and max per metric rather than an
+    average, so buckets can be combined exactly: a window's average is
+    sum(x_sum) / sum(x_count). Only valid readings are counted, matching
+    the stats endpoint. Rows are rebuilt by the rollup compactor
+    (services/sensor_rollups.py), never edited in place.
+
+Author: PPF Monitoring Team
+Created: 2026-03-19
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.config.database import Base
+
+
+class SensorRollup(Base):
+    __tablename__ = "sensor_rollups"
+
+    pit_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("pits.id"), primary_key=True
+    )
+    resolution_seconds: Mapped[int] = mapped_column(Integer, primary_key=True)  # 60 | 900 | 3600
+    bucket_start: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )  # UTC, aligned to resolution_seconds
+
+    reading_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # ── Per metric: readings with a value, their sum, min and max ─────────
+    temperature_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    temperature_sum: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    temperature_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    temperature_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    humidity_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    humidity_sum: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    humidity_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    humidity_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    pressure_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pressure_sum: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pressure_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pressure_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    iaq_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    iaq_sum: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    iaq_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    iaq_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    pm1_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pm1_sum: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm1_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm1_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    pm25_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pm25_sum: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm25_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm25_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    pm10_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pm10_sum: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm10_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pm10_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    def __repr__(self) -> str:
+        return (
+            f"<SensorRollup pit_id={self.pit_id} res={self.resolution_seconds}s "
+            f"at={self.bucket_start} n={self.reading_count}>"
+        )
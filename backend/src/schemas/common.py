@@ -2,7 +2,8 @@
 Module: common.py
 Purpose:
     Shared Pydantic schemas used across multiple route modules.
-    PaginatedResponse, SuccessResponse, ErrorResponse, and list wrappers.
+    PaginatedResponse, CursorPaginatedResponse, SuccessResponse,
+    ErrorResponse, and list wrappers.
 
 Author: PPF Monitoring Team
 Created: 2026-02-21
@@ -28,6 +29,18 @@ class PaginatedResponse(BaseModel, Generic[DataT]):
     has_prev: bool
 
 
+class CursorPaginatedResponse(BaseModel, Generic[DataT]):
+    """Wrapper for keyset-paginated list endpoints (see utils/pagination.py)."""
+
+    items: List[DataT]
+    page_size: int = Field(..., ge=1, le=200, description="Records per page")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor for the next page")
+    has_next: bool
+    estimated_total: Optional[int] = Field(
+        None, description="Approximate records matching the query (when requested)"
+    )
+
+
 # ─── Standard Success / Error ──────────────────────────────────────────────────
 class SuccessResponse(BaseModel):
     """Simple success acknowledgement for actions that return no data."""
@@ -71,3 +84,22 @@ def build_paginated(
             "has_prev": page > 1,
         }
     }
+
+
+def build_cursor_paginated(
+    items: list,
+    page_size: int,
+    next_cursor: Optional[str],
+    estimated_total: Optional[int] = None,
+) -> dict:
+    """Build keyset pagination metadata dict for use in route handlers."""
+    return {
+        "success": True,
+        "data": {
+            "items": items,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
+            "estimated_total": estimated_total,
+        }
+    }
@@ -0,0 +1,222 @@
+"""
+Module: alert_cooldown.py
+Purpose:
+    In-memory alert cooldown state per (device_id, pit_id, alert_type).
+
+    A new alert is suppressed while an unacknowledged alert of the same
+    type for the same device and pit was raised within the cooldown window.
+    Instead of querying the alerts table for every threshold violation,
+    the tracker keeps the creation time of every unacknowledged alert per
+    key that is still inside the window:
+      - seeded from the DB at startup
+      - added when evaluate_alerts() raises an alert
+      - removed when that alert is acknowledged (single or acknowledge-all),
+        so an older unacknowledged alert keeps the key on cooldown
+      - times older than the window lapse on their own
+
+    Acknowledgements served by another uvicorn worker never reach this
+    process's routes, so a background task re-reads the alerts acknowledged
+    inside the window every ALERT_COOLDOWN_SYNC_SECONDS and drops them.
+
+    Until seed() has run, callers fall back to the DB query.
+
+Author: PPF Monitoring Team
+Created: 2026-03-11
+"""
+
+import asyncio
+from bisect import insort
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import select
+
+from src.config.database import get_db_context
+from src.models.alert import Alert
+from src.utils.helpers import utc_now
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ALERT_COOLDOWN_MINUTES = 5
+ALERT_COOLDOWN_SYNC_SECONDS = 10
+
+CooldownKey = tuple[str, int, str]
+
+
+def _key(device_id: str, pit_id: int, alert_type) -> CooldownKey:
+    # AlertType members and the plain strings loaded from the DB must match
+    return (device_id, pit_id, getattr(alert_type, "value", alert_type))
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite hands back naive datetimes — treat them as UTC."""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class AlertCooldownTracker:
+    """
+    Unacknowledged alert times per (device_id, pit_id, alert_type).
+
+    Args:
+        cooldown_minutes: Window during which a repeat alert is suppressed
+        sync_interval_seconds: Seconds between reads of acknowledgements
+            made by other processes
+    """
+
+    def __init__(
+        self,
+        cooldown_minutes: int = ALERT_COOLDOWN_MINUTES,
+        sync_interval_seconds: float = ALERT_COOLDOWN_SYNC_SECONDS,
+    ):
+        self.window = timedelta(minutes=cooldown_minutes)
+        self.sync_interval = max(0.1, sync_interval_seconds)
+        # Ascending created_at of each unacknowledged alert per key
+        self._raised_at: dict[CooldownKey, list[datetime]] = {}
+        self.is_seeded = False
+        self._task: Optional[asyncio.Task] = None
+        # Set in API processes when ingest runs in its own process
+        # (ingest_ipc.py): acknowledgements are mirrored there
+        self.peer: Optional[Callable[[dict], None]] = None
+
+    # ── Startup ──────────────────────────────────────────────────────────────
+    async def seed(self, session_factory: Callable = get_db_context) -> int:
+        """Load unacknowledged alerts still inside the window. Returns cooldowns loaded."""
+        cutoff = utc_now() - self.window
+        async with session_factory() as db:
+            result = await db.execute(
+                select(Alert.device_id, Alert.pit_id, Alert.alert_type, Alert.created_at)
+                .where(
+                    Alert.is_acknowledged.is_(False),
+                    Alert.device_id.is_not(None),
+                    Alert.created_at >= cutoff,
+                )
+                .order_by(Alert.created_at)
+            )
+            rows = result.all()
+
+        raised_at: dict[CooldownKey, list[datetime]] = {}
+        for device_id, pit_id, alert_type, created_at in rows:
+            raised_at.setdefault(_key(device_id, pit_id, alert_type), []).append(_as_utc(created_at))
+        self._raised_at = raised_at
+        self.is_seeded = True
+        logger.info(f"Alert cooldown tracker seeded with {len(raised_at)} active cooldown(s)")
+        return len(raised_at)
+
+    def start(self, session_factory: Callable = get_db_context) -> None:
+        """Start following acknowledgements made by other processes."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(session_factory), name="alert-cooldown-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, session_factory: Callable) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            if not self._raised_at:
+                continue
+            try:
+                await self.sync(session_factory)
+            except Exception as e:
+                logger.warning(f"Alert cooldown sync failed (will retry): {e}")
+
+    async def sync(self, session_factory: Callable = get_db_context) -> int:
+        """
+        Drop cooldowns of alerts acknowledged anywhere (this or another
+        worker) that are still inside the window. Returns alerts read.
+        """
+        cutoff = utc_now() - self.window
+        async with session_factory() as db:
+            result = await db.execute(
+                select(Alert.device_id, Alert.pit_id, Alert.alert_type, Alert.created_at)
+                .where(
+                    Alert.is_acknowledged.is_(True),
+                    Alert.device_id.is_not(None),
+                    Alert.created_at >= cutoff,
+                )
+            )
+            rows = result.all()
+        self.forget_entries(rows)
+        return len(rows)
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+    def on_cooldown(
+        self,
+        device_id: str,
+        pit_id: int,
+        alert_type: str,
+        now: Optional[datetime] = None,
+    ) -> bool:
+        key = _key(device_id, pit_id, alert_type)
+        times = self._raised_at.get(key)
+        if times is None:
+            return False
+        if (now or utc_now()) - times[-1] < self.window:
+            return True
+        del self._raised_at[key]  # lapsed, older times with it
+        return False
+
+    # ── Updates ──────────────────────────────────────────────────────────────
+    def record(self, alert: Alert) -> None:
+        """An alert was raised — start its cooldown."""
+        if alert.device_id is None or alert.created_at is None:
+            return
+        times = self._raised_at.setdefault(_key(alert.device_id, alert.pit_id, alert.alert_type), [])
+        created_at = _as_utc(alert.created_at)
+        if created_at not in times:
+            insort(times, created_at)
+
+    def acknowledge(self, alert: Alert) -> None:
+        """
+        An alert was acknowledged — drop its time. The key stays on cooldown
+        while any other unacknowledged alert of it is inside the window.
+        """
+        self.forget([alert])
+
+    def forget(self, alerts: Iterable[Alert]) -> None:
+        """Drop cooldowns started by these alerts (acknowledged or rolled back)."""
+        entries = [
+            (alert.device_id, alert.pit_id, alert.alert_type, _as_utc(alert.created_at))
+            for alert in alerts
+            if alert.device_id is not None and alert.created_at is not None
+        ]
+        self.forget_entries(entries)
+        if self.peer is not None and entries:
+            self.peer({
+                "op": "cooldowns",
+                "alerts": [
+                    [device_id, pit_id, _key(device_id, pit_id, alert_type)[2], created_at.isoformat()]
+                    for device_id, pit_id, alert_type, created_at in entries
+                ],
+            })
+
+    def forget_entries(self, entries: Iterable[tuple[str, int, str, datetime]]) -> None:
+        """forget() for (device_id, pit_id, alert_type, created_at) tuples."""
+        for device_id, pit_id, alert_type, created_at in entries:
+            key = _key(device_id, pit_id, alert_type)
+            times = self._raised_at.get(key)
+            if times is None:
+                continue
+            try:
+                times.remove(_as_utc(created_at))
+            except ValueError:
+                continue
+            if not times:
+                del self._raised_at[key]
+
+    def clear(self) -> None:
+        self._raised_at.clear()
+        self.is_seeded = False
+
+    def __len__(self) -> int:
+        return len(self._raised_at)
+
+
+alert_cooldowns = AlertCooldownTracker()
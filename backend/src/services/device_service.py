@@ -17,6 +17,7 @@ from src.models.device import Device, SensorType
 from src.models.device_command import DeviceCommand as DeviceCommandModel
 from src.models.subscription import Subscription
 from src.schemas.device import DeviceCommandRequest, DeviceRegister, DeviceUpdate
+from src.services.license_service import license_cache
 from src.services.mqtt_service import publish_device_command
 from src.utils.constants import (
     DeviceCommand,
@@ -137,6 +138,8 @@ async def register_device(
 
     await db.commit()
     await db.refresh(device)
+    # Drop any cached "unknown device" entry from earlier messages
+    license_cache.invalidate(device.device_id)
 
     logger.info(
         f"Device registered: device_id='{device.device_id}' "
@@ -172,6 +175,7 @@ async def update_device(
 
     await db.commit()
     await db.refresh(device)
+    license_cache.invalidate(device.device_id)
     logger.info(f"Device updated: device_id='{device.device_id}' fields={list(update_data.keys())}")
     return device
 
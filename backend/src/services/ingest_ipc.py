@@ -0,0 +1,401 @@
+"""
+Module: ingest_ipc.py
+Purpose:
+    Local channel between a standalone ingest process (src/ingest_worker.py)
+    and the API server processes, used when ingest.mode is "external".
+
+    Transport: a Unix domain socket, newline-delimited JSON in both
+    directions. The ingest process listens on ingest.ipc_socket — or, when
+    several share the MQTT load (mqtt.shared_group), each on
+    <ipc_socket>.<worker id>. Every API process (uvicorn worker) connects
+    to each ingest socket present and reconnects on its own. An ingest
+    process refuses to start on a socket another live process listens on,
+    and only removes the socket file it created itself.
+
+    ingest → API   WebSocket events. In the ingest process the connection
+                   manager's broadcasts are forwarded here; each API process
+                   re-broadcasts them to its own WebSocket clients.
+                   {"scope": "workshop" | "pit", "id": 3, "event": {...}}
+                   Ingest counters for GET /metrics, on connect and every
+                   few seconds (latest kept per ingest process):
+                   {"scope": "metrics", "worker": "...", "stages": {...}, "stats": {...}}
+
+    API → ingest   Cache invalidations made by API routes, so the ingest
+                   process never evaluates against stale data:
+                   {"op": "license", "device_id": "..."}
+                   {"op": "pit_thresholds", "pit_id": 3}
+                   {"op": "workshop_thresholds", "workshop_id": 1}
+                   {"op": "cooldowns", "alerts": [[device_id, pit_id, type, created_at], ...]}
+                   {"op": "resync"} — sent on every (re)connect: the ingest
+                   process drops its license/threshold caches and re-seeds
+                   alert cooldowns, covering anything missed while apart.
+
+    Events are best effort: an API process that is not connected, or too
+    slow to keep up (ingest.ipc_client_queue_size), misses them. Readings
+    themselves are never affected — dashboards re-read history from the DB.
+
+Author: PPF Monitoring Team
+Created: 2026-03-17
+"""
+
+import asyncio
+import glob
+import json
+import os
+import stat
+from datetime import datetime
+from typing import Optional
+
+from src.config.settings import get_settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_RECONNECT_SECONDS = 1.0
+_METRICS_SECONDS = 5.0
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message, separators=(",", ":"), default=str) + "\n").encode()
+
+
+def worker_name() -> str:
+    """This ingest process's name: its MQTT worker id in a shared group, else "ingest"."""
+    if not settings.MQTT_SHARED_GROUP:
+        return "ingest"
+    from src.services.mqtt_service import worker_id
+    return worker_id()
+
+
+def worker_socket_path() -> str:
+    """Socket this ingest process listens on (one per process in a shared group)."""
+    if not settings.MQTT_SHARED_GROUP:
+        return settings.INGEST_IPC_SOCKET
+    return f"{settings.INGEST_IPC_SOCKET}.{worker_name()}"
+
+
+def _is_socket(path: str) -> bool:
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+async def _listening(path: str) -> bool:
+    """Whether a live process accepts connections on the socket at path."""
+    try:
+        _, writer = await asyncio.open_unix_connection(path)
+    except (ConnectionError, OSError):
+        return False
+    writer.close()
+    return True
+
+
+# ─── Ingest process side ──────────────────────────────────────────────────────
+class IngestEventServer:
+    """
+    Listens on the IPC socket, fans WebSocket events out to every connected
+    API process and applies the cache invalidations they send.
+
+    Args:
+        path: Unix socket path (default: worker_socket_path())
+        client_queue_size: Events buffered per API process before dropping
+        name: Reported with this process's metrics (default: worker_name())
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        client_queue_size: int = settings.INGEST_IPC_CLIENT_QUEUE_SIZE,
+        name: Optional[str] = None,
+    ):
+        self.path = path or worker_socket_path()
+        self.name = name or worker_name()
+        self.client_queue_size = max(1, client_queue_size)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._inode: Optional[int] = None
+        self._metrics_task: Optional[asyncio.Task] = None
+        self._clients: set[asyncio.Queue] = set()
+        self.events_sent = 0
+        self.events_dropped = 0
+
+    async def start(self) -> None:
+        """
+        Raises:
+            RuntimeError: Another live process is listening on path
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            if await _listening(self.path):
+                raise RuntimeError(f"Another ingest process is listening on {self.path}")
+            os.remove(self.path)   # left by a crashed run
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        self._inode = os.stat(self.path).st_ino
+        self._metrics_task = asyncio.create_task(self._push_metrics(), name="ingest-ipc-metrics")
+        logger.info(f"Ingest IPC listening on {self.path}")
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._metrics_task.cancel()
+        self._server.close()
+        for queue in list(self._clients):
+            queue.put_nowait(None)
+        await self._server.wait_closed()
+        self._server = None
+        # Only our own socket: a replacement process may have bound the path since
+        try:
+            if os.stat(self.path).st_ino == self._inode:
+                os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def publish(self, scope: str, target_id: int, event: dict) -> None:
+        """ConnectionManager.forward hook — queue an event for every API process."""
+        line = _encode({"scope": scope, "id": target_id, "event": event})
+        for queue in self._clients:
+            try:
+                queue.put_nowait(line)
+                self.events_sent += 1
+            except asyncio.QueueFull:
+                self.events_dropped += 1
+
+    def _metrics_line(self) -> bytes:
+        # Import here to avoid circular deps
+        from src.ingest_worker import ingest_stats
+        from src.services.ingest_metrics import ingest_metrics
+
+        return _encode({
+            "scope": "metrics",
+            "worker": self.name,
+            "stages": ingest_metrics.snapshot(),
+            "stats": {**ingest_stats(), "ipc_server": self.stats},
+        })
+
+    async def _push_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(_METRICS_SECONDS)
+            if not self._clients:
+                continue
+            line = self._metrics_line()
+            for queue in self._clients:
+                try:
+                    queue.put_nowait(line)
+                except asyncio.QueueFull:
+                    pass   # the next push replaces it anyway
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=self.client_queue_size)
+        queue.put_nowait(self._metrics_line())
+        self._clients.add(queue)
+        sender = asyncio.create_task(self._send(queue, writer))
+        logger.info(f"API process connected to ingest IPC ({len(self._clients)} connected)")
+        try:
+            while line := await reader.readline():
+                try:
+                    await apply_invalidation(json.loads(line))
+                except Exception as e:
+                    logger.warning(f"Ingest IPC: ignoring message {line[:200]!r}: {e}")
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._clients.discard(queue)
+            sender.cancel()
+            writer.close()
+            logger.info(f"API process disconnected from ingest IPC ({len(self._clients)} connected)")
+
+    @staticmethod
+    async def _send(queue: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        try:
+            while (line := await queue.get()) is not None:
+                writer.write(line)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "api_processes": len(self._clients),
+            "events_sent": self.events_sent,
+            "events_dropped": self.events_dropped,
+        }
+
+
+async def apply_invalidation(message: dict) -> None:
+    """Apply an API process's cache invalidation in this (ingest) process."""
+    from src.services.alert_cooldown import alert_cooldowns
+    from src.services.license_service import license_cache
+    from src.services.threshold_cache import threshold_cache
+
+    op = message.get("op")
+    if op == "license":
+        license_cache.invalidate(message.get("device_id"))
+    elif op == "pit_thresholds":
+        threshold_cache.invalidate_pit(message["pit_id"])
+    elif op == "workshop_thresholds":
+        threshold_cache.invalidate_workshop(message["workshop_id"])
+    elif op == "cooldowns":
+        alert_cooldowns.forget_entries(
+            (device_id, pit_id, alert_type, datetime.fromisoformat(created_at))
+            for device_id, pit_id, alert_type, created_at in message["alerts"]
+        )
+    elif op == "resync":
+        license_cache.clear()
+        threshold_cache.clear()
+        await alert_cooldowns.seed()
+    else:
+        raise ValueError(f"unknown op {op!r}")
+
+
+# ─── API process side ─────────────────────────────────────────────────────────
+class IngestEventClient:
+    """
+    Connects an API process to the ingest process(es): re-broadcasts their
+    WebSocket events locally, keeps their latest metrics and mirrors cache
+    invalidations to every one of them.
+
+    Args:
+        path: Base Unix socket path; <path> and every <path>.<worker id>
+              socket present are connected (rescanned each second)
+    """
+
+    def __init__(self, path: str = settings.INGEST_IPC_SOCKET):
+        self.path = path
+        self._task: Optional[asyncio.Task] = None
+        self._links: dict[str, asyncio.Task] = {}
+        self._writers: dict[str, asyncio.StreamWriter] = {}
+        # Latest {"worker", "stages", "stats"} report per connected socket
+        self.worker_metrics: dict[str, dict] = {}
+        self.events_received = 0
+        self.invalidations_lost = 0
+
+    def start(self) -> None:
+        from src.services.alert_cooldown import alert_cooldowns
+        from src.services.license_service import license_cache
+        from src.services.threshold_cache import threshold_cache
+
+        license_cache.peer = self.send
+        threshold_cache.peer = self.send
+        alert_cooldowns.peer = self.send
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ingest-ipc-client")
+
+    async def stop(self) -> None:
+        from src.services.alert_cooldown import alert_cooldowns
+        from src.services.license_service import license_cache
+        from src.services.threshold_cache import threshold_cache
+
+        license_cache.peer = threshold_cache.peer = alert_cooldowns.peer = None
+        tasks = [task for task in (self._task, *self._links.values()) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._links.clear()
+
+    @property
+    def connected(self) -> bool:
+        return bool(self._writers)
+
+    def send(self, message: dict) -> None:
+        """Mirror an invalidation. Lost while disconnected — the resync on reconnect covers it."""
+        if not self._writers:
+            self.invalidations_lost += 1
+            return
+        line = _encode(message)
+        for writer in self._writers.values():
+            writer.write(line)
+
+    def _socket_paths(self) -> list[str]:
+        paths = [self.path, *sorted(glob.glob(glob.escape(self.path) + ".*"))]
+        return [path for path in paths if _is_socket(path)]
+
+    async def _run(self) -> None:
+        logged_down = False
+        while True:
+            for path in self._socket_paths():
+                link = self._links.get(path)
+                if link is None or link.done():
+                    self._links[path] = asyncio.create_task(
+                        self._link(path), name=f"ingest-ipc-{os.path.basename(path)}"
+                    )
+            await asyncio.sleep(_RECONNECT_SECONDS)
+            if self._writers:
+                logged_down = False
+            elif not logged_down:
+                logger.warning(f"Ingest process not reachable on {self.path}, retrying")
+                logged_down = True
+
+    async def _link(self, path: str) -> None:
+        """One connection to one ingest process, until it drops."""
+        # Import here to avoid circular deps
+        from src.services.websocket_service import manager
+
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+        except (ConnectionError, OSError):
+            return   # not listening (yet, or a stale socket) — retried on the next scan
+
+        logger.info(f"Connected to ingest process on {path}")
+        self._writers[path] = writer
+        writer.write(_encode({"op": "resync"}))
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message["scope"] == "metrics":
+                    self.worker_metrics[path] = message
+                    continue
+                self.events_received += 1
+                if message["scope"] == "workshop":
+                    await manager.broadcast_to_workshop(message["id"], message["event"])
+                else:
+                    await manager.broadcast_to_pit(message["id"], message["event"])
+        except (ConnectionError, OSError, ValueError) as e:
+            logger.warning(f"Ingest IPC connection to {path} lost: {e}")
+        finally:
+            self._writers.pop(path, None)
+            self.worker_metrics.pop(path, None)
+            writer.close()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "ingest_processes": len(self._writers),
+            "events_received": self.events_received,
+            "invalidations_lost": self.invalidations_lost,
+        }
+
+
+# ─── Global singleton (API process, external ingest mode) ─────────────────────
+_client: Optional[IngestEventClient] = None
+
+
+def get_ingest_client() -> IngestEventClient:
+    """Return the running IPC client."""
+    if _client is None:
+        raise RuntimeError("Ingest IPC client not initialized. Call start_ingest_client() first.")
+    return _client
+
+
+def start_ingest_client() -> IngestEventClient:
+    """Create and start the global IPC client. Call once at API startup."""
+    global _client
+    if _client is None:
+        _client = IngestEventClient()
+    _client.start()
+    return _client
+
+
+async def stop_ingest_client() -> None:
+    """Stop the global IPC client. Call at API shutdown."""
+    global _client
+    if _client is not None:
+        await _client.stop()
+        _client = None
@@ -0,0 +1,170 @@
+"""
+Module: ingest_metrics.py
+Purpose:
+    Per-stage latency histograms for the MQTT sensor ingest path.
+
+    Stages (in pipeline order):
+      queue_wait — message waiting in its ingest queue shard
+      parse      — decoding the payload into readings
+      license    — license/device validation (cache hit or DB)
+      insert     — multi-row INSERT of a writer batch
+      alerts     — alert evaluation for a writer batch
+      commit     — COMMIT of a writer batch
+      ws_fanout  — WebSocket broadcast of a committed batch
+
+    queue_wait, parse and license are recorded per MQTT message, the writer
+    stages per batch (see ingest_writer.py).
+
+    Histograms are HDR-style: logarithmic buckets, 20 per decade from 1 µs
+    to 100 s, so any recorded value is known to within ~12% and recording
+    is a log10 plus a list increment. Quantiles are read from the buckets.
+
+    Exposed by GET /metrics as JSON (count, sum, mean, p50/p90/p99, max per
+    stage) and, with ?format=prometheus, in the Prometheus text format.
+    A standalone ingest process sends snapshot() to the API processes over
+    the IPC socket, where the histograms of all ingest processes are merged.
+
+Author: PPF Monitoring Team
+Created: 2026-03-16
+"""
+
+import math
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+STAGES = ("queue_wait", "parse", "license", "insert", "alerts", "commit", "ws_fanout")
+
+_BUCKETS_PER_DECADE = 20
+_DECADES = 8                               # 1 µs .. 100 s
+_BUCKET_COUNT = _BUCKETS_PER_DECADE * _DECADES + 1
+# Upper bound (µs) of bucket i; values above the last bound go to the overflow bucket
+_UPPER_BOUNDS_US = tuple(10 ** (i / _BUCKETS_PER_DECADE) for i in range(_BUCKET_COUNT))
+# Every 5th bound (4 per decade) from 10 µs is published as a Prometheus "le" bucket
+_PROMETHEUS_BUCKETS = tuple(range(_BUCKETS_PER_DECADE, _BUCKET_COUNT, 5))
+
+_QUANTILES = (("p50", 0.50), ("p90", 0.90), ("p99", 0.99))
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (seconds in, seconds out)."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (_BUCKET_COUNT + 1)   # last slot = overflow
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        micros = seconds * 1_000_000
+        if micros <= 1:
+            index = 0
+        else:
+            index = min(math.ceil(math.log10(micros) * _BUCKETS_PER_DECADE - 1e-9), _BUCKET_COUNT)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th value (capped at max)."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                if index == _BUCKET_COUNT:
+                    return self.max
+                return min(_UPPER_BOUNDS_US[index] / 1_000_000, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """JSON view, milliseconds."""
+        summary = {
+            "count": self.count,
+            "sum_ms": round(self.sum * 1000, 3),
+            "mean_ms": round(self.sum * 1000 / self.count, 3) if self.count else None,
+        }
+        for name, q in _QUANTILES:
+            value = self.quantile(q)
+            summary[f"{name}_ms"] = round(value * 1000, 3) if value is not None else None
+        summary["max_ms"] = round(self.max * 1000, 3) if self.count else None
+        return summary
+
+    def cumulative_buckets(self) -> list[tuple[float, int]]:
+        """(le seconds, cumulative count) at the Prometheus bucket bounds."""
+        buckets = []
+        seen = 0
+        previous = 0
+        for index in _PROMETHEUS_BUCKETS:
+            seen += sum(self.counts[previous:index + 1])
+            previous = index + 1
+            buckets.append((_UPPER_BOUNDS_US[index] / 1_000_000, seen))
+        return buckets
+
+
+class IngestMetrics:
+    """One LatencyHistogram per ingest stage."""
+
+    def __init__(self):
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.stages[stage].record(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Record how long the with-block took (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage].record(time.perf_counter() - start)
+
+    def clear(self) -> None:
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+
+    def snapshot(self) -> dict:
+        """Raw bucket counts per stage, to hand to another process's merge()."""
+        return {
+            stage: {"counts": histogram.counts, "sum": histogram.sum, "max": histogram.max}
+            for stage, histogram in self.stages.items()
+        }
+
+    def merge(self, snapshot: dict) -> None:
+        """Add another process's snapshot() into these histograms."""
+        for stage, state in snapshot.items():
+            histogram = self.stages.get(stage)
+            if histogram is None or len(state["counts"]) != len(histogram.counts):
+                continue
+            histogram.counts = [a + b for a, b in zip(histogram.counts, state["counts"])]
+            histogram.count += sum(state["counts"])
+            histogram.sum += state["sum"]
+            histogram.max = max(histogram.max, state["max"])
+
+    @property
+    def stats(self) -> dict:
+        return {stage: histogram.summary() for stage, histogram in self.stages.items()}
+
+    def prometheus_lines(self) -> list[str]:
+        """Stage histograms in the Prometheus text exposition format."""
+        name = "ppf_ingest_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each sensor ingest stage.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, histogram in self.stages.items():
+            for le, count in histogram.cumulative_buckets():
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{le:.6g}"}} {count}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        return lines
+
+
+ingest_metrics = IngestMetrics()
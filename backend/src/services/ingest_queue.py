@@ -0,0 +1,529 @@
+"""
+Module: ingest_queue.py
+Purpose:
+    Bounded hand-off between the MQTT network thread and the event loop.
+
+    paho's on_message callback offers each (topic, payload) here instead of
+    scheduling a coroutine per message. A fixed pool of worker tasks drains
+    the queue, so a burst (e.g. every Pi reconnecting after a broker blip)
+    queues up instead of opening unbounded concurrent DB sessions.
+
+    Work is sharded by crc32(device_id) % workers: each worker owns one
+    shard queue, so messages from one device are handled strictly in
+    arrival order (no races on last_seen or the cooldown check) while
+    different devices run in parallel. device_id is pulled from the raw
+    payload with a regex — no JSON parse — falling back to the topic.
+    Each queued message carries its enqueue time, so the wait is recorded
+    as the queue_wait stage (ingest_metrics.py).
+
+    Overflow policy when a shard is full (ingest.overflow_policy):
+      drop_oldest — discard the oldest queued message, keep the newest
+      block       — block the MQTT thread until there is room; TCP
+                    backpressure then slows the broker down
+      spill       — append the message to its shard's JSON-lines file on
+                    disk and re-queue it once the shard has drained below half
+
+    Spill files (<spill_path>.<shard>-<shards>) are append-only. A refill
+    reads forward from the shard's read offset — only the lines that fit —
+    and records the new offset in a side file written with an atomic
+    rename, so a refill costs the lines it moves, never the whole backlog,
+    and a crash never loses or rewrites spilled messages. A file read to
+    its end is deleted. Reads and side-file writes run in a worker thread.
+    Appends do too: offer() only buffers the line, and a flush task writes
+    whatever has accumulated in one worker-thread call, so a burst that
+    spills never blocks the event loop on disk. Refills and flushes take
+    turns (_spill_io), so a shard counts as drained only once its file and
+    its buffer are both empty.
+
+Author: PPF Monitoring Team
+Created: 2026-03-12
+"""
+
+import asyncio
+import glob
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Optional
+
+from src.config.settings import get_settings
+from src.services.ingest_metrics import ingest_metrics
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+OVERFLOW_POLICIES = ("drop_oldest", "block", "spill")
+
+# Upper bound on how long the MQTT thread waits under the "block" policy
+# before giving up on a message (protects shutdown from hanging)
+_BLOCK_TIMEOUT_SECONDS = 30.0
+
+MessageHandler = Callable[[str, str], Awaitable[None]]
+
+_DEVICE_ID_RE = re.compile(r'"device_id"\s*:\s*"([^"]*)"')
+
+
+def shard_key(topic: str, payload: str) -> str:
+    """
+    Ordering key for a message: the payload's device_id if present,
+    otherwise the topic (workshop/W/pit/P/sensors identifies the pit's device).
+    """
+    match = _DEVICE_ID_RE.search(payload, 0, 512)
+    if match and match.group(1):
+        return match.group(1)
+    return topic
+
+
+class IngestQueue:
+    """
+    Bounded, device-sharded queue of raw MQTT messages drained by N workers.
+
+    Args:
+        handler: Coroutine called as handler(topic, payload) for each message
+        maxsize: Messages held in memory (split evenly across shards)
+        workers: Number of worker tasks, one per shard
+        overflow_policy: "drop_oldest" | "block" | "spill"
+        spill_path: Base path of the per-shard JSON-lines files used by "spill"
+    """
+
+    def __init__(
+        self,
+        handler: MessageHandler,
+        maxsize: int = settings.INGEST_QUEUE_SIZE,
+        workers: int = settings.INGEST_WORKERS,
+        overflow_policy: str = settings.INGEST_OVERFLOW_POLICY,
+        spill_path: str = settings.INGEST_SPILL_PATH,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown ingest overflow policy '{overflow_policy}'. "
+                f"Expected one of {OVERFLOW_POLICIES}"
+            )
+        self._handler = handler
+        self.worker_count = max(1, workers)
+        self.shard_size = max(1, maxsize // self.worker_count)
+        self.maxsize = self.shard_size * self.worker_count
+        self.overflow_policy = overflow_policy
+        self.spill_path = spill_path
+
+        self._shards: list[asyncio.Queue] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: list[asyncio.Task] = []
+        # Guards the append handles and read offsets (refills read in a thread)
+        self._spill_lock = threading.Lock()
+        self._spill_handles: dict[int, Any] = {}
+        self._spill_offsets: list[int] = [0] * self.worker_count
+        self._refilling: set[int] = set()
+        # Spilled lines not yet written, per shard (flushed in a thread)
+        self._spill_buffer: dict[int, list[bytes]] = {}
+        self._spill_flush_task: Optional[asyncio.Task] = None
+        self._spill_io = asyncio.Lock()
+
+        # Counters (exposed via stats for /metrics)
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.blocked = 0
+        # Spilled messages still on disk, per shard
+        self._spill_backlog: list[int] = [0] * self.worker_count
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        """Create the queue and worker tasks on the running event loop."""
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._shards = [asyncio.Queue(maxsize=self.shard_size) for _ in range(self.worker_count)]
+        self._load_spill()
+        if self.spill_pending:
+            logger.warning(f"Found {self.spill_pending} spilled message(s) from a previous run")
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"ingest-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        for index, backlog in enumerate(self._spill_backlog):
+            if backlog:
+                asyncio.create_task(self._refill_shard(index), name=f"ingest-refill-{index}")
+        logger.info(
+            f"Ingest queue started (maxsize={self.maxsize}, workers={self.worker_count}, "
+            f"overflow={self.overflow_policy})"
+        )
+
+    async def stop(self) -> None:
+        """Process everything already queued, then stop the workers."""
+        if not self._workers:
+            return
+        for shard in self._shards:
+            await shard.join()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Spilled messages stay on disk for the next start
+        if self._spill_flush_task is not None:
+            await self._spill_flush_task
+            self._spill_flush_task = None
+        with self._spill_lock:
+            for handle in self._spill_handles.values():
+                handle.close()
+            self._spill_handles.clear()
+        logger.info("Ingest queue stopped")
+
+    def shard_index(self, topic: str, payload: str) -> int:
+        return zlib.crc32(shard_key(topic, payload).encode("utf-8")) % self.worker_count
+
+    def shard_for(self, topic: str, payload: str) -> asyncio.Queue:
+        return self._shards[self.shard_index(topic, payload)]
+
+    @property
+    def spill_pending(self) -> int:
+        return sum(self._spill_backlog)
+
+    def is_full_for(self, topic: str, payload: str) -> bool:
+        """True if the shard this message maps to has no room."""
+        return bool(self._shards) and self.shard_for(topic, payload).full()
+
+    @property
+    def depth(self) -> int:
+        return sum(shard.qsize() for shard in self._shards)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "shard_depths": [shard.qsize() for shard in self._shards],
+            "maxsize": self.maxsize,
+            "workers": self.worker_count,
+            "overflow_policy": self.overflow_policy,
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "spill_pending": self.spill_pending,
+            "blocked": self.blocked,
+        }
+
+    # ── Producer API ─────────────────────────────────────────────────────────
+    def offer_threadsafe(self, topic: str, payload: str) -> None:
+        """
+        Hand a message over from a non-loop thread (the paho network thread).
+        Under the "block" policy this call waits until the queue has room.
+        """
+        if self._loop is None or self._loop.is_closed():
+            logger.error(f"Ingest queue not running, dropping message on '{topic}'")
+            self.dropped += 1
+            return
+
+        if self.overflow_policy == "block":
+            future = asyncio.run_coroutine_threadsafe(self.put(topic, payload), self._loop)
+            try:
+                future.result(timeout=_BLOCK_TIMEOUT_SECONDS)
+            except Exception as e:
+                future.cancel()
+                self.dropped += 1
+                logger.error(f"Ingest queue blocked too long, dropping message on '{topic}': {e}")
+            return
+
+        self._loop.call_soon_threadsafe(self.offer, topic, payload)
+
+    def offer(self, topic: str, payload: str) -> None:
+        """Enqueue from the event loop thread without waiting (never blocks)."""
+        self.received += 1
+        item = (topic, payload, time.monotonic())
+        index = self.shard_index(topic, payload)
+        shard = self._shards[index]
+
+        # Behind an on-disk backlog: spill too, so the device's order holds
+        if self.overflow_policy == "spill" and self._spill_backlog[index]:
+            self._spill(item, index)
+            return
+
+        try:
+            shard.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow_policy == "spill":
+            self._spill(item, index)
+            return
+
+        # drop_oldest (also the fallback for "block" when called on the loop)
+        try:
+            shard.get_nowait()
+            shard.task_done()
+            self.dropped += 1
+        except asyncio.QueueEmpty:
+            pass
+        shard.put_nowait(item)
+        if self.dropped % 1000 == 1:
+            logger.warning(f"Ingest queue full — dropped {self.dropped} oldest message(s) so far")
+
+    async def put(self, topic: str, payload: str) -> None:
+        """Enqueue from the event loop, waiting for room if the shard is full."""
+        shard = self.shard_for(topic, payload)
+        if shard.full():
+            self.blocked += 1
+        await shard.put((topic, payload, time.monotonic()))
+        self.received += 1
+
+    # ── Workers ──────────────────────────────────────────────────────────────
+    async def _worker(self, index: int) -> None:
+        shard = self._shards[index]
+        while True:
+            topic, payload, enqueued_at = await shard.get()
+            ingest_metrics.observe("queue_wait", time.monotonic() - enqueued_at)
+            try:
+                await self._handler(topic, payload)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Ingest worker {index} failed on '{topic}': {e}", exc_info=True)
+            finally:
+                shard.task_done()
+
+            if self._spill_backlog[index] and shard.qsize() < self.shard_size // 2 + 1:
+                await self._refill_shard(index)
+
+    # ── Spill files ──────────────────────────────────────────────────────────
+    def _spill_file(self, index: int) -> str:
+        return f"{self.spill_path}.{index}-{self.worker_count}"
+
+    def _spill(self, item: tuple[str, str, float], index: int) -> None:
+        """Buffer one message for its shard's spill file (loop thread, no I/O)."""
+        self._spill_buffer.setdefault(index, []).append(json.dumps(item[:2]).encode("utf-8") + b"\n")
+        self.spilled += 1
+        self._spill_backlog[index] += 1
+        if self._spill_flush_task is None or self._spill_flush_task.done():
+            self._spill_flush_task = asyncio.get_running_loop().create_task(
+                self._flush_spill(), name="ingest-spill-flush"
+            )
+
+    async def _flush_spill(self) -> None:
+        """Write buffered spill lines in a worker thread until none are left."""
+        while self._spill_buffer:
+            async with self._spill_io:
+                pending, self._spill_buffer = self._spill_buffer, {}
+                failed = await asyncio.to_thread(self._write_spill, pending)
+            for index, count in failed.items():
+                self.spilled -= count
+                self.dropped += count
+                self._spill_backlog[index] = max(0, self._spill_backlog[index] - count)
+            # A worker waiting on an empty shard would not refill it itself
+            for index in pending:
+                if (self._workers and self._spill_backlog[index]
+                        and self._shards[index].qsize() < self.shard_size // 2 + 1):
+                    await self._refill_shard(index)
+
+    def _write_spill(self, pending: dict[int, list[bytes]]) -> dict[int, int]:
+        """Append buffered lines per shard (worker thread). Returns lines lost per shard."""
+        failed = {}
+        with self._spill_lock:
+            for index, lines in pending.items():
+                try:
+                    self._append_spill(index, lines)
+                except OSError as e:
+                    failed[index] = len(lines)
+                    logger.error(
+                        f"Ingest spill to '{self._spill_file(index)}' failed, "
+                        f"dropping {len(lines)} message(s): {e}"
+                    )
+        return failed
+
+    def _append_spill(self, index: int, lines: list[bytes]) -> None:
+        # Caller holds _spill_lock
+        handle = self._spill_handles.get(index)
+        if handle is None:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handle = self._spill_handles[index] = open(self._spill_file(index), "ab")
+        handle.writelines(lines)
+        handle.flush()
+
+    async def _refill_shard(self, index: int) -> None:
+        """Move as many of a shard's spilled messages back as fit, oldest first."""
+        shard = self._shards[index]
+        room = self.shard_size - shard.qsize()
+        if room <= 0 or index in self._refilling:
+            return
+        self._refilling.add(index)
+        try:
+            async with self._spill_io:
+                items, drained = await asyncio.to_thread(self._read_spill, index, room)
+                # Lines still buffered are on their way to a new file
+                buffered = len(self._spill_buffer.get(index, ()))
+        except OSError as e:
+            logger.error(f"Ingest spill refill from '{self._spill_file(index)}' failed: {e}")
+            return
+        finally:
+            self._refilling.discard(index)
+
+        # Only this shard's worker takes from it and offer() spills while
+        # there is a backlog, so the room measured above is still there
+        now = time.monotonic()
+        for topic, payload in items:
+            shard.put_nowait((topic, payload, now))
+        if drained:
+            self._spill_backlog[index] = buffered
+        else:
+            self._spill_backlog[index] = max(0, self._spill_backlog[index] - len(items))
+        if items:
+            logger.info(
+                f"Re-queued {len(items)} spilled message(s) on shard {index}, "
+                f"{self._spill_backlog[index]} still on disk"
+            )
+
+    def _read_spill(self, index: int, limit: int) -> tuple[list[tuple[str, str]], bool]:
+        """
+        Read up to limit messages from the shard's read offset (worker thread).
+
+        Returns:
+            (messages, drained) — drained once the file has been read to its
+            end and removed
+        """
+        path = self._spill_file(index)
+        with self._spill_lock:
+            offset = self._spill_offsets[index]
+
+        items: list[tuple[str, str]] = []
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                while len(items) < limit:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):    # end of file
+                        break
+                    offset += len(line)
+                    try:
+                        topic, payload = json.loads(line)
+                    except (ValueError, TypeError):
+                        logger.error(f"Ingest spill: skipping corrupt line in '{path}'")
+                        continue
+                    items.append((topic, payload))
+        except FileNotFoundError:
+            return items, True
+
+        with self._spill_lock:
+            self._spill_offsets[index] = offset
+            if offset >= os.path.getsize(path):
+                # Everything read and nothing appended since: start afresh
+                handle = self._spill_handles.pop(index, None)
+                if handle is not None:
+                    handle.close()
+                os.remove(path)
+                _remove_if_exists(path + ".offset")
+                self._spill_offsets[index] = 0
+                return items, True
+            _write_offset(path + ".offset", offset)
+        return items, False
+
+    def _load_spill(self) -> None:
+        """
+        Index spill files left by a previous run. Files written with a
+        different shard count (or the older single-file layout) are re-spilled
+        into the current shards, keeping each device's order.
+        """
+        self._spill_backlog = [0] * self.worker_count
+        self._spill_offsets = [0] * self.worker_count
+        pattern = re.compile(re.escape(self.spill_path) + r"\.(\d+)-(\d+)$")
+        foreign = []
+        for path in sorted(glob.glob(glob.escape(self.spill_path) + ".*-*")):
+            match = pattern.match(path)
+            if match is None:
+                continue
+            index, shards = int(match.group(1)), int(match.group(2))
+            if shards != self.worker_count:
+                foreign.append(path)
+                continue
+            offset = _read_offset(path + ".offset")
+            self._spill_offsets[index] = offset
+            with open(path, "rb") as f:
+                f.seek(offset)
+                self._spill_backlog[index] = sum(1 for line in f if line.endswith(b"\n"))
+        if os.path.exists(self.spill_path):
+            foreign.insert(0, self.spill_path)
+
+        for path in foreign:
+            by_shard: dict[int, list[bytes]] = {}
+            with open(path, "rb") as f:
+                f.seek(_read_offset(path + ".offset"))
+                for line in f:
+                    try:
+                        topic, payload = json.loads(line)
+                    except (ValueError, TypeError):
+                        continue
+                    by_shard.setdefault(self.shard_index(topic, payload), []).append(
+                        line if line.endswith(b"\n") else line + b"\n"
+                    )
+            with self._spill_lock:
+                for index, lines in by_shard.items():
+                    self._append_spill(index, lines)
+                    self._spill_backlog[index] += len(lines)
+            os.remove(path)
+            _remove_if_exists(path + ".offset")
+
+
+def _read_offset(path: str) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_offset(path: str, offset: int) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(str(offset))
+    os.replace(tmp, path)
+
+
+def _remove_if_exists(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# ─── Global singleton ─────────────────────────────────────────────────────────
+_ingest_queue: Optional[IngestQueue] = None
+
+
+def get_ingest_queue() -> IngestQueue:
+    """Return the running ingest queue."""
+    if _ingest_queue is None:
+        raise RuntimeError("Ingest queue not initialized. Call start_ingest_queue() first.")
+    return _ingest_queue
+
+
+def start_ingest_queue(handler: Optional[MessageHandler] = None) -> IngestQueue:
+    """
+    Create and start the global ingest queue. Call once at startup,
+    before the MQTT client starts delivering messages.
+    Defaults to mqtt_service.dispatch_message as the handler.
+    """
+    global _ingest_queue
+    if _ingest_queue is None:
+        if handler is None:
+            # Import here to avoid circular deps
+            from src.services.mqtt_service import dispatch_message
+            handler = dispatch_message
+        _ingest_queue = IngestQueue(handler)
+    _ingest_queue.start()
+    return _ingest_queue
+
+
+async def stop_ingest_queue() -> None:
+    """Drain queued messages and stop the workers. Call at shutdown."""
+    global _ingest_queue
+    if _ingest_queue is not None:
+        await _ingest_queue.stop()
+        _ingest_queue = None
@@ -0,0 +1,492 @@
+"""
+Module: ingest_spool.py
+Purpose:
+    Durable on-disk spool for sensor readings the database cannot take.
+
+    When the sensor writer's transaction fails because the database is
+    unreachable (connection refused, pool timeout, failover, maintenance),
+    the batch is appended here instead of being retried row by row and
+    dropped. Messages whose license check needs the database during an
+    outage (cold license cache) are spooled raw, so they are not lost either.
+
+    Layout: a directory of append-only segment files, 000000000001.seg,
+    000000000002.seg, ... — one JSON record per line, fsync'ed per append.
+    A segment is closed after ingest.spool_segment_records records.
+
+    Several processes share ingest.spool_dir (uvicorn workers in embedded
+    mode), so each one spools into its own worker-<slot> subdirectory: the
+    lowest slot whose .lock file it can flock, held until stop(). A
+    restarted worker usually gets its old slot back; segments left in a
+    slot nobody holds (fewer workers after a restart) or directly in
+    spool_dir (older layout) are moved into the claiming process's
+    directory and replayed by it.
+
+    A background task probes the database every
+    ingest.spool_replay_interval_seconds and, once it answers, replays the
+    segments oldest first: consecutive readings go in as one executemany
+    INSERT per chunk, raw messages go back through mqtt_service's
+    dispatcher. A segment is deleted once fully replayed; if replay fails
+    half way the segment is rewritten with what is left, so nothing is
+    inserted twice. Readings that the unique (device_id, device_timestamp)
+    index says are already stored are skipped.
+
+    Replayed readings keep their original created_at. Alerts are not
+    evaluated and no WebSocket update is pushed for them — by then they
+    are history, and dashboards read them from the DB. A replayed reading
+    newer than a pit's latest snapshot does update it (latest_readings.py).
+
+    File I/O runs in a worker thread so the event loop (and with the
+    asyncio MQTT transport, the broker connection) is never blocked on
+    fsync.
+
+Author: PPF Monitoring Team
+Created: 2026-03-14
+"""
+
+import asyncio
+import json
+import os
+import socket
+import threading
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import insert, text
+
+from src.config.database import get_db_context
+from src.config.settings import get_settings
+from src.models.sensor_data import SensorData
+from src.services.latest_readings import latest_readings
+from src.services.reading_dedup import is_duplicate_reading
+from src.utils.helpers import utc_now
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_SEGMENT_SUFFIX = ".seg"
+_SLOT_PREFIX = "worker-"
+_LOCK_NAME = ".lock"
+_MAX_SLOTS = 64
+_SENSOR_TABLE = SensorData.__table__
+_COLUMNS = tuple(c.key for c in _SENSOR_TABLE.columns if c.key != "id")
+_DATETIME_COLUMNS = frozenset(
+    c.key for c in _SENSOR_TABLE.columns if c.type.python_type is datetime
+)
+
+
+def is_db_unavailable(error: BaseException) -> bool:
+    """
+    True for errors meaning "the database could not be reached", as opposed
+    to a statement the database rejected (constraint, bad data).
+    """
+    if isinstance(error, (sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.TimeoutError)):
+        return True
+    if isinstance(error, sa_exc.DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError, socket.gaierror, asyncio.TimeoutError))
+
+
+def _encode_reading(reading: SensorData, workshop_id: int, pit_id: int) -> str:
+    row = {}
+    for key in _COLUMNS:
+        value = getattr(reading, key)
+        row[key] = value.isoformat() if isinstance(value, datetime) else value
+    row["workshop_id"] = workshop_id
+    row["pit_id"] = pit_id
+    return json.dumps({"r": row}, separators=(",", ":"))
+
+
+def _decode_reading(row: dict) -> dict:
+    for key in _DATETIME_COLUMNS:
+        if row.get(key) is not None:
+            row[key] = datetime.fromisoformat(row[key])
+    return row
+
+
+class IngestSpool:
+    """
+    Append-only segment spool with ordered bulk replay.
+
+    Args:
+        directory: Shared spool directory (segments go in a per-process subdirectory)
+        segment_records: Records per segment before a new one is started
+        max_records: Spool capacity; further readings are dropped (logged)
+        replay_interval_seconds: Seconds between DB probes while spooled
+        replay_chunk_rows: Readings per INSERT during replay
+        session_factory: Async context manager yielding an AsyncSession
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.INGEST_SPOOL_DIR,
+        segment_records: int = settings.INGEST_SPOOL_SEGMENT_RECORDS,
+        max_records: int = settings.INGEST_SPOOL_MAX_RECORDS,
+        replay_interval_seconds: float = settings.INGEST_SPOOL_REPLAY_INTERVAL_SECONDS,
+        replay_chunk_rows: int = settings.INGEST_BATCH_MAX_ROWS,
+        session_factory: Callable = get_db_context,
+    ):
+        self.directory = directory
+        self.segment_records = max(1, segment_records)
+        self.max_records = max_records
+        self.replay_interval = max(0.1, replay_interval_seconds)
+        self.replay_chunk_rows = max(1, replay_chunk_rows)
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()      # file access (worker threads)
+        self._replay_lock = asyncio.Lock()
+
+        # segment number → [record count, spooled_at of its first record]
+        self._segments: dict[int, list] = {}
+        self._active: Optional[int] = None
+        self._loaded = False
+        self._own_dir: Optional[str] = None
+        self._dir_lock = None              # flock'ed .lock file of _own_dir
+
+        # Counters (exposed via stats for /metrics and /health)
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.duplicates = 0
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        """Pick up segments left by a previous run and start the replay task."""
+        self._load()
+        if self.depth:
+            logger.warning(f"Ingest spool holds {self.depth} record(s) from a previous run")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ingest-spool-replay")
+
+    async def stop(self) -> None:
+        """
+        Stop replaying and give up this process's spool directory. Spooled
+        records stay on disk for the next start (of this or another worker).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        async with self._replay_lock:
+            with self._lock:
+                self._release()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            if not self.depth:
+                continue
+            try:
+                await self.replay()
+            except Exception as e:
+                if is_db_unavailable(e):
+                    logger.debug(f"Ingest spool: database still unavailable ({e})")
+                else:
+                    logger.error(f"Ingest spool replay failed: {e}", exc_info=True)
+
+    # ── Appending ────────────────────────────────────────────────────────────
+    async def append_readings(self, items: Iterable[tuple[SensorData, int, int]]) -> int:
+        """
+        Spool (reading, workshop_id, pit_id) items durably, in order.
+        Returns the number spooled (the rest was over capacity).
+        """
+        lines = [_encode_reading(reading, ws, pit) for reading, ws, pit in items]
+        return await asyncio.to_thread(self._append, lines)
+
+    async def append_message(self, topic: str, payload: str) -> int:
+        """Spool a raw MQTT message for re-dispatch once the DB is back."""
+        line = json.dumps({"m": [topic, payload]}, separators=(",", ":"))
+        return await asyncio.to_thread(self._append, [line])
+
+    def _append(self, lines: list[str]) -> int:
+        with self._lock:
+            self._load()
+            room = max(0, self.max_records - self.depth) if self.max_records > 0 else len(lines)
+            if room < len(lines):
+                self.dropped += len(lines) - room
+                logger.error(
+                    f"Ingest spool full ({self.depth} records) — dropping "
+                    f"{len(lines) - room} reading(s)"
+                )
+                lines = lines[:room]
+            written = 0
+            now = utc_now().timestamp()
+            while written < len(lines):
+                segment = self._writable_segment(now)
+                entry = self._segments[segment]
+                take = lines[written:written + self.segment_records - entry[0]]
+                with open(self._path(segment), "a", encoding="utf-8") as f:
+                    f.write("".join(line + "\n" for line in take))
+                    f.flush()
+                    os.fsync(f.fileno())
+                entry[0] += len(take)
+                written += len(take)
+            self.spooled += written
+            return written
+
+    def _writable_segment(self, now: float) -> int:
+        active = self._active
+        if active is None or self._segments[active][0] >= self.segment_records:
+            active = max(self._segments, default=0) + 1
+            self._segments[active] = [0, now]
+            self._active = active
+        return active
+
+    # ── Replay ───────────────────────────────────────────────────────────────
+    async def replay(self) -> int:
+        """
+        Replay spooled segments oldest first. Returns records replayed.
+
+        Raises:
+            The database error if it is still unavailable (segments kept)
+        """
+        async with self._replay_lock:
+            async with self._session_factory() as db:
+                await db.execute(text("SELECT 1"))
+
+            total = 0
+            while True:
+                segment = self._oldest_segment()
+                if segment is None:
+                    break
+                records = await asyncio.to_thread(self._read_segment, segment)
+                done, error = await self._replay_records(records)
+                await asyncio.to_thread(self._finish_segment, segment, records[done:])
+                total += done
+                self.replayed += done
+                if error is not None:
+                    raise error
+            if total:
+                logger.info(f"Ingest spool: replayed {total} record(s)")
+            return total
+
+    def _oldest_segment(self) -> Optional[int]:
+        with self._lock:
+            if not self._segments:
+                return None
+            oldest = min(self._segments)
+            if oldest == self._active:
+                self._active = None    # close it: new appends go to a new segment
+            return oldest
+
+    async def _replay_records(self, records: list[dict]) -> tuple[int, Optional[Exception]]:
+        """
+        Replay in order. Returns how many leading records are done, and the
+        error that stopped replay (None if all were done).
+        """
+        # Import here to avoid circular deps
+        from src.services.mqtt_service import dispatch_message
+
+        done = 0
+        while done < len(records):
+            if "m" in records[done]:
+                topic, payload = records[done]["m"]
+                try:
+                    await dispatch_message(topic, payload)
+                except Exception as e:
+                    if is_db_unavailable(e):
+                        return done, e
+                    logger.error(f"Ingest spool: dropping spooled message on '{topic}': {e}")
+                done += 1
+                continue
+            chunk = []
+            while (done + len(chunk) < len(records) and "r" in records[done + len(chunk)]
+                   and len(chunk) < self.replay_chunk_rows):
+                chunk.append(_decode_reading(dict(records[done + len(chunk)]["r"])))
+            try:
+                await self._insert_chunk(chunk)
+            except Exception as e:
+                return done, e
+            done += len(chunk)
+        return done, None
+
+    async def _insert_chunk(self, chunk: list[dict]) -> None:
+        """
+        Bulk INSERT a chunk. If it collides with readings already stored
+        (the live path may have taken a redelivered copy), insert row by
+        row and skip the duplicates.
+        """
+        try:
+            async with self._session_factory() as db:
+                await db.execute(insert(_SENSOR_TABLE), chunk)
+                snapshots = await latest_readings.record(db, chunk)
+                await db.commit()
+            latest_readings.apply(snapshots)
+            return
+        except Exception as e:
+            if not is_duplicate_reading(e):
+                raise
+        for row in chunk:
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(insert(_SENSOR_TABLE), [row])
+                    snapshots = await latest_readings.record(db, [row])
+                    await db.commit()
+                latest_readings.apply(snapshots)
+            except Exception as e:
+                if not is_duplicate_reading(e):
+                    raise
+                self.duplicates += 1
+
+    # ── Segment files ────────────────────────────────────────────────────────
+    def _path(self, segment: int) -> str:
+        return os.path.join(self._own_dir, f"{segment:012d}{_SEGMENT_SUFFIX}")
+
+    def _read_segment(self, segment: int) -> list[dict[str, Any]]:
+        with self._lock:
+            records = []
+            try:
+                with open(self._path(segment), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            logger.error(f"Ingest spool: skipping corrupt record in segment {segment}")
+            except FileNotFoundError:
+                pass
+            return records
+
+    def _finish_segment(self, segment: int, remaining: list[dict]) -> None:
+        with self._lock:
+            path = self._path(segment)
+            if not remaining:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self._segments.pop(segment, None)
+                return
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, separators=(",", ":")) + "\n" for r in remaining)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            self._segments[segment][0] = len(remaining)
+
+    def _load(self) -> None:
+        """Claim this process's directory and index its segment files (once)."""
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._own_dir = self._claim_directory()
+        for name in sorted(os.listdir(self._own_dir)):
+            if not name.endswith(_SEGMENT_SUFFIX):
+                continue
+            path = os.path.join(self._own_dir, name)
+            with open(path, "r", encoding="utf-8") as f:
+                count = sum(1 for line in f if line.strip())
+            if count:
+                self._segments[int(name[:-len(_SEGMENT_SUFFIX)])] = [count, os.path.getmtime(path)]
+            else:
+                os.remove(path)
+        self._adopt(self.directory)
+        self._loaded = True
+
+    def _claim_directory(self) -> str:
+        """Lock and return the lowest free worker-<slot> subdirectory."""
+        try:
+            import fcntl  # POSIX only
+        except ImportError:
+            path = os.path.join(self.directory, f"{_SLOT_PREFIX}pid{os.getpid()}")
+            os.makedirs(path, exist_ok=True)
+            return path
+
+        for slot in range(_MAX_SLOTS):
+            path = os.path.join(self.directory, f"{_SLOT_PREFIX}{slot}")
+            lock = self._try_lock(path)
+            if lock is not None:
+                self._dir_lock = lock
+                return path
+        raise RuntimeError(f"All {_MAX_SLOTS} ingest spool slots in {self.directory} are taken")
+
+    @staticmethod
+    def _try_lock(path: str):
+        """flock path/.lock without waiting. Returns the open file, or None if held."""
+        import fcntl
+
+        os.makedirs(path, exist_ok=True)
+        f = open(os.path.join(path, _LOCK_NAME), "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return None
+        return f
+
+    def _adopt(self, directory: str) -> None:
+        """
+        Move segments nobody owns into this process's directory, after its
+        own: loose ones in directory, then those of every unheld slot.
+        """
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name.endswith(_SEGMENT_SUFFIX):
+                self._adopt_segment(path)
+            elif (name.startswith(_SLOT_PREFIX) and path != self._own_dir
+                    and self._dir_lock is not None and os.path.isdir(path)):
+                lock = self._try_lock(path)
+                if lock is None:
+                    continue       # a live worker's spool
+                try:
+                    for seg in sorted(os.listdir(path)):
+                        if seg.endswith(_SEGMENT_SUFFIX):
+                            self._adopt_segment(os.path.join(path, seg))
+                finally:
+                    lock.close()
+
+    def _adopt_segment(self, path: str) -> None:
+        segment = max(self._segments, default=0) + 1
+        try:
+            mtime = os.path.getmtime(path)
+            os.rename(path, self._path(segment))
+        except FileNotFoundError:
+            return                 # taken by another worker starting up
+        with open(self._path(segment), "r", encoding="utf-8") as f:
+            count = sum(1 for line in f if line.strip())
+        if not count:
+            os.remove(self._path(segment))
+            return
+        self._segments[segment] = [count, mtime]
+        logger.warning(f"Ingest spool: adopted {count} record(s) from {path}")
+
+    def _release(self) -> None:
+        """Forget the loaded index and unlock this process's directory."""
+        if self._dir_lock is not None:
+            self._dir_lock.close()
+            self._dir_lock = None
+        self._segments.clear()
+        self._active = None
+        self._own_dir = None
+        self._loaded = False
+
+    # ── Introspection ────────────────────────────────────────────────────────
+    @property
+    def depth(self) -> int:
+        return sum(entry[0] for entry in self._segments.values())
+
+    @property
+    def oldest_age_seconds(self) -> Optional[float]:
+        if not self._segments:
+            return None
+        first = self._segments[min(self._segments)][1]
+        return round(max(0.0, utc_now().timestamp() - first), 1)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "segments": len(self._segments),
+            "oldest_age_seconds": self.oldest_age_seconds,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+            "duplicates": self.duplicates,
+        }
+
+
+ingest_spool = IngestSpool()
@@ -0,0 +1,377 @@
+"""
+Module: ingest_writer.py
+Purpose:
+    Micro-batched writer stage for the MQTT sensor ingest path.
+
+    The MQTT handler builds a SensorData row per message and submits it here.
+    The writer collects rows for a few milliseconds (or until N rows are
+    pending) and writes each batch in ONE transaction:
+      1. The batch's devices are marked seen in the liveness registry
+         (flushed to the devices table write-behind, see liveness.py) and
+         their offline deadlines re-armed (see offline_detector.py)
+      2. Multi-row INSERT of every reading in the batch
+      3. Alert evaluation for each reading flagged for it (every single-
+         reading message; the newest reading of a device batch message
+         unless ingest.alert_eval_mode is "each")
+      4. Upsert of each pit's newest reading into pit_latest_readings
+         (latest_readings.py)
+      5. One COMMIT
+      6. WebSocket broadcast for each reading and each alert (after commit)
+    Steps 2-6 are timed per batch as ingest stages (ingest_metrics.py).
+
+    If a batch fails (e.g. one row violates a constraint), the rows are
+    retried one transaction each so a single bad reading cannot drop the rest.
+    A row rejected by the (device_id, device_timestamp) unique index is a
+    duplicate the in-memory check missed (see reading_dedup.py) and is
+    counted as such rather than as a failure.
+    If it fails because the database is unreachable, the batch goes to the
+    on-disk spool instead and is replayed once the DB is back (ingest_spool.py).
+
+Author: PPF Monitoring Team
+Created: 2026-03-10
+"""
+
+import asyncio
+from typing import Callable, Optional
+
+from src.config.database import get_db_context
+from src.config.settings import get_settings
+from src.models.alert import Alert
+from src.models.sensor_data import SensorData
+from src.services.alert_cooldown import alert_cooldowns
+from src.services.ingest_metrics import ingest_metrics
+from src.services.ingest_spool import IngestSpool, ingest_spool, is_db_unavailable
+from src.services.latest_readings import latest_readings
+from src.services.liveness import liveness
+from src.services.offline_detector import offline_detector
+from src.services.reading_dedup import is_duplicate_reading, reading_dedup
+from src.services.sensor_service import evaluate_alerts
+from src.services.threshold_cache import threshold_cache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class PendingReading:
+    """One reading waiting in the writer queue, plus its routing context."""
+
+    __slots__ = ("reading", "workshop_id", "pit_id", "check_alerts", "alerts")
+
+    def __init__(
+        self,
+        reading: SensorData,
+        workshop_id: int,
+        pit_id: int,
+        check_alerts: bool = True,
+    ):
+        self.reading = reading
+        self.workshop_id = workshop_id
+        self.pit_id = pit_id
+        self.check_alerts = check_alerts
+        self.alerts: list[Alert] = []
+
+
+class SensorBatchWriter:
+    """
+    Collects sensor readings and writes them in batches.
+
+    Args:
+        max_rows: Flush as soon as this many readings are pending
+        max_delay_ms: Flush when the oldest pending reading has waited this long
+        queue_size: Pending readings allowed before submit() waits (backpressure)
+        session_factory: Async context manager yielding an AsyncSession
+        spool: Where batches go while the database is unreachable
+    """
+
+    def __init__(
+        self,
+        max_rows: int = settings.INGEST_BATCH_MAX_ROWS,
+        max_delay_ms: int = settings.INGEST_BATCH_MAX_DELAY_MS,
+        queue_size: int = settings.INGEST_WRITER_QUEUE_SIZE,
+        session_factory: Callable = get_db_context,
+        spool: Optional[IngestSpool] = None,
+    ):
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max(0, max_delay_ms) / 1000.0
+        self._queue: asyncio.Queue[Optional[PendingReading]] = asyncio.Queue(maxsize=queue_size)
+        self._session_factory = session_factory
+        self._spool = spool or ingest_spool
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters (exposed via stats for /metrics)
+        self.batches_written = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.rows_spooled = 0
+        self.rows_duplicate = 0
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        """Start the background flush loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Sensor batch writer started "
+                f"(max_rows={self.max_rows}, max_delay={self.max_delay * 1000:.0f}ms)"
+            )
+
+    async def stop(self) -> None:
+        """Flush everything already submitted, then stop the loop."""
+        if self._task is None:
+            return
+        await self._queue.put(None)  # sentinel — processed after pending rows
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Sensor batch writer stopped")
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "batches_written": self.batches_written,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "rows_spooled": self.rows_spooled,
+            "rows_duplicate": self.rows_duplicate,
+        }
+
+    # ── Producer API ─────────────────────────────────────────────────────────
+    async def submit(
+        self,
+        reading: SensorData,
+        workshop_id: int,
+        pit_id: int,
+        check_alerts: bool = True,
+    ) -> None:
+        """
+        Queue a reading for the next batch.
+        Waits only when the writer queue is full (backpressure on the producer).
+
+        Args:
+            check_alerts: Evaluate alert thresholds for this reading
+        """
+        await self._queue.put(PendingReading(reading, workshop_id, pit_id, check_alerts))
+
+    # ── Flush loop ───────────────────────────────────────────────────────────
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect_batch()
+            if batch:
+                try:
+                    await self._write_batch(batch)
+                except Exception as e:
+                    _rollback_cooldowns(batch)
+                    if is_db_unavailable(e):
+                        logger.warning(f"Database unavailable, spooling {len(batch)} reading(s): {e}")
+                        await self._spool_batch(batch)
+                        continue
+                    if is_duplicate_reading(e):
+                        logger.info(f"Sensor batch of {len(batch)} holds a stored reading, retrying row-by-row")
+                    else:
+                        logger.error(
+                            f"Sensor batch of {len(batch)} failed, retrying row-by-row: {e}",
+                            exc_info=True,
+                        )
+                    await self._write_rows_individually(batch)
+
+    async def _collect_batch(self) -> tuple[list[PendingReading], bool]:
+        """
+        Wait for the first reading, then keep collecting until max_rows
+        are pending or max_delay has elapsed since the first one arrived.
+
+        Returns:
+            (batch, stopping) — stopping is True once the stop sentinel is seen
+        """
+        first = await self._queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_rows:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    async def _write_batch(self, batch: list[PendingReading]) -> None:
+        """Insert, evaluate alerts and commit a whole batch in one transaction."""
+        async with self._session_factory() as db:
+            # 1. Liveness is recorded in memory — no devices row UPDATE per
+            #    batch — and each device's offline deadline is re-armed
+            await self._mark_seen(db, batch)
+
+            # 2. Multi-row INSERT (SQLAlchemy batches add_all into one
+            #    INSERT ... VALUES (...), (...) RETURNING id per flush)
+            with ingest_metrics.time("insert"):
+                db.add_all([p.reading for p in batch])
+                await db.flush()
+                snapshots = await latest_readings.record(db, [p.reading for p in batch])
+
+            # 3. Per-reading alert evaluation
+            with ingest_metrics.time("alerts"):
+                for p in batch:
+                    if not p.check_alerts:
+                        continue
+                    p.alerts = await evaluate_alerts(
+                        db=db,
+                        reading=p.reading,
+                        workshop_id=p.workshop_id,
+                        pit_id=p.pit_id,
+                    )
+                    if p.alerts:
+                        # Flush so later readings in this batch see the alert
+                        # in their cooldown check
+                        await db.flush()
+
+            # 4. One COMMIT for the whole batch (readings + latest snapshot)
+            with ingest_metrics.time("commit"):
+                await db.commit()
+
+        latest_readings.apply(snapshots)
+        self.batches_written += 1
+        self.rows_written += len(batch)
+        logger.debug(f"Sensor batch committed: {len(batch)} reading(s)")
+
+        # 6. Push WebSocket updates only after the data is durable
+        with ingest_metrics.time("ws_fanout"):
+            await self._broadcast(batch)
+
+    @staticmethod
+    async def _mark_seen(db, batch: list[PendingReading]) -> None:
+        latest = {p.reading.device_id: p for p in batch}
+        for device_id, p in latest.items():
+            liveness.touch_device(device_id)
+            thresholds = await threshold_cache.get(db, p.workshop_id, p.pit_id)
+            offline_detector.arm(
+                device_id,
+                p.workshop_id,
+                p.pit_id,
+                thresholds.device_offline_threshold_seconds,
+            )
+
+    async def _write_rows_individually(self, batch: list[PendingReading]) -> None:
+        """Slow path: one transaction per reading, dropping only the bad rows."""
+        for i, p in enumerate(batch):
+            try:
+                # Reset state left over from the failed batch transaction
+                p.reading = _detached_copy(p.reading)
+                await self._write_batch([p])
+            except Exception as e:
+                _rollback_cooldowns([p])
+                if is_db_unavailable(e):
+                    await self._spool_batch(batch[i:])
+                    return
+                if is_duplicate_reading(e):
+                    self.rows_duplicate += 1
+                    logger.debug(
+                        f"Skipping duplicate reading from device '{p.reading.device_id}' "
+                        f"at {p.reading.device_timestamp}"
+                    )
+                    continue
+                self.rows_failed += 1
+                # Never stored — a redelivery of it must not count as a duplicate
+                reading_dedup.forget(p.reading.device_id, p.reading.device_timestamp)
+                logger.error(
+                    f"Dropping sensor reading from device '{p.reading.device_id}' "
+                    f"pit_id={p.pit_id}: {e}"
+                )
+
+    async def _spool_batch(self, batch: list[PendingReading]) -> None:
+        try:
+            spooled = await self._spool.append_readings(
+                (_detached_copy(p.reading), p.workshop_id, p.pit_id) for p in batch
+            )
+        except OSError as e:
+            spooled = 0
+            logger.error(f"Ingest spool write failed: {e}")
+        self.rows_spooled += spooled
+        self.rows_failed += len(batch) - spooled
+
+    @staticmethod
+    async def _broadcast(batch: list[PendingReading]) -> None:
+        # Import here to avoid circular deps
+        from src.services.websocket_service import broadcast_alert, broadcast_sensor_update
+
+        for p in batch:
+            try:
+                await broadcast_sensor_update(
+                    workshop_id=p.workshop_id,
+                    pit_id=p.pit_id,
+                    reading=p.reading,
+                )
+                for alert in p.alerts:
+                    await broadcast_alert(workshop_id=p.workshop_id, alert=alert)
+            except Exception as ws_error:
+                logger.warning(f"WebSocket broadcast failed: {ws_error}")
+
+
+def _rollback_cooldowns(batch: list[PendingReading]) -> None:
+    """Alerts from a rolled-back batch were never stored — release their cooldowns."""
+    alert_cooldowns.forget(alert for p in batch for alert in p.alerts)
+    for p in batch:
+        p.alerts = []
+
+
+def _detached_copy(reading: SensorData) -> SensorData:
+    """Return a fresh transient copy of a reading (drops id/session state)."""
+    columns = {
+        c.key: getattr(reading, c.key)
+        for c in SensorData.__table__.columns
+        if c.key != "id"
+    }
+    return SensorData(**columns)
+
+
+# ─── Global singleton (mirrors mqtt_service's client handling) ────────────────
+_writer: Optional[SensorBatchWriter] = None
+
+
+def get_sensor_writer() -> SensorBatchWriter:
+    """Return the running sensor writer."""
+    if _writer is None:
+        raise RuntimeError("Sensor writer not initialized. Call start_sensor_writer() first.")
+    return _writer
+
+
+def start_sensor_writer() -> SensorBatchWriter:
+    """Create and start the global sensor writer. Call once at startup."""
+    global _writer
+    if _writer is None:
+        _writer = SensorBatchWriter()
+    _writer.start()
+    return _writer
+
+
+async def stop_sensor_writer() -> None:
+    """Flush pending readings and stop the global writer. Call at shutdown."""
+    global _writer
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
@@ -35,6 +35,7 @@ from src.utils.helpers import (
     generate_temporary_password,
 )
 from src.utils.logger import get_logger
+from src.utils.pagination import estimate_count, keyset_page
 
 logger = get_logger(__name__)
 
@@ -84,6 +85,19 @@ async def get_job_by_token(db: AsyncSession, token: str) -> Optional[Job]:
     return result.scalar_one_or_none()
 
 
+def _workshop_jobs_query(
+    workshop_id: int,
+    status_filter: Optional[str],
+    pit_id_filter: Optional[int],
+):
+    base_query = select(Job).where(Job.workshop_id == workshop_id)
+    if status_filter:
+        base_query = base_query.where(Job.status == status_filter)
+    if pit_id_filter:
+        base_query = base_query.where(Job.pit_id == pit_id_filter)
+    return base_query
+
+
 async def list_jobs_for_workshop(
     db: AsyncSession,
     workshop_id: int,
@@ -92,13 +106,7 @@ async def list_jobs_for_workshop(
     status_filter: Optional[str] = None,
     pit_id_filter: Optional[int] = None,
 ) -> Tuple[List[Job], int]:
-    from sqlalchemy.orm import selectinload
-    
-    base_query = select(Job).where(Job.workshop_id == workshop_id)
-    if status_filter:
-        base_query = base_query.where(Job.status == status_filter)
-    if pit_id_filter:
-        base_query = base_query.where(Job.pit_id == pit_id_filter)
+    base_query = _workshop_jobs_query(workshop_id, status_filter, pit_id_filter)
 
     count_result = await db.execute(
         select(func.count()).select_from(base_query.subquery())
@@ -116,6 +124,37 @@ async def list_jobs_for_workshop(
     return result.scalars().all(), total
 
 
+async def list_jobs_for_workshop_after(
+    db: AsyncSession,
+    workshop_id: int,
+    cursor: Optional[str] = None,
+    page_size: int = 20,
+    status_filter: Optional[str] = None,
+    pit_id_filter: Optional[int] = None,
+    estimate_total: bool = False,
+) -> Tuple[List[Job], Optional[str], Optional[int]]:
+    """
+    Keyset variant of list_jobs_for_workshop (see utils/pagination.py).
+
+    Returns:
+        (jobs, next_cursor, estimated_total or None)
+
+    Raises:
+        ValueError: Invalid cursor
+    """
+    base_query = _workshop_jobs_query(workshop_id, status_filter, pit_id_filter)
+    jobs, next_cursor = await keyset_page(
+        db,
+        base_query.options(selectinload(Job.customer), selectinload(Job.pit)),
+        Job.created_at,
+        Job.id,
+        cursor,
+        page_size,
+    )
+    estimated = await estimate_count(db, base_query) if estimate_total else None
+    return jobs, next_cursor, estimated
+
+
 async def get_active_job_for_pit(db: AsyncSession, pit_id: int) -> Optional[Job]:
     """Get any job currently in progress for a given pit."""
     result = await db.execute(
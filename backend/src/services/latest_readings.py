@@ -0,0 +1,190 @@
+"""
+Module: latest_readings.py
+Purpose:
+    Newest valid reading per pit, held in memory and mirrored in the
+    pit_latest_readings table.
+
+    Write side (ingest): the batch writer calls record() after inserting a
+    batch and before its COMMIT, so the snapshot rows change atomically
+    with the readings, then apply() once committed to update memory.
+    The upsert only ever replaces an older reading — spool replays can
+    deliver readings older than what is already shown.
+
+    Read side (dashboards, tracking page, stream status): get_many() serves
+    pits from memory. Misses, and entries older than
+    sensor.latest_cache_ttl_seconds (another process may be ingesting for
+    the pit), come from the table in one query. A pit without a row yet
+    (readings from before the table existed) is looked up in sensor_data
+    once and its row written, "no reading" included.
+
+Author: PPF Monitoring Team
+Created: 2026-03-21
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Iterable, Mapping, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import get_settings
+from src.models.pit_latest_reading import PitLatestReading
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_FIELDS = (
+    "device_id", "temperature", "humidity", "pressure", "gas_resistance",
+    "iaq", "pm1", "pm25", "pm10",
+)
+
+
+class LatestSnapshot:
+    """Detached copy of a pit's newest valid reading. Treat as read-only."""
+
+    __slots__ = ("pit_id", "reading_at") + _FIELDS
+
+    def __init__(self, pit_id: int, reading_at: datetime, values: Mapping[str, Any]):
+        self.pit_id = pit_id
+        # SQLite hands timestamps back naive; they are stored as UTC
+        self.reading_at = reading_at if reading_at.tzinfo else reading_at.replace(tzinfo=timezone.utc)
+        for field in _FIELDS:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_reading(cls, reading) -> "LatestSnapshot":
+        """From a SensorData row, or a dict of its columns (spool replay)."""
+        values = reading if isinstance(reading, Mapping) else {
+            field: getattr(reading, field) for field in _FIELDS + ("pit_id", "created_at")
+        }
+        return cls(values["pit_id"], values["created_at"], values)
+
+    def as_row(self) -> dict:
+        row = {field: getattr(self, field) for field in _FIELDS}
+        row.update(pit_id=self.pit_id, reading_at=self.reading_at)
+        return row
+
+
+def _upsert(dialect_name: str):
+    """INSERT ... ON CONFLICT (pit_id) that keeps the newer reading."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(PitLatestReading)
+    return stmt.on_conflict_do_update(
+        index_elements=[PitLatestReading.pit_id],
+        set_={field: stmt.excluded[field] for field in _FIELDS + ("reading_at",)},
+        where=or_(
+            PitLatestReading.reading_at.is_(None),
+            PitLatestReading.reading_at < stmt.excluded.reading_at,
+        ),
+    )
+
+
+class LatestReadingCache:
+    """
+    Process-local pit_id → LatestSnapshot (or None) map over pit_latest_readings.
+
+    Args:
+        ttl_seconds: Age after which an entry is re-read from the table
+    """
+
+    def __init__(self, ttl_seconds: float = settings.SENSOR_LATEST_CACHE_TTL_SECONDS):
+        self.ttl = ttl_seconds
+        self._by_pit: dict[int, tuple[Optional[LatestSnapshot], float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # ── Ingest ───────────────────────────────────────────────────────────────
+    async def record(self, db: AsyncSession, readings: Iterable) -> list[LatestSnapshot]:
+        """
+        Upsert the newest valid reading per pit of a batch, in the caller's
+        transaction. Pass the result to apply() after the COMMIT.
+        """
+        newest: dict[int, LatestSnapshot] = {}
+        for reading in readings:
+            is_valid = reading.get("is_valid") if isinstance(reading, Mapping) else reading.is_valid
+            if is_valid is False:
+                continue
+            snapshot = LatestSnapshot.from_reading(reading)
+            current = newest.get(snapshot.pit_id)
+            if current is None or snapshot.reading_at >= current.reading_at:
+                newest[snapshot.pit_id] = snapshot
+        if newest:
+            await db.execute(
+                _upsert(db.get_bind().dialect.name),
+                [snapshot.as_row() for snapshot in newest.values()],
+            )
+        return list(newest.values())
+
+    def apply(self, snapshots: Iterable[LatestSnapshot]) -> None:
+        """Make committed snapshots visible to readers in this process."""
+        now = time.monotonic()
+        for snapshot in snapshots:
+            entry = self._by_pit.get(snapshot.pit_id)
+            current = entry[0] if entry is not None else None
+            if current is None or snapshot.reading_at >= current.reading_at:
+                self._by_pit[snapshot.pit_id] = (snapshot, now)
+
+    # ── Readers ──────────────────────────────────────────────────────────────
+    async def get(self, db: AsyncSession, pit_id: int) -> Optional[LatestSnapshot]:
+        return (await self.get_many(db, [pit_id]))[pit_id]
+
+    async def get_many(
+        self,
+        db: AsyncSession,
+        pit_ids: Iterable[int],
+    ) -> dict[int, Optional[LatestSnapshot]]:
+        """Newest valid reading of each pit (None if it has none)."""
+        now = time.monotonic()
+        found: dict[int, Optional[LatestSnapshot]] = {}
+        missing = []
+        for pit_id in pit_ids:
+            entry = self._by_pit.get(pit_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                found[pit_id] = entry[0]
+            else:
+                missing.append(pit_id)
+        self.hits += len(found)
+        if not missing:
+            return found
+
+        self.misses += len(missing)
+        result = await db.execute(
+            select(PitLatestReading).where(PitLatestReading.pit_id.in_(missing))
+        )
+        rows = {row.pit_id: row for row in result.scalars()}
+        for pit_id in missing:
+            row = rows.get(pit_id)
+            if row is None:
+                snapshot = await self._backfill(db, pit_id)
+            elif row.reading_at is None:
+                snapshot = None
+            else:
+                snapshot = LatestSnapshot(pit_id, row.reading_at, row.__dict__)
+            self._by_pit[pit_id] = (snapshot, now)
+            found[pit_id] = snapshot
+        return found
+
+    async def _backfill(self, db: AsyncSession, pit_id: int) -> Optional[LatestSnapshot]:
+        # Import here to avoid circular deps
+        from src.services.sensor_service import latest_reading
+
+        reading = await latest_reading(db, pit_id, valid_only=True)
+        snapshot = LatestSnapshot.from_reading(reading) if reading is not None else None
+        row = snapshot.as_row() if snapshot is not None else {"pit_id": pit_id, "reading_at": None}
+        await db.execute(_upsert(db.get_bind().dialect.name), [row])
+        return snapshot
+
+    def clear(self) -> None:
+        self._by_pit.clear()
+
+    @property
+    def stats(self) -> dict:
+        return {"pits": len(self._by_pit), "hits": self.hits, "misses": self.misses}
+
+
+latest_readings = LatestReadingCache()
@@ -0,0 +1,60 @@
+"""
+Module: leader_lock.py
+Purpose:
+    One-at-a-time guard for the periodic sensor history jobs (rollup
+    compactor, retention, partition maintenance).
+
+    Every process that runs ingest starts these jobs — several uvicorn
+    workers in embedded mode, or several ingest processes. Run together
+    they race: two compactors replacing the same rollup buckets collide on
+    the primary key, two retention runs archive the same rows twice. Each
+    pass therefore first takes a PostgreSQL advisory lock named after the
+    job; a process that does not get it skips the pass and tries again on
+    its next one, so a job always has one runner while any is alive.
+
+    The lock is held on a dedicated connection for the length of the pass
+    (session-level, released explicitly or when the connection closes — a
+    crashed runner never leaves it behind). On other databases (SQLite in
+    tests, one process) every pass runs.
+
+Author: PPF Monitoring Team
+Created: 2026-03-25
+"""
+
+import zlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from sqlalchemy import func, select
+
+
+def lock_key(name: str) -> int:
+    """Advisory lock key for a job name (stable across processes and restarts)."""
+    return zlib.crc32(f"ppf:{name}".encode())
+
+
+@asynccontextmanager
+async def leader_lock(session_factory: Callable, name: str) -> AsyncIterator[bool]:
+    """
+    Try to become the runner of job name for the with-block.
+
+    Yields:
+        True if this process holds the lock (run the pass), False if
+        another process does (skip it)
+    """
+    async with session_factory() as db:
+        engine = db.bind
+    if engine is None or engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    key = lock_key(name)
+    async with engine.connect() as conn:
+        held = bool(await conn.scalar(select(func.pg_try_advisory_lock(key))))
+        await conn.commit()   # don't sit idle in a transaction for the whole pass
+        try:
+            yield held
+        finally:
+            if held:
+                await conn.scalar(select(func.pg_advisory_unlock(key)))
+                await conn.commit()
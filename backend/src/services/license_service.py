@@ -5,22 +5,33 @@ Purpose:
     Called by MQTT subscriber on every incoming sensor message.
     Invalid licenses result in DISABLE command being sent to device.
 
+    The MQTT hot path uses validate_license_cached(), which checks a
+    process-local snapshot of the Device + Subscription rows instead of
+    running two SELECTs per message. Routes that change those rows call
+    license_cache.invalidate(device_id) after committing; a TTL bounds
+    staleness for any writer that does not (e.g. another process).
+
 Author: PPF Monitoring Team
 Created: 2026-02-21
 """
 
-from typing import Optional
+import time
+from datetime import datetime
+from typing import Callable, Optional, Union
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config.database import get_db_context
+from src.config.settings import get_settings
 from src.models.device import Device
 from src.models.subscription import Subscription
 from src.utils.constants import DeviceStatus, SubscriptionStatus
-from src.utils.helpers import mask_license_key, utc_now
+from src.utils.helpers import license_key_matches, mask_license_key, utc_now
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
+settings = get_settings()
 
 
 class LicenseValidationResult:
@@ -30,7 +41,7 @@ class LicenseValidationResult:
         self,
         is_valid: bool,
         reason: str = "",
-        device: Optional[Device] = None,
+        device: Optional[Union[Device, "DeviceLicenseSnapshot"]] = None,
         workshop_id: Optional[int] = None,
         pit_id: Optional[int] = None,
     ):
@@ -41,45 +52,145 @@ class LicenseValidationResult:
         self.pit_id = pit_id
 
 
-async def validate_license(
-    db: AsyncSession,
-    device_id: str,
-    license_key: str,
-) -> LicenseValidationResult:
-    """
-    Validate a device's license key against the database.
+# ─── Cached snapshot ──────────────────────────────────────────────────────────
+class SubscriptionSnapshot:
+    """The Subscription columns license validation reads."""
 
-    Called on every MQTT sensor message. Fails fast and explicit —
-    no silent failures. Invalid results trigger kill-switch flow.
+    __slots__ = ("status", "expires_at")
 
-    Args:
-        db: Database session
-        device_id: Device identifier (e.g., PIWIFI-01, ESP32-A1B2C3)
-        license_key: License key sent by device
+    def __init__(self, status: str, expires_at: Optional[datetime]):
+        self.status = status
+        self.expires_at = expires_at
 
-    Returns:
-        LicenseValidationResult with is_valid flag and reason
+
+class DeviceLicenseSnapshot:
+    """
+    Detached copy of the Device columns license validation and reading
+    construction need. Safe to keep across sessions (no lazy loads).
     """
-    masked_key = mask_license_key(license_key)
 
-    # 1. Find device by device_id
-    device_result = await db.execute(
-        select(Device).where(Device.device_id == device_id)
+    __slots__ = (
+        "device_id",
+        "license_key",
+        "status",
+        "workshop_id",
+        "pit_id",
+        "primary_sensor_code",
+        "air_quality_sensor_code",
+        "subscription",
     )
-    device = device_result.scalar_one_or_none()
 
-    if not device:
-        logger.warning(f"License validation FAILED: Unknown device_id='{device_id}'")
-        return LicenseValidationResult(
-            is_valid=False,
-            reason="Unknown device",
+    def __init__(self, device: Device, subscription: Optional[Subscription]):
+        self.device_id = device.device_id
+        self.license_key = device.license_key
+        self.status = device.status
+        self.workshop_id = device.workshop_id
+        self.pit_id = device.pit_id
+        self.primary_sensor_code = device.primary_sensor_code
+        self.air_quality_sensor_code = device.air_quality_sensor_code
+        self.subscription = (
+            SubscriptionSnapshot(subscription.status, subscription.expires_at)
+            if subscription is not None
+            else None
         )
 
-    # 2. Validate license key matches device record
-    if device.license_key != license_key:
+
+class LicenseCache:
+    """
+    Process-local device_id → DeviceLicenseSnapshot map.
+
+    Unknown devices are cached too (as None) so a misconfigured device
+    spamming messages does not hit the DB on every publish.
+
+    Args:
+        ttl_seconds: Entry lifetime; 0 disables caching
+        max_entries: Oldest entries are evicted beyond this size
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = settings.LICENSE_CACHE_TTL_SECONDS,
+        max_entries: int = settings.LICENSE_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = max(0, ttl_seconds)
+        self.max_entries = max(1, max_entries)
+        self._entries: dict[str, tuple[float, Optional[DeviceLicenseSnapshot]]] = {}
+        # Bumped on every invalidation so a load that raced with an admin
+        # change cannot re-insert the stale snapshot
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        # Set in API processes when ingest runs in its own process
+        # (ingest_ipc.py): invalidations are mirrored there
+        self.peer: Optional[Callable[[dict], None]] = None
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, device_id: str) -> tuple[bool, Optional[DeviceLicenseSnapshot]]:
+        """Return (found, snapshot). found is False on a miss or expired entry."""
+        entry = self._entries.get(device_id)
+        if entry is None or time.monotonic() >= entry[0]:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, entry[1]
+
+    def put(
+        self,
+        device_id: str,
+        snapshot: Optional[DeviceLicenseSnapshot],
+        generation: int,
+    ) -> None:
+        """Store a snapshot loaded while the cache was at `generation`."""
+        if self.ttl == 0 or generation != self._generation:
+            return
+        self._entries.pop(device_id, None)
+        while len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[device_id] = (time.monotonic() + self.ttl, snapshot)
+
+    def invalidate(self, device_id: Optional[str]) -> None:
+        """Drop one device's entry. Call after committing Device/Subscription changes."""
+        self._generation += 1
+        if device_id:
+            self._entries.pop(device_id, None)
+        if self.peer is not None:
+            self.peer({"op": "license", "device_id": device_id})
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl_seconds": self.ttl,
+        }
+
+
+license_cache = LicenseCache()
+
+
+# ─── Checks (shared by cached and uncached validation) ────────────────────────
+def _check_device(
+    device: Union[Device, DeviceLicenseSnapshot],
+    device_id: str,
+    license_key: str,
+) -> Optional[LicenseValidationResult]:
+    """
+    Key and device status checks. Returns a failure result, or None if OK.
+    license_key may be the short token sent by binary payloads.
+    """
+    if not license_key_matches(device.license_key, license_key):
         logger.warning(
             f"License validation FAILED: Key mismatch for device_id='{device_id}' "
-            f"sent='{masked_key}' expected='{mask_license_key(device.license_key)}'"
+            f"sent='{mask_license_key(license_key)}' "
+            f"expected='{mask_license_key(device.license_key)}'"
         )
         return LicenseValidationResult(
             is_valid=False,
@@ -87,7 +198,6 @@ async def validate_license(
             device=device,
         )
 
-    # 3. Check device status
     if device.status == DeviceStatus.DISABLED:
         logger.info(f"License validation FAILED: Device disabled device_id='{device_id}'")
         return LicenseValidationResult(
@@ -104,12 +214,16 @@ async def validate_license(
             device=device,
         )
 
-    # 4. Check subscription status
-    sub_result = await db.execute(
-        select(Subscription).where(Subscription.device_id == device_id)
-    )
-    subscription = sub_result.scalar_one_or_none()
+    return None
+
 
+def _check_subscription(
+    device: Union[Device, DeviceLicenseSnapshot],
+    device_id: str,
+    license_key: str,
+    subscription: Optional[Union[Subscription, SubscriptionSnapshot]],
+) -> LicenseValidationResult:
+    """Subscription status and expiry checks (expiry against utc_now())."""
     if not subscription:
         logger.warning(f"License validation FAILED: No subscription for device_id='{device_id}'")
         return LicenseValidationResult(
@@ -134,7 +248,6 @@ async def validate_license(
             device=device,
         )
 
-    # 5. Check expiry date
     if subscription.expires_at and subscription.expires_at < utc_now():
         logger.info(
             f"License EXPIRED (past expiry date) for device_id='{device_id}' "
@@ -146,8 +259,7 @@ async def validate_license(
             device=device,
         )
 
-    # All checks passed
-    logger.debug(f"License VALID for device_id='{device_id}' key='{masked_key}'")
+    logger.debug(f"License VALID for device_id='{device_id}' key='{mask_license_key(license_key)}'")
     return LicenseValidationResult(
         is_valid=True,
         reason="Valid",
@@ -155,3 +267,94 @@ async def validate_license(
         workshop_id=device.workshop_id,
         pit_id=device.pit_id,
     )
+
+
+def _unknown_device(device_id: str) -> LicenseValidationResult:
+    logger.warning(f"License validation FAILED: Unknown device_id='{device_id}'")
+    return LicenseValidationResult(
+        is_valid=False,
+        reason="Unknown device",
+    )
+
+
+# ─── Validation ───────────────────────────────────────────────────────────────
+async def validate_license(
+    db: AsyncSession,
+    device_id: str,
+    license_key: str,
+) -> LicenseValidationResult:
+    """
+    Validate a device's license key against the database.
+
+    Fails fast and explicit — no silent failures.
+    Invalid results trigger kill-switch flow.
+
+    Args:
+        db: Database session
+        device_id: Device identifier (e.g., PIWIFI-01, ESP32-A1B2C3)
+        license_key: License key sent by device
+
+    Returns:
+        LicenseValidationResult with is_valid flag and reason
+    """
+    # 1. Find device by device_id
+    device_result = await db.execute(
+        select(Device).where(Device.device_id == device_id)
+    )
+    device = device_result.scalar_one_or_none()
+
+    if not device:
+        return _unknown_device(device_id)
+
+    # 2–3. License key and device status
+    failure = _check_device(device, device_id, license_key)
+    if failure:
+        return failure
+
+    # 4–5. Subscription status and expiry date
+    sub_result = await db.execute(
+        select(Subscription).where(Subscription.device_id == device_id)
+    )
+    subscription = sub_result.scalar_one_or_none()
+    return _check_subscription(device, device_id, license_key, subscription)
+
+
+async def _load_snapshot(db: AsyncSession, device_id: str) -> Optional[DeviceLicenseSnapshot]:
+    device_result = await db.execute(
+        select(Device).where(Device.device_id == device_id)
+    )
+    device = device_result.scalar_one_or_none()
+    if device is None:
+        return None
+    sub_result = await db.execute(
+        select(Subscription).where(Subscription.device_id == device_id)
+    )
+    return DeviceLicenseSnapshot(device, sub_result.scalar_one_or_none())
+
+
+async def validate_license_cached(
+    device_id: str,
+    license_key: str,
+) -> LicenseValidationResult:
+    """
+    validate_license() for the MQTT hot path.
+
+    Serves from license_cache and only opens a DB session on a miss.
+    Status and expiry checks still run on every call, so a subscription
+    that lapses while cached is rejected as soon as expires_at passes.
+    result.device is a DeviceLicenseSnapshot, not an ORM Device.
+    """
+    found, snapshot = license_cache.get(device_id)
+    if not found:
+        generation = license_cache.generation
+        async with get_db_context() as db:
+            snapshot = await _load_snapshot(db, device_id)
+        license_cache.put(device_id, snapshot, generation)
+
+    if snapshot is None:
+        return _unknown_device(device_id)
+
+    failure = _check_device(snapshot, device_id, license_key)
+    if failure:
+        return failure
+    return _check_subscription(snapshot, device_id, license_key, snapshot.subscription)
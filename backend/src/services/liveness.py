@@ -0,0 +1,253 @@
+"""
+Module: liveness.py
+Purpose:
+    Write-behind registry of device and camera liveness.
+
+    Every sensor message used to UPDATE its devices row (is_online,
+    last_seen, last_mqtt_message) and every camera heartbeat its cameras
+    row — the hottest rows in the DB, rewritten (and vacuumed) constantly.
+    The ingest path now only records the timestamp here; a background task
+    writes everything that changed since the last flush with one bulk
+    UPDATE per table every ingest.liveness_flush_interval_seconds.
+
+    Readers (sensor dashboards, pit / device / camera lists) overlay the
+    registry on the row they loaded, so they see liveness up to the last
+    message even before it is flushed.
+
+    Explicit offline events (device LWT, camera status "offline") are still
+    written straight to the DB by their handlers; they call
+    mark_device_offline() / mark_camera_offline() so an older pending
+    touch cannot flip the row back online.
+
+Author: PPF Monitoring Team
+Created: 2026-03-14
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import bindparam, func, update
+
+from src.config.database import get_db_context
+from src.config.settings import get_settings
+from src.models.camera import Camera
+from src.models.device import Device
+from src.utils.helpers import utc_now
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite hands back naive datetimes — treat them as UTC."""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+# One statement each, executed with a list of parameter sets (executemany)
+_devices_table = Device.__table__
+_cameras_table = Camera.__table__
+
+_DEVICE_UPDATE = (
+    update(_devices_table)
+    .where(_devices_table.c.device_id == bindparam("b_device_id"))
+    .values(
+        is_online=True,
+        last_seen=bindparam("b_seen"),
+        last_mqtt_message=bindparam("b_seen"),
+    )
+)
+_CAMERA_UPDATE = (
+    update(_cameras_table)
+    .where(_cameras_table.c.device_id == bindparam("b_device_id"))
+    .values(
+        is_online=True,
+        status="online",
+        last_seen=bindparam("b_seen"),
+        ip_address=func.coalesce(bindparam("b_ip"), _cameras_table.c.ip_address),
+    )
+)
+
+
+class LivenessRegistry:
+    """
+    Last-seen times for devices and cameras, flushed to the DB write-behind.
+
+    Args:
+        flush_interval_seconds: Seconds between background flushes
+        session_factory: Async context manager yielding an AsyncSession
+    """
+
+    def __init__(
+        self,
+        flush_interval_seconds: float = settings.LIVENESS_FLUSH_INTERVAL_SECONDS,
+        session_factory: Callable = get_db_context,
+    ):
+        self.flush_interval = max(0.1, flush_interval_seconds)
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+        self._device_seen: dict[str, datetime] = {}
+        self._camera_seen: dict[str, datetime] = {}
+        # Changed since the last flush
+        self._dirty_devices: dict[str, datetime] = {}
+        self._dirty_cameras: dict[str, tuple[datetime, Optional[str]]] = {}
+
+        # Counters (exposed via stats for /metrics)
+        self.touches = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        """Start the periodic flush task on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="liveness-flush")
+            logger.info(f"Liveness registry started (flush every {self.flush_interval:g}s)")
+
+    async def stop(self) -> None:
+        """Stop the flush task and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info("Liveness registry stopped")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Liveness flush failed (will retry): {e}")
+
+    # ── Writers (ingest path — no DB access) ─────────────────────────────────
+    def touch_device(self, device_id: str, at: Optional[datetime] = None) -> None:
+        """A sensor message arrived from this device."""
+        seen = at or utc_now()
+        self._device_seen[device_id] = seen
+        self._dirty_devices[device_id] = seen
+        self.touches += 1
+
+    def touch_camera(
+        self,
+        device_id: str,
+        ip_address: Optional[str] = None,
+        at: Optional[datetime] = None,
+    ) -> None:
+        """A heartbeat arrived from this camera (ip_address kept if None)."""
+        seen = at or utc_now()
+        self._camera_seen[device_id] = seen
+        previous = self._dirty_cameras.get(device_id)
+        if ip_address is None and previous is not None:
+            ip_address = previous[1]
+        self._dirty_cameras[device_id] = (seen, ip_address)
+        self.touches += 1
+
+    def mark_device_offline(self, device_id: str) -> None:
+        """The device went offline (written to the DB by the caller)."""
+        self._device_seen.pop(device_id, None)
+        self._dirty_devices.pop(device_id, None)
+
+    def mark_camera_offline(self, device_id: str) -> None:
+        """The camera went offline (written to the DB by the caller)."""
+        self._camera_seen.pop(device_id, None)
+        self._dirty_cameras.pop(device_id, None)
+
+    # ── Readers ──────────────────────────────────────────────────────────────
+    def device_last_seen(self, device: Any) -> Optional[datetime]:
+        """Newest of the registry and the loaded row's last_seen."""
+        return self._newest(self._device_seen.get(device.device_id), device.last_seen)
+
+    def device_is_online(self, device: Any) -> bool:
+        """The row's is_online, or True if seen since the row was last written."""
+        return self._is_online(self._device_seen.get(device.device_id), device)
+
+    def camera_last_seen(self, camera: Any) -> Optional[datetime]:
+        return self._newest(self._camera_seen.get(camera.device_id), camera.last_seen)
+
+    def camera_is_online(self, camera: Any) -> bool:
+        return self._is_online(self._camera_seen.get(camera.device_id), camera)
+
+    @staticmethod
+    def _newest(seen: Optional[datetime], stored: Optional[datetime]) -> Optional[datetime]:
+        stored = _as_utc(stored)
+        if seen is None or (stored is not None and stored >= seen):
+            return stored
+        return seen
+
+    @staticmethod
+    def _is_online(seen: Optional[datetime], row: Any) -> bool:
+        if row.is_online:
+            return True
+        stored = _as_utc(row.last_seen)
+        return seen is not None and (stored is None or seen > stored)
+
+    # ── Flush ────────────────────────────────────────────────────────────────
+    @property
+    def pending(self) -> int:
+        return len(self._dirty_devices) + len(self._dirty_cameras)
+
+    async def flush(self) -> int:
+        """Write pending liveness with one bulk UPDATE per table. Returns rows."""
+        if not self.pending:
+            return 0
+        devices, self._dirty_devices = self._dirty_devices, {}
+        cameras, self._dirty_cameras = self._dirty_cameras, {}
+
+        try:
+            async with self._session_factory() as db:
+                if devices:
+                    await db.execute(_DEVICE_UPDATE, [
+                        {"b_device_id": device_id, "b_seen": seen}
+                        for device_id, seen in devices.items()
+                    ])
+                if cameras:
+                    await db.execute(_CAMERA_UPDATE, [
+                        {"b_device_id": device_id, "b_seen": seen, "b_ip": ip}
+                        for device_id, (seen, ip) in cameras.items()
+                    ])
+                await db.commit()
+        except Exception:
+            # Put them back unless a newer touch (or offline event) replaced them
+            for device_id, seen in devices.items():
+                if device_id in self._device_seen:
+                    self._dirty_devices.setdefault(device_id, seen)
+            for device_id, entry in cameras.items():
+                if device_id in self._camera_seen:
+                    self._dirty_cameras.setdefault(device_id, entry)
+            raise
+
+        rows = len(devices) + len(cameras)
+        self.flushes += 1
+        self.rows_flushed += rows
+        logger.debug(f"Liveness flushed: {len(devices)} device(s), {len(cameras)} camera(s)")
+        return rows
+
+    # ── Introspection ────────────────────────────────────────────────────────
+    @property
+    def stats(self) -> dict:
+        return {
+            "devices": len(self._device_seen),
+            "cameras": len(self._camera_seen),
+            "pending": self.pending,
+            "touches": self.touches,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+        }
+
+    def clear(self) -> None:
+        self._device_seen.clear()
+        self._camera_seen.clear()
+        self._dirty_devices.clear()
+        self._dirty_cameras.clear()
+
+
+liveness = LivenessRegistry()
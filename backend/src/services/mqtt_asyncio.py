@@ -0,0 +1,205 @@
+"""
+Module: mqtt_asyncio.py
+Purpose:
+    Runs a paho-mqtt client natively on the application's asyncio event loop
+    (mqtt.transport: "asyncio") instead of paho's loop_start() thread.
+
+    paho exposes socket open/close and write-interest callbacks; the broker
+    socket is registered with loop.add_reader / loop.add_writer, which call
+    loop_read() / loop_write(), and a small task calls loop_misc() once a
+    second for keepalive pings and retries. Every paho callback — including
+    on_message — then runs on the event loop thread, so there is no
+    cross-thread hop per message. With TLS, a readiness event is followed by
+    loop_read() calls until the SSL buffer is empty (sock.pending()):
+    records already decrypted there never make the socket readable again.
+
+    paho does not reconnect by itself without its network thread, so this
+    module also owns the reconnect back-off after an unexpected disconnect.
+    client.reconnect() (DNS, TCP and TLS handshake) runs in the default
+    executor. paho's Client is not safe to drive from two threads at once,
+    so the loop_misc() task and the reader/writer registrations are torn
+    down first, and the socket callbacks reconnect() triggers are ignored;
+    once it returns, the new socket is registered on the loop.
+
+Author: PPF Monitoring Team
+Created: 2026-03-12
+"""
+
+import asyncio
+import socket
+from typing import Optional
+
+import paho.mqtt.client as mqtt
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_MISC_INTERVAL_SECONDS = 1.0
+_RECONNECT_MIN_DELAY = 2.0
+_RECONNECT_MAX_DELAY = 30.0
+
+
+def _pending(sock) -> int:
+    """Bytes buffered inside an SSL socket (0 for plain sockets)."""
+    pending = getattr(sock, "pending", None)
+    return pending() if pending is not None else 0
+
+
+class AsyncioMqttTransport:
+    """
+    Drives a paho Client from an asyncio event loop.
+
+    Call attach() before client.connect(); the socket callbacks registered
+    here take over from loop_start().
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: mqtt.Client):
+        self.loop = loop
+        self.client = client
+        self._sock: Optional[socket.socket] = None
+        self._misc_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._paused = False
+        self._closing = False
+        # True while client.reconnect() runs in the executor
+        self._reconnecting = False
+
+    def attach(self) -> None:
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    # ── paho socket callbacks ────────────────────────────────────────────────
+    def _on_loop(self, callback, *args) -> None:
+        """Run callback now if on the loop thread, else hand it to the loop."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    # While reconnecting these fire on the executor thread; _reconnect_loop
+    # registers the new socket itself once client.reconnect() has returned
+
+    def _on_socket_open(self, client, userdata, sock) -> None:
+        if not self._reconnecting:
+            self._on_loop(self._register, sock)
+
+    def _on_socket_close(self, client, userdata, sock) -> None:
+        if not self._reconnecting:
+            self._on_loop(self._unregister, sock)
+
+    def _on_socket_register_write(self, client, userdata, sock) -> None:
+        if not self._reconnecting:
+            self._on_loop(self.loop.add_writer, sock, self._write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock) -> None:
+        if not self._reconnecting:
+            self._on_loop(self.loop.remove_writer, sock)
+
+    def _register(self, sock) -> None:
+        self._sock = sock
+        self._paused = False
+        self.loop.add_reader(sock, self._read)
+        if self._misc_task is None or self._misc_task.done():
+            self._misc_task = self.loop.create_task(self._misc_loop())
+
+    def _unregister(self, sock) -> None:
+        self.loop.remove_reader(sock)
+        self.loop.remove_writer(sock)
+        if self._sock is sock:
+            self._sock = None
+
+    async def _detach(self) -> None:
+        """Stop touching the client from the loop (before reconnecting off it)."""
+        task, self._misc_task = self._misc_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._sock is not None:
+            try:
+                self._unregister(self._sock)
+            except (OSError, ValueError):   # already closed by paho
+                self._sock = None
+
+    def _read(self) -> None:
+        sock = self._sock
+        rc = self.client.loop_read()
+        # Drain what TLS already decrypted; stop if backpressure paused us
+        while (
+            rc == mqtt.MQTT_ERR_SUCCESS
+            and sock is not None
+            and self._sock is sock
+            and not self._paused
+            and _pending(sock)
+        ):
+            rc = self.client.loop_read()
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            logger.debug(f"MQTT loop_read rc={rc}")
+
+    def _write(self) -> None:
+        self.client.loop_write()
+
+    async def _misc_loop(self) -> None:
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            try:
+                await asyncio.sleep(_MISC_INTERVAL_SECONDS)
+            except asyncio.CancelledError:
+                break
+
+    # ── Backpressure ─────────────────────────────────────────────────────────
+    def pause_reading(self) -> None:
+        """Stop reading from the broker socket (TCP backpressure)."""
+        if self._sock is not None and not self._paused:
+            self.loop.remove_reader(self._sock)
+            self._paused = True
+
+    def resume_reading(self) -> None:
+        if self._sock is not None and self._paused:
+            self.loop.add_reader(self._sock, self._read)
+        self._paused = False
+
+    # ── Reconnect ────────────────────────────────────────────────────────────
+    def schedule_reconnect(self) -> None:
+        """Start the reconnect back-off loop (no-op if already running)."""
+        if self._closing:
+            return
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self.loop.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        delay = _RECONNECT_MIN_DELAY
+        while not self._closing:
+            await asyncio.sleep(delay)
+            await self._detach()
+            self._reconnecting = True
+            try:
+                await self.loop.run_in_executor(None, self.client.reconnect)
+            except (OSError, mqtt.WebsocketConnectionError) as e:
+                logger.warning(f"MQTT reconnect failed: {e}. Retrying in {delay:.0f}s")
+                delay = min(delay * 2, _RECONNECT_MAX_DELAY)
+                continue
+            finally:
+                self._reconnecting = False
+            sock = self.client.socket()
+            if sock is not None:
+                self._register(sock)
+                if self.client.want_write():
+                    self.loop.add_writer(sock, self._write)
+            logger.info("MQTT reconnect issued")
+            return
+
+    def close(self) -> None:
+        """Stop background tasks. Call before client.disconnect()."""
+        self._closing = True
+        for task in (self._misc_task, self._reconnect_task):
+            if task is not None and not task.done():
+                task.cancel()
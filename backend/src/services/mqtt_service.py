@@ -2,15 +2,25 @@
 Module: mqtt_service.py
 Purpose:
     MQTT subscriber that listens for sensor data from edge devices (Raspberry Pi).
-    On each message:
+    Incoming messages go through a bounded ingest queue (ingest_queue.py)
+    drained by a fixed number of workers. For each sensor message:
       1. Parses JSON payload
       2. Validates license key
-      3. Stores sensor reading
-      4. Evaluates alert conditions
-      5. Pushes update to WebSocket clients
+      3. Submits the reading to the batched writer (ingest_writer.py), which
+         stores it, evaluates alert conditions and pushes the WebSocket update
 
     Also publishes device commands (kill-switch, enable, restart).
 
+    Several backend processes can share the ingest load: with
+    mqtt.shared_group set, every topic is subscribed as
+    $share/<group>/<topic>, so the broker hands each message (sensor data,
+    device status, provisioning, camera events) to exactly one process.
+    Each process then needs a stable, unique client_id — see
+    mqtt_client_id(). Commands are published by whichever process serves
+    the API request, so they go out once either way. Sharing is only
+    allowed with ingest.mode external (see Settings): an embedded process
+    pushes WebSocket events to its own clients alone.
+
 Author: PPF Monitoring Team
 Created: 2026-02-21
 """
@@ -18,7 +28,9 @@ Created: 2026-02-21
 import asyncio
 import json
 import os
+import socket
 import ssl
+import tempfile
 import uuid
 from typing import TYPE_CHECKING, Optional
 
@@ -26,13 +38,23 @@ import paho.mqtt.client as mqtt
 
 from src.config.database import get_db_context
 from src.config.settings import get_settings
-from src.services.license_service import validate_license
+from src.services.ingest_metrics import ingest_metrics
+from src.services.ingest_queue import get_ingest_queue
+from src.services.ingest_spool import ingest_spool, is_db_unavailable
+from src.services.ingest_writer import get_sensor_writer
+from src.services.mqtt_asyncio import AsyncioMqttTransport
+from src.services.license_service import validate_license_cached
+from src.services.reading_dedup import reading_dedup
+from src.services.liveness import liveness
+from src.services.offline_detector import offline_detector
+from src.services.threshold_cache import threshold_cache
+from src.services.payload_decoder import BINARY_HEADERS
 from src.services.sensor_service import (
-    evaluate_alerts,
-    parse_sensor_payload,
-    store_sensor_reading,
+    build_sensor_reading,
+    decode_sensor_readings,
 )
 from src.utils.constants import (
+    MQTT_SHARED_SUBSCRIPTION,
     MQTT_SUBSCRIBE_DEVICE_STATUS,
     MQTT_SUBSCRIBE_PROVISIONING,
     MQTT_SUBSCRIBE_SENSOR_DATA,
@@ -51,6 +73,81 @@ settings = get_settings()
 # Global MQTT client instance (singleton for the service)
 _mqtt_client: Optional[mqtt.Client] = None
 _event_loop: Optional[asyncio.AbstractEventLoop] = None
+# Set when mqtt.transport is "asyncio" (no paho network thread)
+_asyncio_transport: Optional[AsyncioMqttTransport] = None
+# False for a publish-only client (API process with ingest.mode "external")
+_subscribe = True
+
+
+# Worker slot this process holds, and its open lock file (see worker_id)
+_worker_slot: Optional[int] = None
+_worker_slot_file = None
+_MAX_WORKER_SLOTS = 64
+
+# Every topic the backend handles (see dispatch_message)
+SUBSCRIBED_TOPICS: tuple[str, ...] = (
+    MQTT_SUBSCRIBE_SENSOR_DATA,
+    MQTT_SUBSCRIBE_DEVICE_STATUS,
+    MQTT_SUBSCRIBE_PROVISIONING,
+    "workshop/+/cameras/register",
+    "workshop/+/cameras/heartbeat",
+    "workshop/+/cameras/status",
+)
+
+
+def subscription_topics() -> list[str]:
+    """Topic filters to subscribe to — shared when mqtt.shared_group is set."""
+    group = settings.MQTT_SHARED_GROUP
+    if not group:
+        return list(SUBSCRIBED_TOPICS)
+    return [MQTT_SHARED_SUBSCRIPTION.format(group=group, topic=t) for t in SUBSCRIBED_TOPICS]
+
+
+def worker_id() -> str:
+    """
+    Stable ID of this process within the shared group.
+
+    MQTT_WORKER_ID if set. Otherwise the host name plus the lowest worker
+    slot not held by another process on this host (an flock'ed file in
+    the temp dir, released when the process exits), so uvicorn worker N
+    keeps the same client_id across restarts.
+    """
+    global _worker_slot, _worker_slot_file
+    if settings.MQTT_WORKER_ID:
+        return settings.MQTT_WORKER_ID
+    host = socket.gethostname()
+    try:
+        import fcntl  # POSIX only
+    except ImportError:
+        return f"{host}-{os.getpid()}"
+
+    if _worker_slot is not None:
+        return f"{host}-{_worker_slot}"
+    group = settings.MQTT_SHARED_GROUP
+    for slot in range(_MAX_WORKER_SLOTS):
+        path = os.path.join(tempfile.gettempdir(), f"ppf_mqtt_{group}_{slot}.lock")
+        f = open(path, "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            continue
+        _worker_slot, _worker_slot_file = slot, f
+        return f"{host}-{slot}"
+    logger.warning(f"All {_MAX_WORKER_SLOTS} MQTT worker slots taken — using the PID")
+    return f"{host}-{os.getpid()}"
+
+
+def mqtt_client_id() -> str:
+    """
+    Client ID for this process. Random without a shared group (one backend);
+    <prefix>-<group>-<worker id> with one, so a restarted worker takes over
+    its own session instead of piling up stale clients.
+    """
+    group = settings.MQTT_SHARED_GROUP
+    if not group:
+        return f"{settings.MQTT_CLIENT_ID_PREFIX}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    return f"{settings.MQTT_CLIENT_ID_PREFIX}-{group}-{worker_id()}"
 
 
 def get_mqtt_client() -> mqtt.Client:
@@ -124,18 +221,11 @@ def _on_connect(client: mqtt.Client, userdata, flags, rc: int) -> None:
             f"Connected to MQTT broker at "
             f"{settings.MQTT_BROKER_HOST}:{settings.MQTT_BROKER_PORT}"
         )
-        # Subscribe to sensor data and device status topics
-        client.subscribe(MQTT_SUBSCRIBE_SENSOR_DATA, qos=settings.MQTT_QOS)
-        client.subscribe(MQTT_SUBSCRIBE_DEVICE_STATUS, qos=settings.MQTT_QOS)
-        client.subscribe(MQTT_SUBSCRIBE_PROVISIONING, qos=settings.MQTT_QOS)
-        # Subscribe to camera topics
-        client.subscribe("workshop/+/cameras/register", qos=settings.MQTT_QOS)
-        client.subscribe("workshop/+/cameras/heartbeat", qos=settings.MQTT_QOS)
-        client.subscribe("workshop/+/cameras/status", qos=settings.MQTT_QOS)
-        logger.info(f"Subscribed to: {MQTT_SUBSCRIBE_SENSOR_DATA}")
-        logger.info(f"Subscribed to: {MQTT_SUBSCRIBE_DEVICE_STATUS}")
-        logger.info(f"Subscribed to: {MQTT_SUBSCRIBE_PROVISIONING}")
-        logger.info("Subscribed to: workshop/+/cameras/+")
+        if not _subscribe:
+            return
+        for topic in subscription_topics():
+            client.subscribe(topic, qos=settings.MQTT_QOS)
+            logger.info(f"Subscribed to: {topic}")
     else:
         error_messages = {
             1: "Connection refused — incorrect protocol version",
@@ -159,17 +249,24 @@ def _on_disconnect(client: mqtt.Client, userdata, rc: int) -> None:
             f"Unexpected MQTT disconnect rc={rc}. "
             f"Will attempt reconnect in {settings.MQTT_RECONNECT_DELAY}s"
         )
+        if _asyncio_transport is not None:
+            _asyncio_transport.schedule_reconnect()
 
 
 def _on_message(client: mqtt.Client, userdata, message: mqtt.MQTTMessage) -> None:
     """
     Callback: called when a subscribed MQTT message arrives.
-    Runs on the MQTT network thread — submits async work to the event loop.
+    Runs on the MQTT network thread (or on the event loop with the asyncio
+    transport) — hands the message to the ingest queue.
     """
     topic = message.topic
     
     try:
-        payload_str = message.payload.decode("utf-8")
+        if "/sensors" in topic and message.payload[:1] and message.payload[0] in BINARY_HEADERS:
+            # Compact binary sensor payload — carried as latin-1 (lossless)
+            payload_str = message.payload.decode("latin-1")
+        else:
+            payload_str = message.payload.decode("utf-8")
     except UnicodeDecodeError as e:
         logger.error(f"Failed to decode MQTT message on topic '{topic}': {e}")
         return
@@ -184,38 +281,40 @@ def _on_message(client: mqtt.Client, userdata, message: mqtt.MQTTMessage) -> Non
         logger.error(f"CRITICAL: Event loop not set, cannot process message on {topic}")
         return
 
-    # Route to appropriate handler based on topic pattern
+    # Hand over to the bounded ingest queue; its workers call dispatch_message()
+    try:
+        queue = get_ingest_queue()
+    except RuntimeError as e:
+        logger.error(f"Dropping MQTT message on '{topic}': {e}")
+        return
+
+    if _asyncio_transport is None:
+        queue.offer_threadsafe(topic, payload_str)
+    elif queue.overflow_policy == "block" and queue.is_full_for(topic, payload_str):
+        # Already on the event loop and must not block it: stop reading from
+        # the broker until this message fits, then resume
+        _asyncio_transport.pause_reading()
+        task = _event_loop.create_task(queue.put(topic, payload_str))
+        task.add_done_callback(lambda _: _asyncio_transport and _asyncio_transport.resume_reading())
+    else:
+        queue.offer(topic, payload_str)
+
+
+async def dispatch_message(topic: str, payload_str: str) -> None:
+    """Route a queued MQTT message to its handler based on topic pattern."""
     if "/sensors" in topic:
-        asyncio.run_coroutine_threadsafe(
-            _handle_sensor_message(topic, payload_str),
-            _event_loop,
-        )
+        await _handle_sensor_message(topic, payload_str)
     elif "/status" in topic and "/cameras/" not in topic:
-        asyncio.run_coroutine_threadsafe(
-            _handle_device_status(topic, payload_str),
-            _event_loop,
-        )
+        await _handle_device_status(topic, payload_str)
     elif "provisioning/announce" in topic:
-        logger.warning(f"PROV-ROUTING: Submitting to event loop")
-        asyncio.run_coroutine_threadsafe(
-            _handle_provisioning_announce(topic, payload_str),
-            _event_loop,
-        )
+        logger.warning(f"PROV-ROUTING: Dispatching from ingest queue")
+        await _handle_provisioning_announce(topic, payload_str)
     elif "/cameras/register" in topic:
-        asyncio.run_coroutine_threadsafe(
-            _handle_camera_registration(topic, payload_str),
-            _event_loop,
-        )
+        await _handle_camera_registration(topic, payload_str)
     elif "/cameras/heartbeat" in topic:
-        asyncio.run_coroutine_threadsafe(
-            _handle_camera_heartbeat(topic, payload_str),
-            _event_loop,
-        )
+        await _handle_camera_heartbeat(topic, payload_str)
     elif "/cameras/status" in topic:
-        asyncio.run_coroutine_threadsafe(
-            _handle_camera_status(topic, payload_str),
-            _event_loop,
-        )
+        await _handle_camera_status(topic, payload_str)
     else:
         logger.warning(f"Unhandled MQTT topic: {topic}")
 
@@ -225,82 +324,86 @@ async def _handle_sensor_message(topic: str, payload_str: str) -> None:
     Process incoming sensor data message.
 
     Flow:
-    1. Parse JSON
-    2. Validate license
-    3. Store reading
-    4. Evaluate alerts
-    5. Push WebSocket update
+    1. Decode the message into its readings (JSON or binary, single or batch;
+       one-pass fast path for known shapes)
+    2. Validate license (cached snapshot) — once per message
+    3. Drop readings already ingested (same device_id + device_timestamp)
+    4. Build readings and hand them to the batched writer, which
+       stores them, evaluates alerts, commits and pushes the WebSocket updates.
+       For a batch, alerts run on the newest reading only unless
+       ingest.alert_eval_mode is "each".
     """
-    # Parse payload
-    payload = parse_sensor_payload(payload_str)
-    if not payload:
+    with ingest_metrics.time("parse"):
+        readings = decode_sensor_readings(payload_str)
+    if not readings:
         logger.warning(f"Dropping invalid sensor payload on topic '{topic}'")
         return
 
-    device_id = payload.get("device_id", "")
-    license_key = payload.get("license_key", "")
+    device_id = readings[0].device_id
+    license_key = readings[0].license_key
 
-    async with get_db_context() as db:
-        # Validate license
-        validation = await validate_license(db, device_id, license_key)
+    # Validate license (served from the in-process cache; DB only on a miss)
+    try:
+        with ingest_metrics.time("license"):
+            validation = await validate_license_cached(device_id, license_key)
+    except Exception as e:
+        if not is_db_unavailable(e):
+            raise
+        # Cache miss during a DB outage — keep the message for replay
+        logger.warning(f"Database unavailable, spooling message from '{device_id}': {e}")
+        await ingest_spool.append_message(topic, payload_str)
+        return
 
-        if not validation.is_valid:
-            logger.warning(
-                f"Invalid license for device '{device_id}': {validation.reason}. "
-                f"Sending DISABLE command."
+    if not validation.is_valid:
+        logger.warning(
+            f"Invalid license for device '{device_id}': {validation.reason}. "
+            f"Sending DISABLE command."
+        )
+        if validation.device:
+            publish_device_command(
+                workshop_id=validation.device.workshop_id,
+                device_id=device_id,
+                command=DeviceCommand.DISABLE,
+                reason=validation.reason,
             )
-            if validation.device:
-                publish_device_command(
-                    workshop_id=validation.device.workshop_id,
-                    device_id=device_id,
-                    command=DeviceCommand.DISABLE,
-                    reason=validation.reason,
-                )
-            return
-
-        device = validation.device
-        workshop_id = validation.workshop_id
-        pit_id = validation.pit_id
+        return
 
-        # Update device online status
-        device.is_online = True
-        device.last_seen = utc_now()
-        device.last_mqtt_message = utc_now()
+    # Oldest first, so the writer (and dashboards) see the newest reading last
+    if len(readings) > 1:
+        readings.sort(key=_reading_sort_key)
+
+    # Redelivered / replayed readings are dropped before insert and alerting
+    readings = [
+        r for r in readings
+        if not reading_dedup.is_duplicate(device_id, r.device_timestamp)
+    ]
+    if not readings:
+        logger.debug(f"Dropping duplicate sensor message from '{device_id}'")
+        return
+    check_each = settings.INGEST_ALERT_EVAL_MODE == "each"
+    newest = len(readings) - 1
 
-        # Store sensor reading
-        reading = await store_sensor_reading(
-            db=db,
+    # Device online status is updated by the writer, once per batch
+    writer = get_sensor_writer()
+    for index, payload in enumerate(readings):
+        reading = build_sensor_reading(
             payload=payload,
-            device=device,
-            workshop_id=workshop_id,
-            pit_id=pit_id,
+            device=validation.device,
+            workshop_id=validation.workshop_id,
+            pit_id=validation.pit_id,
+        )
+        await writer.submit(
+            reading,
+            workshop_id=validation.workshop_id,
+            pit_id=validation.pit_id,
+            check_alerts=check_each or index == newest,
         )
 
-        if reading:
-            # Evaluate alert conditions
-            alerts = await evaluate_alerts(
-                db=db,
-                reading=reading,
-                workshop_id=workshop_id,
-                pit_id=pit_id,
-            )
-
-            await db.commit()
 
-            # Push WebSocket update (import here to avoid circular deps)
-            try:
-                from src.services.websocket_service import broadcast_sensor_update
-                await broadcast_sensor_update(
-                    workshop_id=workshop_id,
-                    pit_id=pit_id,
-                    reading=reading,
-                )
-                if alerts:
-                    from src.services.websocket_service import broadcast_alert
-                    for alert in alerts:
-                        await broadcast_alert(workshop_id=workshop_id, alert=alert)
-            except Exception as ws_error:
-                logger.warning(f"WebSocket broadcast failed: {ws_error}")
+def _reading_sort_key(payload) -> float:
+    # Readings without a device timestamp sort first, in arrival order
+    ts = payload.device_timestamp
+    return ts.timestamp() if ts is not None else float("-inf")
 
 
 async def _handle_device_status(topic: str, payload_str: str) -> None:
@@ -336,12 +439,25 @@ async def _handle_device_status(topic: str, payload_str: str) -> None:
             device = result.scalar_one_or_none()
             if device:
                 device.is_online = is_online
+                if not is_online:
+                    liveness.mark_device_offline(device_id)
+                    offline_detector.disarm(device_id)
                 if is_online:
                     device.last_seen = utc_now()
                     # Update IP if firmware sends a real address
                     raw_ip = (data.get("ip") or "").replace("\x00", "").strip()
                     if raw_ip and raw_ip != "connecting":
                         device.ip_address = raw_ip
+                    if device.workshop_id is not None:
+                        offline_threshold = settings.SENSOR_OFFLINE_THRESHOLD_SECONDS
+                        if device.pit_id is not None:
+                            thresholds = await threshold_cache.get(
+                                db, device.workshop_id, device.pit_id
+                            )
+                            offline_threshold = thresholds.device_offline_threshold_seconds
+                        offline_detector.arm(
+                            device_id, device.workshop_id, device.pit_id, offline_threshold
+                        )
                 logger.debug(f"DB updated: device '{device_id}' is_online={is_online}")
             else:
                 logger.debug(f"Status for unknown device_id='{device_id}' — ignoring")
@@ -571,12 +687,9 @@ async def _handle_camera_registration(topic: str, payload_str: str) -> None:
 async def _handle_camera_heartbeat(topic: str, payload_str: str) -> None:
     """
     Handle camera heartbeat messages.
-    Updates last_seen timestamp and online status.
+    Records last_seen / online status (and IP) in the liveness registry;
+    the cameras row is updated write-behind in bulk.
     """
-    import json
-    from sqlalchemy import select, update
-    from src.models.camera import Camera
-    
     try:
         data = json.loads(payload_str)
     except json.JSONDecodeError as e:
@@ -587,23 +700,8 @@ async def _handle_camera_heartbeat(topic: str, payload_str: str) -> None:
     if not device_id:
         return
     
-    try:
-        async with get_db_context() as db:
-            # Update camera heartbeat
-            await db.execute(
-                update(Camera)
-                .where(Camera.device_id == device_id)
-                .values(
-                    is_online=True,
-                    status="online",
-                    last_seen=utc_now(),
-                    ip_address=data.get("ip_address", Camera.ip_address)
-                )
-            )
-            await db.commit()
-            logger.debug(f"💓 Camera heartbeat: {device_id}")
-    except Exception as e:
-        logger.error(f"Error handling camera heartbeat for '{device_id}': {e}")
+    liveness.touch_camera(device_id, ip_address=data.get("ip_address"))
+    logger.debug(f"💓 Camera heartbeat: {device_id}")
 
 
 async def _handle_camera_status(topic: str, payload_str: str) -> None:
@@ -611,7 +709,7 @@ async def _handle_camera_status(topic: str, payload_str: str) -> None:
     Handle camera status updates (online/offline).
     """
     import json
-    from sqlalchemy import select, update
+    from sqlalchemy import select
     from src.models.camera import Camera
     from src.services.websocket_service import broadcast_camera_notification
     
@@ -642,6 +740,8 @@ async def _handle_camera_status(topic: str, payload_str: str) -> None:
                 camera.status = status
                 if is_online:
                     camera.last_seen = utc_now()
+                else:
+                    liveness.mark_camera_offline(device_id)
                 await db.commit()
                 
                 logger.info(f"🎥 Camera '{device_id}' → {status.upper()}")
@@ -661,19 +761,27 @@ async def _handle_camera_status(topic: str, payload_str: str) -> None:
         logger.error(f"Error handling camera status for '{device_id}': {e}", exc_info=True)
 
 
-def setup_mqtt(loop: asyncio.AbstractEventLoop) -> None:
+def setup_mqtt(loop: asyncio.AbstractEventLoop, subscribe: bool = True) -> None:
     """
     Initialize and start the MQTT client.
     Call this once at application startup.
 
     Args:
         loop: The asyncio event loop for the main application
+        subscribe: False for a publish-only client (device commands and
+            provisioning replies from an API process whose ingest runs in
+            a standalone worker)
     """
-    global _mqtt_client, _event_loop
+    global _mqtt_client, _event_loop, _asyncio_transport, _subscribe
     _event_loop = loop
+    _subscribe = subscribe
 
-    unique_id = f"ppf_backend_{os.getpid()}_{uuid.uuid4().hex[:8]}"
-    client = mqtt.Client(client_id=unique_id, clean_session=True)
+    if subscribe:
+        client_id = mqtt_client_id()
+    else:
+        # Never joins the shared group, so it must not take a worker slot
+        client_id = f"{settings.MQTT_CLIENT_ID_PREFIX}_pub_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    client = mqtt.Client(client_id=client_id, clean_session=True)
     client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
 
     # Enable TLS for cloud MQTT brokers (e.g., HiveMQ Cloud on port 8883)
@@ -688,17 +796,26 @@ def setup_mqtt(loop: asyncio.AbstractEventLoop) -> None:
     # Reconnect after 2 s, back-off up to 30 s — survives Render sleep/wake
     client.reconnect_delay_set(min_delay=2, max_delay=30)
 
+    transport = None
+    if settings.MQTT_TRANSPORT == "asyncio":
+        transport = AsyncioMqttTransport(loop, client)
+        transport.attach()
+
     try:
         client.connect(
             settings.MQTT_BROKER_HOST,
             settings.MQTT_BROKER_PORT,
             settings.MQTT_KEEPALIVE,
         )
-        client.loop_start()  # runs on background thread
+        if transport is None:
+            client.loop_start()  # runs on background thread
+        _asyncio_transport = transport
         _mqtt_client = client
         logger.info(
             f"MQTT client connecting to "
-            f"{settings.MQTT_BROKER_HOST}:{settings.MQTT_BROKER_PORT}"
+            f"{settings.MQTT_BROKER_HOST}:{settings.MQTT_BROKER_PORT} "
+            f"(transport={settings.MQTT_TRANSPORT}, client_id={client_id}"
+            f"{', shared group ' + settings.MQTT_SHARED_GROUP if settings.MQTT_SHARED_GROUP else ''})"
         )
     except Exception as e:
         logger.error(f"Failed to connect to MQTT broker: {e}", exc_info=True)
@@ -707,9 +824,15 @@ def setup_mqtt(loop: asyncio.AbstractEventLoop) -> None:
 
 def teardown_mqtt() -> None:
     """Cleanly shut down the MQTT client. Call at application shutdown."""
-    global _mqtt_client
+    global _mqtt_client, _asyncio_transport
     if _mqtt_client:
-        _mqtt_client.loop_stop()
-        _mqtt_client.disconnect()
+        if _asyncio_transport is not None:
+            _asyncio_transport.close()
+            _mqtt_client.disconnect()
+            _mqtt_client.loop_write()  # flush DISCONNECT now; no network thread
+            _asyncio_transport = None
+        else:
+            _mqtt_client.loop_stop()
+            _mqtt_client.disconnect()
         _mqtt_client = None
         logger.info("MQTT client disconnected cleanly")
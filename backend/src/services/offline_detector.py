@@ -0,0 +1,278 @@
+"""
+Module: offline_detector.py
+Purpose:
+    Event-driven offline detection for sensor devices.
+
+    Replaces the 30-second stale-device sweeper, which scanned the devices
+    table for old last_seen values and never told the dashboards. Every
+    sensor batch re-arms a per-device deadline (last message + the pit's
+    effective device_offline_threshold_seconds, see threshold_cache.py);
+    a single task sleeps until the earliest deadline. When one passes, the
+    device is marked offline in the liveness registry and the devices
+    table, and a device_offline WebSocket event is pushed.
+
+    The heap holds at most one entry per device: re-arming only moves the
+    deadline in _armed, and a popped entry whose deadline has moved is
+    pushed back with the new one. Re-arming is therefore O(1) for the
+    common case of a device that keeps reporting.
+
+    On startup the devices that are online in the DB are armed once from
+    their stored last_seen, so a device that went quiet while the backend
+    was down is still reported.
+
+    A threshold change takes effect for a device from its next message.
+
+    With several backend processes (mqtt.shared_group), a device's messages
+    may be spread over all of them, so a deadline in one process does not
+    prove the device is silent. Before firing, the stored last_seen (kept
+    current by every process's liveness flush) is checked and the deadline
+    re-armed from it if it is newer. The offline UPDATE only matches rows
+    still online, and only the process whose UPDATE flipped the row
+    broadcasts the event.
+
+Author: PPF Monitoring Team
+Created: 2026-03-14
+"""
+
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from itertools import groupby
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import select, update
+
+from src.config.database import get_db_context
+from src.config.settings import get_settings
+from src.models.device import Device
+from src.services.liveness import liveness
+from src.services.threshold_cache import threshold_cache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class _Deadline(NamedTuple):
+    at: float          # epoch seconds
+    workshop_id: int
+    pit_id: Optional[int]
+    threshold: float
+
+
+class OfflineDetector:
+    """
+    Per-device offline deadlines, fired from one background task.
+
+    Args:
+        session_factory: Async context manager yielding an AsyncSession
+    """
+
+    def __init__(self, session_factory: Callable = get_db_context):
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self._armed: dict[str, _Deadline] = {}
+        self._heap: list[tuple[float, str]] = []
+
+        # Counters (exposed via stats for /metrics)
+        self.fired = 0
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        """Arm devices that are online in the DB, then start the timer task."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="offline-detector")
+            logger.info("Offline detector started")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Offline detector stopped")
+
+    async def _run(self) -> None:
+        try:
+            await self.seed()
+        except Exception as e:
+            logger.error(f"Offline detector seed failed: {e}", exc_info=True)
+
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.expire_due()
+            except Exception as e:
+                logger.error(f"Offline detector failed to mark devices offline: {e}", exc_info=True)
+
+    # ── Arming ───────────────────────────────────────────────────────────────
+    def arm(
+        self,
+        device_id: str,
+        workshop_id: int,
+        pit_id: Optional[int],
+        threshold_seconds: float,
+        seen_at: Optional[datetime] = None,
+    ) -> None:
+        """(Re)set a device's deadline to seen_at (default now) + threshold."""
+        seen = seen_at.timestamp() if seen_at is not None else time.time()
+        deadline = seen + threshold_seconds
+        previous = self._armed.get(device_id)
+        self._armed[device_id] = _Deadline(deadline, workshop_id, pit_id, threshold_seconds)
+        # A later deadline is picked up when the old heap entry pops
+        if previous is None or deadline < previous.at:
+            earliest = self._heap[0][0] if self._heap else None
+            heapq.heappush(self._heap, (deadline, device_id))
+            if self._wakeup is not None and (earliest is None or deadline < earliest):
+                self._wakeup.set()
+
+    def disarm(self, device_id: str) -> None:
+        """Stop tracking a device (it reported offline itself)."""
+        self._armed.pop(device_id, None)
+
+    async def seed(self) -> int:
+        """Arm every online, assigned device from its last_seen. Returns count."""
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(Device)
+                .where(
+                    Device.is_online == True,  # noqa: E712
+                    Device.workshop_id.isnot(None),
+                )
+                .order_by(Device.workshop_id)
+            )
+            devices = result.scalars().all()
+            for workshop_id, group in groupby(devices, key=lambda d: d.workshop_id):
+                group = list(group)
+                thresholds = await threshold_cache.get_many(
+                    db, workshop_id, {d.pit_id for d in group if d.pit_id is not None}
+                )
+                for device in group:
+                    if device.device_id in self._armed:
+                        continue  # a message arrived since startup
+                    t = thresholds.get(device.pit_id)
+                    self.arm(
+                        device.device_id,
+                        workshop_id,
+                        device.pit_id,
+                        t.device_offline_threshold_seconds if t is not None
+                        else settings.SENSOR_OFFLINE_THRESHOLD_SECONDS,
+                        seen_at=liveness.device_last_seen(device),
+                    )
+        logger.info(f"Offline detector armed {len(devices)} online device(s)")
+        return len(devices)
+
+    # ── Firing ───────────────────────────────────────────────────────────────
+    def _pop_due(self, now: float) -> list[tuple[str, _Deadline]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            at, device_id = heapq.heappop(self._heap)
+            current = self._armed.get(device_id)
+            if current is None or current.at < at:
+                continue  # disarmed, or superseded by an earlier entry
+            if current.at > at:
+                heapq.heappush(self._heap, (current.at, device_id))  # re-armed
+                continue
+            del self._armed[device_id]
+            due.append((device_id, current))
+        return due
+
+    async def expire_due(self, now: Optional[float] = None) -> list[str]:
+        """
+        Mark every device whose deadline has passed offline and broadcast it.
+
+        Returns:
+            device_ids marked offline
+        """
+        now = time.time() if now is None else now
+        due = self._pop_due(now)
+        if not due:
+            return []
+
+        async with self._session_factory() as db:
+            # Seen more recently by another process? Re-arm from the DB value.
+            result = await db.execute(
+                select(Device).where(Device.device_id.in_([d for d, _ in due]))
+            )
+            stored = {device.device_id: device for device in result.scalars().all()}
+            silent = []
+            for device_id, deadline in due:
+                device = stored.get(device_id)
+                last_seen = liveness.device_last_seen(device) if device is not None else None
+                if last_seen is not None and last_seen.timestamp() + deadline.threshold > now:
+                    self.arm(device_id, deadline.workshop_id, deadline.pit_id,
+                             deadline.threshold, seen_at=last_seen)
+                else:
+                    silent.append((device_id, deadline))
+            if not silent:
+                return []
+
+            # Registry first: a pending touch must not flip the row back online
+            for device_id, _ in silent:
+                liveness.mark_device_offline(device_id)
+            result = await db.execute(
+                update(Device)
+                .where(
+                    Device.device_id.in_([d for d, _ in silent]),
+                    Device.is_online == True,  # noqa: E712
+                )
+                .values(is_online=False)
+                .returning(Device.device_id)
+                .execution_options(synchronize_session=False)
+            )
+            flipped = set(result.scalars().all())
+            await db.commit()
+
+        device_ids = [device_id for device_id, _ in silent if device_id in flipped]
+        if not device_ids:
+            return []
+        self.fired += len(device_ids)
+        logger.info(f"Marked {len(device_ids)} silent device(s) offline: {', '.join(device_ids)}")
+
+        # Import here to avoid circular deps
+        from src.services.websocket_service import broadcast_device_offline
+
+        for device_id, deadline in silent:
+            if device_id not in flipped or deadline.pit_id is None:
+                continue
+            try:
+                await broadcast_device_offline(deadline.workshop_id, deadline.pit_id, device_id)
+            except Exception as ws_error:
+                logger.warning(f"WebSocket broadcast failed: {ws_error}")
+        return device_ids
+
+    # ── Introspection ────────────────────────────────────────────────────────
+    @property
+    def stats(self) -> dict:
+        next_in = None
+        if self._heap:
+            next_in = round(max(0.0, self._heap[0][0] - time.time()), 3)
+        return {
+            "armed": len(self._armed),
+            "heap": len(self._heap),
+            "fired": self.fired,
+            "next_deadline_in_seconds": next_in,
+        }
+
+    def clear(self) -> None:
+        self._armed.clear()
+        self._heap.clear()
+
+
+offline_detector = OfflineDetector()
@@ -0,0 +1,387 @@
+"""
+Module: payload_decoder.py
+Purpose:
+    Fast path for decoding MQTT sensor payloads of the known shapes.
+
+    The tolerant path (parse_sensor_payload → build_sensor_reading) runs
+    _safe_float/_safe_int on every column one payload.get() at a time and
+    range-checks afterwards. For the shapes our own firmware sends, this
+    module precompiles a field table per sensor_type and does type
+    coercion, NaN rejection and the plausible-range checks in a single
+    loop over that table.
+
+    A payload only takes the fast path when its sensor_type is known, it
+    carries no keys outside that shape, and every value already has the
+    expected JSON type. Anything else (string numbers, booleans, extra
+    fields, unknown sensor_type) returns None here and the caller falls
+    back to the tolerant path, so stored values are identical either way.
+
+    JSON is decoded with orjson when it is installed, otherwise with the
+    stdlib json module. orjson rejects NaN/Infinity literals, which the
+    stdlib accepts, so a failed orjson decode is retried with json.
+
+    The sensor topic also accepts a compact binary encoding, negotiated by
+    its first byte (JSON always starts with '{'). Version 1, big-endian:
+
+        B    header 0xB1 (one reading) or 0xB2 (batch)
+        B+s  device_id (length-prefixed UTF-8)
+        8s   license token (first 8 bytes of SHA-256 of the license key)
+        B    reading count — batch (0xB2) only, then per reading:
+          Q    device timestamp, epoch milliseconds (0 = absent)
+          B    field count, then per field:
+          B+v  field ID and value — fixed-point ints, see BINARY_FIELDS
+
+    The ingest queue carries payloads as str, so binary payloads travel
+    latin-1 decoded (a lossless byte ↔ char mapping) and are turned back
+    into bytes here.
+
+Author: PPF Monitoring Team
+Created: 2026-03-13
+"""
+
+import json
+import struct
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from src.utils.helpers import LICENSE_TOKEN_BYTES, LICENSE_TOKEN_PREFIX
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# ─── JSON decoding ────────────────────────────────────────────────────────────
+_loads: Optional[Callable[[Any], Any]] = None
+
+
+def _resolve_loads() -> Callable[[Any], Any]:
+    global _loads
+    try:
+        import orjson  # optional speed-up
+        _loads = orjson.loads
+    except ImportError:
+        _loads = json.loads
+    return _loads
+
+
+def loads(raw: Any) -> Any:
+    """
+    Decode a JSON document (str or bytes).
+
+    Raises:
+        json.JSONDecodeError (orjson's error type subclasses it)
+    """
+    fast = _loads or _resolve_loads()
+    try:
+        return fast(raw)
+    except ValueError:
+        if fast is json.loads:
+            raise
+        # NaN / Infinity literals — the tolerant path rejects the values
+        return json.loads(raw)
+
+
+# ─── Field table ──────────────────────────────────────────────────────────────
+# Every SensorData column a payload may carry: (name, type, min, max).
+# min/max are the physically plausible ranges used by _validate_reading.
+SENSOR_FIELDS: tuple[tuple[str, type, Optional[float], Optional[float]], ...] = (
+    ("temperature",     float, -40.0, 80.0),
+    ("humidity",        float, 0.0, 100.0),
+    ("pressure",        float, 300.0, 1100.0),
+    ("gas_resistance",  float, None, None),
+    ("iaq",             float, 0.0, 500.0),
+    ("iaq_accuracy",    int,   None, None),
+    ("pm1",             float, None, None),
+    ("pm25",            float, 0.0, 1000.0),
+    ("pm10",            float, 0.0, 1000.0),
+    ("particles_03um",  int,   None, None),
+    ("particles_05um",  int,   None, None),
+    ("particles_10um",  int,   None, None),
+    ("particles_25um",  int,   None, None),
+    ("particles_50um",  int,   None, None),
+    ("particles_100um", int,   None, None),
+)
+
+VALID_RANGES: dict[str, tuple[float, float]] = {
+    name: (lo, hi) for name, _, lo, hi in SENSOR_FIELDS if lo is not None
+}
+
+_ENVELOPE_KEYS = frozenset({"device_id", "license_key", "sensor_type", "timestamp"})
+
+_PMS5003_FIELDS = (
+    "pm1", "pm25", "pm10",
+    "particles_03um", "particles_05um", "particles_10um",
+    "particles_25um", "particles_50um", "particles_100um",
+)
+_BME688_FIELDS = (
+    "temperature", "humidity", "pressure", "gas_resistance", "iaq", "iaq_accuracy",
+)
+
+# sensor_type → columns that shape may carry
+KNOWN_SHAPES: dict[str, tuple[str, ...]] = {
+    "DHT22+PMS5003":  ("temperature", "humidity") + _PMS5003_FIELDS,
+    "BME688+PMS5003": _BME688_FIELDS + _PMS5003_FIELDS,
+    "BME680+PMS5003": _BME688_FIELDS + _PMS5003_FIELDS,
+    "PIWIFI-01":      _BME688_FIELDS + _PMS5003_FIELDS,   # Raspberry Pi relay
+}
+
+
+class _CompiledShape:
+    __slots__ = ("fields", "allowed_keys")
+
+    def __init__(self, columns: tuple[str, ...]):
+        by_name = {spec[0]: spec for spec in SENSOR_FIELDS}
+        self.fields = tuple(by_name[name] for name in columns)
+        self.allowed_keys = _ENVELOPE_KEYS | frozenset(columns)
+
+
+_COMPILED: dict[str, _CompiledShape] = {
+    sensor_type: _CompiledShape(columns) for sensor_type, columns in KNOWN_SHAPES.items()
+}
+
+_EMPTY_VALUES: dict[str, None] = dict.fromkeys(name for name, *_ in SENSOR_FIELDS)
+
+
+# ─── Decoded payload ──────────────────────────────────────────────────────────
+class SensorPayload:
+    """
+    A sensor payload with its column values already coerced and checked.
+
+    values holds every SENSOR_FIELDS column (None when absent or rejected).
+    """
+
+    __slots__ = (
+        "device_id",
+        "license_key",
+        "sensor_type",
+        "device_timestamp",
+        "values",
+        "is_valid",
+    )
+
+    def __init__(
+        self,
+        device_id: str,
+        license_key: str,
+        sensor_type: Optional[str],
+        device_timestamp: Optional[datetime],
+        values: dict[str, Any],
+        is_valid: bool,
+    ):
+        self.device_id = device_id
+        self.license_key = license_key
+        self.sensor_type = sensor_type
+        self.device_timestamp = device_timestamp
+        self.values = values
+        self.is_valid = is_valid
+
+
+def parse_device_timestamp(value: Any) -> Optional[datetime]:
+    """Parse the payload's ISO-8601 timestamp ('Z' suffix allowed)."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        logger.warning(f"Invalid device timestamp: {value}")
+        return None
+
+
+def decode_known_shape(data: dict) -> Optional[SensorPayload]:
+    """
+    Coerce and range-check a parsed payload of a known shape in one pass.
+
+    Returns:
+        SensorPayload, or None if the payload is not a known shape with
+        well-typed values (use the tolerant path instead)
+    """
+    sensor_type = data.get("sensor_type")
+    shape = _COMPILED.get(sensor_type) if type(sensor_type) is str else None
+    if shape is None or not data.keys() <= shape.allowed_keys:
+        return None
+
+    device_id = data.get("device_id")
+    license_key = data.get("license_key")
+    if type(device_id) is not str or type(license_key) is not str:
+        return None
+
+    values = _EMPTY_VALUES.copy()
+    is_valid = True
+    for name, kind, lo, hi in shape.fields:
+        value = data.get(name)
+        if value is None:
+            continue
+        value_type = type(value)
+        if kind is float:
+            if value_type is int:
+                value = float(value)
+            elif value_type is not float:
+                return None
+            elif value != value:  # NaN
+                continue
+        elif value_type is not int:
+            return None
+        if lo is not None and not (lo <= value <= hi):
+            is_valid = False
+        values[name] = value
+
+    return SensorPayload(
+        device_id=device_id,
+        license_key=license_key,
+        sensor_type=sensor_type,
+        device_timestamp=parse_device_timestamp(data.get("timestamp")),
+        values=values,
+        is_valid=is_valid,
+    )
+
+
+# ─── Compact binary format ────────────────────────────────────────────────────
+BINARY_HEADER_V1 = 0xB1
+BINARY_HEADER_BATCH_V1 = 0xB2
+BINARY_HEADERS = frozenset({BINARY_HEADER_V1, BINARY_HEADER_BATCH_V1})
+
+# field ID → (column, struct format, scale). Stored value = raw / scale.
+BINARY_FIELDS: dict[int, tuple[str, str, int]] = {
+    1:  ("temperature",     "h", 100),
+    2:  ("humidity",        "H", 100),
+    3:  ("pressure",        "I", 100),
+    4:  ("gas_resistance",  "I", 1),
+    5:  ("iaq",             "H", 10),
+    6:  ("iaq_accuracy",    "B", 1),
+    7:  ("pm1",             "H", 10),
+    8:  ("pm25",            "H", 10),
+    9:  ("pm10",            "H", 10),
+    10: ("particles_03um",  "H", 1),
+    11: ("particles_05um",  "H", 1),
+    12: ("particles_10um",  "H", 1),
+    13: ("particles_25um",  "H", 1),
+    14: ("particles_50um",  "H", 1),
+    15: ("particles_100um", "H", 1),
+}
+
+_FIELD_KINDS: dict[str, type] = {name: kind for name, kind, *_ in SENSOR_FIELDS}
+_BINARY_IDS: dict[str, int] = {spec[0]: field_id for field_id, spec in BINARY_FIELDS.items()}
+_BINARY_STRUCTS: dict[int, tuple[str, struct.Struct, int, type]] = {
+    field_id: (name, struct.Struct("!" + fmt), scale, _FIELD_KINDS[name])
+    for field_id, (name, fmt, scale) in BINARY_FIELDS.items()
+}
+_TOKEN = struct.Struct(f"!{LICENSE_TOKEN_BYTES}s")
+_READING_HEAD = struct.Struct("!QB")
+
+
+def is_binary_payload(payload: str) -> bool:
+    """True if a (latin-1 decoded) payload uses the compact binary format."""
+    return bool(payload) and ord(payload[0]) in BINARY_HEADERS
+
+
+def _encode_reading(timestamp_ms: int, values: dict[str, Any]) -> bytes:
+    fields = [
+        (_BINARY_IDS[name], value) for name, value in values.items() if value is not None
+    ]
+    parts = [_READING_HEAD.pack(timestamp_ms, len(fields))]
+    for field_id, value in fields:
+        _, packer, scale, _ = _BINARY_STRUCTS[field_id]
+        parts.append(bytes((field_id,)) + packer.pack(round(value * scale)))
+    return b"".join(parts)
+
+
+def encode_binary(
+    device_id: str,
+    token: bytes,
+    values: dict[str, Any],
+    timestamp_ms: int = 0,
+) -> bytes:
+    """
+    Encode one reading in binary format v1. None values are omitted.
+
+    Raises:
+        struct.error: a value does not fit its fixed-point field
+    """
+    device = device_id.encode("utf-8")
+    return b"".join((
+        struct.pack("!BB", BINARY_HEADER_V1, len(device)),
+        device,
+        _TOKEN.pack(token),
+        _encode_reading(timestamp_ms, values),
+    ))
+
+
+def encode_binary_batch(
+    device_id: str,
+    token: bytes,
+    readings: list[tuple[int, dict[str, Any]]],
+) -> bytes:
+    """
+    Encode several (timestamp_ms, values) readings in one batch message.
+
+    Raises:
+        struct.error: a value does not fit, or more than 255 readings
+    """
+    device = device_id.encode("utf-8")
+    return b"".join((
+        struct.pack("!BB", BINARY_HEADER_BATCH_V1, len(device)),
+        device,
+        _TOKEN.pack(token),
+        struct.pack("!B", len(readings)),
+        *(_encode_reading(ts, values) for ts, values in readings),
+    ))
+
+
+def decode_binary(payload: str | bytes) -> Optional[list[SensorPayload]]:
+    """
+    Decode and range-check a binary payload (single or batch) in one pass.
+
+    Returns:
+        One SensorPayload per reading (license_key holds the 'tok:' short
+        token), or None if the payload is truncated, uses an unknown
+        version or carries an unknown field ID
+    """
+    raw = payload.encode("latin-1") if isinstance(payload, str) else payload
+    try:
+        header = raw[0]
+        if header not in BINARY_HEADERS:
+            logger.warning(f"Unsupported binary sensor payload version 0x{header:02x}")
+            return None
+        id_end = 2 + raw[1]
+        device_id = raw[2:id_end].decode("utf-8")
+        (token,) = _TOKEN.unpack_from(raw, id_end)
+        offset = id_end + _TOKEN.size
+        reading_count = 1
+        if header == BINARY_HEADER_BATCH_V1:
+            reading_count = raw[offset]
+            offset += 1
+
+        license_key = LICENSE_TOKEN_PREFIX + token.hex()
+        readings = []
+        for _ in range(reading_count):
+            timestamp_ms, field_count = _READING_HEAD.unpack_from(raw, offset)
+            offset += _READING_HEAD.size
+            values = _EMPTY_VALUES.copy()
+            is_valid = True
+            for _ in range(field_count):
+                name, unpacker, scale, kind = _BINARY_STRUCTS[raw[offset]]
+                (value,) = unpacker.unpack_from(raw, offset + 1)
+                offset += 1 + unpacker.size
+                if kind is float:
+                    value = value / scale
+                bounds = VALID_RANGES.get(name)
+                if bounds is not None and not (bounds[0] <= value <= bounds[1]):
+                    is_valid = False
+                values[name] = value
+
+            device_ts = None
+            if timestamp_ms:
+                device_ts = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+            readings.append(SensorPayload(
+                device_id=device_id,
+                license_key=license_key,
+                sensor_type=None,
+                device_timestamp=device_ts,
+                values=values,
+                is_valid=is_valid,
+            ))
+    except (IndexError, KeyError, UnicodeDecodeError, struct.error) as e:
+        logger.error(f"Failed to decode binary sensor payload: {e!r} | {len(raw)} bytes")
+        return None
+
+    return readings
@@ -0,0 +1,124 @@
+"""
+Module: reading_dedup.py
+Purpose:
+    Drop sensor readings that were already ingested, before they reach the
+    writer (so no wasted INSERT and no second alert evaluation).
+
+    Duplicates come from QoS 1 redelivery (the broker resends a message
+    whose PUBACK was lost) and from edge devices replaying their buffer
+    after a reconnect. A reading is identified by (device_id,
+    device_timestamp); readings without a device timestamp are never
+    treated as duplicates.
+
+    Per device, the tracker remembers the last ingest.dedup_window_per_device
+    timestamps it let through; devices are evicted least recently used
+    beyond ingest.dedup_max_devices. Anything older than the window, or
+    seen by another process, is caught by the unique partial index
+    uq_sensor_data_device_timestamp and skipped by the writer.
+
+    With sharded ingest workers (ingest_queue.py) a device's messages are
+    handled by one worker in order, so check-and-record needs no lock.
+
+Author: PPF Monitoring Team
+Created: 2026-03-15
+"""
+
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from src.config.settings import get_settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# uq_sensor_data_device_timestamp, or uq_sensor_data_y2026m03_device_timestamp
+# per partition on PostgreSQL (sensor_partitions.py)
+_DEDUP_INDEX_RE = re.compile(r"uq_sensor_data(_\w+?)?_device_timestamp")
+
+
+def is_duplicate_reading(error: BaseException) -> bool:
+    """True if an INSERT was rejected by the (device_id, device_timestamp) index."""
+    if not isinstance(error, IntegrityError):
+        return False
+    message = str(error.orig)
+    # PostgreSQL names the index, SQLite lists its columns
+    return bool(_DEDUP_INDEX_RE.search(message)) or "sensor_data.device_timestamp" in message
+
+
+class ReadingDeduplicator:
+    """
+    Sliding window of recently ingested device timestamps per device.
+
+    Args:
+        window_per_device: Timestamps remembered per device; 0 disables
+        max_devices: Least recently used devices are evicted beyond this
+    """
+
+    def __init__(
+        self,
+        window_per_device: int = settings.INGEST_DEDUP_WINDOW_PER_DEVICE,
+        max_devices: int = settings.INGEST_DEDUP_MAX_DEVICES,
+    ):
+        self.window = max(0, window_per_device)
+        self.max_devices = max(1, max_devices)
+        # device_id → {timestamp: None}, insertion ordered (oldest first)
+        self._seen: OrderedDict[str, dict[float, None]] = OrderedDict()
+        self.accepted = 0
+        self.duplicates = 0
+
+    def is_duplicate(self, device_id: str, device_timestamp: Optional[datetime]) -> bool:
+        """
+        True if this reading was already let through; otherwise remember it
+        and return False.
+        """
+        if device_timestamp is None or self.window == 0:
+            self.accepted += 1
+            return False
+
+        key = device_timestamp.timestamp()
+        seen = self._seen.get(device_id)
+        if seen is None:
+            while len(self._seen) >= self.max_devices:
+                self._seen.popitem(last=False)
+            seen = self._seen[device_id] = {}
+        else:
+            self._seen.move_to_end(device_id)
+
+        if key in seen:
+            self.duplicates += 1
+            return True
+
+        seen[key] = None
+        if len(seen) > self.window:
+            del seen[next(iter(seen))]
+        self.accepted += 1
+        return False
+
+    def forget(self, device_id: str, device_timestamp: Optional[datetime]) -> None:
+        """A reading was let through but never stored — accept it again."""
+        if device_timestamp is None:
+            return
+        seen = self._seen.get(device_id)
+        if seen is not None:
+            seen.pop(device_timestamp.timestamp(), None)
+
+    def clear(self) -> None:
+        self._seen.clear()
+        self.accepted = 0
+        self.duplicates = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "devices": len(self._seen),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+        }
+
+
+reading_dedup = ReadingDeduplicator()
@@ -0,0 +1,192 @@
+"""
+Module: sensor_partitions.py
+Purpose:
+    Monthly range partitions of sensor_data on PostgreSQL.
+
+    Migration f7g8h9i0j1k2 turns sensor_data into a table partitioned by
+    RANGE (created_at), one partition per calendar month
+    (sensor_data_y2026m03 holds March 2026), plus sensor_data_default as
+    a safety net. Queries that bound created_at (history, stats, latest —
+    see sensor_service.latest_reading) only touch the matching partitions,
+    and old months can be dropped whole once retention has emptied them
+    (drop_empty_partitions).
+
+    The maintainer creates the partitions for the current month and the
+    next sensor.partition_months_ahead months at startup and once a day,
+    so inserts never land in the default partition; with several ingest
+    processes only the holder of the leader lock (leader_lock.py) does.
+    Each partition gets its own unique (device_id, device_timestamp)
+    index — PostgreSQL only allows unique indexes on the parent that
+    include created_at — which keeps the duplicate-reading backstop of
+    reading_dedup.py.
+
+    On SQLite (tests) or an unpartitioned table (created with create_all)
+    this is a no-op.
+
+Author: PPF Monitoring Team
+Created: 2026-03-18
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import get_db_context
+from src.config.settings import get_settings
+from src.services.leader_lock import leader_lock
+from src.utils.helpers import utc_now
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_CHECK_INTERVAL_SECONDS = 24 * 3600
+
+
+def month_start(value: datetime) -> datetime:
+    """First instant (UTC) of the month containing value."""
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(start: datetime, months: int) -> datetime:
+    """Month start `months` after (or before, if negative) a month start."""
+    index = start.year * 12 + start.month - 1 + months
+    return start.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"sensor_data_y{start.year:04d}m{start.month:02d}"
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    """True if sensor_data is a partitioned PostgreSQL table."""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    result = await db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'sensor_data' AND pg_table_is_visible(c.oid)"
+    ))
+    return result.first() is not None
+
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int) -> list[str]:
+    """
+    Create the missing partitions from this month to months_ahead months
+    out. Returns the names created (empty when not partitioned).
+    """
+    if not await is_partitioned(db):
+        return []
+
+    existing = set((await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'sensor_data'"
+    ))).scalars())
+
+    created = []
+    current = month_start(utc_now())
+    for offset in range(max(0, months_ahead) + 1):
+        start = add_months(current, offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        end = add_months(start, 1)
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF sensor_data "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        await db.execute(text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{name}_device_timestamp "
+            f"ON {name} (device_id, device_timestamp) WHERE device_timestamp IS NOT NULL"
+        ))
+        created.append(name)
+    await db.commit()
+    return created
+
+
+async def drop_empty_partitions(db: AsyncSession, before: datetime) -> list[str]:
+    """
+    Drop monthly partitions that end at or before `before` and hold no rows
+    (emptied by sensor_retention.py). Returns the names dropped.
+    """
+    if not await is_partitioned(db):
+        return []
+
+    names = (await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'sensor_data' AND c.relname ~ '^sensor_data_y[0-9]{4}m[0-9]{2}$'"
+    ))).scalars()
+
+    dropped = []
+    for name in sorted(names):
+        start = datetime(int(name[-7:-3]), int(name[-2:]), 1, tzinfo=timezone.utc)
+        if add_months(start, 1) > before:
+            continue
+        if (await db.execute(text(f"SELECT 1 FROM {name} LIMIT 1"))).first() is not None:
+            continue
+        await db.execute(text(f"ALTER TABLE sensor_data DETACH PARTITION {name}"))
+        await db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    await db.commit()
+    return dropped
+
+
+class SensorPartitionMaintainer:
+    """
+    Keeps sensor_data partitions created ahead of time.
+
+    Args:
+        months_ahead: Future months to keep a partition for
+        session_factory: Async context manager yielding an AsyncSession
+    """
+
+    def __init__(
+        self,
+        months_ahead: int = settings.SENSOR_PARTITION_MONTHS_AHEAD,
+        session_factory: Callable = get_db_context,
+    ):
+        self.months_ahead = months_ahead
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="sensor-partitions")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> list[str]:
+        async with leader_lock(self._session_factory, "sensor_partitions") as leader:
+            if not leader:
+                return []   # another process is creating them right now
+            async with self._session_factory() as db:
+                created = await ensure_partitions(db, self.months_ahead)
+        if created:
+            logger.info(f"Created sensor_data partition(s): {', '.join(created)}")
+        return created
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"sensor_data partition maintenance failed: {e}")
+            await asyncio.sleep(_CHECK_INTERVAL_SECONDS)
+
+
+partition_maintainer = SensorPartitionMaintainer()
@@ -0,0 +1,338 @@
+"""
+Module: sensor_retention.py
+Purpose:
+    Retention policy for sensor history: raw sensor_data rows and each
+    rollup level (sensor_rollups.py) are kept for a configurable number of
+    days, then removed.
+
+    Policies (retention.policies in settings.yaml) are resolved per
+    workshop: default, overridden by the workshop's subscription_plan,
+    overridden by the workshop id. Cutoffs are aligned to the hour, so
+    purges always remove whole rollup buckets.
+
+    Raw rows are downsampled before they go: each day about to be purged
+    has its rollup buckets rebuilt from the raw rows first, so the rollups
+    hold the full history even if the compactor never saw those rows.
+    Rows are then deleted (and, with retention.archive_dir set, first
+    appended to gzipped JSONL files) in batches of retention.batch_rows,
+    oldest first, one short transaction each, pausing between batches.
+    Every batch ends on a minute boundary, so an interrupted purge never
+    leaves a half-deleted minute for the next downsampling to miss.
+
+    The rollup compactor does not rebuild buckets older than a pit's raw
+    cutoff (raw_cutoffs), as their raw rows are gone. On PostgreSQL,
+    monthly partitions emptied this way are dropped.
+
+    Runs in the ingest process every retention.interval_minutes; with
+    several ingest processes, only in the one holding the leader lock
+    (leader_lock.py).
+
+Author: PPF Monitoring Team
+Created: 2026-03-20
+"""
+
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import get_db_context
+from src.config.settings import get_settings
+from src.models.pit import Pit
+from src.models.sensor_data import SensorData
+from src.models.sensor_rollup import SensorRollup
+from src.models.workshop import Workshop
+from src.services.leader_lock import leader_lock
+from src.services.sensor_partitions import drop_empty_partitions
+from src.services.sensor_rollups import RESOLUTIONS, floor_time, rebuild_buckets
+from src.utils.helpers import utc_now
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_ROLLUP_KEYS = {60: "rollup_1m_days", 900: "rollup_15m_days", 3600: "rollup_1h_days"}
+_DOWNSAMPLE_CHUNK = timedelta(days=1)
+
+
+class RetentionPolicy(NamedTuple):
+    raw_days: Optional[int]                      # None = forever
+    rollup_days: dict[int, Optional[int]]        # resolution_seconds -> days
+
+    def cutoff(self, days: Optional[int], now: datetime) -> Optional[datetime]:
+        """Data older than this goes (hour aligned); None keeps everything."""
+        if days is None:
+            return None
+        return floor_time(now - timedelta(days=days), 3600)
+
+
+def _longer(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    return None if a is None or b is None else max(a, b)
+
+
+def policy_for(
+    workshop_id: int,
+    plan: Optional[str],
+    policies: dict = settings.RETENTION_POLICIES,
+) -> RetentionPolicy:
+    """Effective policy of a workshop (default → plan → workshop id)."""
+    workshops = policies.get("workshops") or {}
+    merged = {
+        "raw_days": settings.SENSOR_DATA_RETENTION_DAYS,
+        **(policies.get("default") or {}),
+        **((policies.get("plans") or {}).get(plan) or {}),
+        **(workshops.get(workshop_id) or workshops.get(str(workshop_id)) or {}),
+    }
+    raw_days = merged.get("raw_days")
+    rollup_days = {}
+    finer = raw_days
+    for resolution in RESOLUTIONS:
+        # A coarser level is rebuilt from the finer one, so it never expires first
+        finer = rollup_days[resolution] = _longer(merged.get(_ROLLUP_KEYS[resolution]), finer)
+    return RetentionPolicy(raw_days, rollup_days)
+
+
+async def pit_policies(db: AsyncSession) -> list[tuple[int, int, RetentionPolicy]]:
+    """(pit_id, workshop_id, policy) for every pit."""
+    result = await db.execute(
+        select(Pit.id, Pit.workshop_id, Workshop.subscription_plan).join(
+            Workshop, Workshop.id == Pit.workshop_id
+        )
+    )
+    return [
+        (pit_id, workshop_id, policy_for(workshop_id, plan))
+        for pit_id, workshop_id, plan in result
+    ]
+
+
+async def raw_cutoffs(db: AsyncSession, now: Optional[datetime] = None) -> dict[int, datetime]:
+    """pit_id -> raw retention cutoff, for pits whose raw data expires."""
+    now = now or utc_now()
+    cutoffs = {}
+    for pit_id, _, policy in await pit_policies(db):
+        cutoff = policy.cutoff(policy.raw_days, now)
+        if cutoff is not None:
+            cutoffs[pit_id] = cutoff
+    return cutoffs
+
+
+class SensorRetention:
+    """
+    Applies the retention policies on a schedule.
+
+    Args:
+        interval_minutes: Pause between runs
+        batch_rows: Rows removed per DELETE
+        batch_pause_ms: Pause between DELETEs
+        archive_dir: Write raw rows here before deleting them ("" = don't)
+        session_factory: Async context manager yielding an AsyncSession
+    """
+
+    def __init__(
+        self,
+        interval_minutes: float = settings.RETENTION_INTERVAL_MINUTES,
+        batch_rows: int = settings.RETENTION_BATCH_ROWS,
+        batch_pause_ms: int = settings.RETENTION_BATCH_PAUSE_MS,
+        archive_dir: str = settings.RETENTION_ARCHIVE_DIR,
+        session_factory: Callable = get_db_context,
+    ):
+        self.interval = max(1.0, interval_minutes * 60)
+        self.batch_rows = max(1, batch_rows)
+        self.batch_pause = max(0, batch_pause_ms) / 1000.0
+        self.archive_dir = archive_dir
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters (exposed via stats for /metrics)
+        self.leader = False
+        self.runs = 0
+        self.raw_deleted = 0
+        self.raw_archived = 0
+        self.rollups_deleted = 0
+        self.partitions_dropped = 0
+        self.failures = 0
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="sensor-retention")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Sensor retention run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "leader": self.leader,
+            "runs": self.runs,
+            "raw_deleted": self.raw_deleted,
+            "raw_archived": self.raw_archived,
+            "rollups_deleted": self.rollups_deleted,
+            "partitions_dropped": self.partitions_dropped,
+            "failures": self.failures,
+        }
+
+    # ── One run ──────────────────────────────────────────────────────────────
+    async def run_once(self, now: Optional[datetime] = None) -> dict:
+        """Apply every workshop's policy once. Returns the rows removed."""
+        async with leader_lock(self._session_factory, "sensor_retention") as leader:
+            self.leader = leader
+            if not leader:
+                return {"raw_deleted": 0, "rollups_deleted": 0}
+            return await self._apply(now or utc_now())
+
+    async def _apply(self, now: datetime) -> dict:
+        async with self._session_factory() as db:
+            pits = await pit_policies(db)
+
+        raw_deleted = rollups_deleted = 0
+        raw_cutoff_max: Optional[datetime] = None
+        for pit_id, workshop_id, policy in pits:
+            cutoff = policy.cutoff(policy.raw_days, now)
+            if cutoff is not None:
+                raw_deleted += await self._purge_raw(pit_id, workshop_id, cutoff)
+                raw_cutoff_max = max(cutoff, raw_cutoff_max or cutoff)
+            for resolution, days in policy.rollup_days.items():
+                cutoff = policy.cutoff(days, now)
+                if cutoff is not None:
+                    rollups_deleted += await self._purge_rollups(pit_id, resolution, cutoff)
+
+        if raw_cutoff_max is not None:
+            async with self._session_factory() as db:
+                dropped = await drop_empty_partitions(db, raw_cutoff_max)
+            if dropped:
+                self.partitions_dropped += len(dropped)
+                logger.info(f"Dropped empty sensor_data partition(s): {', '.join(dropped)}")
+
+        self.runs += 1
+        if raw_deleted or rollups_deleted:
+            logger.info(
+                f"Sensor retention: removed {raw_deleted} reading(s), "
+                f"{rollups_deleted} rollup bucket(s)"
+            )
+        return {"raw_deleted": raw_deleted, "rollups_deleted": rollups_deleted}
+
+    async def _purge_raw(self, pit_id: int, workshop_id: int, cutoff: datetime) -> int:
+        """Downsample, then delete, a pit's readings older than cutoff — a day at a time."""
+        deleted = 0
+        while True:
+            async with self._session_factory() as db:
+                oldest = await db.scalar(
+                    select(func.min(SensorData.created_at)).where(
+                        SensorData.pit_id == pit_id, SensorData.created_at < cutoff
+                    )
+                )
+                if oldest is None:
+                    return deleted
+                chunk_end = min(cutoff, floor_time(oldest, 3600) + _DOWNSAMPLE_CHUNK)
+                await rebuild_buckets(db, pit_id, oldest, chunk_end - timedelta(microseconds=1))
+                await db.commit()
+
+            while True:
+                async with self._session_factory() as db:
+                    removed = await self._delete_raw_batch(db, pit_id, workshop_id, chunk_end)
+                if not removed:
+                    break
+                deleted += removed
+                self.raw_deleted += removed
+                await asyncio.sleep(self.batch_pause)
+
+    async def _delete_raw_batch(
+        self,
+        db: AsyncSession,
+        pit_id: int,
+        workshop_id: int,
+        end: datetime,
+    ) -> int:
+        in_range = (SensorData.pit_id == pit_id, SensorData.created_at < end)
+
+        # End the batch on a minute boundary after ~batch_rows rows
+        nth = await db.scalar(
+            select(SensorData.created_at).where(*in_range)
+            .order_by(SensorData.created_at).offset(self.batch_rows - 1).limit(1)
+        )
+        if nth is not None:
+            oldest = await db.scalar(select(func.min(SensorData.created_at)).where(*in_range))
+            boundary = floor_time(nth, 60)
+            if boundary <= floor_time(oldest, 60):
+                boundary += timedelta(seconds=60)
+            end = min(end, boundary)
+            in_range = (SensorData.pit_id == pit_id, SensorData.created_at < end)
+
+        if self.archive_dir:
+            rows = (await db.execute(select(SensorData.__table__).where(*in_range))).all()
+            if rows:
+                await asyncio.to_thread(self._archive, workshop_id, rows)
+                self.raw_archived += len(rows)
+
+        result = await db.execute(
+            delete(SensorData).where(*in_range).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount or 0
+
+    def _archive(self, workshop_id: int, rows: list) -> None:
+        """Append rows to <archive_dir>/workshop_<id>/sensor_data_<YYYY>_<MM>.jsonl.gz."""
+        directory = os.path.join(self.archive_dir, f"workshop_{workshop_id}")
+        os.makedirs(directory, exist_ok=True)
+        by_month: dict[str, list[str]] = {}
+        for row in rows:
+            month = row.created_at.strftime("%Y_%m")
+            by_month.setdefault(month, []).append(json.dumps(dict(row._mapping), default=str))
+        for month, lines in by_month.items():
+            path = os.path.join(directory, f"sensor_data_{month}.jsonl.gz")
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+    async def _purge_rollups(self, pit_id: int, resolution: int, cutoff: datetime) -> int:
+        """Delete a pit's buckets of one resolution older than cutoff, batch by batch."""
+        deleted = 0
+        while True:
+            async with self._session_factory() as db:
+                oldest = await db.scalar(
+                    select(func.min(SensorRollup.bucket_start)).where(
+                        SensorRollup.pit_id == pit_id,
+                        SensorRollup.resolution_seconds == resolution,
+                        SensorRollup.bucket_start < cutoff,
+                    )
+                )
+                if oldest is None:
+                    return deleted
+                # At most batch_rows buckets fit in this span
+                end = min(cutoff, floor_time(oldest, resolution) + timedelta(seconds=resolution * self.batch_rows))
+                result = await db.execute(
+                    delete(SensorRollup)
+                    .where(
+                        SensorRollup.pit_id == pit_id,
+                        SensorRollup.resolution_seconds == resolution,
+                        SensorRollup.bucket_start < end,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            deleted += result.rowcount or 0
+            self.rollups_deleted += result.rowcount or 0
+            await asyncio.sleep(self.batch_pause)
+
+
+sensor_retention = SensorRetention()
@@ -0,0 +1,528 @@
+"""
+Module: sensor_rollups.py
+Purpose:
+    Per-pit rollups of sensor_data (models/sensor_rollup.py): building them
+    as readings arrive, and answering window aggregates from them.
+
+    Compactor (runs in the ingest process): every
+    sensor.rollup_interval_seconds it reads the sensor_data rows added since
+    its last pass — by id, so readings replayed from the spool with an old
+    created_at are caught too — and, per pit, rebuilds the 1-minute buckets
+    over the affected time range from raw rows, then the 15-minute and
+    1-hour buckets covering them from the next finer level. Buckets are
+    recomputed rather than incremented, so repeating a pass is harmless.
+    The last couple of minutes are refreshed on every pass as well, which
+    covers rows whose transaction committed after a higher id was seen.
+    Buckets older than a pit's raw retention cutoff are left alone
+    (sensor_retention.py downsamples them before purging the raw rows).
+    With several ingest processes only the holder of the leader lock
+    (leader_lock.py) compacts; the others skip their passes.
+
+    Reads: window_aggregate() covers [start, end] with the coarsest buckets
+    that fit, finer ones towards the edges, and raw rows only for the
+    partial minutes at either end plus whatever the compactor has not
+    reached yet. A 30-day stats window reads ~100 rollup rows instead of
+    ~260k readings; with no rollups (e.g. before the first backfill has
+    finished) it degrades to the plain raw aggregate.
+
+    bucketed_aggregate() does the same per chart bucket (1m … 1d): only
+    rollup levels that divide the bucket are used, so every rollup row
+    falls inside exactly one output bucket and SQL groups them directly.
+
+Author: PPF Monitoring Team
+Created: 2026-03-19
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import BigInteger, Integer, and_, cast, delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import get_db_context
+from src.config.settings import get_settings
+from src.models.sensor_data import SensorData
+from src.models.sensor_rollup import SensorRollup
+from src.services.leader_lock import leader_lock
+from src.utils.helpers import utc_now
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+RESOLUTIONS = (60, 900, 3600)   # finest first; each divides the next
+METRICS = ("temperature", "humidity", "pressure", "iaq", "pm1", "pm25", "pm10")
+
+_SETTLE_SECONDS = 120
+
+
+# ─── Time buckets ─────────────────────────────────────────────────────────────
+def _utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back naive; they are stored as UTC
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def floor_time(value: datetime, seconds: int) -> datetime:
+    """Start of the `seconds`-long bucket containing value (UTC, epoch aligned)."""
+    epoch = int(_utc(value).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+def ceil_time(value: datetime, seconds: int) -> datetime:
+    """First bucket boundary at or after value."""
+    floored = floor_time(value, seconds)
+    return floored if floored == _utc(value) else floored + timedelta(seconds=seconds)
+
+
+def bucket_epoch(column, seconds: int, dialect_name: str):
+    """SQL expression: epoch seconds of the bucket start containing column."""
+    if dialect_name == "sqlite":
+        return cast(func.strftime("%s", column), Integer) // seconds * seconds
+    return cast(func.floor(func.extract("epoch", column) / seconds) * seconds, BigInteger)
+
+
+def plan_segments(
+    start: datetime,
+    end: datetime,
+    resolutions: tuple[int, ...] = RESOLUTIONS,
+) -> list[tuple[int, datetime, datetime]]:
+    """
+    Cover [start, end) with the coarsest whole buckets that fit.
+    start and end must be aligned to the finest resolution.
+
+    Returns:
+        [(resolution_seconds, bucket_from, bucket_to), ...] in time order
+    """
+    if start >= end or not resolutions:
+        return []
+    resolution, finer = resolutions[-1], resolutions[:-1]
+    lo, hi = ceil_time(start, resolution), floor_time(end, resolution)
+    if lo >= hi:
+        return plan_segments(start, end, finer)
+    return plan_segments(start, lo, finer) + [(resolution, lo, hi)] + plan_segments(hi, end, finer)
+
+
+# ─── Aggregates ───────────────────────────────────────────────────────────────
+class MetricAggregate:
+    """count / sum / min / max of one metric; combines exactly."""
+
+    __slots__ = ("count", "sum", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, count, total, minimum, maximum) -> None:
+        if not count:
+            return
+        self.count += count
+        self.sum += total or 0.0
+        if minimum is not None and (self.min is None or minimum < self.min):
+            self.min = minimum
+        if maximum is not None and (self.max is None or maximum > self.max):
+            self.max = maximum
+
+    @property
+    def avg(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+
+class Aggregate:
+    """Reading count plus a MetricAggregate per metric."""
+
+    def __init__(self):
+        self.reading_count = 0
+        self.metrics = {metric: MetricAggregate() for metric in METRICS}
+
+    def add_row(self, row) -> None:
+        """Fold in a row with reading_count and <metric>_count/_sum/_min/_max."""
+        self.reading_count += row.reading_count or 0
+        for metric, agg in self.metrics.items():
+            agg.add(
+                getattr(row, f"{metric}_count"),
+                getattr(row, f"{metric}_sum"),
+                getattr(row, f"{metric}_min"),
+                getattr(row, f"{metric}_max"),
+            )
+
+    def as_row(self, pit_id: int, resolution: int, bucket_start: datetime) -> dict:
+        row = {
+            "pit_id": pit_id,
+            "resolution_seconds": resolution,
+            "bucket_start": bucket_start,
+            "reading_count": self.reading_count,
+        }
+        for metric, agg in self.metrics.items():
+            row[f"{metric}_count"] = agg.count
+            row[f"{metric}_sum"] = agg.sum if agg.count else None
+            row[f"{metric}_min"] = agg.min
+            row[f"{metric}_max"] = agg.max
+        return row
+
+
+def _raw_columns() -> list:
+    columns = [func.count(SensorData.id).label("reading_count")]
+    for metric in METRICS:
+        column = getattr(SensorData, metric)
+        columns += [
+            func.count(column).label(f"{metric}_count"),
+            func.sum(column).label(f"{metric}_sum"),
+            func.min(column).label(f"{metric}_min"),
+            func.max(column).label(f"{metric}_max"),
+        ]
+    return columns
+
+
+def _rollup_columns() -> list:
+    columns = [func.sum(SensorRollup.reading_count).label("reading_count")]
+    for metric in METRICS:
+        columns += [
+            func.sum(getattr(SensorRollup, f"{metric}_count")).label(f"{metric}_count"),
+            func.sum(getattr(SensorRollup, f"{metric}_sum")).label(f"{metric}_sum"),
+            func.min(getattr(SensorRollup, f"{metric}_min")).label(f"{metric}_min"),
+            func.max(getattr(SensorRollup, f"{metric}_max")).label(f"{metric}_max"),
+        ]
+    return columns
+
+
+async def window_aggregate(
+    db: AsyncSession,
+    pit_id: int,
+    start: datetime,
+    end: datetime,
+) -> Aggregate:
+    """Aggregate of a pit's valid readings with start <= created_at <= end."""
+    head_end, tail_start = await _rolled_up_span(db, pit_id, start, end)
+
+    aggregate = Aggregate()
+    segments = plan_segments(head_end, tail_start)
+    if segments:
+        result = await db.execute(
+            select(*_rollup_columns()).where(
+                SensorRollup.pit_id == pit_id, _segments_clause(segments)
+            )
+        )
+        aggregate.add_row(result.one())
+
+    result = await db.execute(
+        select(*_raw_columns()).where(
+            SensorData.pit_id == pit_id,
+            SensorData.is_valid.is_(True),
+            _edges_clause(start, head_end, tail_start, end),
+        )
+    )
+    aggregate.add_row(result.one())
+    return aggregate
+
+
+async def bucketed_aggregate(
+    db: AsyncSession,
+    pit_id: int,
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int,
+) -> dict[datetime, Aggregate]:
+    """
+    Aggregates of a pit's valid readings with start <= created_at <= end,
+    per epoch-aligned bucket of bucket_seconds (a multiple of 60).
+    Buckets without readings are left out.
+
+    Returns:
+        {bucket_start: Aggregate} in time order
+    """
+    head_end, tail_start = await _rolled_up_span(db, pit_id, start, end)
+    dialect_name = db.get_bind().dialect.name
+    buckets: dict[int, Aggregate] = {}
+
+    resolutions = tuple(r for r in RESOLUTIONS if bucket_seconds % r == 0)
+    segments = plan_segments(head_end, tail_start, resolutions)
+    if segments:
+        bucket = bucket_epoch(SensorRollup.bucket_start, bucket_seconds, dialect_name).label("bucket")
+        result = await db.execute(
+            select(bucket, *_rollup_columns())
+            .where(SensorRollup.pit_id == pit_id, _segments_clause(segments))
+            .group_by(bucket)
+        )
+        for row in result:
+            buckets.setdefault(int(row.bucket), Aggregate()).add_row(row)
+
+    bucket = bucket_epoch(SensorData.created_at, bucket_seconds, dialect_name).label("bucket")
+    result = await db.execute(
+        select(bucket, *_raw_columns())
+        .where(
+            SensorData.pit_id == pit_id,
+            SensorData.is_valid.is_(True),
+            _edges_clause(start, head_end, tail_start, end),
+        )
+        .group_by(bucket)
+    )
+    for row in result:
+        buckets.setdefault(int(row.bucket), Aggregate()).add_row(row)
+
+    return {
+        datetime.fromtimestamp(epoch, tz=timezone.utc): buckets[epoch]
+        for epoch in sorted(buckets)
+    }
+
+
+async def _rolled_up_span(
+    db: AsyncSession,
+    pit_id: int,
+    start: datetime,
+    end: datetime,
+) -> tuple[datetime, datetime]:
+    """
+    (head_end, tail_start): [head_end, tail_start) is served from rollups,
+    the partial minute before it and everything from the newest rolled-up
+    minute on (which may still be filling) from raw rows.
+    """
+    fine = RESOLUTIONS[0]
+    head_end = min(ceil_time(start, fine), _utc(end))
+    newest = await db.scalar(
+        select(func.max(SensorRollup.bucket_start)).where(
+            SensorRollup.pit_id == pit_id,
+            SensorRollup.resolution_seconds == fine,
+            SensorRollup.bucket_start >= head_end,
+            SensorRollup.bucket_start < end,
+        )
+    )
+    return head_end, (_utc(newest) if newest is not None else head_end)
+
+
+def _segments_clause(segments: list[tuple[int, datetime, datetime]]):
+    return or_(*(
+        and_(
+            SensorRollup.resolution_seconds == resolution,
+            SensorRollup.bucket_start >= lo,
+            SensorRollup.bucket_start < hi,
+        )
+        for resolution, lo, hi in segments
+    ))
+
+
+def _edges_clause(start: datetime, head_end: datetime, tail_start: datetime, end: datetime):
+    return or_(
+        and_(SensorData.created_at >= start, SensorData.created_at < head_end),
+        and_(SensorData.created_at >= tail_start, SensorData.created_at <= end),
+    )
+
+
+# ─── Building rollups ─────────────────────────────────────────────────────────
+async def rebuild_buckets(
+    db: AsyncSession,
+    pit_id: int,
+    first: datetime,
+    last: datetime,
+) -> None:
+    """
+    Recompute every bucket, at every resolution, of pit_id that contains a
+    time in [first, last]. The caller commits.
+    """
+    resolution = RESOLUTIONS[0]
+    lo = floor_time(first, resolution)
+    hi = floor_time(last, resolution) + timedelta(seconds=resolution)
+
+    # Finest level from raw readings
+    bucket = bucket_epoch(SensorData.created_at, resolution, db.get_bind().dialect.name).label("bucket")
+    result = await db.execute(
+        select(bucket, *_raw_columns())
+        .where(
+            SensorData.pit_id == pit_id,
+            SensorData.is_valid.is_(True),
+            SensorData.created_at >= lo,
+            SensorData.created_at < hi,
+        )
+        .group_by(bucket)
+    )
+    buckets: dict[datetime, Aggregate] = {}
+    for row in result:
+        aggregate = buckets[datetime.fromtimestamp(int(row.bucket), tz=timezone.utc)] = Aggregate()
+        aggregate.add_row(row)
+    await _replace(db, pit_id, resolution, lo, hi, buckets)
+
+    # Each coarser level from the one below it
+    for source, resolution in zip(RESOLUTIONS, RESOLUTIONS[1:]):
+        lo, hi = floor_time(lo, resolution), ceil_time(hi, resolution)
+        result = await db.execute(
+            select(SensorRollup.__table__).where(
+                SensorRollup.pit_id == pit_id,
+                SensorRollup.resolution_seconds == source,
+                SensorRollup.bucket_start >= lo,
+                SensorRollup.bucket_start < hi,
+            )
+        )
+        buckets = {}
+        for row in result:
+            start = floor_time(row.bucket_start, resolution)
+            buckets.setdefault(start, Aggregate()).add_row(row)
+        await _replace(db, pit_id, resolution, lo, hi, buckets)
+
+
+async def _replace(
+    db: AsyncSession,
+    pit_id: int,
+    resolution: int,
+    lo: datetime,
+    hi: datetime,
+    buckets: dict[datetime, Aggregate],
+) -> None:
+    await db.execute(
+        delete(SensorRollup)
+        .where(
+            SensorRollup.pit_id == pit_id,
+            SensorRollup.resolution_seconds == resolution,
+            SensorRollup.bucket_start >= lo,
+            SensorRollup.bucket_start < hi,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if buckets:
+        await db.execute(
+            insert(SensorRollup),
+            [aggregate.as_row(pit_id, resolution, start) for start, aggregate in buckets.items()],
+        )
+
+
+class RollupCompactor:
+    """
+    Folds newly inserted sensor_data rows into the rollups.
+
+    Args:
+        interval_seconds: Pause between passes once caught up
+        batch_rows: sensor_data ids covered per pass
+        session_factory: Async context manager yielding an AsyncSession
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = settings.SENSOR_ROLLUP_INTERVAL_SECONDS,
+        batch_rows: int = settings.SENSOR_ROLLUP_BATCH_ROWS,
+        session_factory: Callable = get_db_context,
+    ):
+        self.interval = max(1.0, interval_seconds)
+        self.batch_rows = max(1, batch_rows)
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._last_id: Optional[int] = None
+
+        # Counters (exposed via stats for /metrics)
+        self.leader = False
+        self.passes = 0
+        self.pits_refreshed = 0
+        self.backlog_rows = 0
+        self.failures = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="sensor-rollups")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        """Fold in rows added since the last pass. Returns the pits refreshed."""
+        async with leader_lock(self._session_factory, "sensor_rollups") as leader:
+            self.leader = leader
+            if not leader:
+                # Another process compacts; re-seed if this one takes over
+                self._last_id = None
+                self.backlog_rows = 0
+                return 0
+            return await self._fold()
+
+    async def _fold(self) -> int:
+        async with self._session_factory() as db:
+            if self._last_id is None:
+                self._last_id = await _seed_watermark(db)
+            max_id = await db.scalar(select(func.max(SensorData.id))) or 0
+            upto = min(max_id, self._last_id + self.batch_rows)
+
+            ranges: dict[int, tuple[datetime, datetime]] = {}
+            if upto > self._last_id:
+                result = await db.execute(
+                    select(SensorData.pit_id, func.min(SensorData.created_at), func.max(SensorData.created_at))
+                    .where(SensorData.id > self._last_id, SensorData.id <= upto)
+                    .group_by(SensorData.pit_id)
+                )
+                ranges = {pit_id: (first, last) for pit_id, first, last in result}
+            if upto == max_id:
+                # Caught up: also redo the last minutes, for rows that
+                # committed after a higher id had already been folded in
+                result = await db.execute(
+                    select(SensorData.pit_id, func.min(SensorData.created_at), func.max(SensorData.created_at))
+                    .where(SensorData.created_at >= utc_now() - timedelta(seconds=_SETTLE_SECONDS))
+                    .group_by(SensorData.pit_id)
+                )
+                for pit_id, first, last in result:
+                    if pit_id in ranges:
+                        first = min(_utc(first), _utc(ranges[pit_id][0]))
+                        last = max(_utc(last), _utc(ranges[pit_id][1]))
+                    ranges[pit_id] = (first, last)
+
+            cutoffs = {}
+            if settings.RETENTION_ENABLED and ranges:
+                # Import here to avoid circular deps
+                from src.services.sensor_retention import raw_cutoffs
+                cutoffs = await raw_cutoffs(db)
+            for pit_id, (first, last) in ranges.items():
+                # Raw rows before the retention cutoff are (being) purged;
+                # their buckets were downsampled already and stay as they are
+                cutoff = cutoffs.get(pit_id)
+                if cutoff is not None:
+                    if _utc(last) < cutoff:
+                        continue
+                    first = max(_utc(first), cutoff)
+                await rebuild_buckets(db, pit_id, first, last)
+            await db.commit()
+
+        self._last_id = upto
+        self.backlog_rows = max_id - upto
+        self.passes += 1
+        self.pits_refreshed += len(ranges)
+        return len(ranges)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Sensor rollup pass failed: {e}")
+            # Backfill runs pass after pass; afterwards wait for new readings
+            await asyncio.sleep(0 if self.backlog_rows else self.interval)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "leader": self.leader,
+            "passes": self.passes,
+            "pits_refreshed": self.pits_refreshed,
+            "backlog_rows": self.backlog_rows,
+            "failures": self.failures,
+        }
+
+
+async def _seed_watermark(db: AsyncSession) -> int:
+    """Highest sensor_data id already covered by the stored rollups."""
+    newest = await db.scalar(
+        select(func.max(SensorRollup.bucket_start)).where(
+            SensorRollup.resolution_seconds == RESOLUTIONS[0]
+        )
+    )
+    if newest is None:
+        return 0   # nothing rolled up yet: backfill from the start
+    return await db.scalar(
+        select(func.max(SensorData.id)).where(SensorData.created_at < newest)
+    ) or 0
+
+
+rollup_compactor = RollupCompactor()
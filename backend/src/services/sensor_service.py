@@ -10,17 +10,32 @@ Author: PPF Monitoring Team
 Created: 2026-02-21
 """
 
-import json
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.alert import Alert, AlertConfig
+from src.config.settings import get_settings
+from src.models.alert import Alert
 from src.models.device import Device
-from src.models.pit_alert_config import PitAlertConfig
 from src.models.sensor_data import SensorData
+from src.services.payload_decoder import (
+    SENSOR_FIELDS,
+    VALID_RANGES,
+    SensorPayload,
+    decode_binary,
+    decode_known_shape,
+    is_binary_payload,
+    loads,
+    parse_device_timestamp,
+)
+from src.services.alert_cooldown import (
+    ALERT_COOLDOWN_MINUTES,
+    AlertCooldownTracker,
+    alert_cooldowns,
+)
+from src.services.threshold_cache import EffectiveThresholds, threshold_cache
 from src.utils.constants import AlertSeverity, AlertType, SensorStatus
 from src.utils.helpers import (
     evaluate_humidity_status,
@@ -32,19 +47,7 @@ from src.utils.helpers import (
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
-
-
-def _resolve_threshold(pit_cfg, ws_cfg, field: str, default):
-    """Return pit override if set, else workshop config, else hardcoded default."""
-    if pit_cfg is not None:
-        val = getattr(pit_cfg, field, None)
-        if val is not None:
-            return val
-    if ws_cfg is not None:
-        val = getattr(ws_cfg, field, None)
-        if val is not None:
-            return val
-    return default
+settings = get_settings()
 
 
 def _calculate_iaq_from_gas_resistance(gas_resistance: Optional[float]) -> Optional[float]:
@@ -117,6 +120,17 @@ def parse_sensor_payload(raw_payload: str) -> Optional[dict]:
         "timestamp": "2026-02-21T10:30:00Z"
     }
 
+    Batch format (several readings per message, e.g. Pi batch window):
+    {
+        "device_id": "PIWIFI-01",
+        "license_key": "LIC-XXXX-YYYY-ZZZZ",
+        "sensor_type": "BME688+PMS5003",
+        "readings": [
+            {"temperature": 24.5, "humidity": 58.2, "timestamp": "2026-02-21T10:30:00Z"},
+            {"temperature": 24.6, "humidity": 58.0, "timestamp": "2026-02-21T10:30:10Z"}
+        ]
+    }
+
     Args:
         raw_payload: Raw MQTT message bytes decoded to string
 
@@ -124,11 +138,15 @@ def parse_sensor_payload(raw_payload: str) -> Optional[dict]:
         dict if valid, None if parsing fails
     """
     try:
-        data = json.loads(raw_payload)
-    except json.JSONDecodeError as e:
+        data = loads(raw_payload)
+    except ValueError as e:
         logger.error(f"Failed to parse sensor JSON payload: {e} | Raw: {raw_payload[:200]}")
         return None
 
+    if not isinstance(data, dict):
+        logger.warning(f"Sensor payload is not a JSON object: {raw_payload[:200]}")
+        return None
+
     required_keys = {"device_id", "license_key"}
     if not required_keys.issubset(data.keys()):
         logger.warning(f"Sensor payload missing required keys. Got: {list(data.keys())}")
@@ -137,6 +155,158 @@ def parse_sensor_payload(raw_payload: str) -> Optional[dict]:
     return data
 
 
+def decode_sensor_readings(raw_payload: str) -> Optional[list[SensorPayload]]:
+    """
+    Parse and coerce an incoming MQTT sensor payload into its readings.
+
+    Compact binary payloads (first byte 0xB1/0xB2) and known JSON firmware
+    shapes are coerced and range-checked in one pass by payload_decoder;
+    any other JSON goes through the tolerant coerce_sensor_payload().
+    A JSON "readings" array yields one SensorPayload per element, each
+    inheriting device_id, license_key and sensor_type from the envelope.
+
+    Returns:
+        List of SensorPayload (one for a single-reading message),
+        None if the payload could not be parsed
+    """
+    if is_binary_payload(raw_payload):
+        readings = decode_binary(raw_payload)
+    else:
+        data = parse_sensor_payload(raw_payload)
+        if data is None:
+            return None
+        batch = data.pop("readings", None)
+        if batch is None:
+            return [decode_known_shape(data) or coerce_sensor_payload(data)]
+        if not isinstance(batch, list):
+            logger.warning(f"Sensor payload 'readings' is not an array: {type(batch).__name__}")
+            return None
+        readings = [
+            decode_known_shape(merged) or coerce_sensor_payload(merged)
+            for merged in ({**data, **item} for item in batch if isinstance(item, dict))
+        ]
+
+    if readings is not None and len(readings) > settings.INGEST_MAX_READINGS_PER_MESSAGE:
+        logger.warning(
+            f"Sensor batch of {len(readings)} readings truncated to the newest "
+            f"{settings.INGEST_MAX_READINGS_PER_MESSAGE}"
+        )
+        readings = readings[-settings.INGEST_MAX_READINGS_PER_MESSAGE:]
+    return readings
+
+
+def coerce_sensor_payload(payload: dict) -> SensorPayload:
+    """
+    Tolerant coercion of a parsed payload of any shape.
+
+    Numbers sent as strings are converted, unparseable or NaN values
+    become NULL, and the reading is flagged invalid if a value is outside
+    its plausible range.
+    """
+    values = {
+        name: _safe_int(payload.get(name)) if kind is int else _safe_float(payload.get(name))
+        for name, kind, _, _ in SENSOR_FIELDS
+    }
+    device_ts = None
+    if "timestamp" in payload:
+        device_ts = parse_device_timestamp(payload["timestamp"])
+
+    return SensorPayload(
+        device_id=payload.get("device_id", ""),
+        license_key=payload.get("license_key", ""),
+        sensor_type=payload.get("sensor_type"),
+        device_timestamp=device_ts,
+        values=values,
+        is_valid=_validate_reading(
+            values["temperature"],
+            values["humidity"],
+            values["pressure"],
+            values["iaq"],
+            values["pm25"],
+            values["pm10"],
+        ),
+    )
+
+
+def build_sensor_reading(
+    payload: dict | SensorPayload,
+    device: Device,
+    workshop_id: int,
+    pit_id: int,
+) -> SensorData:
+    """
+    Build a SensorData instance from a parsed payload without touching the DB.
+
+    Determines sensor type from device configuration and payload content.
+    All non-applicable fields are stored as NULL. Used directly by the
+    batched ingest writer, which inserts many readings in one statement.
+
+    Args:
+        payload: Decoded SensorPayload, or a parsed MQTT payload dict
+                 (coerced with coerce_sensor_payload)
+        device: Device ORM model instance (or any object exposing device_id
+                and the primary/air-quality sensor codes)
+        workshop_id: Workshop ID (denormalized)
+        pit_id: Pit ID
+
+    Returns:
+        Transient SensorData instance (not yet added to a session)
+    """
+    now = utc_now()
+    decoded = payload if isinstance(payload, SensorPayload) else coerce_sensor_payload(payload)
+    values = decoded.values
+
+    # Determine sensor types
+    primary_type = device.primary_sensor_code   # 'DHT22' or 'BME680'
+    aq_type = device.air_quality_sensor_code     # 'PMS5003' or None
+
+    # Use provided IAQ or calculate from gas resistance
+    iaq = values["iaq"]
+    if iaq is None and values["gas_resistance"] is not None:
+        iaq = _calculate_iaq_from_gas_resistance(values["gas_resistance"])
+
+    is_valid = decoded.is_valid
+
+    reading = SensorData(
+        device_id=device.device_id,
+        pit_id=pit_id,
+        workshop_id=workshop_id,
+        primary_sensor_type=primary_type,
+        air_quality_sensor_type=aq_type,
+        # Shared fields (DHT22 or BME680)
+        temperature=values["temperature"],
+        humidity=values["humidity"],
+        # BME680-specific (None for DHT22)
+        pressure=values["pressure"],
+        gas_resistance=values["gas_resistance"],
+        iaq=iaq,
+        iaq_accuracy=values["iaq_accuracy"],
+        # PMS5003-specific (None for BME680-only)
+        pm1=values["pm1"],
+        pm25=values["pm25"],
+        pm10=values["pm10"],
+        particles_03um=values["particles_03um"],
+        particles_05um=values["particles_05um"],
+        particles_10um=values["particles_10um"],
+        particles_25um=values["particles_25um"],
+        particles_50um=values["particles_50um"],
+        particles_100um=values["particles_100um"],
+        # Validity
+        is_valid=is_valid,
+        device_timestamp=decoded.device_timestamp,
+        created_at=now,
+    )
+
+    if not is_valid:
+        logger.warning(
+            f"Invalid sensor reading from device '{device.device_id}': "
+            f"temp={reading.temperature} hum={reading.humidity} "
+            f"pm25={reading.pm25} pm10={reading.pm10}"
+        )
+
+    return reading
+
+
 async def store_sensor_reading(
     db: AsyncSession,
     payload: dict,
@@ -147,8 +317,8 @@ async def store_sensor_reading(
     """
     Store a validated sensor reading to the database.
 
-    Determines sensor type from device configuration and payload content.
-    All non-applicable fields are stored as NULL.
+    Single-row path (add + flush). The MQTT ingest path uses the batched
+    writer in ingest_writer.py instead.
 
     Args:
         db: Database session
@@ -161,72 +331,7 @@ async def store_sensor_reading(
         SensorData instance if stored, None on error
     """
     try:
-        now = utc_now()
-
-        # Parse device timestamp if present
-        device_ts = None
-        if "timestamp" in payload:
-            try:
-                device_ts = datetime.fromisoformat(
-                    payload["timestamp"].replace("Z", "+00:00")
-                )
-            except (ValueError, AttributeError):
-                logger.warning(f"Invalid device timestamp: {payload.get('timestamp')}")
-
-        # Determine sensor types
-        primary_type = device.primary_sensor_code   # 'DHT22' or 'BME680'
-        aq_type = device.air_quality_sensor_code     # 'PMS5003' or None
-
-        temperature = _safe_float(payload.get("temperature"))
-        humidity = _safe_float(payload.get("humidity"))
-        pressure = _safe_float(payload.get("pressure"))
-        gas_resistance = _safe_float(payload.get("gas_resistance"))
-        
-        # Use provided IAQ or calculate from gas resistance
-        iaq = _safe_float(payload.get("iaq"))
-        if iaq is None and gas_resistance is not None:
-            iaq = _calculate_iaq_from_gas_resistance(gas_resistance)
-        
-        pm25 = _safe_float(payload.get("pm25"))
-        pm10 = _safe_float(payload.get("pm10"))
-
-        is_valid = _validate_reading(temperature, humidity, pressure, iaq, pm25, pm10)
-
-        reading = SensorData(
-            device_id=device.device_id,
-            pit_id=pit_id,
-            workshop_id=workshop_id,
-            primary_sensor_type=primary_type,
-            air_quality_sensor_type=aq_type,
-            # Shared fields (DHT22 or BME680)
-            temperature=temperature,
-            humidity=humidity,
-            # BME680-specific (None for DHT22)
-            pressure=pressure,
-            gas_resistance=gas_resistance,
-            iaq=iaq,
-            iaq_accuracy=_safe_int(payload.get("iaq_accuracy")),
-            # PMS5003-specific (None for BME680-only)
-            pm1=_safe_float(payload.get("pm1")),
-            pm25=pm25,
-            pm10=pm10,
-            particles_03um=_safe_int(payload.get("particles_03um")),
-            particles_05um=_safe_int(payload.get("particles_05um")),
-            particles_10um=_safe_int(payload.get("particles_10um")),
-            particles_25um=_safe_int(payload.get("particles_25um")),
-            particles_50um=_safe_int(payload.get("particles_50um")),
-            particles_100um=_safe_int(payload.get("particles_100um")),
-            # Validity
-            is_valid=is_valid,
-            device_timestamp=device_ts,
-            created_at=now,
-        )
-
-        if not is_valid:
-            logger.warning(
-                f"Invalid sensor reading from device '{device.device_id}': "
-                f"temp={temperature} hum={humidity} pm25={pm25} pm10={pm10}"
-            )
+        reading = build_sensor_reading(payload, device, workshop_id, pit_id)
 
         db.add(reading)
         await db.flush()  # get ID without commit
@@ -246,55 +351,74 @@ async def store_sensor_reading(
         return None
 
 
+async def latest_reading(
+    db: AsyncSession,
+    pit_id: int,
+    valid_only: bool = False,
+) -> Optional[SensorData]:
+    """
+    Newest reading of a pit.
+
+    Looks within the last sensor.latest_reading_lookback_days first, so on
+    the partitioned table only the newest partitions are scanned; falls
+    back to the full history for pits that have been silent longer.
+    """
+    query = select(SensorData).where(SensorData.pit_id == pit_id)
+    if valid_only:
+        query = query.where(SensorData.is_valid.is_(True))
+    query = query.order_by(SensorData.created_at.desc()).limit(1)
+
+    since = utc_now() - timedelta(days=settings.SENSOR_LATEST_LOOKBACK_DAYS)
+    result = await db.execute(query.where(SensorData.created_at >= since))
+    reading = result.scalar_one_or_none()
+    if reading is None:
+        result = await db.execute(query.where(SensorData.created_at < since))
+        reading = result.scalar_one_or_none()
+    return reading
+
+
 async def evaluate_alerts(
     db: AsyncSession,
     reading: SensorData,
     workshop_id: int,
     pit_id: int,
+    thresholds: Optional[EffectiveThresholds] = None,
+    cooldowns: Optional[AlertCooldownTracker] = None,
 ) -> list[Alert]:
     """
     Check sensor reading against alert thresholds and create alerts.
 
-    Resolution order for each threshold:
-      1. Per-pit PitAlertConfig (if set and non-null)
-      2. Per-workshop AlertConfig
-      3. Hardcoded defaults
+    Thresholds come from the shared per-pit cache (pit override →
+    workshop config → default, see threshold_cache.py).
 
     Args:
         db: Database session
         reading: SensorData instance just stored
         workshop_id: Workshop to fetch alert config for
         pit_id: Pit that triggered the reading
+        thresholds: Pre-resolved thresholds (looked up in the cache if omitted)
+        cooldowns: Cooldown tracker; defaults to the global one once seeded,
+            otherwise cooldowns are checked against the alerts table
 
     Returns:
         List of Alert objects created (empty if no violations)
     """
     triggered_alerts = []
-    COOLDOWN_MINUTES = 5
+    tracker = cooldowns
+    if tracker is None and alert_cooldowns.is_seeded:
+        tracker = alert_cooldowns
 
     try:
-        # Fetch workshop alert config
-        config_result = await db.execute(
-            select(AlertConfig).where(AlertConfig.workshop_id == workshop_id)
-        )
-        config = config_result.scalar_one_or_none()
+        if thresholds is None:
+            thresholds = await threshold_cache.get(db, workshop_id, pit_id)
 
-        # Fetch per-pit alert config overrides
-        pit_config_result = await db.execute(
-            select(PitAlertConfig).where(PitAlertConfig.pit_id == pit_id)
-        )
-        pit_config = pit_config_result.scalar_one_or_none()
-
-        # Resolve thresholds: pit override → workshop config → default
-        temp_min = _resolve_threshold(pit_config, config, "temp_min", 15.0)
-        temp_max = _resolve_threshold(pit_config, config, "temp_max", 35.0)
-        humidity_max = _resolve_threshold(pit_config, config, "humidity_max", 70.0)
-        pm25_warning = _resolve_threshold(pit_config, config, "pm25_warning", 12.0)
-        pm25_critical = _resolve_threshold(pit_config, config, "pm25_critical", 35.4)
-        pm10_warning = _resolve_threshold(pit_config, config, "pm10_warning", 54.0)
-        pm10_critical = _resolve_threshold(pit_config, config, "pm10_critical", 154.0)
-        iaq_warning = _resolve_threshold(pit_config, config, "iaq_warning", 100.0)
-        iaq_critical = _resolve_threshold(pit_config, config, "iaq_critical", 150.0)
+        temp_min = thresholds.temp_min
+        temp_max = thresholds.temp_max
+        humidity_max = thresholds.humidity_max
+        pm25_warning = thresholds.pm25_warning
+        pm25_critical = thresholds.pm25_critical
+        iaq_warning = thresholds.iaq_warning
+        iaq_critical = thresholds.iaq_critical
 
         now = utc_now()
 
@@ -307,7 +431,7 @@ async def evaluate_alerts(
                     if reading.temperature < temp_min
                     else AlertType.TEMP_TOO_HIGH
                 )
-                if not await _alert_on_cooldown(db, reading.device_id, pit_id, alert_type, COOLDOWN_MINUTES):
+                if not await _on_cooldown(db, tracker, reading.device_id, pit_id, alert_type):
                     threshold = temp_min if reading.temperature < temp_min else temp_max
                     alert = _create_alert(
                         workshop_id=workshop_id,
@@ -330,7 +454,7 @@ async def evaluate_alerts(
         if reading.humidity is not None:
             hum_status = evaluate_humidity_status(reading.humidity, humidity_max)
             if hum_status == SensorStatus.WARNING:
-                if not await _alert_on_cooldown(db, reading.device_id, pit_id, AlertType.HUMIDITY_TOO_HIGH, COOLDOWN_MINUTES):
+                if not await _on_cooldown(db, tracker, reading.device_id, pit_id, AlertType.HUMIDITY_TOO_HIGH):
                     alert = _create_alert(
                         workshop_id=workshop_id,
                         pit_id=pit_id,
@@ -351,7 +475,7 @@ async def evaluate_alerts(
         if reading.pm25 is not None:
             pm25_status = evaluate_pm25_status(reading.pm25, pm25_warning, pm25_critical)
             if pm25_status in (SensorStatus.WARNING, SensorStatus.CRITICAL):
-                if not await _alert_on_cooldown(db, reading.device_id, pit_id, AlertType.HIGH_PM25, COOLDOWN_MINUTES):
+                if not await _on_cooldown(db, tracker, reading.device_id, pit_id, AlertType.HIGH_PM25):
                     severity = (
                         AlertSeverity.CRITICAL
                         if pm25_status == SensorStatus.CRITICAL
@@ -380,7 +504,7 @@ async def evaluate_alerts(
         if reading.iaq is not None:
             iaq_status = evaluate_iaq_status(reading.iaq, iaq_warning, iaq_critical)
             if iaq_status in (SensorStatus.WARNING, SensorStatus.CRITICAL):
-                if not await _alert_on_cooldown(db, reading.device_id, pit_id, AlertType.HIGH_IAQ, COOLDOWN_MINUTES):
+                if not await _on_cooldown(db, tracker, reading.device_id, pit_id, AlertType.HIGH_IAQ):
                     severity = (
                         AlertSeverity.CRITICAL
                         if iaq_status == SensorStatus.CRITICAL
@@ -406,6 +530,9 @@ async def evaluate_alerts(
                     triggered_alerts.append(alert)
 
         if triggered_alerts:
+            if tracker is not None:
+                for alert in triggered_alerts:
+                    tracker.record(alert)
             logger.info(
                 f"Generated {len(triggered_alerts)} alert(s) for pit_id={pit_id} "
                 f"workshop_id={workshop_id}"
@@ -420,6 +547,19 @@ async def evaluate_alerts(
     return triggered_alerts
 
 
+async def _on_cooldown(
+    db: AsyncSession,
+    tracker: Optional[AlertCooldownTracker],
+    device_id: str,
+    pit_id: int,
+    alert_type: str,
+) -> bool:
+    """In-memory cooldown check when a tracker is available, else a DB query."""
+    if tracker is not None:
+        return tracker.on_cooldown(device_id, pit_id, alert_type)
+    return await _alert_on_cooldown(db, device_id, pit_id, alert_type, ALERT_COOLDOWN_MINUTES)
+
+
 async def _alert_on_cooldown(
     db: AsyncSession,
     device_id: str,
@@ -479,19 +619,21 @@ def _validate_reading(
     pm25: Optional[float],
     pm10: Optional[float],
 ) -> bool:
-    """Return False if any value is outside physically plausible sensor ranges."""
-    if temperature is not None and not (-40.0 <= temperature <= 80.0):
-        return False
-    if humidity is not None and not (0.0 <= humidity <= 100.0):
-        return False
-    if pressure is not None and not (300.0 <= pressure <= 1100.0):
-        return False
-    if iaq is not None and not (0.0 <= iaq <= 500.0):
-        return False
-    if pm25 is not None and not (0.0 <= pm25 <= 1000.0):
-        return False
-    if pm10 is not None and not (0.0 <= pm10 <= 1000.0):
-        return False
+    """
+    Return False if any value is outside physically plausible sensor ranges
+    (payload_decoder.VALID_RANGES, shared with the fast-path decoder).
+    """
+    for name, value in (
+        ("temperature", temperature),
+        ("humidity", humidity),
+        ("pressure", pressure),
+        ("iaq", iaq),
+        ("pm25", pm25),
+        ("pm10", pm10),
+    ):
+        lo, hi = VALID_RANGES[name]
+        if value is not None and not (lo <= value <= hi):
+            return False
     return True
 
 
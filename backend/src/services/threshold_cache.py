@@ -0,0 +1,196 @@
+"""
+Module: threshold_cache.py
+Purpose:
+    Effective alert thresholds per pit, resolved once and kept in memory.
+
+    Resolution order for every threshold:
+      1. Per-pit PitAlertConfig (if set and non-null)
+      2. Per-workshop AlertConfig
+      3. Hardcoded defaults (WHO 2021)
+
+    The ingest path (evaluate_alerts), the dashboard read endpoints and the
+    pit alert-config GET (which also reports where each value came from)
+    share the same EffectiveThresholds object. Entries are rebuilt when the
+    workshop alert-config PATCH or the pit alert-config PUT commits a change;
+    those only reach this process and an external ingest peer, so a TTL
+    bounds how long another uvicorn worker keeps the old values.
+
+Author: PPF Monitoring Team
+Created: 2026-03-11
+"""
+
+import time
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import get_settings
+from src.models.alert import AlertConfig
+from src.models.pit_alert_config import PitAlertConfig
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# (field, default) — used when neither the pit nor the workshop sets a value
+THRESHOLD_DEFAULTS: tuple[tuple[str, float], ...] = (
+    ("temp_min", 15.0),
+    ("temp_max", 35.0),
+    ("humidity_max", 70.0),
+    ("pm25_warning", 12.0),
+    ("pm25_critical", 35.4),
+    ("pm10_warning", 54.0),
+    ("pm10_critical", 154.0),
+    ("iaq_warning", 100.0),
+    ("iaq_critical", 150.0),
+    ("device_offline_threshold_seconds", 60),
+)
+
+_FIELDS = tuple(field for field, _ in THRESHOLD_DEFAULTS)
+
+
+def _resolve_threshold(pit_cfg, ws_cfg, field: str, default) -> tuple:
+    """
+    Return (value, source): pit override if set, else workshop config,
+    else hardcoded default. source is "pit", "workshop" or "default".
+    """
+    if pit_cfg is not None:
+        val = getattr(pit_cfg, field, None)
+        if val is not None:
+            return val, "pit"
+    if ws_cfg is not None:
+        val = getattr(ws_cfg, field, None)
+        if val is not None:
+            return val, "workshop"
+    return default, "default"
+
+
+class EffectiveThresholds:
+    """Fully resolved thresholds for one pit. Treat as read-only."""
+
+    __slots__ = ("workshop_id", "pit_id", "sources") + _FIELDS
+
+    def __init__(
+        self,
+        workshop_id: int,
+        pit_id: int,
+        ws_config: Optional[AlertConfig] = None,
+        pit_config: Optional[PitAlertConfig] = None,
+    ):
+        self.workshop_id = workshop_id
+        self.pit_id = pit_id
+        self.sources: dict[str, str] = {}
+        for field, default in THRESHOLD_DEFAULTS:
+            value, self.sources[field] = _resolve_threshold(pit_config, ws_config, field, default)
+            setattr(self, field, value)
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in _FIELDS}
+
+    def as_sourced_dict(self) -> dict:
+        """as_dict() plus <field>_source for each field."""
+        result = {}
+        for field in _FIELDS:
+            result[field] = getattr(self, field)
+            result[f"{field}_source"] = self.sources[field]
+        return result
+
+
+class ThresholdCache:
+    """
+    Process-local pit_id → EffectiveThresholds map.
+
+    Args:
+        ttl_seconds: Entry lifetime; 0 disables caching
+    """
+
+    def __init__(self, ttl_seconds: int = settings.THRESHOLD_CACHE_TTL_SECONDS):
+        self.ttl = max(0, ttl_seconds)
+        self._by_pit: dict[int, tuple[float, EffectiveThresholds]] = {}
+        # Set in API processes when ingest runs in its own process
+        # (ingest_ipc.py): invalidations are mirrored there
+        self.peer: Optional[Callable[[dict], None]] = None
+
+    def _cached(self, pit_id: int, now: float) -> Optional[EffectiveThresholds]:
+        entry = self._by_pit.get(pit_id)
+        if entry is None or now >= entry[0]:
+            return None
+        return entry[1]
+
+    async def get(self, db: AsyncSession, workshop_id: int, pit_id: int) -> EffectiveThresholds:
+        """Return cached thresholds for a pit, loading them on first use or after expiry."""
+        cached = self._cached(pit_id, time.monotonic())
+        if cached is not None:
+            return cached
+        return (await self.get_many(db, workshop_id, [pit_id]))[pit_id]
+
+    async def get_many(
+        self,
+        db: AsyncSession,
+        workshop_id: int,
+        pit_ids: Iterable[int],
+    ) -> dict[int, EffectiveThresholds]:
+        """
+        Thresholds for several pits of one workshop.
+        Misses and expired entries are loaded with one AlertConfig and one
+        PitAlertConfig query.
+        """
+        pit_ids = list(pit_ids)
+        now = time.monotonic()
+        found = {}
+        for pid in pit_ids:
+            cached = self._cached(pid, now)
+            if cached is not None:
+                found[pid] = cached
+        missing = [pid for pid in pit_ids if pid not in found]
+        if not missing:
+            return found
+
+        ws_result = await db.execute(
+            select(AlertConfig).where(AlertConfig.workshop_id == workshop_id)
+        )
+        ws_config = ws_result.scalar_one_or_none()
+
+        if len(missing) == 1:
+            pit_result = await db.execute(
+                select(PitAlertConfig).where(PitAlertConfig.pit_id == missing[0])
+            )
+            pit_row = pit_result.scalar_one_or_none()
+            pit_configs = {missing[0]: pit_row} if pit_row is not None else {}
+        else:
+            pit_result = await db.execute(
+                select(PitAlertConfig).where(PitAlertConfig.pit_id.in_(missing))
+            )
+            pit_configs = {cfg.pit_id: cfg for cfg in pit_result.scalars().all()}
+
+        expires = time.monotonic() + self.ttl
+        for pid in missing:
+            entry = EffectiveThresholds(workshop_id, pid, ws_config, pit_configs.get(pid))
+            if self.ttl:
+                self._by_pit[pid] = (expires, entry)
+            found[pid] = entry
+        return found
+
+    def invalidate_pit(self, pit_id: int) -> None:
+        """Drop one pit's entry. Call after committing a PitAlertConfig change."""
+        self._by_pit.pop(pit_id, None)
+        if self.peer is not None:
+            self.peer({"op": "pit_thresholds", "pit_id": pit_id})
+
+    def invalidate_workshop(self, workshop_id: int) -> None:
+        """Drop every pit of a workshop. Call after committing an AlertConfig change."""
+        for pid in [pid for pid, (_, t) in self._by_pit.items() if t.workshop_id == workshop_id]:
+            del self._by_pit[pid]
+        if self.peer is not None:
+            self.peer({"op": "workshop_thresholds", "workshop_id": workshop_id})
+        logger.debug(f"Threshold cache invalidated for workshop_id={workshop_id}")
+
+    def clear(self) -> None:
+        self._by_pit.clear()
+
+    def __len__(self) -> int:
+        return len(self._by_pit)
+
+
+threshold_cache = ThresholdCache()
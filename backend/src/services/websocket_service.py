@@ -11,7 +11,7 @@ Created: 2026-02-21
 
 import json
 from collections import defaultdict
-from typing import Optional
+from typing import Callable, Optional
 
 from fastapi import WebSocket
 
@@ -41,6 +41,9 @@ class ConnectionManager:
         self._pit_connections: dict[int, set[WebSocket]] = defaultdict(set)
         # WebSocket → metadata dict
         self._connection_meta: dict[WebSocket, dict] = {}
+        # Set in a standalone ingest process (ingest_ipc.py): events are
+        # handed to the API processes instead of local sockets
+        self.forward: Optional[Callable[[str, int, dict], None]] = None
 
     async def connect(
         self,
@@ -107,12 +110,18 @@ class ConnectionManager:
 
     async def broadcast_to_workshop(self, workshop_id: int, data: dict) -> None:
         """Send event to all connections subscribed to a workshop."""
+        if self.forward is not None:
+            self.forward("workshop", workshop_id, data)
+            return
         sockets = list(self._workshop_connections.get(workshop_id, set()))
         for ws in sockets:
             await self._send_to_socket(ws, data)
 
     async def broadcast_to_pit(self, pit_id: int, data: dict) -> None:
         """Send event to all connections subscribed to a specific pit."""
+        if self.forward is not None:
+            self.forward("pit", pit_id, data)
+            return
         sockets = list(self._pit_connections.get(pit_id, set()))
         for ws in sockets:
             await self._send_to_socket(ws, data)
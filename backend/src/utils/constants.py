@@ -161,6 +161,10 @@ MQTT_SUBSCRIBE_DEVICE_STATUS = "workshop/+/device/+/status"
 
 # Provisioning topics
 MQTT_SUBSCRIBE_PROVISIONING = "provisioning/announce"
+
+# Shared subscription (MQTT 5 / mosquitto ≥1.6 / HiveMQ / EMQX): each message
+# on the filter goes to ONE member of the group instead of every subscriber
+MQTT_SHARED_SUBSCRIPTION = "$share/{group}/{topic}"
 MQTT_TOPIC_PROVISIONING_CONFIG = "provisioning/{device_id}/config"
 
 
@@ -9,6 +9,7 @@ Author: PPF Monitoring Team
 Created: 2026-02-21
 """
 
+import hashlib
 import random
 import secrets
 import string
@@ -214,3 +215,28 @@ def mask_license_key(license_key: str) -> str:
     if len(parts) < 2:
         return "***"
     return f"{parts[0]}-{parts[1]}-****-****"
+
+
+# Compact binary sensor payloads carry a short token instead of the key
+LICENSE_TOKEN_PREFIX = "tok:"
+LICENSE_TOKEN_BYTES = 8
+
+
+def license_token(license_key: str) -> str:
+    """
+    Short license token used by compact binary sensor payloads.
+
+    Returns:
+        str: 'tok:' + hex of the first 8 bytes of SHA-256(license_key)
+    """
+    digest = hashlib.sha256(license_key.encode("utf-8")).digest()
+    return LICENSE_TOKEN_PREFIX + digest[:LICENSE_TOKEN_BYTES].hex()
+
+
+def license_key_matches(expected: Optional[str], sent: str) -> bool:
+    """Compare a device's license key with a sent key or short token."""
+    if expected is None:
+        return False
+    if isinstance(sent, str) and sent.startswith(LICENSE_TOKEN_PREFIX):
+        return secrets.compare_digest(license_token(expected), sent)
+    return expected == sent
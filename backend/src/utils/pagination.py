@@ -0,0 +1,114 @@
+"""
+Module: pagination.py
+Purpose:
+    Keyset (cursor) pagination for newest-first list endpoints.
+
+    OFFSET paging reads and discards every skipped row, and its count(*)
+    scans the whole filtered set — both grow with the table. Keyset paging
+    instead continues from the last row served: rows are ordered by
+    (created_at DESC, id DESC) and the next page is everything strictly
+    after that pair, which an index on created_at serves directly however
+    deep the client goes. The pair travels as an opaque next_cursor.
+    The condition is spelled created_at <= t AND (created_at < t OR
+    id < i) rather than as a row comparison, so the plain bound on
+    created_at can use the existing (…, created_at) indexes.
+
+    The total is optional and estimated: on PostgreSQL it is the planner's
+    row estimate for the filtered query (no scan), elsewhere an exact
+    count(*).
+
+Author: PPF Monitoring Team
+Created: 2026-03-22
+"""
+
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import Select, and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just after (created_at, row_id)."""
+    if created_at.tzinfo is None:
+        # SQLite hands timestamps back naive; they are stored as UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    payload = json.dumps([created_at.astimezone(timezone.utc).isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Inverse of encode_cursor.
+
+    Raises:
+        ValueError: The cursor was not produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>, bound parameters intact."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+    """Rows query would return — planner estimate on PostgreSQL, exact elsewhere."""
+    if db.get_bind().dialect.name == "postgresql":
+        plan = (await db.execute(_Explain(query))).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return (await db.execute(select(func.count()).select_from(query.subquery()))).scalar_one()
+
+
+async def keyset_page(
+    db: AsyncSession,
+    query: Select,
+    created_col: Any,
+    id_col: Any,
+    cursor: Optional[str],
+    page_size: int,
+) -> tuple[list, Optional[str]]:
+    """
+    One page of query, newest first, starting after cursor (None = first page).
+
+    Returns:
+        (rows, next_cursor) — next_cursor is None on the last page
+
+    Raises:
+        ValueError: Invalid cursor
+    """
+    if cursor:
+        after_at, after_id = decode_cursor(cursor)
+        query = query.where(and_(
+            created_col <= after_at,
+            or_(created_col < after_at, id_col < after_id),
+        ))
+    result = await db.execute(
+        query.order_by(created_col.desc(), id_col.desc()).limit(page_size + 1)
+    )
+    rows = list(result.scalars().all())
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
@@ -2,7 +2,8 @@
 conftest.py
 Purpose:
     Shared pytest fixtures for the entire test suite.
-    Provides: in-memory SQLite DB, async test client, auth tokens per role.
+    Provides: in-memory SQLite DB, async test client, auth tokens per role,
+    a seeded workshop/pit/device and a SensorData factory for history tests.
 
     Test isolation strategy:
       - StaticPool forces all connections to the SAME in-memory SQLite database.
@@ -55,9 +56,22 @@ from sqlalchemy.pool import StaticPool
 
 from src.config.database import Base, get_db
 from src.main import app
+from src.models.device import Device
+from src.models.pit import Pit
+from src.models.sensor_data import SensorData
 from src.models.user import User
+from src.models.workshop import Workshop
+from src.services.alert_cooldown import alert_cooldowns
 from src.services.auth_service import create_access_token, hash_password
+from src.services.ingest_metrics import ingest_metrics
+from src.services.latest_readings import latest_readings
+from src.services.license_service import license_cache
+from src.services.liveness import liveness
+from src.services.offline_detector import offline_detector
+from src.services.reading_dedup import reading_dedup
+from src.services.threshold_cache import threshold_cache
 from src.utils.constants import UserRole
+from src.utils.helpers import utc_now
 
 # ─── Test database engine ─────────────────────────────────────────────────────
 # StaticPool: all engine.connect() calls return the SAME underlying connection
@@ -110,6 +124,7 @@ async def clean_db(setup_test_db):
 
     Uses reversed sorted_tables order to respect FK constraints on delete.
     Disable FK enforcement during truncation for SQLite compatibility.
+    In-process caches of those rows are cleared as well.
     """
     yield  # test runs first
     async with test_engine.begin() as conn:
@@ -117,6 +132,14 @@ async def clean_db(setup_test_db):
         for table in reversed(Base.metadata.sorted_tables):
             await conn.execute(table.delete())
         await conn.execute(text("PRAGMA foreign_keys = ON"))
+    license_cache.clear()
+    threshold_cache.clear()
+    alert_cooldowns.clear()
+    liveness.clear()
+    offline_detector.clear()
+    reading_dedup.clear()
+    ingest_metrics.clear()
+    latest_readings.clear()
 
 
 # ─── Per-test session ─────────────────────────────────────────────────────────
@@ -130,6 +153,66 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+# ─── Seeded pits and readings ─────────────────────────────────────────────────
+SENSOR_DEVICE_ID = "ESP32-TESTPIT00001"
+
+
+@pytest.fixture
+def pit_options(request) -> dict:
+    """
+    Options for seeded_pits: {"pits": n, "plan": "<subscription plan>"}.
+    Override this fixture in a module, or parametrise it indirectly.
+    """
+    return getattr(request, "param", {})
+
+
+@pytest_asyncio.fixture
+async def seeded_pits(db_session: AsyncSession, pit_options: dict) -> list[dict]:
+    """
+    One workshop with pit_options["pits"] pits (default 1), and an active
+    device (SENSOR_DEVICE_ID) on the first. Pits come back as
+    {"id", "workshop_id"} dicts — ORM objects expire on later commits.
+    """
+    workshop = Workshop(name="Sensor Shop", slug="sensor-shop", created_at=utc_now())
+    if "plan" in pit_options:
+        workshop.subscription_plan = pit_options["plan"]
+    db_session.add(workshop)
+    await db_session.flush()
+    pits = [
+        Pit(workshop_id=workshop.id, pit_number=n, name=f"Bay {n}")
+        for n in range(1, pit_options.get("pits", 1) + 1)
+    ]
+    db_session.add_all(pits)
+    await db_session.flush()
+    db_session.add(Device(
+        device_id=SENSOR_DEVICE_ID, license_key="LIC-TEST-PIT0-0001", status="active",
+        workshop_id=workshop.id, pit_id=pits[0].id,
+    ))
+    seeded = [{"id": pit.id, "workshop_id": workshop.id} for pit in pits]
+    await db_session.commit()
+    return seeded
+
+
+@pytest_asyncio.fixture
+async def seeded_pit(seeded_pits: list[dict]) -> dict:
+    """The first of seeded_pits."""
+    return seeded_pits[0]
+
+
+def make_reading(pit: dict, created_at, **values) -> SensorData:
+    """
+    Unsaved SensorData from SENSOR_DEVICE_ID for a seeded pit. Temperature
+    21.0 and is_valid True unless given (set here, not by the column
+    default, so code reading unflushed rows sees them too).
+    """
+    values.setdefault("temperature", 21.0)
+    values.setdefault("is_valid", True)
+    return SensorData(
+        device_id=SENSOR_DEVICE_ID, pit_id=pit["id"], workshop_id=pit["workshop_id"],
+        created_at=created_at, **values,
+    )
+
+
 # ─── HTTP test client ─────────────────────────────────────────────────────────
 @pytest_asyncio.fixture
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
@@ -72,3 +72,22 @@ class TestHealthEndpoint:
         assert response.status_code in (200, 503)  # 503 if DB not connected in test
         data = response.json()
         assert "status" in data
+
+    async def test_metrics_include_ingest_section(
+        self, client: AsyncClient, super_admin_headers: dict
+    ):
+        """GET /metrics exposes ingest queue/writer counters (null when not running)."""
+        response = await client.get("/metrics", headers=super_admin_headers)
+        assert response.status_code == 200
+        ingest = response.json()["data"]["ingest"]
+        assert set(ingest) >= {"queue", "writer", "license_cache"}
+
+    async def test_metrics_prometheus_format(
+        self, client: AsyncClient, super_admin_headers: dict
+    ):
+        """GET /metrics?format=prometheus returns stage histograms as text."""
+        response = await client.get("/metrics?format=prometheus", headers=super_admin_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'ppf_ingest_stage_duration_seconds_count{stage="commit"}' in response.text
+        assert "ppf_uptime_seconds" in response.text
@@ -229,6 +229,47 @@ class TestListJobs:
         )
         assert resp.status_code == 200
 
+    @pytest.mark.asyncio
+    async def test_cursor_pagination(
+        self, client: AsyncClient, super_admin_headers: dict, db_session: AsyncSession,
+        workshop: Workshop, pit: Pit, job: Job
+    ):
+        created_at = job.created_at
+        for plate in ("MH12AB0002", "MH12AB0003"):
+            db_session.add(Job(
+                workshop_id=workshop.id, pit_id=pit.id, work_type="Full PPF",
+                status="waiting", car_plate=plate, currency="INR", created_at=created_at,
+            ))
+        await db_session.flush()
+
+        url = f"/api/v1/workshops/{workshop.id}/jobs?pagination=cursor&page_size=2&estimate_total=true"
+        resp = await client.get(url, headers=super_admin_headers)
+        assert resp.status_code == 200
+        first = resp.json()["data"]
+        assert len(first["items"]) == 2
+        assert first["has_next"] is True
+        assert first["estimated_total"] == 3
+
+        resp = await client.get(
+            f"/api/v1/workshops/{workshop.id}/jobs",
+            params={"cursor": first["next_cursor"], "page_size": 2},
+            headers=super_admin_headers,
+        )
+        second = resp.json()["data"]
+        assert second["next_cursor"] is None
+        ids = [item["id"] for item in first["items"] + second["items"]]
+        assert len(set(ids)) == 3
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_rejected(
+        self, client: AsyncClient, super_admin_headers: dict, workshop: Workshop
+    ):
+        resp = await client.get(
+            f"/api/v1/workshops/{workshop.id}/jobs?cursor=bogus",
+            headers=super_admin_headers,
+        )
+        assert resp.status_code == 400
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # DETAIL   GET /jobs/{job_id}
@@ -0,0 +1,177 @@
+"""
+test_sensor_endpoints.py
+Integration tests for the chart series endpoints.
+
+Actual API URL map (prefix /api/v1):
+  GET    /pits/{id}/sensors/series        — bucketed or LTTB-downsampled series
+  GET    /pits/{id}/sensors/history       — paginated, or LTTB-downsampled with max_points
+
+Tests:
+  - Unknown or empty metric lists are rejected
+  - Without bucket, the finest width that fits the range is chosen
+  - Bucket values match the readings; only the requested metrics are returned
+  - A range needing more than SERIES_MAX_BUCKETS buckets is rejected
+  - from_dt must be before to_dt
+  - bucket and max_points cannot be combined
+  - history with max_points returns the downsampled raw series, spikes kept;
+    it cannot be combined with cursor pagination
+
+Author: PPF Monitoring Team
+Created: 2026-03-23
+"""
+
+from datetime import timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.routes.sensors import SERIES_MAX_BUCKETS
+from src.services.sensor_rollups import floor_time
+from src.utils.helpers import utc_now
+from tests.conftest import make_reading
+
+
+def _url(pit: dict) -> str:
+    return f"/api/v1/pits/{pit['id']}/sensors/series"
+
+
+def _range(hours: float) -> dict:
+    end = floor_time(utc_now(), 3600)
+    return {"from_dt": (end - timedelta(hours=hours)).isoformat(), "to_dt": end.isoformat()}
+
+
+class TestSensorSeries:
+
+    @pytest.mark.asyncio
+    async def test_unknown_metric_rejected(
+        self, client: AsyncClient, super_admin_headers: dict, seeded_pit: dict
+    ):
+        resp = await client.get(
+            _url(seeded_pit), params={"metrics": "temperature,co2"}, headers=super_admin_headers,
+        )
+        assert resp.status_code == 400
+        assert "co2" in resp.json()["detail"]
+
+        resp = await client.get(_url(seeded_pit), params={"metrics": " , "}, headers=super_admin_headers)
+        assert resp.status_code == 400
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("hours, bucket", [
+        (2, "1m"), (24, "1m"), (72, "5m"), (24 * 30, "1h"), (24 * 200, "1d"),
+    ])
+    async def test_bucket_chosen_from_range(
+        self, client: AsyncClient, super_admin_headers: dict, seeded_pit: dict, hours, bucket
+    ):
+        resp = await client.get(_url(seeded_pit), params=_range(hours), headers=super_admin_headers)
+        assert resp.status_code == 200
+        assert resp.json()["bucket"] == bucket
+
+    @pytest.mark.asyncio
+    async def test_bucket_values(
+        self, client: AsyncClient, super_admin_headers: dict, db_session: AsyncSession, seeded_pit: dict
+    ):
+        params = _range(2)
+        hour = floor_time(utc_now(), 3600) - timedelta(hours=2)
+        db_session.add_all(
+            make_reading(seeded_pit, hour + timedelta(minutes=10 * i), temperature=20.0 + i, pm25=5.0)
+            for i in range(6)
+        )
+        await db_session.commit()
+
+        resp = await client.get(
+            _url(seeded_pit),
+            params={**params, "bucket": "1h", "metrics": "temperature"},
+            headers=super_admin_headers,
+        )
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["bucket_seconds"] == 3600
+        assert body["reading_count"] == [6]
+        assert body["temperature_avg"] == [22.5]
+        assert body["temperature_min"] == [20.0]
+        assert body["temperature_max"] == [25.0]
+        assert "pm25_avg" not in body
+
+    @pytest.mark.asyncio
+    async def test_too_many_buckets(
+        self, client: AsyncClient, super_admin_headers: dict, seeded_pit: dict
+    ):
+        hours = SERIES_MAX_BUCKETS / 60 + 1
+        resp = await client.get(
+            _url(seeded_pit), params={**_range(hours), "bucket": "1m"}, headers=super_admin_headers,
+        )
+        assert resp.status_code == 400
+        assert f"max {SERIES_MAX_BUCKETS} buckets" in resp.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_from_must_precede_to(
+        self, client: AsyncClient, super_admin_headers: dict, seeded_pit: dict
+    ):
+        params = _range(1)
+        params["from_dt"], params["to_dt"] = params["to_dt"], params["from_dt"]
+        resp = await client.get(_url(seeded_pit), params=params, headers=super_admin_headers)
+        assert resp.status_code == 400
+
+        same = {"from_dt": params["from_dt"], "to_dt": params["from_dt"]}
+        resp = await client.get(_url(seeded_pit), params=same, headers=super_admin_headers)
+        assert resp.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_bucket_and_max_points_conflict(
+        self, client: AsyncClient, super_admin_headers: dict, seeded_pit: dict
+    ):
+        resp = await client.get(
+            _url(seeded_pit),
+            params={**_range(2), "bucket": "5m", "max_points": 100},
+            headers=super_admin_headers,
+        )
+        assert resp.status_code == 400
+        assert "max_points" in resp.json()["detail"]
+
+        resp = await client.get(
+            _url(seeded_pit), params={**_range(2), "max_points": 100}, headers=super_admin_headers,
+        )
+        assert resp.status_code == 200
+        assert resp.json()["max_points"] == 100
+
+
+class TestSensorHistoryDownsampled:
+
+    @pytest.mark.asyncio
+    async def test_max_points_keeps_spike(
+        self, client: AsyncClient, super_admin_headers: dict, db_session: AsyncSession, seeded_pit: dict
+    ):
+        params = _range(2)
+        start = floor_time(utc_now(), 3600) - timedelta(hours=2)
+        db_session.add_all(
+            make_reading(seeded_pit, start + timedelta(seconds=30 * i), pm25=150.0 if i == 97 else 5.0)
+            for i in range(200)
+        )
+        await db_session.commit()
+
+        resp = await client.get(
+            f"/api/v1/pits/{seeded_pit['id']}/sensors/history",
+            params={**params, "max_points": 20},
+            headers=super_admin_headers,
+        )
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["max_points"] == 20
+        pm25 = body["series"]["pm25"]
+        assert pm25["raw_count"] == 200
+        assert len(pm25["values"]) == 20
+        assert max(pm25["values"]) == 150.0
+        assert body["series"]["temperature"]["raw_count"] == 200
+
+    @pytest.mark.asyncio
+    async def test_max_points_not_paginated(
+        self, client: AsyncClient, super_admin_headers: dict, seeded_pit: dict
+    ):
+        resp = await client.get(
+            f"/api/v1/pits/{seeded_pit['id']}/sensors/history",
+            params={"max_points": 50, "pagination": "cursor"},
+            headers=super_admin_headers,
+        )
+        assert resp.status_code == 400
+        assert "max_points" in resp.json()["detail"]
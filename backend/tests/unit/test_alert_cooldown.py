@@ -0,0 +1,160 @@
+"""
+test_alert_cooldown.py
+Unit tests for alert_cooldown.py
+
+Tests:
+  - seed() loads unacknowledged alerts inside the window only
+  - Cooldowns lapse after the window
+  - Acknowledging the tracked alert ends the cooldown; an older one does not
+  - Acknowledging the newest alert leaves an older unacknowledged one in force
+  - sync() drops alerts acknowledged through another process
+  - evaluate_alerts() with a tracker makes no cooldown queries
+
+Author: PPF Monitoring Team
+Created: 2026-03-11
+"""
+
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.alert import Alert
+from src.models.sensor_data import SensorData
+from src.models.workshop import Workshop
+from src.services.alert_cooldown import AlertCooldownTracker
+from src.services.sensor_service import evaluate_alerts
+from src.services.threshold_cache import EffectiveThresholds
+from src.utils.constants import AlertSeverity, AlertType
+from src.utils.helpers import utc_now
+from tests.conftest import TestSessionLocal
+
+
+DEVICE_ID = "ESP32-COOLDOWN0001"
+
+
+def _alert(alert_type=AlertType.HIGH_PM25, created_at=None, **kwargs) -> Alert:
+    fields = dict(
+        workshop_id=1,
+        pit_id=1,
+        device_id=DEVICE_ID,
+        alert_type=alert_type.value,
+        severity=AlertSeverity.WARNING.value,
+        message="test",
+        is_acknowledged=False,
+        created_at=created_at or utc_now(),
+    )
+    fields.update(kwargs)
+    return Alert(**fields)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# AlertCooldownTracker
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestAlertCooldownTracker:
+
+    @pytest.mark.asyncio
+    async def test_seed_loads_active_cooldowns(self, db_session: AsyncSession):
+        workshop = Workshop(name="Cooldown Shop", slug="cooldown-shop", created_at=utc_now())
+        db_session.add(workshop)
+        await db_session.flush()
+        db_session.add_all([
+            _alert(AlertType.HIGH_PM25, workshop_id=workshop.id),
+            _alert(AlertType.HIGH_IAQ, workshop_id=workshop.id, is_acknowledged=True),
+            _alert(
+                AlertType.HUMIDITY_TOO_HIGH,
+                workshop_id=workshop.id,
+                created_at=utc_now() - timedelta(minutes=30),
+            ),
+        ])
+        await db_session.commit()
+
+        tracker = AlertCooldownTracker()
+        assert await tracker.seed(TestSessionLocal) == 1
+        assert tracker.is_seeded
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HIGH_PM25) is True
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HIGH_IAQ) is False
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HUMIDITY_TOO_HIGH) is False
+
+    def test_cooldown_lapses_after_window(self):
+        tracker = AlertCooldownTracker(cooldown_minutes=5)
+        alert = _alert()
+        tracker.record(alert)
+
+        assert tracker.on_cooldown(DEVICE_ID, 1, "high_pm25") is True
+        later = alert.created_at + timedelta(minutes=5, seconds=1)
+        assert tracker.on_cooldown(DEVICE_ID, 1, "high_pm25", now=later) is False
+        assert len(tracker) == 0
+
+    def test_acknowledge_only_clears_tracked_alert(self):
+        tracker = AlertCooldownTracker()
+        old = _alert(created_at=utc_now() - timedelta(minutes=10))
+        new = _alert()
+        tracker.record(old)
+        tracker.record(new)
+
+        tracker.acknowledge(old)
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HIGH_PM25) is True
+
+        tracker.acknowledge(new)
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HIGH_PM25) is False
+
+    def test_ack_newest_while_older_unacked_exists(self):
+        tracker = AlertCooldownTracker(cooldown_minutes=5)
+        older = _alert(created_at=utc_now() - timedelta(minutes=2))
+        newest = _alert()
+        tracker.record(older)
+        tracker.record(newest)
+
+        tracker.acknowledge(newest)
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HIGH_PM25) is True
+        # ...until the older alert leaves the window
+        lapsed = older.created_at + timedelta(minutes=5, seconds=1)
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HIGH_PM25, now=lapsed) is False
+
+    @pytest.mark.asyncio
+    async def test_sync_drops_acks_from_other_workers(self, db_session: AsyncSession):
+        workshop = Workshop(name="Sync Shop", slug="sync-shop", created_at=utc_now())
+        db_session.add(workshop)
+        await db_session.flush()
+        alert = _alert(workshop_id=workshop.id)
+        db_session.add(alert)
+        await db_session.commit()
+
+        tracker = AlertCooldownTracker()
+        await tracker.seed(TestSessionLocal)
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HIGH_PM25) is True
+
+        # Acknowledged by a route in another worker: no acknowledge() here
+        alert.is_acknowledged = True
+        await db_session.commit()
+        assert await tracker.sync(TestSessionLocal) == 1
+        assert tracker.on_cooldown(DEVICE_ID, 1, AlertType.HIGH_PM25) is False
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# evaluate_alerts() with a tracker
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestEvaluateAlertsWithTracker:
+
+    @pytest.mark.asyncio
+    async def test_sustained_violation_makes_no_queries(self):
+        session = AsyncMock(spec=AsyncSession)
+        session.execute = AsyncMock(side_effect=AssertionError("unexpected query"))
+        session.add = MagicMock()
+        tracker = AlertCooldownTracker()
+        thresholds = EffectiveThresholds(workshop_id=1, pit_id=1)
+
+        raised = []
+        for _ in range(5):
+            reading = SensorData(device_id=DEVICE_ID, pm25=60.0)
+            raised += await evaluate_alerts(
+                session, reading, workshop_id=1, pit_id=1,
+                thresholds=thresholds, cooldowns=tracker,
+            )
+
+        assert [a.alert_type for a in raised] == [AlertType.HIGH_PM25]
+        assert session.execute.await_count == 0
@@ -0,0 +1,185 @@
+"""
+test_ingest_ipc.py
+Unit tests for ingest_ipc.py
+
+Tests:
+  - WebSocket events forwarded by the ingest process reach the API process's manager
+  - Cache invalidations made in the API process are applied in the ingest process
+  - A (re)connecting API process asks for a resync
+  - Without a connected API process, events are not queued anywhere
+  - A live socket is never taken over or unlinked by another ingest process
+  - An API process connects to every <ipc_socket>.<worker id> and keeps
+    each ingest process's metrics
+
+Author: PPF Monitoring Team
+Created: 2026-03-17
+"""
+
+import asyncio
+import os
+import socket
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.services.alert_cooldown import alert_cooldowns
+from src.services.ingest_ipc import IngestEventClient, IngestEventServer
+from src.services.license_service import license_cache
+from src.services.threshold_cache import threshold_cache
+from src.services.websocket_service import ConnectionManager
+from src.utils.helpers import utc_now
+
+
+async def _until(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "ingest.sock")
+
+
+class TestIngestIpc:
+
+    @pytest.mark.asyncio
+    async def test_events_reach_api_process(self, socket_path):
+        server = IngestEventServer(path=socket_path)
+        await server.start()
+        client = IngestEventClient(path=socket_path)
+
+        ingest_manager = ConnectionManager()
+        ingest_manager.forward = server.publish
+        api_manager = ConnectionManager()
+        api_manager.broadcast_to_workshop = AsyncMock()
+        api_manager.broadcast_to_pit = AsyncMock()
+
+        with patch("src.services.websocket_service.manager", api_manager), \
+                patch("src.services.alert_cooldown.alert_cooldowns.seed", new=AsyncMock()):
+            client.start()
+            await _until(lambda: server.stats["api_processes"] == 1)
+
+            event = {"event": "sensor_update", "pit_id": 2, "data": {"temperature": 21.5}}
+            await ingest_manager.broadcast_to_workshop(1, event)
+            await ingest_manager.broadcast_to_pit(2, event)
+            await _until(lambda: client.events_received == 2)
+
+            await client.stop()
+        await server.stop()
+
+        api_manager.broadcast_to_workshop.assert_awaited_once_with(1, event)
+        api_manager.broadcast_to_pit.assert_awaited_once_with(2, event)
+
+    @pytest.mark.asyncio
+    async def test_invalidations_applied_in_ingest_process(self, socket_path):
+        server = IngestEventServer(path=socket_path)
+        await server.start()
+        client = IngestEventClient(path=socket_path)
+        seed = AsyncMock()
+
+        raised_at = utc_now() - timedelta(minutes=1)
+        alert = SimpleNamespace(
+            device_id="ESP32-IPC000000001", pit_id=3, alert_type="high_pm25", created_at=raised_at,
+        )
+
+        with patch.object(alert_cooldowns, "seed", new=seed):
+            client.start()
+            await _until(lambda: seed.await_count == 1)   # resync on connect
+
+            # Applied locally in the API process, then mirrored; here both
+            # ends share the singletons, so start from the ingest-side state
+            generation = license_cache.generation
+            alert_cooldowns.record(alert)
+            client.send({"op": "license", "device_id": "ESP32-IPC000000001"})
+            client.send({
+                "op": "cooldowns",
+                "alerts": [[alert.device_id, alert.pit_id, alert.alert_type, raised_at.isoformat()]],
+            })
+            await _until(lambda: license_cache.generation > generation and len(alert_cooldowns) == 0)
+
+            await client.stop()
+        await server.stop()
+
+        assert license_cache.peer is None
+        assert threshold_cache.peer is None
+
+    @pytest.mark.asyncio
+    async def test_caches_mirror_through_peer(self):
+        sent = []
+        threshold_cache.peer = sent.append
+        license_cache.peer = sent.append
+        try:
+            threshold_cache.invalidate_pit(4)
+            threshold_cache.invalidate_workshop(1)
+            license_cache.invalidate("ESP32-IPC000000002")
+        finally:
+            threshold_cache.peer = license_cache.peer = None
+
+        assert sent == [
+            {"op": "pit_thresholds", "pit_id": 4},
+            {"op": "workshop_thresholds", "workshop_id": 1},
+            {"op": "license", "device_id": "ESP32-IPC000000002"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_no_api_process_connected(self, socket_path):
+        server = IngestEventServer(path=socket_path)
+        await server.start()
+        server.publish("workshop", 1, {"event": "alert"})
+        await server.stop()
+
+        assert server.stats == {"api_processes": 0, "events_sent": 0, "events_dropped": 0}
+
+    @pytest.mark.asyncio
+    async def test_live_socket_not_taken_over(self, socket_path):
+        server = IngestEventServer(path=socket_path)
+        await server.start()
+        with pytest.raises(RuntimeError, match="listening"):
+            await IngestEventServer(path=socket_path).start()
+        assert os.path.exists(socket_path)
+        await server.stop()
+
+        # A socket file nobody listens on is left over from a crash
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(socket_path)
+        stale.close()
+        restarted = IngestEventServer(path=socket_path)
+        await restarted.start()
+
+        # Replaced underneath (e.g. by a new process): stop() leaves it alone
+        os.remove(socket_path)
+        replacement = socket.socket(socket.AF_UNIX)
+        replacement.bind(socket_path)
+        await restarted.stop()
+        assert os.path.exists(socket_path)
+        replacement.close()
+
+    @pytest.mark.asyncio
+    async def test_client_connects_to_every_worker(self, socket_path):
+        servers = [
+            IngestEventServer(path=f"{socket_path}.host-0", name="host-0"),
+            IngestEventServer(path=f"{socket_path}.host-1", name="host-1"),
+        ]
+        for server in servers:
+            await server.start()
+        client = IngestEventClient(path=socket_path)
+
+        with patch("src.services.alert_cooldown.alert_cooldowns.seed", new=AsyncMock()):
+            client.start()
+            await _until(lambda: len(client.worker_metrics) == 2)
+            assert client.stats["ingest_processes"] == 2
+            reports = list(client.worker_metrics.values())
+            assert sorted(report["worker"] for report in reports) == ["host-0", "host-1"]
+            assert all("commit" in report["stages"] and "queue" in report["stats"] for report in reports)
+            generation = license_cache.generation
+            client.send({"op": "license", "device_id": "ESP32-IPC000000003"})
+            await _until(lambda: license_cache.generation >= generation + 2)   # once per worker
+            await client.stop()
+        for server in servers:
+            await server.stop()
+
+        assert client.worker_metrics == {}   # dropped with their connections
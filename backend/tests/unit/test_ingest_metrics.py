@@ -0,0 +1,95 @@
+"""
+test_ingest_metrics.py
+Unit tests for ingest_metrics.py
+
+Tests:
+  - Histogram quantiles stay within the bucket error bound
+  - Empty histograms report no quantiles
+  - time() records a stage even when the block raises
+  - Prometheus buckets are cumulative and end at the total count
+  - Snapshots from other processes merge into the histograms
+  - /metrics gauges print counters as exact integers and floats in full
+
+Author: PPF Monitoring Team
+Created: 2026-03-16
+"""
+
+import pytest
+
+from src.api.routes.health import _prometheus_text
+from src.services.ingest_metrics import STAGES, IngestMetrics, LatencyHistogram
+
+
+class TestLatencyHistogram:
+
+    def test_quantiles_within_bucket_error(self):
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):          # 1 ms .. 1 s, uniform
+            histogram.record(ms / 1000)
+
+        assert histogram.count == 1000
+        assert histogram.quantile(0.50) == pytest.approx(0.500, rel=0.13)
+        assert histogram.quantile(0.99) == pytest.approx(0.990, rel=0.13)
+        assert histogram.quantile(1.0) == pytest.approx(1.0)
+        assert histogram.summary()["max_ms"] == 1000.0
+
+    def test_empty_histogram(self):
+        summary = LatencyHistogram().summary()
+        assert summary["count"] == 0
+        assert summary["p99_ms"] is None
+
+    def test_extremes_are_kept(self):
+        histogram = LatencyHistogram()
+        histogram.record(0.0)
+        histogram.record(500.0)            # beyond the last bucket
+        assert histogram.quantile(1.0) == 500.0
+        assert histogram.quantile(0.5) <= 1e-6     # first bucket: 0 .. 1 µs
+
+
+class TestIngestMetrics:
+
+    def test_time_records_on_error(self):
+        metrics = IngestMetrics()
+        with pytest.raises(ValueError):
+            with metrics.time("parse"):
+                raise ValueError("bad payload")
+        assert metrics.stats["parse"]["count"] == 1
+        assert set(metrics.stats) == set(STAGES)
+
+    def test_prometheus_buckets_cumulative(self):
+        metrics = IngestMetrics()
+        for seconds in (0.0002, 0.003, 0.003, 0.2):
+            metrics.observe("commit", seconds)
+
+        lines = [
+            line for line in metrics.prometheus_lines()
+            if line.startswith('ppf_ingest_stage_duration_seconds_bucket{stage="commit"')
+        ]
+        counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+        assert counts == sorted(counts)
+        assert counts[-1] == 4
+        assert lines[-1].endswith('le="+Inf"} 4')
+
+    def test_merge_snapshot(self):
+        worker_a, worker_b = IngestMetrics(), IngestMetrics()
+        worker_a.observe("commit", 0.002)
+        worker_b.observe("commit", 0.004)
+        worker_b.observe("commit", 0.5)
+
+        merged = IngestMetrics()
+        merged.merge(worker_a.snapshot())
+        merged.merge(worker_b.snapshot())
+        commit = merged.stages["commit"]
+        assert commit.count == 3
+        assert commit.sum == pytest.approx(0.506)
+        assert commit.max == 0.5
+        assert commit.quantile(0.5) == pytest.approx(0.004, rel=0.13)
+
+    def test_prometheus_gauges_keep_precision(self):
+        text = _prometheus_text({
+            "uptime_seconds": 1234567.891,
+            "ingest": {"writer": {"rows_written": 123456789, "running": True}, "stages": {}},
+        }, IngestMetrics())
+        assert "ppf_ingest_writer_rows_written 123456789\n" in text
+        assert "ppf_ingest_writer_running 1\n" in text
+        assert "ppf_uptime_seconds 1234567.891\n" in text
@@ -0,0 +1,239 @@
+"""
+test_ingest_queue.py
+Unit tests for ingest_queue.py
+
+Tests:
+  - Workers never exceed the configured concurrency
+  - drop_oldest keeps the newest messages and counts drops
+  - spill writes overflow to disk and re-queues it once drained
+  - Spill appends are written from a worker thread, not the event loop
+  - A restart resumes spilled messages from the saved read offset, and
+    files from a different shard count are re-spilled in order
+  - block makes the producer thread wait instead of dropping
+  - Messages from one device are handled in order across sharded workers
+
+Author: PPF Monitoring Team
+Created: 2026-03-12
+"""
+
+import asyncio
+import json
+import random
+import threading
+
+import pytest
+
+from src.services.ingest_queue import IngestQueue, shard_key
+
+
+class _RecordingHandler:
+    """Handler that records messages and can be held closed with an Event."""
+
+    def __init__(self):
+        self.seen: list[str] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, topic: str, payload: str) -> None:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.gate.wait()
+            await asyncio.sleep(0)
+            self.seen.append(payload)
+        finally:
+            self.active -= 1
+
+
+class TestIngestQueue:
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded_by_workers(self):
+        handler = _RecordingHandler()
+        queue = IngestQueue(handler, maxsize=300, workers=3, overflow_policy="drop_oldest")
+        queue.start()
+        for i in range(50):
+            queue.offer("t", f'{{"device_id": "ESP32-{i:04d}"}}')
+        await queue.stop()
+
+        assert len(handler.seen) == 50
+        assert handler.max_active <= 3
+        assert queue.stats["processed"] == 50
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest(self):
+        handler = _RecordingHandler()
+        handler.gate.clear()
+        queue = IngestQueue(handler, maxsize=3, workers=1, overflow_policy="drop_oldest")
+        queue.start()
+        queue.offer("t", "0")
+        await asyncio.sleep(0)       # worker takes "0" and waits on the gate
+        for i in range(1, 7):
+            queue.offer("t", str(i))
+
+        assert queue.depth == 3
+        assert queue.dropped == 3
+        handler.gate.set()
+        await queue.stop()
+        assert handler.seen == ["0", "4", "5", "6"]
+
+    @pytest.mark.asyncio
+    async def test_spill_and_refill(self, tmp_path):
+        handler = _RecordingHandler()
+        handler.gate.clear()
+        spill = tmp_path / "spill.jsonl"
+        queue = IngestQueue(
+            handler, maxsize=2, workers=1, overflow_policy="spill", spill_path=str(spill)
+        )
+        queue.start()
+        for i in range(6):
+            queue.offer("t", str(i))
+        await asyncio.sleep(0)
+
+        assert queue.spilled > 0
+        assert queue.dropped == 0
+        shard_file = tmp_path / "spill.jsonl.0-1"
+        while not shard_file.exists():
+            await asyncio.sleep(0.01)
+        assert shard_file.read_text().count("\n") == queue.spilled
+
+        handler.gate.set()
+        while queue.spill_pending or queue.depth:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        assert handler.seen == [str(i) for i in range(6)]
+        assert not shard_file.exists()
+
+    @pytest.mark.asyncio
+    async def test_spill_appends_off_the_loop(self, tmp_path):
+        handler = _RecordingHandler()
+        handler.gate.clear()
+        queue = IngestQueue(
+            handler, maxsize=1, workers=1, overflow_policy="spill",
+            spill_path=str(tmp_path / "spill.jsonl"),
+        )
+        writers = []
+        append = queue._append_spill
+        queue._append_spill = lambda index, lines: (
+            writers.append((threading.current_thread(), len(lines))), append(index, lines)
+        )
+        queue.start()
+        queue.offer("t", "0")
+        await asyncio.sleep(0)       # worker takes "0" and waits on the gate
+        for i in range(1, 6):
+            queue.offer("t", str(i))
+        assert writers == []         # offer() only buffered them
+        assert queue.spill_pending == 4
+
+        handler.gate.set()
+        while queue.spill_pending or queue.depth:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        assert handler.seen == [str(i) for i in range(6)]
+        assert writers and all(t is not threading.main_thread() for t, _ in writers)
+        assert writers[0][1] == 4    # the burst went out in one write
+
+    @pytest.mark.asyncio
+    async def test_spill_resumes_from_offset_after_restart(self, tmp_path):
+        spill = tmp_path / "spill.jsonl"
+        lines = [json.dumps(["t", str(i)]) + "\n" for i in range(10)]
+        (tmp_path / "spill.jsonl.0-1").write_text("".join(lines))
+        # A previous run had already re-queued the first four
+        (tmp_path / "spill.jsonl.0-1.offset").write_text(str(sum(len(l) for l in lines[:4])))
+
+        handler = _RecordingHandler()
+        queue = IngestQueue(
+            handler, maxsize=4, workers=1, overflow_policy="spill", spill_path=str(spill)
+        )
+        queue.start()
+        assert queue.spill_pending == 6
+        while queue.spill_pending or queue.depth:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        assert handler.seen == [str(i) for i in range(4, 10)]
+
+    @pytest.mark.asyncio
+    async def test_spill_from_other_shard_count_is_respilled(self, tmp_path):
+        spill = tmp_path / "spill.jsonl"
+        devices = [f"ESP32-{d}" for d in "ABCDEF"]
+        messages = [json.dumps({"device_id": d, "n": n}) for n in range(3) for d in devices]
+        (tmp_path / "spill.jsonl.0-1").write_text(
+            "".join(json.dumps(["t", m]) + "\n" for m in messages)
+        )
+
+        seen: dict[str, list[int]] = {}
+
+        async def handler(topic, payload):
+            msg = json.loads(payload)
+            seen.setdefault(msg["device_id"], []).append(msg["n"])
+
+        queue = IngestQueue(
+            handler, maxsize=40, workers=3, overflow_policy="spill", spill_path=str(spill)
+        )
+        queue.start()
+        while queue.spill_pending or queue.depth:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        assert seen == {d: [0, 1, 2] for d in devices}
+        assert not (tmp_path / "spill.jsonl.0-1").exists()
+
+    @pytest.mark.asyncio
+    async def test_block_waits_for_room(self):
+        handler = _RecordingHandler()
+        handler.gate.clear()
+        queue = IngestQueue(handler, maxsize=1, workers=1, overflow_policy="block")
+        queue.start()
+
+        def produce():
+            for i in range(4):
+                queue.offer_threadsafe("t", str(i))
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        await asyncio.sleep(0.1)
+        assert producer.is_alive()   # blocked: one in flight, one queued
+
+        handler.gate.set()
+        while producer.is_alive():
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        assert handler.seen == ["0", "1", "2", "3"]
+        assert queue.dropped == 0
+        assert queue.blocked >= 1
+
+
+class TestDeviceSharding:
+
+    def test_shard_key_from_payload_or_topic(self):
+        assert shard_key("workshop/1/pit/2/sensors", '{"device_id": "ESP32-A", "x": 1}') == "ESP32-A"
+        assert shard_key("workshop/1/pit/2/sensors", '{"temperature": 21.0}') == "workshop/1/pit/2/sensors"
+
+    @pytest.mark.asyncio
+    async def test_per_device_order_preserved(self):
+        seen: dict[str, list[int]] = {}
+        active: set[str] = set()
+        overlaps = []
+
+        async def handler(topic, payload):
+            msg = json.loads(payload)
+            device = msg["device_id"]
+            if device in active:
+                overlaps.append(device)
+            active.add(device)
+            await asyncio.sleep(random.random() / 1000)
+            seen.setdefault(device, []).append(msg["seq"])
+            active.discard(device)
+
+        queue = IngestQueue(handler, maxsize=1000, workers=4, overflow_policy="block")
+        queue.start()
+        devices = [f"ESP32-{i:04d}" for i in range(12)]
+        for seq in range(20):
+            for device in devices:
+                queue.offer("t", json.dumps({"device_id": device, "seq": seq}))
+        await queue.stop()
+
+        assert overlaps == []
+        assert all(seen[d] == list(range(20)) for d in devices)
+        assert len(queue.stats["shard_depths"]) == 4
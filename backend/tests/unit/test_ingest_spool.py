@@ -0,0 +1,193 @@
+"""
+test_ingest_spool.py
+Unit tests for ingest_spool.py
+
+Tests:
+  - The writer spools a batch when the database is unreachable
+  - Replay inserts spooled readings in order, keeping created_at
+  - A replay that fails half way leaves only the rest on disk (no duplicates)
+  - Segments survive a restart; depth and age are reported
+  - Processes sharing the spool dir each get their own subdirectory; a
+    replay never touches another worker's segments
+  - Segments of a slot nobody holds, or loose in the spool dir, are adopted
+
+Author: PPF Monitoring Team
+Created: 2026-03-14
+"""
+
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.device import Device
+from src.models.pit import Pit
+from src.models.sensor_data import SensorData
+from src.models.workshop import Workshop
+from src.services.ingest_spool import IngestSpool, is_db_unavailable
+from src.services.ingest_writer import SensorBatchWriter
+from src.utils.helpers import utc_now
+from tests.conftest import TestSessionLocal
+
+
+DEVICE_ID = "ESP32-SPOOL0000001"
+
+
+class _Sessions:
+    """Session factory that raises OperationalError for chosen session numbers."""
+
+    def __init__(self, fail_on: set[int] = frozenset(), fail_all: bool = False):
+        self.opened = 0
+        self.fail_on = set(fail_on)
+        self.fail_all = fail_all
+
+    @asynccontextmanager
+    async def __call__(self):
+        self.opened += 1
+        if self.fail_all or self.opened in self.fail_on:
+            raise OperationalError("SELECT 1", {}, ConnectionRefusedError("db down"))
+        async with TestSessionLocal() as session:
+            yield session
+
+
+@pytest_asyncio.fixture
+async def pit(db_session: AsyncSession) -> Pit:
+    workshop = Workshop(name="Spool Shop", slug="spool-shop", created_at=utc_now())
+    db_session.add(workshop)
+    await db_session.flush()
+    pit = Pit(workshop_id=workshop.id, pit_number=1, name="Bay 1")
+    db_session.add(pit)
+    await db_session.flush()
+    db_session.add(Device(
+        device_id=DEVICE_ID, license_key="LIC-SPOL-0001-0000", status="active",
+        workshop_id=workshop.id, pit_id=pit.id,
+    ))
+    await db_session.commit()
+    return pit
+
+
+def _readings(pit: Pit, n: int) -> list[tuple[SensorData, int, int]]:
+    start = utc_now() - timedelta(minutes=10)
+    return [
+        (SensorData(
+            device_id=DEVICE_ID, pit_id=pit.id, workshop_id=pit.workshop_id,
+            temperature=20.0 + i, is_valid=True,
+            created_at=start + timedelta(seconds=i),
+        ), pit.workshop_id, pit.id)
+        for i in range(n)
+    ]
+
+
+async def _stored(db: AsyncSession) -> list[SensorData]:
+    result = await db.execute(select(SensorData).order_by(SensorData.id))
+    return list(result.scalars().all())
+
+
+class TestIngestSpool:
+
+    def test_error_classification(self):
+        assert is_db_unavailable(OperationalError("x", {}, Exception("gone")))
+        assert is_db_unavailable(ConnectionRefusedError())
+        assert not is_db_unavailable(ValueError("bad reading"))
+
+    @pytest.mark.asyncio
+    async def test_writer_spools_when_db_unavailable(self, pit, tmp_path):
+        spool = IngestSpool(directory=str(tmp_path), segment_records=2)
+        writer = SensorBatchWriter(max_rows=10, session_factory=_Sessions(fail_all=True), spool=spool)
+        writer.start()
+        for reading, ws, pit_id in _readings(pit, 3):
+            await writer.submit(reading, ws, pit_id, check_alerts=False)
+        await writer.stop()
+
+        assert writer.rows_spooled == 3
+        assert writer.rows_failed == 0
+        assert spool.stats["depth"] == 3
+        assert spool.stats["segments"] == 2
+        assert spool.oldest_age_seconds is not None
+
+    @pytest.mark.asyncio
+    async def test_replay_in_order(self, pit, tmp_path, db_session):
+        items = _readings(pit, 5)
+        spool = IngestSpool(directory=str(tmp_path), segment_records=2, session_factory=_Sessions())
+        assert await spool.append_readings(items) == 5
+
+        assert await spool.replay() == 5
+        rows = await _stored(db_session)
+        assert [r.temperature for r in rows] == [20.0, 21.0, 22.0, 23.0, 24.0]
+        assert rows[0].created_at.replace(tzinfo=None) == items[0][0].created_at.replace(tzinfo=None)
+        assert spool.stats["depth"] == 0
+        assert list(tmp_path.rglob("*.seg")) == []
+
+    @pytest.mark.asyncio
+    async def test_unavailable_db_keeps_spool(self, pit, tmp_path):
+        spool = IngestSpool(directory=str(tmp_path), session_factory=_Sessions(fail_all=True))
+        await spool.append_readings(_readings(pit, 2))
+        with pytest.raises(OperationalError):
+            await spool.replay()
+        assert spool.depth == 2
+
+    @pytest.mark.asyncio
+    async def test_partial_replay_leaves_rest(self, pit, tmp_path, db_session):
+        # Session 1 is the probe, 2 the first chunk, 3 the second chunk (fails)
+        sessions = _Sessions(fail_on={3})
+        spool = IngestSpool(directory=str(tmp_path), replay_chunk_rows=2, session_factory=sessions)
+        await spool.append_readings(_readings(pit, 5))
+
+        with pytest.raises(OperationalError):
+            await spool.replay()
+        assert spool.depth == 3
+        assert len(await _stored(db_session)) == 2
+
+        assert await spool.replay() == 3
+        rows = await _stored(db_session)
+        assert [r.temperature for r in rows] == [20.0, 21.0, 22.0, 23.0, 24.0]
+
+    @pytest.mark.asyncio
+    async def test_segments_survive_restart(self, pit, tmp_path):
+        first = IngestSpool(directory=str(tmp_path), segment_records=3)
+        await first.append_readings(_readings(pit, 4))
+        await first.append_message("workshop/1/pit/1/sensors", '{"device_id": "X"}')
+        await first.stop()
+
+        second = IngestSpool(directory=str(tmp_path), segment_records=3)
+        second._load()
+        assert second.depth == 5
+        assert second.stats["segments"] == 2
+
+    @pytest.mark.asyncio
+    async def test_workers_do_not_share_segments(self, pit, tmp_path, db_session):
+        # Two spools on one directory behave like two uvicorn workers: each
+        # flock()s its own slot (flock locks are per open file)
+        a = IngestSpool(directory=str(tmp_path), segment_records=10, session_factory=_Sessions())
+        b = IngestSpool(directory=str(tmp_path), segment_records=10, session_factory=_Sessions())
+        items = _readings(pit, 5)
+        await a.append_readings(items[:2])
+        await b.append_readings(items[2:])
+        assert sorted(p.parent.name for p in tmp_path.rglob("*.seg")) == ["worker-0", "worker-1"]
+
+        assert await a.replay() == 2
+        assert b.depth == 3
+        assert len(list((tmp_path / "worker-1").glob("*.seg"))) == 1
+        assert await b.replay() == 3
+        assert len(await _stored(db_session)) == 5
+
+    @pytest.mark.asyncio
+    async def test_orphaned_segments_adopted(self, pit, tmp_path):
+        a = IngestSpool(directory=str(tmp_path))
+        b = IngestSpool(directory=str(tmp_path))
+        await a.append_readings(_readings(pit, 2))
+        await b.append_readings(_readings(pit, 3))
+        await a.stop()
+        await b.stop()
+        (tmp_path / "000000000007.seg").write_text('{"m": ["t", "p"]}\n')   # older layout
+
+        # Restarted with one worker: it takes slot 0 and the rest with it
+        survivor = IngestSpool(directory=str(tmp_path))
+        survivor._load()
+        assert survivor.depth == 6
+        assert survivor.stats["segments"] == 3
+        assert sorted(p.parent.name for p in tmp_path.rglob("*.seg")) == ["worker-0"] * 3
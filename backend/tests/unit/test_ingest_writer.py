@@ -0,0 +1,198 @@
+"""
+test_ingest_writer.py
+Unit tests for ingest_writer.py
+
+Tests:
+  - SensorBatchWriter batches readings into one transaction
+  - max_rows splits large bursts into several batches
+  - Alerts are still evaluated and broadcast per reading
+  - check_alerts=False stores the reading without evaluating alerts
+  - A bad row falls back to row-by-row writes without dropping the others
+
+Author: PPF Monitoring Team
+Created: 2026-03-10
+"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.alert import Alert
+from src.models.device import Device
+from src.models.pit import Pit
+from src.models.sensor_data import SensorData
+from src.models.workshop import Workshop
+from src.services.ingest_writer import SensorBatchWriter
+from src.services.liveness import liveness
+from src.utils.constants import AlertType
+from src.utils.helpers import utc_now
+from tests.conftest import TestSessionLocal
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers / fixtures
+# ─────────────────────────────────────────────────────────────────────────────
+
+DEVICE_ID = "ESP32-WRITER000001"
+
+
+class _CountingSessionFactory:
+    """Session factory that counts how many transactions the writer opens."""
+
+    def __init__(self):
+        self.sessions = 0
+
+    @asynccontextmanager
+    async def __call__(self):
+        self.sessions += 1
+        async with TestSessionLocal() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+
+@pytest_asyncio.fixture
+async def seeded(db_session: AsyncSession) -> dict:
+    workshop = Workshop(name="Writer Shop", slug="writer-shop", created_at=utc_now())
+    db_session.add(workshop)
+    await db_session.flush()
+    pit = Pit(workshop_id=workshop.id, pit_number=1, name="Pit 1", created_at=utc_now())
+    db_session.add(pit)
+    await db_session.flush()
+    device = Device(
+        device_id=DEVICE_ID,
+        license_key="LIC-WRIT-ER00-0001",
+        workshop_id=workshop.id,
+        pit_id=pit.id,
+        status="active",
+        is_online=False,
+    )
+    db_session.add(device)
+    await db_session.commit()
+    return {"workshop_id": workshop.id, "pit_id": pit.id}
+
+
+def _reading(seeded: dict, **values) -> SensorData:
+    defaults = dict(temperature=24.0, humidity=50.0, pm25=8.0, is_valid=True)
+    defaults.update(values)
+    return SensorData(
+        device_id=DEVICE_ID,
+        pit_id=seeded["pit_id"],
+        workshop_id=seeded["workshop_id"],
+        created_at=utc_now(),
+        **defaults,
+    )
+
+
+async def _count(db: AsyncSession, model) -> int:
+    result = await db.execute(select(func.count()).select_from(model))
+    return result.scalar_one()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SensorBatchWriter
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestSensorBatchWriter:
+
+    @pytest.mark.asyncio
+    async def test_burst_written_in_one_transaction(self, seeded, db_session):
+        factory = _CountingSessionFactory()
+        writer = SensorBatchWriter(max_rows=50, max_delay_ms=1000, session_factory=factory)
+        writer.start()
+
+        with patch("src.services.websocket_service.broadcast_sensor_update", new=AsyncMock()) as ws:
+            for _ in range(5):
+                await writer.submit(_reading(seeded), seeded["workshop_id"], seeded["pit_id"])
+            await writer.stop()
+
+        assert factory.sessions == 1
+        assert writer.batches_written == 1
+        assert writer.rows_written == 5
+        assert ws.await_count == 5
+        assert await _count(db_session, SensorData) == 5
+
+        # Liveness is recorded in memory only — the devices row is written
+        # by the registry's periodic flush
+        device = (await db_session.execute(
+            select(Device).where(Device.device_id == DEVICE_ID)
+        )).scalar_one()
+        assert device.is_online is False
+        assert liveness.device_is_online(device) is True
+        assert liveness.stats["pending"] == 1
+
+    @pytest.mark.asyncio
+    async def test_max_rows_splits_batches(self, seeded, db_session):
+        factory = _CountingSessionFactory()
+        writer = SensorBatchWriter(max_rows=2, max_delay_ms=1000, session_factory=factory)
+        writer.start()
+
+        with patch("src.services.websocket_service.broadcast_sensor_update", new=AsyncMock()):
+            for _ in range(5):
+                await writer.submit(_reading(seeded), seeded["workshop_id"], seeded["pit_id"])
+            await writer.stop()
+
+        assert writer.batches_written == 3
+        assert await _count(db_session, SensorData) == 5
+
+    @pytest.mark.asyncio
+    async def test_alerts_evaluated_and_broadcast_per_reading(self, seeded, db_session):
+        writer = SensorBatchWriter(
+            max_rows=50, max_delay_ms=1000, session_factory=_CountingSessionFactory()
+        )
+        writer.start()
+
+        with patch("src.services.websocket_service.broadcast_sensor_update", new=AsyncMock()), \
+             patch("src.services.websocket_service.broadcast_alert", new=AsyncMock()) as ws_alert:
+            await writer.submit(_reading(seeded, pm25=50.0), seeded["workshop_id"], seeded["pit_id"])
+            # Same bay still high in the same batch — cooldown must suppress it
+            await writer.submit(_reading(seeded, pm25=55.0), seeded["workshop_id"], seeded["pit_id"])
+            await writer.stop()
+
+        alerts = (await db_session.execute(select(Alert))).scalars().all()
+        assert [a.alert_type for a in alerts] == [AlertType.HIGH_PM25.value]
+        assert ws_alert.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_check_alerts_false_skips_evaluation(self, seeded, db_session):
+        writer = SensorBatchWriter(
+            max_rows=50, max_delay_ms=1000, session_factory=_CountingSessionFactory()
+        )
+        writer.start()
+
+        with patch("src.services.websocket_service.broadcast_sensor_update", new=AsyncMock()):
+            await writer.submit(
+                _reading(seeded, pm25=80.0), seeded["workshop_id"], seeded["pit_id"],
+                check_alerts=False,
+            )
+            await writer.stop()
+
+        assert await _count(db_session, SensorData) == 1
+        assert await _count(db_session, Alert) == 0
+
+    @pytest.mark.asyncio
+    async def test_bad_row_falls_back_to_row_by_row(self, seeded, db_session):
+        writer = SensorBatchWriter(
+            max_rows=50, max_delay_ms=1000, session_factory=_CountingSessionFactory()
+        )
+        writer.start()
+
+        bad = _reading(seeded)
+        bad.workshop_id = None  # violates NOT NULL
+
+        with patch("src.services.websocket_service.broadcast_sensor_update", new=AsyncMock()):
+            await writer.submit(_reading(seeded), seeded["workshop_id"], seeded["pit_id"])
+            await writer.submit(bad, seeded["workshop_id"], seeded["pit_id"])
+            await writer.submit(_reading(seeded), seeded["workshop_id"], seeded["pit_id"])
+            await writer.stop()
+
+        assert writer.rows_written == 2
+        assert writer.rows_failed == 1
+        assert await _count(db_session, SensorData) == 2
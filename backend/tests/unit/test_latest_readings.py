@@ -0,0 +1,128 @@
+"""
+test_latest_readings.py
+Unit tests for latest_readings.py
+
+Tests:
+  - record() upserts the newest valid reading per pit, never an older one
+  - Invalid readings are ignored
+  - get_many() serves memory, then the table, then backfills from sensor_data
+  - The batch writer updates the snapshot in the same transaction
+
+Author: PPF Monitoring Team
+Created: 2026-03-21
+"""
+
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.pit_latest_reading import PitLatestReading
+from src.services.ingest_writer import SensorBatchWriter
+from src.services.latest_readings import LatestReadingCache, latest_readings
+from src.utils.helpers import utc_now
+from tests.conftest import SENSOR_DEVICE_ID, TestSessionLocal, make_reading
+
+
+@pytest.fixture
+def pit_options() -> dict:
+    return {"pits": 2}
+
+
+async def _row(db: AsyncSession, pit_id: int) -> PitLatestReading:
+    db.expire_all()
+    return (await db.execute(
+        select(PitLatestReading).where(PitLatestReading.pit_id == pit_id)
+    )).scalar_one_or_none()
+
+
+class TestRecord:
+
+    @pytest.mark.asyncio
+    async def test_keeps_newest_valid_reading(self, db_session: AsyncSession, seeded_pits):
+        pit = seeded_pits[0]
+        now = utc_now()
+        cache = LatestReadingCache()
+
+        snapshots = await cache.record(db_session, [
+            make_reading(pit, now - timedelta(seconds=20), temperature=21.0),
+            make_reading(pit, now - timedelta(seconds=10), temperature=22.0),
+            make_reading(pit, now, temperature=99.0, is_valid=False),
+        ])
+        await db_session.commit()
+        assert [s.temperature for s in snapshots] == [22.0]
+        assert (await _row(db_session, pit["id"])).temperature == 22.0
+
+        # A late (spool replayed) reading does not replace a newer one
+        await cache.record(db_session, [make_reading(pit, now - timedelta(minutes=5), temperature=18.0)])
+        await db_session.commit()
+        assert (await _row(db_session, pit["id"])).temperature == 22.0
+
+        # Dict rows (spool replay) are accepted too
+        await cache.record(db_session, [{
+            "pit_id": pit["id"], "device_id": SENSOR_DEVICE_ID, "created_at": now + timedelta(seconds=1),
+            "temperature": 23.0, "is_valid": True,
+        }])
+        await db_session.commit()
+        assert (await _row(db_session, pit["id"])).temperature == 23.0
+
+
+class TestGetMany:
+
+    @pytest.mark.asyncio
+    async def test_memory_table_and_backfill(self, db_session: AsyncSession, seeded_pits):
+        first, second = seeded_pits
+        now = utc_now()
+        db_session.add(make_reading(second, now - timedelta(hours=1), temperature=30.0))
+        db_session.add(make_reading(second, now, temperature=31.0, is_valid=False))
+        await db_session.commit()
+
+        cache = LatestReadingCache(ttl_seconds=60)
+        snapshots = await cache.record(db_session, [make_reading(first, now, temperature=25.0)])
+        await db_session.commit()
+        cache.apply(snapshots)
+
+        found = await cache.get_many(db_session, [first["id"], second["id"]])
+        await db_session.commit()
+        assert found[first["id"]].temperature == 25.0
+        # No snapshot row yet: looked up in sensor_data and written back
+        assert found[second["id"]].temperature == 30.0
+        assert (await _row(db_session, second["id"])).temperature == 30.0
+        assert cache.stats == {"pits": 2, "hits": 1, "misses": 1}
+
+        # A fresh process reads the table
+        other = LatestReadingCache(ttl_seconds=60)
+        found = await other.get_many(db_session, [first["id"], second["id"]])
+        assert found[first["id"]].temperature == 25.0
+        assert found[second["id"]].reading_at is not None
+
+    @pytest.mark.asyncio
+    async def test_pit_without_readings(self, db_session: AsyncSession, seeded_pits):
+        cache = LatestReadingCache()
+        assert await cache.get(db_session, seeded_pits[1]["id"]) is None
+        await db_session.commit()
+        row = await _row(db_session, seeded_pits[1]["id"])
+        assert row is not None and row.reading_at is None
+
+        # A later reading replaces the "no reading" row
+        await cache.record(db_session, [make_reading(seeded_pits[1], utc_now())])
+        await db_session.commit()
+        assert (await _row(db_session, seeded_pits[1]["id"])).reading_at is not None
+
+
+class TestWriterIntegration:
+
+    @pytest.mark.asyncio
+    async def test_batch_updates_snapshot(self, db_session: AsyncSession, seeded_pits):
+        pit = seeded_pits[0]
+        writer = SensorBatchWriter(max_rows=50, max_delay_ms=1000, session_factory=TestSessionLocal)
+        writer.start()
+        with patch("src.services.websocket_service.broadcast_sensor_update", new=AsyncMock()):
+            await writer.submit(make_reading(pit, utc_now(), temperature=26.5), pit["workshop_id"], pit["id"])
+            await writer.stop()
+
+        assert (await _row(db_session, pit["id"])).temperature == 26.5
+        assert latest_readings.stats["pits"] == 1
+        assert (await latest_readings.get(db_session, pit["id"])).temperature == 26.5
@@ -11,16 +11,28 @@ Tests every branch of validate_license():
   - Subscription past expires_at date
   - All checks passed → valid
 
+And validate_license_cached() / LicenseCache:
+  - Hits skip the DB, expiry is still checked on every hit
+  - invalidate() forces a reload; a racing stale load is not re-cached
+  - Unknown devices are cached as negative entries
+
 Author: PPF Monitoring Team
 Created: 2026-02-22
 """
 
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from src.services.license_service import LicenseValidationResult, validate_license
+from src.services.license_service import (
+    LicenseCache,
+    LicenseValidationResult,
+    license_cache,
+    validate_license,
+    validate_license_cached,
+)
 from src.models.device import Device
 from src.models.subscription import Subscription
 from src.utils.constants import DeviceStatus, SubscriptionStatus
@@ -256,3 +268,124 @@ class TestValidateLicense:
         )
         assert result.workshop_id == 1
         assert result.pit_id      == 2
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# validate_license_cached() / LicenseCache
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _patch_db(*sessions):
+    """Patch get_db_context to yield the given mock sessions in order."""
+    queue = list(sessions)
+    opened = []
+
+    @asynccontextmanager
+    async def _ctx():
+        session = queue.pop(0)
+        opened.append(session)
+        yield session
+
+    return patch("src.services.license_service.get_db_context", _ctx), opened
+
+
+class TestValidateLicenseCached:
+
+    @pytest.mark.asyncio
+    async def test_second_message_served_from_cache(self):
+        session = _session_with_device_and_sub(_make_device(), _make_subscription())
+        ctx, opened = _patch_db(session)
+
+        with ctx:
+            first = await validate_license_cached(DEVICE_ID, LICENSE_KEY)
+            second = await validate_license_cached(DEVICE_ID, LICENSE_KEY)
+
+        assert first.is_valid is True and second.is_valid is True
+        assert len(opened) == 1
+        assert session.execute.await_count == 2
+        assert second.workshop_id == 1
+        assert second.device.device_id == DEVICE_ID
+
+    @pytest.mark.asyncio
+    async def test_expiry_checked_on_every_hit(self):
+        expires = _now() + timedelta(seconds=30)
+        session = _session_with_device_and_sub(
+            _make_device(), _make_subscription(expires_at=expires)
+        )
+        ctx, _ = _patch_db(session)
+
+        with ctx:
+            assert (await validate_license_cached(DEVICE_ID, LICENSE_KEY)).is_valid is True
+            with patch(
+                "src.services.license_service.utc_now",
+                return_value=expires + timedelta(seconds=1),
+            ):
+                result = await validate_license_cached(DEVICE_ID, LICENSE_KEY)
+
+        assert result.is_valid is False
+        assert result.reason == "License expired"
+
+    @pytest.mark.asyncio
+    async def test_wrong_key_rejected_from_cache(self):
+        session = _session_with_device_and_sub(_make_device(), _make_subscription())
+        ctx, _ = _patch_db(session)
+
+        with ctx:
+            await validate_license_cached(DEVICE_ID, LICENSE_KEY)
+            result = await validate_license_cached(DEVICE_ID, "LIC-BAAD-BAAD-BAAD")
+
+        assert result.is_valid is False
+        assert result.reason == "License key mismatch"
+
+    @pytest.mark.asyncio
+    async def test_invalidate_forces_reload(self):
+        active = _session_with_device_and_sub(_make_device(), _make_subscription())
+        suspended = _session_with_device_and_sub(
+            _make_device(status=DeviceStatus.SUSPENDED), _make_subscription()
+        )
+        ctx, opened = _patch_db(active, suspended)
+
+        with ctx:
+            assert (await validate_license_cached(DEVICE_ID, LICENSE_KEY)).is_valid is True
+            license_cache.invalidate(DEVICE_ID)
+            result = await validate_license_cached(DEVICE_ID, LICENSE_KEY)
+
+        assert len(opened) == 2
+        assert result.is_valid is False
+        assert result.reason == "Subscription suspended"
+
+    @pytest.mark.asyncio
+    async def test_unknown_device_cached_as_negative_entry(self):
+        session = _session_with_device_and_sub(None, None)
+        ctx, opened = _patch_db(session)
+
+        with ctx:
+            for _ in range(3):
+                result = await validate_license_cached("ESP32-UNKNOWN", LICENSE_KEY)
+
+        assert result.is_valid is False
+        assert result.reason == "Unknown device"
+        assert len(opened) == 1
+
+
+class TestLicenseCache:
+
+    def test_stale_load_not_stored_after_invalidate(self):
+        cache = LicenseCache(ttl_seconds=60)
+        generation = cache.generation
+        cache.invalidate(DEVICE_ID)  # admin change lands while the load is in flight
+        cache.put(DEVICE_ID, None, generation)
+        assert cache.get(DEVICE_ID) == (False, None)
+
+    def test_ttl_expiry(self):
+        cache = LicenseCache(ttl_seconds=60)
+        cache.put(DEVICE_ID, None, cache.generation)
+        assert cache.get(DEVICE_ID)[0] is True
+        with patch("src.services.license_service.time.monotonic", return_value=1e12):
+            assert cache.get(DEVICE_ID)[0] is False
+
+    def test_max_entries_evicts_oldest(self):
+        cache = LicenseCache(ttl_seconds=60, max_entries=2)
+        for device_id in ("A", "B", "C"):
+            cache.put(device_id, None, cache.generation)
+        assert cache.get("A")[0] is False
+        assert cache.get("C")[0] is True
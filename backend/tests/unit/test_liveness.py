@@ -0,0 +1,140 @@
+"""
+test_liveness.py
+Unit tests for liveness.py
+
+Tests:
+  - Touches stay in memory until flush(); one flush writes every device/camera
+  - Readers overlay unflushed liveness on the loaded row
+  - Offline events drop pending touches
+  - A failed flush keeps the pending entries for the next one
+
+Author: PPF Monitoring Team
+Created: 2026-03-14
+"""
+
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.camera import Camera
+from src.models.device import Device
+from src.models.workshop import Workshop
+from src.services.liveness import LivenessRegistry
+from src.utils.helpers import utc_now
+from tests.conftest import TestSessionLocal
+
+
+DEVICE_IDS = ["ESP32-LIVE00000001", "ESP32-LIVE00000002"]
+CAMERA_ID = "CAM-LIVE-0001"
+
+
+class _Sessions:
+    """Session factory counting transactions (and optionally failing)."""
+
+    def __init__(self, fail: bool = False):
+        self.opened = 0
+        self.fail = fail
+
+    @asynccontextmanager
+    async def __call__(self):
+        self.opened += 1
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        async with TestSessionLocal() as session:
+            yield session
+
+
+@pytest_asyncio.fixture
+async def rows(db_session: AsyncSession) -> None:
+    workshop = Workshop(name="Liveness Shop", slug="liveness-shop", created_at=utc_now())
+    db_session.add(workshop)
+    await db_session.flush()
+    db_session.add_all([
+        Device(device_id=device_id, license_key=f"LIC-LIVE-{n:04d}-0000", status="active")
+        for n, device_id in enumerate(DEVICE_IDS)
+    ])
+    db_session.add(Camera(
+        workshop_id=workshop.id, device_id=CAMERA_ID, name="Bay camera", ip_address="10.0.0.5",
+    ))
+    await db_session.commit()
+
+
+async def _device(db: AsyncSession, device_id: str) -> Device:
+    device = (await db.execute(select(Device).where(Device.device_id == device_id))).scalar_one()
+    await db.refresh(device)
+    return device
+
+
+class TestLivenessRegistry:
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_all_touches_in_one_transaction(self, rows, db_session):
+        sessions = _Sessions()
+        registry = LivenessRegistry(session_factory=sessions)
+        for _ in range(3):
+            for device_id in DEVICE_IDS:
+                registry.touch_device(device_id)
+        registry.touch_camera(CAMERA_ID, ip_address="10.0.0.9")
+
+        assert sessions.opened == 0
+        assert await registry.flush() == 3
+        assert sessions.opened == 1
+        assert registry.pending == 0
+
+        for device_id in DEVICE_IDS:
+            device = await _device(db_session, device_id)
+            assert device.is_online is True
+            assert device.last_seen is not None
+            assert device.last_mqtt_message == device.last_seen
+
+        camera = (await db_session.execute(select(Camera))).scalar_one()
+        assert (camera.is_online, camera.status, camera.ip_address) == (True, "online", "10.0.0.9")
+
+        # Nothing new — no transaction
+        assert await registry.flush() == 0
+        assert sessions.opened == 1
+
+    @pytest.mark.asyncio
+    async def test_readers_overlay_unflushed_liveness(self, rows, db_session):
+        registry = LivenessRegistry(session_factory=_Sessions())
+        device = await _device(db_session, DEVICE_IDS[0])
+        assert registry.device_is_online(device) is False
+        assert registry.device_last_seen(device) is None
+
+        registry.touch_device(DEVICE_IDS[0])
+        assert registry.device_is_online(device) is True
+        assert registry.device_last_seen(device) is not None
+
+        # A newer DB value wins over an older registry entry
+        device.last_seen = utc_now() + timedelta(minutes=1)
+        assert registry.device_last_seen(device) == device.last_seen
+
+    @pytest.mark.asyncio
+    async def test_offline_event_drops_pending_touch(self, rows, db_session):
+        registry = LivenessRegistry(session_factory=_Sessions())
+        registry.touch_device(DEVICE_IDS[0])
+        registry.mark_device_offline(DEVICE_IDS[0])
+
+        assert await registry.flush() == 0
+        device = await _device(db_session, DEVICE_IDS[0])
+        assert registry.device_is_online(device) is False
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, rows, db_session):
+        sessions = _Sessions(fail=True)
+        registry = LivenessRegistry(session_factory=sessions)
+        registry.touch_device(DEVICE_IDS[0])
+        registry.touch_device(DEVICE_IDS[1])
+        registry.mark_device_offline(DEVICE_IDS[1])
+
+        with pytest.raises(ConnectionError):
+            await registry.flush()
+        assert registry.pending == 1
+
+        sessions.fail = False
+        assert await registry.flush() == 1
+        assert (await _device(db_session, DEVICE_IDS[0])).is_online is True
@@ -0,0 +1,319 @@
+"""
+test_mqtt_asyncio.py
+Unit tests for the asyncio MQTT transport (mqtt_asyncio.py + mqtt_service)
+
+Runs setup_mqtt() with mqtt.transport="asyncio" against a minimal in-process
+MQTT broker stand-in (asyncio server, no threads):
+  - Subscriptions cover sensor, status, provisioning and camera topics
+  - A PUBLISH from the broker reaches the ingest queue on the event loop thread
+  - publish_device_command() goes out over the same socket
+  - mqtt.shared_group: $share/<group>/ subscriptions, stable client_id per worker,
+    rejected unless ingest.mode is external
+  - TLS: data already decrypted in the SSL buffer is read without a new
+    readiness event; reconnect() runs off the event loop thread, with
+    loop_misc() and the socket registrations stopped until it returns
+
+Author: PPF Monitoring Team
+Created: 2026-03-12
+"""
+
+import asyncio
+import socket
+import threading
+from unittest.mock import AsyncMock, patch
+
+import paho.mqtt.client as mqtt
+import pytest
+from pydantic import ValidationError
+
+from src.config.settings import Settings
+from src.services import mqtt_service
+from src.services.ingest_queue import IngestQueue
+from src.services.mqtt_asyncio import AsyncioMqttTransport
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Minimal MQTT 3.1.1 broker stand-in
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _encode_length(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, n = n % 128, n // 128
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _publish_packet(topic: str, payload: bytes) -> bytes:
+    body = len(topic).to_bytes(2, "big") + topic.encode() + payload
+    return b"\x30" + _encode_length(len(body)) + body
+
+
+class _StandInBroker:
+    """Accepts one client, acks CONNECT/SUBSCRIBE/PUBLISH and records traffic."""
+
+    def __init__(self):
+        self.subscriptions: list[str] = []
+        self.client_id: str = ""
+        self.published: list[tuple[str, bytes]] = []
+        self.connected = asyncio.Event()
+        self.subscribed = asyncio.Event()
+        self.writer = None
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def send(self, topic: str, payload: bytes) -> None:
+        self.writer.write(_publish_packet(topic, payload))
+
+    async def _serve(self, reader, writer) -> None:
+        self.writer = writer
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                length, multiplier = 0, 1
+                while True:
+                    byte = (await reader.readexactly(1))[0]
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not byte & 0x80:
+                        break
+                body = await reader.readexactly(length)
+                kind = header[0] & 0xF0
+
+                if kind == 0x10:                                   # CONNECT
+                    id_len = int.from_bytes(body[10:12], "big")
+                    self.client_id = body[12:12 + id_len].decode()
+                    writer.write(b"\x20\x02\x00\x00")
+                    self.connected.set()
+                elif kind == 0x80:                                 # SUBSCRIBE
+                    pid, pos, granted = body[:2], 2, b""
+                    while pos < len(body):
+                        tlen = int.from_bytes(body[pos:pos + 2], "big")
+                        self.subscriptions.append(body[pos + 2:pos + 2 + tlen].decode())
+                        granted += bytes([body[pos + 2 + tlen]])
+                        pos += 3 + tlen
+                    writer.write(b"\x90" + _encode_length(2 + len(granted)) + pid + granted)
+                    if len(self.subscriptions) >= 6:
+                        self.subscribed.set()
+                elif kind == 0x30:                                 # PUBLISH
+                    tlen = int.from_bytes(body[:2], "big")
+                    topic = body[2:2 + tlen].decode()
+                    qos = (header[0] >> 1) & 0x03
+                    pos = 2 + tlen
+                    if qos:
+                        writer.write(b"\x40\x02" + body[pos:pos + 2])
+                        pos += 2
+                    self.published.append((topic, body[pos:]))
+                elif kind == 0xC0:                                 # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif kind == 0xE0:                                 # DISCONNECT
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+
+
+async def _wait_for(predicate, timeout: float = 3.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestAsyncioTransport:
+
+    @pytest.mark.asyncio
+    async def test_subscribe_receive_and_publish_on_event_loop(self):
+        broker = _StandInBroker()
+        port = await broker.start()
+
+        received = []
+
+        async def handler(topic, payload):
+            received.append((topic, payload, threading.current_thread()))
+
+        queue = IngestQueue(handler, maxsize=10, workers=1, overflow_policy="drop_oldest")
+        queue.start()
+
+        settings = mqtt_service.settings
+        with patch.object(settings, "MQTT_TRANSPORT", "asyncio"), \
+             patch.object(settings, "MQTT_BROKER_HOST", "127.0.0.1"), \
+             patch.object(settings, "MQTT_BROKER_PORT", port), \
+             patch.object(settings, "MQTT_USE_TLS", False), \
+             patch("src.services.mqtt_service.get_ingest_queue", return_value=queue):
+            mqtt_service.setup_mqtt(asyncio.get_running_loop())
+            try:
+                await asyncio.wait_for(broker.subscribed.wait(), timeout=3)
+                assert mqtt_service._asyncio_transport is not None
+                assert mqtt_service.MQTT_SUBSCRIBE_SENSOR_DATA in broker.subscriptions
+                assert "workshop/+/cameras/heartbeat" in broker.subscriptions
+
+                broker.send("workshop/1/pit/2/sensors", b'{"device_id": "ESP32-X"}')
+                await broker.writer.drain()
+                await _wait_for(lambda: received)
+
+                assert mqtt_service.publish_device_command(
+                    workshop_id=1, device_id="ESP32-X", command="DISABLE", reason="test"
+                ) is True
+                await _wait_for(lambda: broker.published)
+            finally:
+                mqtt_service.teardown_mqtt()
+                await queue.stop()
+                await broker.stop()
+
+        topic, payload, thread = received[0]
+        assert topic == "workshop/1/pit/2/sensors"
+        assert payload == '{"device_id": "ESP32-X"}'
+        assert thread is threading.main_thread()
+        assert broker.published[0][0] == "workshop/1/device/ESP32-X/command"
+
+
+class _FakeTlsSocket:
+    """Stands in for an ssl.SSLSocket holding n decrypted records."""
+
+    def __init__(self, buffered: int):
+        self.buffered = buffered
+
+    def pending(self) -> int:
+        return self.buffered
+
+
+class TestTransportInternals:
+
+    @pytest.mark.asyncio
+    async def test_read_drains_ssl_buffer(self):
+        sock = _FakeTlsSocket(buffered=3)
+        reads = []
+
+        class Client:
+            def loop_read(self):
+                reads.append(sock.buffered)
+                sock.buffered = max(0, sock.buffered - 1)
+                return mqtt.MQTT_ERR_SUCCESS
+
+        transport = AsyncioMqttTransport(asyncio.get_running_loop(), Client())
+        transport._sock = sock
+        transport._read()
+        # One read per readiness event, then one per buffered record
+        assert reads == [3, 2, 1]
+        assert sock.buffered == 0
+
+    @pytest.mark.asyncio
+    async def test_reconnect_runs_off_the_loop(self):
+        loop = asyncio.get_running_loop()
+        threads = []
+        calls = []
+        new_sock = socket.socket()
+
+        class Client:
+            def reconnect(self):
+                threads.append(threading.current_thread())
+                calls.append("reconnect")
+                # Fired on the executor thread: must not register anything
+                transport._on_socket_open(self, None, new_sock)
+                transport._on_socket_register_write(self, None, new_sock)
+
+            def loop_misc(self):
+                calls.append("misc")
+                return mqtt.MQTT_ERR_SUCCESS
+
+            def socket(self):
+                return new_sock
+
+            def want_write(self):
+                return True
+
+        transport = AsyncioMqttTransport(loop, Client())
+        transport._misc_task = loop.create_task(transport._misc_loop())
+        await asyncio.sleep(0)
+        registered = []
+        transport._register = lambda sock: registered.append(
+            (sock, threading.current_thread(), transport._misc_task)
+        )
+        try:
+            with patch("src.services.mqtt_asyncio._RECONNECT_MIN_DELAY", 0):
+                transport.schedule_reconnect()
+                await asyncio.wait_for(transport._reconnect_task, timeout=3)
+            assert threads and threads[0] is not threading.main_thread()
+            # loop_misc() stopped before reconnect(), and not restarted
+            # until the new socket is registered back on the loop
+            assert calls == ["misc", "reconnect"]
+            assert registered == [(new_sock, threading.main_thread(), None)]
+            assert loop.remove_writer(new_sock)     # write interest re-registered
+        finally:
+            transport.close()
+            new_sock.close()
+
+
+class TestSharedSubscriptions:
+
+    @pytest.mark.asyncio
+    async def test_shared_group_subscriptions_and_client_id(self):
+        broker = _StandInBroker()
+        port = await broker.start()
+        queue = IngestQueue(AsyncMock(), maxsize=10, workers=1, overflow_policy="drop_oldest")
+        queue.start()
+
+        settings = mqtt_service.settings
+        with patch.object(settings, "MQTT_TRANSPORT", "asyncio"), \
+             patch.object(settings, "MQTT_BROKER_HOST", "127.0.0.1"), \
+             patch.object(settings, "MQTT_BROKER_PORT", port), \
+             patch.object(settings, "MQTT_USE_TLS", False), \
+             patch.object(settings, "MQTT_SHARED_GROUP", "ingest"), \
+             patch.object(settings, "MQTT_WORKER_ID", "api-2"), \
+             patch("src.services.mqtt_service.get_ingest_queue", return_value=queue):
+            mqtt_service.setup_mqtt(asyncio.get_running_loop())
+            try:
+                await asyncio.wait_for(broker.subscribed.wait(), timeout=3)
+            finally:
+                mqtt_service.teardown_mqtt()
+                await queue.stop()
+                await broker.stop()
+
+        assert broker.client_id == "ppf_backend-ingest-api-2"
+        assert "$share/ingest/workshop/+/pit/+/sensors" in broker.subscriptions
+        assert "$share/ingest/provisioning/announce" in broker.subscriptions
+        assert all(topic.startswith("$share/ingest/") for topic in broker.subscriptions)
+
+    def test_plain_subscriptions_without_group(self):
+        with patch.object(mqtt_service.settings, "MQTT_SHARED_GROUP", ""):
+            assert mqtt_service.subscription_topics() == list(mqtt_service.SUBSCRIBED_TOPICS)
+            assert mqtt_service.mqtt_client_id() != mqtt_service.mqtt_client_id()
+
+    def test_worker_slot_is_stable_and_unique(self, tmp_path):
+        settings = mqtt_service.settings
+        with patch.object(settings, "MQTT_SHARED_GROUP", "slots"), \
+             patch.object(settings, "MQTT_WORKER_ID", None), \
+             patch("tempfile.gettempdir", return_value=str(tmp_path)), \
+             patch.object(mqtt_service, "_worker_slot", None), \
+             patch.object(mqtt_service, "_worker_slot_file", None):
+            first = mqtt_service.mqtt_client_id()
+            assert first.endswith("-0")
+            assert mqtt_service.mqtt_client_id() == first       # same process, same ID
+
+            # Another process on this host already holds slot 0 → it gets slot 1
+            held = mqtt_service._worker_slot_file
+            mqtt_service._worker_slot, mqtt_service._worker_slot_file = None, None
+            assert mqtt_service.mqtt_client_id().endswith("-1")
+            mqtt_service._worker_slot_file.close()
+            held.close()
+
+    def test_shared_group_requires_external_ingest(self):
+        with pytest.raises(ValidationError, match="INGEST_MODE 'external'"):
+            Settings(MQTT_SHARED_GROUP="ingest", INGEST_MODE="embedded")
+        assert Settings(MQTT_SHARED_GROUP="ingest", INGEST_MODE="external").MQTT_SHARED_GROUP == "ingest"
@@ -0,0 +1,163 @@
+"""
+test_offline_detector.py
+Unit tests for offline_detector.py
+
+Tests:
+  - A device is marked offline (DB + WebSocket) once its deadline passes
+  - Re-arming moves the deadline without growing the heap
+  - The pit's device_offline_threshold_seconds override is used by the writer
+  - Disarmed devices never fire
+  - seed() arms online devices from their stored last_seen
+  - A newer last_seen written by another process re-arms instead of firing
+
+Author: PPF Monitoring Team
+Created: 2026-03-14
+"""
+
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.device import Device
+from src.models.pit import Pit
+from src.models.pit_alert_config import PitAlertConfig
+from src.models.sensor_data import SensorData
+from src.models.workshop import Workshop
+from src.services.ingest_writer import PendingReading, SensorBatchWriter
+from src.services.liveness import liveness
+from src.services.offline_detector import OfflineDetector, offline_detector
+from src.utils.helpers import utc_now
+from tests.conftest import TestSessionLocal
+
+
+DEVICE_ID = "ESP32-OFFLINE00001"
+
+
+@asynccontextmanager
+async def _sessions():
+    async with TestSessionLocal() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def device(db_session: AsyncSession) -> Device:
+    workshop = Workshop(name="Offline Shop", slug="offline-shop", created_at=utc_now())
+    db_session.add(workshop)
+    await db_session.flush()
+    pit = Pit(workshop_id=workshop.id, pit_number=1, name="Bay 1")
+    db_session.add(pit)
+    await db_session.flush()
+    dev = Device(
+        device_id=DEVICE_ID,
+        license_key="LIC-OFFL-0001-0000",
+        workshop_id=workshop.id,
+        pit_id=pit.id,
+        status="active",
+        is_online=True,
+        last_seen=utc_now() - timedelta(seconds=90),
+    )
+    db_session.add(dev)
+    await db_session.commit()
+    return dev
+
+
+async def _is_online(db: AsyncSession) -> bool:
+    result = await db.execute(select(Device.is_online).where(Device.device_id == DEVICE_ID))
+    return result.scalar_one()
+
+
+class TestOfflineDetector:
+
+    @pytest.mark.asyncio
+    async def test_fires_after_deadline(self, device, db_session):
+        detector = OfflineDetector(session_factory=_sessions)
+        detector.arm(DEVICE_ID, device.workshop_id, device.pit_id, 60)
+        liveness.touch_device(DEVICE_ID)
+
+        with patch("src.services.websocket_service.broadcast_device_offline",
+                   new_callable=AsyncMock) as broadcast:
+            assert await detector.expire_due() == []
+            fired = await detector.expire_due(now=time.time() + 61)
+
+        assert fired == [DEVICE_ID]
+        broadcast.assert_awaited_once_with(device.workshop_id, device.pit_id, DEVICE_ID)
+        assert await _is_online(db_session) is False
+        assert liveness.stats["pending"] == 0
+        assert detector.stats["armed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_rearm_moves_deadline(self, device):
+        detector = OfflineDetector(session_factory=_sessions)
+        now = time.time()
+        for _ in range(100):
+            detector.arm(DEVICE_ID, device.workshop_id, device.pit_id, 60)
+        assert detector.stats["heap"] == 1
+
+        detector.arm(DEVICE_ID, device.workshop_id, device.pit_id, 60,
+                     seen_at=utc_now() + timedelta(seconds=30))
+        with patch("src.services.websocket_service.broadcast_device_offline",
+                   new_callable=AsyncMock):
+            assert await detector.expire_due(now=now + 70) == []
+            assert detector.stats["heap"] == 1          # re-pushed with the new deadline
+            assert await detector.expire_due(now=now + 95) == [DEVICE_ID]
+
+    @pytest.mark.asyncio
+    async def test_disarmed_device_never_fires(self, device, db_session):
+        detector = OfflineDetector(session_factory=_sessions)
+        detector.arm(DEVICE_ID, device.workshop_id, device.pit_id, 60)
+        detector.disarm(DEVICE_ID)
+        assert await detector.expire_due(now=time.time() + 3600) == []
+        assert await _is_online(db_session) is True
+
+    @pytest.mark.asyncio
+    async def test_writer_arms_with_pit_threshold(self, device, db_session):
+        db_session.add(PitAlertConfig(pit_id=device.pit_id, device_offline_threshold_seconds=45))
+        await db_session.commit()
+
+        writer = SensorBatchWriter(session_factory=_sessions)
+        reading = SensorData(
+            device_id=DEVICE_ID, pit_id=device.pit_id, workshop_id=device.workshop_id,
+            temperature=22.0, is_valid=True, created_at=utc_now(),
+        )
+        before = time.time()
+        with patch("src.services.websocket_service.broadcast_sensor_update",
+                   new_callable=AsyncMock):
+            await writer._write_batch([
+                PendingReading(reading, device.workshop_id, device.pit_id, check_alerts=False)
+            ])
+
+        deadline = offline_detector._armed[DEVICE_ID]
+        assert before + 45 <= deadline.at <= time.time() + 45
+
+    @pytest.mark.asyncio
+    async def test_seed_arms_from_last_seen(self, device):
+        detector = OfflineDetector(session_factory=_sessions)
+        assert await detector.seed() == 1
+        # last_seen was 90 s ago, default threshold 60 s — already overdue
+        with patch("src.services.websocket_service.broadcast_device_offline",
+                   new_callable=AsyncMock):
+            assert await detector.expire_due() == [DEVICE_ID]
+
+
+    @pytest.mark.asyncio
+    async def test_newer_db_last_seen_rearms(self, device, db_session):
+        detector = OfflineDetector(session_factory=_sessions)
+        detector.arm(DEVICE_ID, device.workshop_id, device.pit_id, 60,
+                     seen_at=utc_now() - timedelta(seconds=90))
+
+        # Another backend process handled the device's latest message
+        device.last_seen = utc_now() - timedelta(seconds=10)
+        await db_session.commit()
+
+        with patch("src.services.websocket_service.broadcast_device_offline",
+                   new_callable=AsyncMock) as broadcast:
+            assert await detector.expire_due() == []
+        broadcast.assert_not_awaited()
+        assert await _is_online(db_session) is True
+        assert 45 < detector.stats["next_deadline_in_seconds"] <= 50
@@ -0,0 +1,70 @@
+"""
+test_pagination.py
+Unit tests for pagination.py
+
+Tests:
+  - Cursors round-trip and reject anything else
+  - keyset_page walks a table newest first without gaps or repeats,
+    including rows sharing a timestamp
+  - estimate_count matches the filtered row count (exact off PostgreSQL)
+
+Author: PPF Monitoring Team
+Created: 2026-03-22
+"""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.audit_log import AuditLog
+from src.utils.helpers import utc_now
+from src.utils.pagination import decode_cursor, encode_cursor, estimate_count, keyset_page
+
+
+class TestCursor:
+
+    def test_round_trip(self):
+        at = utc_now()
+        assert decode_cursor(encode_cursor(at, 42)) == (at, 42)
+
+    def test_naive_timestamp_treated_as_utc(self):
+        at = utc_now()
+        assert decode_cursor(encode_cursor(at.replace(tzinfo=None), 7)) == (at, 7)
+
+    @pytest.mark.parametrize("cursor", ["", "not-a-cursor", "WzEsMl0"])
+    def test_garbage_rejected(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestKeysetPage:
+
+    @pytest.mark.asyncio
+    async def test_walks_every_row_once(self, db_session: AsyncSession):
+        base = utc_now() - timedelta(hours=1)
+        # Three rows per timestamp, so pages split ties
+        db_session.add_all(
+            AuditLog(action=f"test.{i}", created_at=base + timedelta(minutes=i // 3))
+            for i in range(11)
+        )
+        db_session.add(AuditLog(action="other.skip", created_at=base))
+        await db_session.commit()
+
+        query = select(AuditLog).where(AuditLog.action.like("test.%"))
+        seen, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = await keyset_page(
+                db_session, query, AuditLog.created_at, AuditLog.id, cursor, page_size=4
+            )
+            seen.extend(rows)
+            pages += 1
+            if cursor is None:
+                break
+
+        assert pages == 3
+        keys = [(row.created_at, row.id) for row in seen]
+        assert keys == sorted(keys, reverse=True)
+        assert len(set(keys)) == 11
+        assert await estimate_count(db_session, query) == 11
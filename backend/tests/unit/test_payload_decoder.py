@@ -0,0 +1,224 @@
+"""
+test_payload_decoder.py
+Unit tests for payload_decoder.py
+
+Tests:
+  - Known shapes take the fast path and match the tolerant path exactly
+  - Out-of-range values mark the reading invalid
+  - Unknown shapes / loosely typed values fall back to the tolerant path
+  - NaN literals are rejected on both paths
+  - Compact binary format: round trip, short license token, bad payloads
+  - Batch messages: JSON "readings" array, binary 0xB2, alert-eval mode
+
+Author: PPF Monitoring Team
+Created: 2026-03-13
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.services import mqtt_service
+from src.services.license_service import LicenseValidationResult
+from src.services.payload_decoder import (
+    decode_binary,
+    decode_known_shape,
+    encode_binary,
+    encode_binary_batch,
+    loads,
+)
+from src.services.sensor_service import coerce_sensor_payload, decode_sensor_readings
+from src.utils.helpers import license_key_matches, license_token
+
+
+DHT22_DATA = {
+    "device_id":       "ESP32-AABBCCDDEEFF",
+    "license_key":     "LIC-TEST-TEST-TEST",
+    "sensor_type":     "DHT22+PMS5003",
+    "temperature":     24.5,
+    "humidity":        58,
+    "pm1":             8.2,
+    "pm25":            14.6,
+    "pm10":            22.1,
+    "particles_03um":  1200,
+    "particles_100um": 10,
+    "timestamp":       "2026-02-22T10:30:00Z",
+}
+
+PI_DATA = {
+    "device_id":   "PIWIFI-01",
+    "license_key": "LIC-TEST-TEST-TEST",
+    "sensor_type": "PIWIFI-01",
+    "temperature": 23.1,
+    "humidity":    51.2,
+    "pressure":    1009.4,
+    "pm1":         3,
+    "pm25":        6,
+    "pm10":        9,
+    "timestamp":   "2026-02-22T10:30:00+00:00",
+}
+
+
+class TestDecodeKnownShape:
+
+    @pytest.mark.parametrize("data", [DHT22_DATA, PI_DATA])
+    def test_matches_tolerant_path(self, data):
+        fast = decode_known_shape(data)
+        tolerant = coerce_sensor_payload(data)
+
+        assert fast is not None
+        assert fast.values == tolerant.values
+        assert fast.is_valid is tolerant.is_valid is True
+        assert fast.device_timestamp == tolerant.device_timestamp
+        assert isinstance(fast.values["humidity"], float)
+        assert fast.values["pressure"] is None or isinstance(fast.values["pressure"], float)
+
+    def test_out_of_range_marks_invalid(self):
+        fast = decode_known_shape({**DHT22_DATA, "temperature": 150.0})
+        assert fast.is_valid is False
+        assert fast.values["temperature"] == 150.0
+
+    @pytest.mark.parametrize("change", [
+        {"sensor_type": "BME680"},          # unknown shape
+        {"pressure": 1000.0},               # column outside the DHT22 shape
+        {"temperature": "24.5"},            # number sent as a string
+        {"particles_03um": 12.5},           # float in an integer column
+        {"humidity": True},
+    ])
+    def test_falls_back_for_unknown_shapes(self, change):
+        assert decode_known_shape({**DHT22_DATA, **change}) is None
+
+    def test_string_numbers_still_decoded_via_tolerant_path(self):
+        (decoded,) = decode_sensor_readings(json.dumps({**DHT22_DATA, "temperature": "24.5"}))
+        assert decoded.values["temperature"] == 24.5
+        assert decoded.is_valid is True
+
+
+class TestNaNRejection:
+
+    def test_loads_accepts_nan_literal(self):
+        assert loads('{"a": NaN}')["a"] != loads('{"a": NaN}')["a"]
+
+    def test_nan_value_is_stored_as_null(self):
+        raw = json.dumps(DHT22_DATA).replace("24.5", "NaN")
+        (decoded,) = decode_sensor_readings(raw)
+        assert decoded.values["temperature"] is None
+        assert decoded.values["humidity"] == 58.0
+
+    def test_fast_path_drops_nan(self):
+        decoded = decode_known_shape({**DHT22_DATA, "pm25": float("nan")})
+        assert decoded.values["pm25"] is None
+        assert decoded.is_valid is True
+
+
+class TestBinaryFormat:
+
+    LICENSE_KEY = "LIC-TEST-TEST-TEST"
+    TOKEN = hashlib.sha256(LICENSE_KEY.encode()).digest()[:8]
+    VALUES = {
+        "temperature": 23.47,
+        "humidity": 51.2,
+        "pressure": 1009.41,
+        "pm1": 3,
+        "pm25": 6.5,
+        "pm10": None,
+        "particles_03um": 1200,
+    }
+
+    def test_round_trip(self):
+        raw = encode_binary("PIWIFI-01", self.TOKEN, self.VALUES, timestamp_ms=1771756200000)
+        assert raw[0] == 0xB1
+        assert len(raw) < len(json.dumps({**PI_DATA, **self.VALUES})) // 3
+
+        (decoded,) = decode_sensor_readings(raw.decode("latin-1"))
+        assert decoded.device_id == "PIWIFI-01"
+        assert decoded.values["temperature"] == 23.47
+        assert decoded.values["pressure"] == 1009.41
+        assert decoded.values["pm1"] == 3.0
+        assert decoded.values["pm10"] is None
+        assert decoded.values["particles_03um"] == 1200
+        assert decoded.is_valid is True
+        assert decoded.device_timestamp == datetime(2026, 2, 22, 10, 30, tzinfo=timezone.utc)
+
+    def test_short_license_token(self):
+        (decoded,) = decode_binary(encode_binary("PIWIFI-01", self.TOKEN, {}))
+        assert decoded.license_key == license_token(self.LICENSE_KEY)
+        assert license_key_matches(self.LICENSE_KEY, decoded.license_key)
+        assert not license_key_matches("LIC-OTHER-KEY-0000", decoded.license_key)
+        assert decoded.device_timestamp is None
+
+    def test_out_of_range_marks_invalid(self):
+        (decoded,) = decode_binary(encode_binary("PIWIFI-01", self.TOKEN, {"humidity": 120.0}))
+        assert decoded.is_valid is False
+
+    @pytest.mark.parametrize("raw", [
+        b"\xb1",                                                   # truncated envelope
+        b"\xb2\x00",                                               # unknown version
+        encode_binary("PIWIFI-01", TOKEN, {"pm25": 1.0})[:-1],      # truncated field
+        encode_binary("PIWIFI-01", TOKEN, {})[:-1] + b"\x01\x63\x01",  # unknown field ID
+    ])
+    def test_bad_payloads_rejected(self, raw):
+        assert decode_binary(raw) is None
+
+
+class TestBatchMessages:
+
+    TOKEN = hashlib.sha256(b"LIC-TEST-TEST-TEST").digest()[:8]
+
+    def _json_batch(self) -> str:
+        envelope = {k: PI_DATA[k] for k in ("device_id", "license_key", "sensor_type")}
+        return json.dumps({
+            **envelope,
+            "readings": [
+                {"temperature": 23.0, "pm25": 70.0, "timestamp": "2026-02-22T10:30:20Z"},
+                {"temperature": 22.0, "pm25": 60.0, "timestamp": "2026-02-22T10:30:00Z"},
+                {"temperature": "22.5", "timestamp": "2026-02-22T10:30:10Z"},  # tolerant path
+            ],
+        })
+
+    def test_json_readings_array(self):
+        readings = decode_sensor_readings(self._json_batch())
+        assert [r.values["temperature"] for r in readings] == [23.0, 22.0, 22.5]
+        assert {r.device_id for r in readings} == {"PIWIFI-01"}
+        assert all(r.license_key == "LIC-TEST-TEST-TEST" for r in readings)
+
+    def test_binary_batch(self):
+        raw = encode_binary_batch("PIWIFI-01", self.TOKEN, [
+            (1771756200000, {"temperature": 22.0}),
+            (1771756210000, {"temperature": 22.5, "pm25": 12.3}),
+        ])
+        assert raw[0] == 0xB2
+        readings = decode_sensor_readings(raw.decode("latin-1"))
+        assert [r.values["temperature"] for r in readings] == [22.0, 22.5]
+        assert readings[1].values["pm25"] == 12.3
+        assert readings[1].device_timestamp.second == 10
+
+    def test_readings_must_be_an_array(self):
+        assert decode_sensor_readings(json.dumps({**DHT22_DATA, "readings": {}})) is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode, expected", [
+        ("latest", [False, False, True]),
+        ("each", [True, True, True]),
+    ])
+    async def test_license_once_and_alert_eval_mode(self, mode, expected):
+        device = MagicMock(device_id="PIWIFI-01", primary_sensor_code="BME680",
+                           air_quality_sensor_code="PMS5003")
+        validation = LicenseValidationResult(
+            is_valid=True, reason="Valid", device=device, workshop_id=1, pit_id=1,
+        )
+        writer = MagicMock(submit=AsyncMock())
+
+        with patch.object(mqtt_service, "validate_license_cached",
+                          new=AsyncMock(return_value=validation)) as validate, \
+             patch.object(mqtt_service, "get_sensor_writer", return_value=writer), \
+             patch.object(mqtt_service.settings, "INGEST_ALERT_EVAL_MODE", mode):
+            await mqtt_service._handle_sensor_message("workshop/1/pit/1/sensors", self._json_batch())
+
+        assert validate.await_count == 1
+        submitted = [c.args[0].temperature for c in writer.submit.await_args_list]
+        assert submitted == [22.0, 22.5, 23.0]          # oldest first
+        assert [c.kwargs["check_alerts"] for c in writer.submit.await_args_list] == expected
@@ -0,0 +1,114 @@
+"""
+test_reading_dedup.py
+Unit tests for reading_dedup.py
+
+Tests:
+  - A repeated (device_id, device_timestamp) is a duplicate; other devices are not
+  - Readings without a device timestamp are never duplicates
+  - The per-device window and the device LRU stay bounded
+  - The unique index catches duplicates the window missed; the writer skips them
+
+Author: PPF Monitoring Team
+Created: 2026-03-15
+"""
+
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.device import Device
+from src.models.pit import Pit
+from src.models.sensor_data import SensorData
+from src.models.workshop import Workshop
+from src.services.ingest_writer import SensorBatchWriter
+from src.services.reading_dedup import ReadingDeduplicator
+from src.utils.helpers import utc_now
+from tests.conftest import TestSessionLocal
+
+
+DEVICE_ID = "ESP32-DEDUP0000001"
+
+
+@pytest_asyncio.fixture
+async def pit(db_session: AsyncSession) -> Pit:
+    workshop = Workshop(name="Dedup Shop", slug="dedup-shop", created_at=utc_now())
+    db_session.add(workshop)
+    await db_session.flush()
+    pit = Pit(workshop_id=workshop.id, pit_number=1, name="Bay 1")
+    db_session.add(pit)
+    await db_session.flush()
+    db_session.add(Device(
+        device_id=DEVICE_ID, license_key="LIC-DEDU-P000-0001", status="active",
+        workshop_id=workshop.id, pit_id=pit.id,
+    ))
+    await db_session.commit()
+    return pit
+
+
+class TestReadingDeduplicator:
+
+    def test_repeat_is_duplicate(self):
+        dedup = ReadingDeduplicator(window_per_device=8, max_devices=10)
+        ts = utc_now()
+        assert not dedup.is_duplicate("A", ts)
+        assert dedup.is_duplicate("A", ts)
+        assert not dedup.is_duplicate("B", ts)
+        assert not dedup.is_duplicate("A", ts + timedelta(seconds=10))
+        assert dedup.stats == {"devices": 2, "accepted": 3, "duplicates": 1}
+
+    def test_missing_timestamp_never_duplicate(self):
+        dedup = ReadingDeduplicator(window_per_device=8, max_devices=10)
+        assert not dedup.is_duplicate("A", None)
+        assert not dedup.is_duplicate("A", None)
+
+    def test_window_and_devices_bounded(self):
+        dedup = ReadingDeduplicator(window_per_device=2, max_devices=2)
+        start = utc_now()
+        for i in range(3):
+            dedup.is_duplicate("A", start + timedelta(seconds=i))
+        # The oldest timestamp fell out of A's window
+        assert not dedup.is_duplicate("A", start)
+
+        dedup.is_duplicate("B", start)
+        dedup.is_duplicate("C", start)   # evicts A (least recently used)
+        assert dedup.stats["devices"] == 2
+        assert not dedup.is_duplicate("A", start + timedelta(seconds=2))
+
+    def test_forget_accepts_again(self):
+        dedup = ReadingDeduplicator(window_per_device=8, max_devices=10)
+        ts = utc_now()
+        dedup.is_duplicate("A", ts)
+        dedup.forget("A", ts)
+        assert not dedup.is_duplicate("A", ts)
+
+    @pytest.mark.asyncio
+    async def test_index_backstop_skips_stored_reading(self, pit, db_session):
+        ts = utc_now() - timedelta(minutes=1)
+
+        def reading(temperature: float) -> SensorData:
+            return SensorData(
+                device_id=DEVICE_ID, pit_id=pit.id, workshop_id=pit.workshop_id,
+                temperature=temperature, is_valid=True,
+                device_timestamp=ts + timedelta(seconds=temperature), created_at=utc_now(),
+            )
+
+        # Stored by an earlier run / another process
+        db_session.add(reading(1.0))
+        await db_session.commit()
+
+        writer = SensorBatchWriter(max_rows=10, max_delay_ms=1000, session_factory=TestSessionLocal)
+        writer.start()
+        with patch("src.services.websocket_service.broadcast_sensor_update", new=AsyncMock()):
+            for temperature in (1.0, 2.0):
+                await writer.submit(reading(temperature), pit.workshop_id, pit.id, check_alerts=False)
+            await writer.stop()
+
+        assert writer.rows_written == 1
+        assert writer.rows_duplicate == 1
+        assert writer.rows_failed == 0
+        count = await db_session.execute(select(func.count()).select_from(SensorData))
+        assert count.scalar_one() == 2
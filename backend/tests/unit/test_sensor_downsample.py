@@ -0,0 +1,100 @@
+"""
+test_sensor_downsample.py
+Unit tests for sensor_downsample.py
+
+Tests:
+  - LTTB keeps the end points, max_points points, and short spikes
+  - The NumPy and pure-Python paths pick the same points
+  - Streamed series share one time axis; missing values are masked per metric
+
+Author: PPF Monitoring Team
+Created: 2026-03-24
+"""
+
+import math
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services import sensor_downsample
+from src.services.sensor_downsample import downsampled_series, lttb_indices, stream_series
+from src.utils.helpers import utc_now
+from tests.conftest import make_reading
+
+
+def _wave(size: int) -> tuple[list[float], list[float]]:
+    x = [float(i * 10) for i in range(size)]
+    y = [20.0 + math.sin(i / 25) * 3 + (i % 7) * 0.1 for i in range(size)]
+    return x, y
+
+
+@pytest.fixture(params=["numpy", "python"])
+def lttb_path(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(sensor_downsample, "np", None)
+    return request.param
+
+
+class TestLttb:
+
+    def test_short_series_kept_whole(self, lttb_path):
+        x, y = _wave(10)
+        assert lttb_indices(x, y, 20) == list(range(10))
+
+    def test_keeps_end_points_and_spike(self, lttb_path):
+        x, y = _wave(5000)
+        y[3217] = 400.0          # a one-reading PM burst
+        kept = lttb_indices(x, y, 100)
+        assert len(kept) == 100
+        assert kept[0] == 0 and kept[-1] == 4999
+        assert kept == sorted(set(kept))
+        assert 3217 in kept
+
+    def test_paths_agree(self, monkeypatch):
+        pytest.importorskip("numpy")
+        x, y = _wave(2345)
+        vectorised = lttb_indices(x, y, 300)
+        monkeypatch.setattr(sensor_downsample, "np", None)
+        assert lttb_indices(x, y, 300) == vectorised
+
+
+class TestStreamedSeries:
+
+    @pytest.mark.asyncio
+    async def test_stream_and_downsample(self, db_session: AsyncSession, seeded_pit: dict, lttb_path):
+        start = utc_now().replace(microsecond=0) - timedelta(hours=2)
+        db_session.add_all(
+            make_reading(
+                seeded_pit, start + timedelta(seconds=i * 10),
+                temperature=20.0 + i % 4,
+                pm25=None if i % 2 else 5.0 + (90.0 if i == 300 else 0.0),
+                is_valid=i != 10,
+            )
+            for i in range(600)
+        )
+        await db_session.commit()
+        end = start + timedelta(hours=2)
+
+        series = await stream_series(db_session, seeded_pit["id"], start, end, ["temperature", "pm25"])
+        assert len(series.times) == 599                      # the invalid reading is skipped
+        assert series.times[0] == pytest.approx(start.timestamp(), abs=1e-3)
+        assert list(series.times) == sorted(series.times)
+        assert len(series.values["pm25"]) == len(series.valid["pm25"]) == 599
+        assert sum(series.valid["temperature"]) == 599
+        assert sum(series.valid["pm25"]) == 299
+
+        times, values = series.points("pm25")
+        assert len(times) == len(values) == 299
+        assert times[0] == series.times[0]                   # i = 0 has a value
+        assert times[1] == pytest.approx(series.times[2])     # i = 1 has none
+        assert float(values[149]) == 95.0                    # i = 300 (i = 10 is invalid)
+
+        downsampled = await downsampled_series(db_session, seeded_pit["id"], start, end, ["pm25"], 50)
+        pm25 = downsampled["pm25"]
+        assert pm25["raw_count"] == 299
+        assert len(pm25["timestamps"]) == len(pm25["values"]) == 50
+        assert 95.0 in pm25["values"]
+        assert pm25["timestamps"][0] == start
@@ -0,0 +1,94 @@
+"""
+test_sensor_partitions.py
+Unit tests for sensor_partitions.py and sensor_service.latest_reading
+
+Tests:
+  - Month arithmetic and partition naming across year boundaries
+  - Partition upkeep is a no-op on an unpartitioned (SQLite) table
+  - latest_reading finds readings older than the lookback window too
+  - The per-partition dedup index is recognised as a duplicate reading
+
+Author: PPF Monitoring Team
+Created: 2026-03-18
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.reading_dedup import is_duplicate_reading
+from src.services.sensor_partitions import (
+    SensorPartitionMaintainer,
+    add_months,
+    month_start,
+    partition_name,
+)
+from src.services.sensor_service import latest_reading
+from src.utils.helpers import utc_now
+from tests.conftest import TestSessionLocal, make_reading
+
+
+class TestMonthArithmetic:
+
+    def test_month_start(self):
+        value = datetime(2026, 3, 18, 13, 45, 12, 500, tzinfo=timezone.utc)
+        assert month_start(value) == datetime(2026, 3, 1, tzinfo=timezone.utc)
+        assert month_start(datetime(2026, 3, 18)) == datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+    def test_add_months_across_years(self):
+        start = datetime(2026, 11, 1, tzinfo=timezone.utc)
+        assert add_months(start, 1) == datetime(2026, 12, 1, tzinfo=timezone.utc)
+        assert add_months(start, 2) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+        assert add_months(start, -11) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+
+    def test_partition_name(self):
+        assert partition_name(datetime(2026, 3, 1)) == "sensor_data_y2026m03"
+
+
+class TestPartitionMaintainer:
+
+    @pytest.mark.asyncio
+    async def test_noop_when_not_partitioned(self):
+        maintainer = SensorPartitionMaintainer(months_ahead=2, session_factory=TestSessionLocal)
+        assert await maintainer.run_once() == []
+
+    def test_partition_dedup_index_is_duplicate(self):
+        error = IntegrityError("INSERT", {}, Exception(
+            'duplicate key value violates unique constraint '
+            '"uq_sensor_data_y2026m03_device_timestamp"'
+        ))
+        assert is_duplicate_reading(error)
+        other = IntegrityError("INSERT", {}, Exception('unique constraint "sensor_data_pkey"'))
+        assert not is_duplicate_reading(other)
+
+
+class TestLatestReading:
+
+    @pytest.mark.asyncio
+    async def test_within_lookback(self, db_session: AsyncSession, seeded_pit: dict):
+        now = utc_now()
+        db_session.add_all([
+            make_reading(seeded_pit, now - timedelta(minutes=5)),
+            make_reading(seeded_pit, now - timedelta(minutes=1), is_valid=False),
+        ])
+        await db_session.commit()
+
+        assert (await latest_reading(db_session, seeded_pit["id"])).is_valid is False
+        latest_valid = await latest_reading(db_session, seeded_pit["id"], valid_only=True)
+        assert latest_valid.is_valid is True
+
+    @pytest.mark.asyncio
+    async def test_falls_back_beyond_lookback(self, db_session: AsyncSession, seeded_pit: dict):
+        old = utc_now() - timedelta(days=90)
+        db_session.add_all([
+            make_reading(seeded_pit, old),
+            make_reading(seeded_pit, old - timedelta(days=1)),
+        ])
+        await db_session.commit()
+
+        reading = await latest_reading(db_session, seeded_pit["id"])
+        assert reading is not None
+        assert abs(reading.created_at.replace(tzinfo=timezone.utc) - old) < timedelta(seconds=1)
+        assert await latest_reading(db_session, seeded_pit["id"] + 1) is None
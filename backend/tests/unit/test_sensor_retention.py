@@ -0,0 +1,139 @@
+"""
+test_sensor_retention.py
+Unit tests for sensor_retention.py
+
+Tests:
+  - Policies resolve default → plan → workshop, coarser levels never expire first
+  - Expired raw readings are downsampled into rollups, archived and deleted in batches
+  - Expired rollup buckets are deleted per resolution
+  - The rollup compactor leaves buckets before the raw cutoff alone
+
+Author: PPF Monitoring Team
+Created: 2026-03-20
+"""
+
+import gzip
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.sensor_data import SensorData
+from src.models.sensor_rollup import SensorRollup
+from src.services.sensor_retention import SensorRetention, policy_for
+from src.services.sensor_rollups import RollupCompactor, floor_time
+from src.utils.helpers import utc_now
+from tests.conftest import SENSOR_DEVICE_ID, TestSessionLocal, make_reading
+
+
+POLICIES = {
+    "default": {"raw_days": 90, "rollup_1m_days": 365, "rollup_15m_days": 730, "rollup_1h_days": None},
+    "plans": {"trial": {"raw_days": 30, "rollup_1m_days": 20}},
+    "workshops": {7: {"raw_days": 400}},
+}
+
+
+@pytest.fixture
+def pit_options() -> dict:
+    # Trial plan (settings.yaml): raw 30 days, 1m rollups 90, 15m 730, 1h forever
+    return {"plan": "trial"}
+
+
+def _readings(pit: dict, start, count: int, step_seconds: int = 10) -> list[SensorData]:
+    return [
+        make_reading(pit, start + timedelta(seconds=i * step_seconds), temperature=20.0 + i % 5)
+        for i in range(count)
+    ]
+
+
+async def _count(db: AsyncSession, *where) -> int:
+    return await db.scalar(select(func.count()).select_from(SensorData).where(*where))
+
+
+class TestPolicy:
+
+    def test_resolution_order(self):
+        assert policy_for(1, "basic", POLICIES).raw_days == 90
+        assert policy_for(1, "trial", POLICIES).raw_days == 30
+        assert policy_for(7, "trial", POLICIES).raw_days == 400
+
+    def test_levels_never_expire_before_finer(self):
+        trial = policy_for(1, "trial", POLICIES)
+        assert trial.rollup_days == {60: 30, 900: 730, 3600: None}
+        workshop = policy_for(7, "basic", POLICIES)
+        assert workshop.rollup_days == {60: 400, 900: 730, 3600: None}
+
+
+class TestSensorRetention:
+
+    @pytest.mark.asyncio
+    async def test_raw_downsampled_archived_and_purged(
+        self, db_session: AsyncSession, seeded_pit: dict, tmp_path,
+    ):
+        now = utc_now()
+        old_start = floor_time(now - timedelta(days=40), 3600) + timedelta(seconds=7)
+        db_session.add_all(_readings(seeded_pit, old_start, 360))          # one expired hour
+        db_session.add_all(_readings(seeded_pit, now - timedelta(days=1), 30))
+        await db_session.commit()
+
+        retention = SensorRetention(
+            batch_rows=50, batch_pause_ms=0, archive_dir=str(tmp_path),
+            session_factory=TestSessionLocal,
+        )
+        result = await retention.run_once(now)
+
+        assert result["raw_deleted"] == 360
+        assert await _count(db_session) == 30
+        hour = await db_session.scalar(
+            select(func.sum(SensorRollup.reading_count)).where(
+                SensorRollup.pit_id == seeded_pit["id"], SensorRollup.resolution_seconds == 3600
+            )
+        )
+        assert hour == 360
+
+        month = old_start.strftime("%Y_%m")
+        path = tmp_path / f"workshop_{seeded_pit['workshop_id']}" / f"sensor_data_{month}.jsonl.gz"
+        with gzip.open(path, "rt") as f:
+            archived = [json.loads(line) for line in f]
+        assert len(archived) == 360
+        assert archived[0]["device_id"] == SENSOR_DEVICE_ID
+        assert retention.stats["raw_archived"] == 360
+
+    @pytest.mark.asyncio
+    async def test_expired_rollups_deleted(self, db_session: AsyncSession, seeded_pit: dict):
+        now = utc_now()
+        old = floor_time(now - timedelta(days=100), 3600)
+        for resolution in (60, 900, 3600):
+            db_session.add(SensorRollup(
+                pit_id=seeded_pit["id"], resolution_seconds=resolution, bucket_start=old, reading_count=6,
+            ))
+        await db_session.commit()
+
+        result = await SensorRetention(
+            batch_pause_ms=0, session_factory=TestSessionLocal,
+        ).run_once(now)
+
+        assert result["rollups_deleted"] == 1
+        remaining = (await db_session.execute(
+            select(SensorRollup.resolution_seconds).where(SensorRollup.pit_id == seeded_pit["id"])
+        )).scalars().all()
+        assert sorted(remaining) == [900, 3600]
+
+    @pytest.mark.asyncio
+    async def test_compactor_skips_expired_buckets(self, db_session: AsyncSession, seeded_pit: dict):
+        now = utc_now()
+        # Late rows: one long expired, one recent
+        db_session.add_all(_readings(seeded_pit, now - timedelta(days=45), 1))
+        db_session.add_all(_readings(seeded_pit, now - timedelta(hours=2), 1))
+        await db_session.commit()
+
+        with patch("src.services.sensor_rollups.settings.RETENTION_ENABLED", True):
+            await RollupCompactor(session_factory=TestSessionLocal).run_once()
+
+        starts = (await db_session.execute(
+            select(SensorRollup.bucket_start).where(SensorRollup.resolution_seconds == 60)
+        )).scalars().all()
+        assert len(starts) == 1
@@ -0,0 +1,215 @@
+"""
+test_sensor_rollups.py
+Unit tests for sensor_rollups.py
+
+Tests:
+  - Bucket alignment and the coarsest-first segment plan
+  - The compactor builds 1m / 15m / 1h buckets matching the raw readings
+  - Readings inserted later with an old created_at are folded in on the next pass
+  - A process without the leader lock skips its pass and re-seeds on takeover
+  - Window aggregates from rollups + raw edges equal the raw aggregate
+  - Bucketed aggregates equal the raw readings grouped per bucket
+
+Author: PPF Monitoring Team
+Created: 2026-03-19
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.sensor_data import SensorData
+from src.models.sensor_rollup import SensorRollup
+from src.services.sensor_rollups import (
+    RollupCompactor,
+    bucketed_aggregate,
+    ceil_time,
+    floor_time,
+    plan_segments,
+    window_aggregate,
+)
+from src.utils.helpers import utc_now
+from tests.conftest import TestSessionLocal, make_reading
+
+
+UTC = timezone.utc
+
+
+def _readings(pit: dict, start: datetime, count: int, step_seconds: int = 50) -> list[SensorData]:
+    return [
+        make_reading(
+            pit, start + timedelta(seconds=i * step_seconds),
+            temperature=20.0 + (i % 7), humidity=50.0 - (i % 5),
+            pm25=None if i % 3 else float(i % 40),
+            is_valid=i % 11 != 0,
+        )
+        for i in range(count)
+    ]
+
+
+async def _raw_stats(db: AsyncSession, pit_id: int, start: datetime, end: datetime) -> tuple:
+    result = await db.execute(
+        select(
+            func.count(SensorData.id), func.avg(SensorData.temperature),
+            func.min(SensorData.temperature), func.max(SensorData.pm25),
+        ).where(
+            SensorData.pit_id == pit_id,
+            SensorData.is_valid.is_(True),
+            SensorData.created_at >= start,
+            SensorData.created_at <= end,
+        )
+    )
+    return tuple(result.one())
+
+
+class TestBuckets:
+
+    def test_floor_and_ceil(self):
+        value = datetime(2026, 3, 19, 10, 7, 30, tzinfo=UTC)
+        assert floor_time(value, 900) == datetime(2026, 3, 19, 10, 0, tzinfo=UTC)
+        assert ceil_time(value, 900) == datetime(2026, 3, 19, 10, 15, tzinfo=UTC)
+        aligned = datetime(2026, 3, 19, 10, 15, tzinfo=UTC)
+        assert ceil_time(aligned, 900) == aligned
+
+    def test_plan_uses_coarsest_buckets(self):
+        start = datetime(2026, 3, 19, 9, 58, tzinfo=UTC)
+        end = datetime(2026, 3, 19, 12, 17, tzinfo=UTC)
+        assert plan_segments(start, end) == [
+            (60, start, datetime(2026, 3, 19, 10, 0, tzinfo=UTC)),
+            (3600, datetime(2026, 3, 19, 10, 0, tzinfo=UTC), datetime(2026, 3, 19, 12, 0, tzinfo=UTC)),
+            (900, datetime(2026, 3, 19, 12, 0, tzinfo=UTC), datetime(2026, 3, 19, 12, 15, tzinfo=UTC)),
+            (60, datetime(2026, 3, 19, 12, 15, tzinfo=UTC), end),
+        ]
+        assert plan_segments(end, end) == []
+
+
+class TestRollupCompactor:
+
+    @pytest.mark.asyncio
+    async def test_buckets_match_raw(self, db_session: AsyncSession, seeded_pit: dict):
+        start = floor_time(utc_now() - timedelta(hours=3), 3600)
+        db_session.add_all(_readings(seeded_pit, start, 150))   # ~2 hours
+        await db_session.commit()
+
+        compactor = RollupCompactor(batch_rows=40, session_factory=TestSessionLocal)
+        while True:
+            await compactor.run_once()
+            if not compactor.backlog_rows:
+                break
+
+        for resolution in (60, 900, 3600):
+            result = await db_session.execute(
+                select(func.sum(SensorRollup.reading_count), func.max(SensorRollup.temperature_max))
+                .where(SensorRollup.pit_id == seeded_pit["id"], SensorRollup.resolution_seconds == resolution)
+            )
+            assert tuple(result.one()) == (136, 26.0)
+        first_hour = await db_session.get(SensorRollup, (seeded_pit["id"], 3600, start))
+        assert first_hour.reading_count == 65
+
+    @pytest.mark.asyncio
+    async def test_late_rows_folded_in(self, db_session: AsyncSession, seeded_pit: dict):
+        start = floor_time(utc_now() - timedelta(days=2), 3600)
+        db_session.add_all(_readings(seeded_pit, start, 10))
+        await db_session.commit()
+        compactor = RollupCompactor(session_factory=TestSessionLocal)
+        await compactor.run_once()
+
+        # e.g. replayed from the spool: new id, old created_at
+        db_session.add_all(_readings(seeded_pit, start + timedelta(seconds=5), 3))
+        await db_session.commit()
+        assert await compactor.run_once() == 1
+
+        hour = await db_session.get(SensorRollup, (seeded_pit["id"], 3600, start))
+        await db_session.refresh(hour)
+        assert hour.reading_count == 11
+
+    @pytest.mark.asyncio
+    async def test_follower_skips_pass(self, db_session: AsyncSession, seeded_pit: dict):
+        db_session.add_all(_readings(seeded_pit, utc_now() - timedelta(hours=1), 10))
+        await db_session.commit()
+        compactor = RollupCompactor(session_factory=TestSessionLocal)
+        await compactor.run_once()
+        assert compactor._last_id is not None and compactor.stats["leader"] is True
+
+        @asynccontextmanager
+        async def held_elsewhere(session_factory, name):
+            yield False
+
+        with patch("src.services.sensor_rollups.leader_lock", held_elsewhere):
+            assert await compactor.run_once() == 0
+        assert compactor._last_id is None        # re-seeded from the rollups on takeover
+        assert compactor.stats["leader"] is False
+
+
+class TestWindowAggregate:
+
+    @pytest.mark.asyncio
+    async def test_matches_raw_aggregate(self, db_session: AsyncSession, seeded_pit: dict):
+        now = utc_now()
+        db_session.add_all(_readings(seeded_pit, now - timedelta(hours=5), 340))
+        await db_session.commit()
+        await RollupCompactor(session_factory=TestSessionLocal).run_once()
+
+        # Newer than the last pass: must come from the raw tail
+        db_session.add_all(_readings(seeded_pit, now - timedelta(seconds=30), 2))
+        await db_session.commit()
+
+        since = now - timedelta(hours=4, seconds=17)
+        end = now + timedelta(minutes=1)
+        stats = await window_aggregate(db_session, seeded_pit["id"], since, end)
+        count, temp_avg, temp_min, pm25_max = await _raw_stats(db_session, seeded_pit["id"], since, end)
+
+        assert stats.reading_count == count
+        assert stats.metrics["temperature"].avg == pytest.approx(temp_avg)
+        assert stats.metrics["temperature"].min == temp_min
+        assert stats.metrics["pm25"].max == pm25_max
+
+    @pytest.mark.asyncio
+    async def test_without_rollups(self, db_session: AsyncSession, seeded_pit: dict):
+        now = utc_now()
+        db_session.add_all(_readings(seeded_pit, now - timedelta(hours=1), 30))
+        await db_session.commit()
+
+        since = now - timedelta(hours=2)
+        stats = await window_aggregate(db_session, seeded_pit["id"], since, now)
+        count, temp_avg, _, _ = await _raw_stats(db_session, seeded_pit["id"], since, now)
+        assert stats.reading_count == count
+        assert stats.metrics["temperature"].avg == pytest.approx(temp_avg)
+        assert stats.metrics["pressure"].avg is None
+
+
+class TestBucketedAggregate:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("bucket_seconds", [60, 300, 3600, 86400])
+    async def test_matches_raw_per_bucket(self, db_session: AsyncSession, seeded_pit: dict, bucket_seconds):
+        now = utc_now()
+        readings = _readings(seeded_pit, now - timedelta(hours=5), 340)
+        db_session.add_all(readings)
+        await db_session.commit()
+        await RollupCompactor(session_factory=TestSessionLocal).run_once()
+
+        tail = _readings(seeded_pit, now - timedelta(seconds=30), 2)
+        db_session.add_all(tail)
+        await db_session.commit()
+
+        since = now - timedelta(hours=4, seconds=17)
+        end = now + timedelta(minutes=1)
+        expected: dict[datetime, list[float]] = {}
+        for reading in readings + tail:
+            at = reading.created_at
+            if reading.is_valid and since <= at <= end:
+                expected.setdefault(floor_time(at, bucket_seconds), []).append(reading.temperature)
+
+        buckets = await bucketed_aggregate(db_session, seeded_pit["id"], since, end, bucket_seconds)
+
+        assert list(buckets) == sorted(expected)
+        for start, temps in expected.items():
+            temperature = buckets[start].metrics["temperature"]
+            assert buckets[start].reading_count == len(temps)
+            assert temperature.avg == pytest.approx(sum(temps) / len(temps))
+            assert (temperature.min, temperature.max) == (min(temps), max(temps))
@@ -0,0 +1,144 @@
+"""
+test_threshold_cache.py
+Unit tests for threshold_cache.py
+
+Tests:
+  - Resolution order: pit override → workshop config → default, with the source of each value
+  - Cached entries are reused without further queries
+  - invalidate_pit / invalidate_workshop pick up committed changes
+  - Entries expire after the TTL (changes served by another worker); ttl 0 disables caching
+
+Author: PPF Monitoring Team
+Created: 2026-03-11
+"""
+
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.alert import AlertConfig
+from src.models.pit import Pit
+from src.models.pit_alert_config import PitAlertConfig
+from src.models.workshop import Workshop
+from src.services.threshold_cache import ThresholdCache
+from src.utils.helpers import utc_now
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fixtures
+# ─────────────────────────────────────────────────────────────────────────────
+
+@pytest_asyncio.fixture
+async def workshop_with_pits(db_session: AsyncSession) -> dict:
+    workshop = Workshop(name="Threshold Shop", slug="threshold-shop", created_at=utc_now())
+    db_session.add(workshop)
+    await db_session.flush()
+
+    pits = [
+        Pit(workshop_id=workshop.id, pit_number=n, name=f"Pit {n}", created_at=utc_now())
+        for n in (1, 2)
+    ]
+    db_session.add_all(pits)
+    await db_session.flush()
+
+    ws_config = AlertConfig(workshop_id=workshop.id, temp_max=30.0)
+    pit_config = PitAlertConfig(pit_id=pits[0].id, temp_max=28.0, device_offline_threshold_seconds=120)
+    db_session.add_all([ws_config, pit_config])
+    await db_session.commit()
+    return {
+        "workshop_id": workshop.id,
+        "pit_ids": [p.id for p in pits],
+        "ws_config": ws_config,
+        "pit_config": pit_config,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ThresholdCache
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestThresholdCache:
+
+    @pytest.mark.asyncio
+    async def test_resolution_order(self, db_session, workshop_with_pits):
+        cache = ThresholdCache()
+        ws_id = workshop_with_pits["workshop_id"]
+        override_pit, plain_pit = workshop_with_pits["pit_ids"]
+
+        result = await cache.get_many(db_session, ws_id, [override_pit, plain_pit])
+
+        assert result[override_pit].temp_max == 28.0                        # pit override
+        assert result[override_pit].device_offline_threshold_seconds == 120
+        assert result[plain_pit].temp_max == 30.0                           # workshop config
+        assert result[plain_pit].pm25_critical == 35.4                      # model default
+
+        assert result[override_pit].sources["temp_max"] == "pit"
+        assert result[plain_pit].as_sourced_dict()["temp_max_source"] == "workshop"
+
+    @pytest.mark.asyncio
+    async def test_missing_configs_fall_back_to_defaults(self, db_session):
+        cache = ThresholdCache()
+        thresholds = await cache.get(db_session, workshop_id=999, pit_id=999)
+        assert thresholds.temp_min == 15.0
+        assert thresholds.as_dict()["device_offline_threshold_seconds"] == 60
+        assert set(thresholds.sources.values()) == {"default"}
+
+    @pytest.mark.asyncio
+    async def test_hit_does_not_query(self, db_session, workshop_with_pits):
+        cache = ThresholdCache()
+        ws_id = workshop_with_pits["workshop_id"]
+        pit_id = workshop_with_pits["pit_ids"][0]
+
+        first = await cache.get(db_session, ws_id, pit_id)
+        with patch.object(db_session, "execute", side_effect=AssertionError("queried")):
+            second = await cache.get(db_session, ws_id, pit_id)
+
+        assert second is first
+
+    @pytest.mark.asyncio
+    async def test_invalidate_picks_up_changes(self, db_session, workshop_with_pits):
+        cache = ThresholdCache()
+        ws_id = workshop_with_pits["workshop_id"]
+        override_pit, plain_pit = workshop_with_pits["pit_ids"]
+        await cache.get_many(db_session, ws_id, [override_pit, plain_pit])
+
+        workshop_with_pits["pit_config"].temp_max = None
+        workshop_with_pits["ws_config"].temp_max = 33.0
+        await db_session.commit()
+
+        # Not rebuilt until a config route invalidates it
+        assert (await cache.get(db_session, ws_id, override_pit)).temp_max == 28.0
+
+        cache.invalidate_pit(override_pit)
+        assert (await cache.get(db_session, ws_id, override_pit)).temp_max == 33.0
+        assert (await cache.get(db_session, ws_id, plain_pit)).temp_max == 30.0
+
+        cache.invalidate_workshop(ws_id)
+        assert len(cache) == 0
+        assert (await cache.get(db_session, ws_id, plain_pit)).temp_max == 33.0
+
+    @pytest.mark.asyncio
+    async def test_ttl_picks_up_changes_from_elsewhere(self, db_session, workshop_with_pits):
+        cache = ThresholdCache(ttl_seconds=60)
+        ws_id = workshop_with_pits["workshop_id"]
+        pit_id = workshop_with_pits["pit_ids"][1]
+        with patch("src.services.threshold_cache.time.monotonic", return_value=1000.0):
+            assert (await cache.get(db_session, ws_id, pit_id)).temp_max == 30.0
+
+        # Committed by another worker: no invalidate_* call reaches this cache
+        workshop_with_pits["ws_config"].temp_max = 33.0
+        await db_session.commit()
+
+        with patch("src.services.threshold_cache.time.monotonic", return_value=1059.0):
+            assert (await cache.get(db_session, ws_id, pit_id)).temp_max == 30.0
+        with patch("src.services.threshold_cache.time.monotonic", return_value=1060.0):
+            assert (await cache.get_many(db_session, ws_id, [pit_id]))[pit_id].temp_max == 33.0
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_disables_caching(self, db_session, workshop_with_pits):
+        cache = ThresholdCache(ttl_seconds=0)
+        ws_id = workshop_with_pits["workshop_id"]
+        await cache.get_many(db_session, ws_id, workshop_with_pits["pit_ids"])
+        assert len(cache) == 0
@@ -7,6 +7,8 @@ Sends BME688 + PMS5003 data to cloud MQTT broker
 import json
 import time
 import ssl
+import hashlib
+import struct
 import serial
 import bme680
 from smbus import SMBus
@@ -28,6 +30,46 @@ LICENSE_KEY = 'LIC-RG-STUDIO-2026'
 WORKSHOP_ID = 2
 PIT_ID = 3  # Pit One
 TOPIC = f'workshop/{WORKSHOP_ID}/pit/{PIT_ID}/sensors'
+PAYLOAD_FORMAT = 'binary'  # 'binary' (compact) or 'json'
+
+# --- Compact binary payload (format v1, decoded by the backend next to JSON) ---
+# Header byte 0xB1 | device_id | 8-byte license token | epoch-ms | fields
+# Field IDs and fixed-point scales must match backend payload_decoder.BINARY_FIELDS
+BINARY_FIELDS = {
+    'temperature': (1, 'h', 100),
+    'humidity': (2, 'H', 100),
+    'pressure': (3, 'I', 100),
+    'gas_resistance': (4, 'I', 1),
+    'pm1': (7, 'H', 10),
+    'pm25': (8, 'H', 10),
+    'pm10': (9, 'H', 10),
+}
+LICENSE_TOKEN = hashlib.sha256(LICENSE_KEY.encode('utf-8')).digest()[:8]
+
+def encode_binary(values):
+    device = DEVICE_ID.encode('utf-8')
+    fields = [(name, v) for name, v in values.items() if v is not None and name in BINARY_FIELDS]
+    out = [struct.pack('!BB', 0xB1, len(device)), device,
+           struct.pack('!8sQB', LICENSE_TOKEN, int(time.time() * 1000), len(fields))]
+    for name, value in fields:
+        field_id, fmt, scale = BINARY_FIELDS[name]
+        out.append(struct.pack('!B' + fmt, field_id, round(value * scale)))
+    return b''.join(out)
+
+def encode_payload(values):
+    """Binary when PAYLOAD_FORMAT is 'binary' and every value fits; JSON otherwise."""
+    if PAYLOAD_FORMAT == 'binary':
+        try:
+            return encode_binary(values)
+        except struct.error:
+            pass
+    payload = {
+        'device_id': DEVICE_ID,
+        'license_key': LICENSE_KEY,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+    payload.update(values)
+    return json.dumps(payload)
 
 print(f"🔌 Connecting to HiveMQ Cloud: {MQTT_BROKER}:{MQTT_PORT}")
 print(f"📡 Publishing to: {TOPIC}")
@@ -104,10 +146,7 @@ while True:
                 }
         
         # Publish to HiveMQ
-        payload = {
-            'device_id': DEVICE_ID,
-            'license_key': LICENSE_KEY,
-            'timestamp': datetime.now(timezone.utc).isoformat(),
+        values = {
             'temperature': temp,
             'humidity': humidity,
             'pressure': pressure,
@@ -117,7 +156,7 @@ while True:
             'pm10': pms_data['pm10']
         }
         
-        client.publish(TOPIC, json.dumps(payload))
+        client.publish(TOPIC, encode_payload(values))
         print(f"✅ Sent: T={temp:.1f}°C, H={humidity:.1f}%, PM2.5={pms_data['pm25']}")
         
     except Exception as e:
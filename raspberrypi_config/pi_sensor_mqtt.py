@@ -7,6 +7,8 @@ Reads BME688 (I2C) and PMS5003 (UART) sensors and publishes to HiveMQ Cloud
 import time
 import ssl
 import json
+import hashlib
+import struct
 import serial
 import paho.mqtt.client as mqtt
 import bme680
@@ -24,6 +26,67 @@ LICENSE_KEY = 'LIC-RG-STUDIO-2026'
 WORKSHOP_ID = 2
 PIT_ID = 3
 TOPIC = f'workshop/{WORKSHOP_ID}/pit/{PIT_ID}/sensors'
+PAYLOAD_FORMAT = 'binary'  # 'binary' (compact) or 'json'
+READ_INTERVAL_SECONDS = 10
+BATCH_WINDOW_SECONDS = 0   # >0: collect readings and publish them in one message (e.g. 60)
+
+# --- Compact binary payload (format v1, decoded by the backend next to JSON) ---
+# Header 0xB1 (one reading) or 0xB2 (batch) | device_id | 8-byte license token
+# | [reading count] | per reading: epoch-ms, fields
+# Field IDs and fixed-point scales must match backend payload_decoder.BINARY_FIELDS
+BINARY_FIELDS = {
+    'temperature': (1, 'h', 100),
+    'humidity': (2, 'H', 100),
+    'pressure': (3, 'I', 100),
+    'gas_resistance': (4, 'I', 1),
+    'pm1': (7, 'H', 10),
+    'pm25': (8, 'H', 10),
+    'pm10': (9, 'H', 10),
+}
+LICENSE_TOKEN = hashlib.sha256(LICENSE_KEY.encode('utf-8')).digest()[:8]
+
+def encode_reading(ts_ms, values):
+    fields = [(name, v) for name, v in values.items() if v is not None and name in BINARY_FIELDS]
+    out = [struct.pack('!QB', ts_ms, len(fields))]
+    for name, value in fields:
+        field_id, fmt, scale = BINARY_FIELDS[name]
+        out.append(struct.pack('!B' + fmt, field_id, round(value * scale)))
+    return b''.join(out)
+
+def encode_binary(readings):
+    device = DEVICE_ID.encode('utf-8')
+    if len(readings) == 1:
+        head = struct.pack('!BB', 0xB1, len(device)) + device + LICENSE_TOKEN
+    else:
+        head = (struct.pack('!BB', 0xB2, len(device)) + device + LICENSE_TOKEN
+                + struct.pack('!B', len(readings)))
+    return head + b''.join(encode_reading(ts_ms, values) for ts_ms, values in readings)
+
+def encode_payload(readings):
+    """
+    readings: list of (epoch_ms, values). Binary when PAYLOAD_FORMAT is
+    'binary' and every value fits; JSON otherwise. Several readings go
+    out as one batch message.
+    """
+    if PAYLOAD_FORMAT == 'binary':
+        try:
+            return encode_binary(readings)
+        except struct.error:
+            pass
+    payload = {
+        'device_id': DEVICE_ID,
+        'license_key': LICENSE_KEY,
+        'sensor_type': 'PIWIFI-01',
+    }
+    items = [
+        dict(values, timestamp=datetime.fromtimestamp(ts_ms / 1000, UTC).isoformat())
+        for ts_ms, values in readings
+    ]
+    if len(items) == 1:
+        payload.update(items[0])
+    else:
+        payload['readings'] = items
+    return json.dumps(payload)
 
 # --- Initialize PMS5003 ---
 print('Initializing PMS5003...')
@@ -110,31 +173,35 @@ except Exception as e:
 print('Starting sensor data stream...')
 time.sleep(2)
 
+pending = []        # (epoch_ms, values) waiting for the batch window
+window_start = None
+
 while True:
     try:
         pms_data = read_pms5003(ser)
         bme_data = read_bme688(bme)
         
-        payload = {
-            'device_id': DEVICE_ID,
-            'license_key': LICENSE_KEY,
-            'timestamp': datetime.now(UTC).isoformat(),
-            'sensor_type': 'PIWIFI-01'
-        }
-        
+        values = {}
         if pms_data:
-            payload.update(pms_data)
+            values.update(pms_data)
         if bme_data:
-            payload.update(bme_data)
+            values.update(bme_data)
         
         if pms_data or bme_data:
-            client.publish(TOPIC, json.dumps(payload))
+            now = time.time()
+            pending.append((int(now * 1000), values))
+            if window_start is None:
+                window_start = now
+            if now - window_start >= BATCH_WINDOW_SECONDS or len(pending) >= 255:
+                client.publish(TOPIC, encode_payload(pending))
+                pending, window_start = [], None
             temp = bme_data['temperature'] if bme_data else 'N/A'
             hum = bme_data['humidity'] if bme_data else 'N/A'
             pm25 = pms_data['pm25'] if pms_data else 'N/A'
-            print(f'Published: T={temp}°C, H={hum}%, PM2.5={pm25}')
+            state = 'Published' if not pending else f'Queued ({len(pending)} in batch)'
+            print(f'{state}: T={temp}°C, H={hum}%, PM2.5={pm25}')
         
-        time.sleep(10)
+        time.sleep(READ_INTERVAL_SECONDS)
     except Exception as e:
         print(f'Loop error: {e}')
-        time.sleep(10)
+        time.sleep(READ_INTERVAL_SECONDS)